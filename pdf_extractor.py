@@ -11,11 +11,12 @@ import json
 import logging
 import base64
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Mapping, NamedTuple
 import fitz  # PyMuPDF
 import pdfplumber
 import pandas as pd
-from openai import OpenAI
+import xlsxwriter
+from openai import OpenAI, APITimeoutError
 from dotenv import load_dotenv
 from PIL import Image
 import io
@@ -26,6 +27,25 @@ import shutil
 import re
 import gc
 import time
+import csv
+import itertools
+import math
+import functools
+import operator
+import hashlib
+import concurrent.futures
+import difflib
+import sqlite3
+import socket
+import threading
+import multiprocessing
+import uuid
+import unicodedata
+import asyncio
+import abc
+from collections.abc import MutableMapping
+from contextlib import contextmanager, ExitStack
+from types import MappingProxyType
 
 # Configuration du logging avec encodage UTF-8 pour Windows
 def setup_logging():
@@ -136,6 +156,2512 @@ def safe_json_parse(content: str, context: str = "API response") -> Optional[Dic
         logger.error(f"Erreur inattendue parsing JSON pour {context}: {e}")
         return None
 
+# 📍 PARSING LOCAL DES EN-TÊTES CADASTRAUX (sans appel réseau)
+# Formats documentés dans le prompt de parse_header_text_with_gpt :
+#   "Département : 89   Commune : 238 MAILLY-LE-CHATEAU"
+#   "Département 89 Commune 238"
+#   "89238 MAILLY-LE-CHATEAU" / "89 238"
+#   "Cadastre 51179 ZY Propriétés"
+HEADER_DEPARTMENT_PATTERN = re.compile(r'd[ée]partement\s*:?\s*(\d{2})(?!\d)', re.IGNORECASE)
+HEADER_COMMUNE_PATTERN = re.compile(r'\bcom(?:mune)?\s*:?\s*(\d{3,5})(?!\d)', re.IGNORECASE)
+HEADER_CONDENSED_PATTERN = re.compile(r'(?<!\d)(\d{2})\s?(\d{3})(?!\d)(?:\s+([A-ZÀ-Ÿ][A-ZÀ-Ÿ\'-]*\b(?:[ -][A-ZÀ-Ÿ][A-ZÀ-Ÿ\'-]*\b)*))?')
+HEADER_COMMUNE_NAME_PATTERN = re.compile(r'(?<!\d)(\d{3})\s+([A-ZÀ-Ÿ][A-ZÀ-Ÿ\'-]*\b(?:[ -][A-ZÀ-Ÿ][A-ZÀ-Ÿ\'-]*\b)*)')
+
+# Table INSEE des communes (optionnelle) : CSV du COG INSEE (colonnes COM + NCC/LIBELLE)
+# ou CSV simple (colonnes code_insee + nom). Absente = pas de validation par la table.
+DEFAULT_INSEE_COMMUNES_FILE = Path(__file__).parent / "data" / "communes_insee.csv"
+_insee_communes_cache = {}
+
+def normalize_commune_name(name: str) -> str:
+    """
+    Normalise un nom de commune pour comparaison :
+    "Mailly-le-Château" → "MAILLY LE CHATEAU"
+    """
+    if not name:
+        return ""
+    without_accents = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r"[-'’]", ' ', without_accents).upper().split())
+
+def load_insee_communes(path: Optional[str] = None) -> Dict[str, str]:
+    """
+    Charge la table INSEE des communes {code_insee(5): nom normalisé}.
+
+    Le chemin peut être fourni via INSEE_COMMUNES_FILE. Retourne {} si la table
+    n'est pas disponible (la validation par la table est alors désactivée).
+    """
+    table_path = Path(path or os.getenv('INSEE_COMMUNES_FILE', '') or DEFAULT_INSEE_COMMUNES_FILE)
+    cache_key = str(table_path)
+    if cache_key in _insee_communes_cache:
+        return _insee_communes_cache[cache_key]
+
+    communes = {}
+    if table_path.exists():
+        try:
+            with open(table_path, encoding='utf-8-sig', newline='') as f:
+                sample = f.read(4096)
+                f.seek(0)
+                delimiter = ';' if sample.count(';') > sample.count(',') else ','
+                for row in csv.DictReader(f, delimiter=delimiter):
+                    # COG INSEE : ignorer les communes déléguées/associées
+                    if row.get('TYPECOM') and row['TYPECOM'] != 'COM':
+                        continue
+                    code = (row.get('COM') or row.get('code_insee') or '').strip()
+                    name = row.get('NCC') or row.get('LIBELLE') or row.get('nom') or ''
+                    if len(code) == 5:
+                        communes[code] = normalize_commune_name(name)
+            logger.info(f"📚 Table INSEE chargée: {len(communes)} communes ({table_path})")
+        except Exception as e:
+            logger.warning(f"Erreur chargement table INSEE {table_path}: {e}")
+            communes = {}
+
+    _insee_communes_cache[cache_key] = communes
+    return communes
+
+def parse_header_text_locally(header_text: str, insee_communes: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    Extrait département/commune d'un en-tête cadastral avec des regex.
+
+    Retourne {"department": "89", "commune": "238"} uniquement si la détection
+    est sûre, sinon {} (le repli ChatGPT prend alors le relais) :
+    - libellés explicites "Département"/"Commune" → sûr (si présent dans la table INSEE quand elle est chargée)
+    - formats condensés "89238 NOM" ou "238 NOM" → sûr seulement si validés par la table INSEE,
+      car un code postal d'adresse ("89660 MAILLY-LE-CHATEAU") a exactement la même forme
+    """
+    if not header_text or not header_text.strip():
+        return {}
+
+    if insee_communes is None:
+        insee_communes = load_insee_communes()
+
+    def in_table(dept: str, commune: str, name: str = "") -> bool:
+        table_name = insee_communes.get(f"{dept}{commune}")
+        if table_name is None:
+            return False
+        name = normalize_commune_name(name)
+        if len(name) >= 3:
+            # Le nom qui suit le code doit commencer par le nom officiel
+            # (les jetons courts comme une section "ZY" sont ignorés)
+            return name.startswith(table_name)
+        return True
+
+    # 1. Formats avec libellés : "Département : 89" + "Commune : 238"
+    dept_match = HEADER_DEPARTMENT_PATTERN.search(header_text)
+    commune_match = HEADER_COMMUNE_PATTERN.search(header_text)
+    labeled_dept = dept_match.group(1) if dept_match else None
+    labeled_commune = None
+    if commune_match:
+        code = commune_match.group(1)
+        if len(code) == 3:
+            labeled_commune = code
+        elif len(code) == 5 and (not labeled_dept or code[:2] == labeled_dept):
+            # "Commune : 89238" → département inclus dans le code INSEE
+            labeled_dept = labeled_dept or code[:2]
+            labeled_commune = code[2:]
+
+    if labeled_dept and labeled_commune:
+        if not insee_communes or in_table(labeled_dept, labeled_commune):
+            return {"department": labeled_dept, "commune": labeled_commune}
+
+    # Les formats suivants ne sont sûrs qu'avec la table INSEE
+    if not insee_communes:
+        return {}
+
+    candidates = []
+
+    # 2. Département libellé + "238 MAILLY-LE-CHATEAU"
+    if labeled_dept:
+        for match in HEADER_COMMUNE_NAME_PATTERN.finditer(header_text):
+            if in_table(labeled_dept, match.group(1), match.group(2)):
+                candidates.append((labeled_dept, match.group(1)))
+
+    # 3. Formats condensés "89238 MAILLY-LE-CHATEAU", "89 238", "51179"
+    for match in HEADER_CONDENSED_PATTERN.finditer(header_text):
+        dept, commune, name = match.group(1), match.group(2), match.group(3) or ""
+        if labeled_dept and dept != labeled_dept:
+            continue
+        if in_table(dept, commune, name):
+            candidates.append((dept, commune))
+
+    distinct_candidates = list(dict.fromkeys(candidates))
+    if len(distinct_candidates) == 1:
+        dept, commune = distinct_candidates[0]
+        return {"department": dept, "commune": commune}
+
+    return {}
+
+# Dictionnaires du filtrage propriétaires/adresses (fichier JSON éditable)
+DEFAULT_NAME_FILTERS_FILE = Path(__file__).parent / "data" / "name_filters.json"
+NAME_FILTER_CACHE_SIZE = 200_000
+_name_filters_cache = {}
+
+def compile_keyword_pattern(keywords) -> re.Pattern:
+    """
+    Compile une liste de mots-clés en une seule regex arborescente (trie) :
+    "PRE", "PRES", "PRES DE" → PRE(?:S(?: DE)?)?
+
+    pattern.search(texte) équivaut à any(mot in texte for mot in keywords),
+    mais chaque position n'est testée qu'une fois contre le préfixe commun.
+    """
+    trie = {}
+    for keyword in keywords:
+        if keyword:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+    def build(node):
+        branches = []
+        chars = []
+        for char in sorted(key for key in node if key):
+            child = node[char]
+            if list(child) == ['']:
+                chars.append(re.escape(char))
+            else:
+                branches.append(re.escape(char) + build(child))
+        if chars:
+            branches.append(chars[0] if len(chars) == 1 else '[' + ''.join(chars) + ']')
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Mot complet atteint : la suite est optionnelle
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    if not trie:
+        return re.compile(r'(?!)')  # Liste vide : ne correspond jamais
+    return re.compile(build(trie))
+
+class NameFilters:
+    """
+    Dictionnaires du filtrage propriétaires compilés une fois, avec mémoïsation par nom.
+
+    Les listes de sous-chaînes deviennent chacune une regex arborescente ; les mots
+    parasites et noms vides (comparaison exacte) deviennent des frozensets.
+    """
+
+    def __init__(self, filters: Dict[str, List[str]]):
+        self.parasitic_words = frozenset(filters.get('mots_parasites', []))
+        self.placeholder_names = frozenset(filters.get('noms_vides', []))
+        self.suspicious_start_pattern = compile_keyword_pattern(filters.get('prefixes_suspects', []))
+        self.legal_entity_pattern = compile_keyword_pattern(filters.get('personnes_morales', []))
+        self.address_pattern = compile_keyword_pattern(
+            filters.get('mots_adresse', []) + filters.get('motifs_adresse', [])
+        )
+        self.classic_name_pattern = compile_keyword_pattern(filters.get('motifs_noms_classiques', []))
+
+        # Mémoïsation : les mêmes noms reviennent sur chaque parcelle d'un propriétaire
+        self.is_likely_real_owner = functools.lru_cache(maxsize=NAME_FILTER_CACHE_SIZE)(self._is_likely_real_owner)
+        self.looks_like_address = functools.lru_cache(maxsize=NAME_FILTER_CACHE_SIZE)(self._looks_like_address)
+
+    def _looks_like_address(self, nom_upper: str) -> bool:
+        return self.address_pattern.search(nom_upper) is not None
+
+    def _is_likely_real_owner(self, nom: str, prenom: str) -> bool:
+        nom_stripped = nom.strip()
+        if not nom_stripped:
+            return False
+
+        nom_upper = nom.upper().strip()
+        prenom_clean = prenom.strip()
+
+        # 🚨 FILTRE STRICT: nom exact = mot parasite, ou préfixe suspect
+        if nom_upper in self.parasitic_words:
+            logger.debug(f"🗑️ REJETÉ (mot parasite): {nom}")
+            return False
+        if self.suspicious_start_pattern.match(nom_upper):
+            logger.debug(f"🗑️ REJETÉ (préfixe suspect): {nom}")
+            return False
+
+        # ✅ CRITÈRE 1: Personnes morales (communes, sociétés) - PRIORITÉ ABSOLUE
+        if len(nom_stripped) >= 8 and self.legal_entity_pattern.search(nom_upper):
+            return True
+
+        # ✅ CRITÈRE 2: Rejet des adresses/lieux-dits (APRÈS vérification personnes morales)
+        if self.looks_like_address(nom_upper):
+            return False
+
+        # ✅ CRITÈRE 3: Personnes physiques avec prénom
+        if len(prenom_clean) >= 2 and len(nom_stripped) >= 3:
+            return True
+
+        # ✅ CRITÈRE 4: Noms de famille seuls mais plausibles (sans chiffres)
+        if (not prenom_clean and len(nom_stripped) >= 5 and
+                not any(char.isdigit() for char in nom) and
+                nom_upper not in self.placeholder_names):
+            return True
+
+        # ✅ CRITÈRE 5: Patterns de noms classiques français
+        return len(nom_stripped) >= 5 and self.classic_name_pattern.search(nom_upper) is not None
+
+def load_name_filters(path: Optional[str] = None) -> NameFilters:
+    """
+    Charge et compile les dictionnaires du filtrage propriétaires.
+
+    Le chemin peut être fourni via NAME_FILTERS_FILE. Contrairement à la table INSEE,
+    le fichier est obligatoire : sans lui, toute ligne serait acceptée comme propriétaire.
+    """
+    filters_path = Path(path or os.getenv('NAME_FILTERS_FILE', '') or DEFAULT_NAME_FILTERS_FILE)
+    cache_key = str(filters_path)
+    if cache_key in _name_filters_cache:
+        return _name_filters_cache[cache_key]
+
+    try:
+        with open(filters_path, encoding='utf-8') as f:
+            filters = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Dictionnaires de filtrage des noms illisibles ({filters_path}): {e}") from e
+
+    name_filters = NameFilters(filters)
+    logger.info(f"📚 Filtres de noms chargés: {sum(len(v) for v in filters.values() if isinstance(v, list))} entrées ({filters_path})")
+    _name_filters_cache[cache_key] = name_filters
+    return name_filters
+
+# Colonnes d'export selon les spécifications du client (avec contenance détaillée)
+EXPORT_COLUMNS_ORDER = [
+    'department', 'commune', 'prefixe', 'section', 'numero',
+    'contenance_ha', 'contenance_a', 'contenance_ca',
+    'droit_reel', 'designation_parcelle', 'nom', 'prenom', 'numero_majic',
+    'voie', 'post_code', 'city', 'id', 'fichier_source',
+    'proprietaire_id'
+]
+
+# Renommage des colonnes pour plus de clarté
+EXPORT_COLUMN_MAPPING = {
+    'department': 'Département',
+    'commune': 'Commune',
+    'prefixe': 'Préfixe',
+    'section': 'Section',
+    'numero': 'Numéro',
+    'contenance_ha': 'Contenance HA',
+    'contenance_a': 'Contenance A',
+    'contenance_ca': 'Contenance CA',
+    'droit_reel': 'Droit réel',
+    'designation_parcelle': 'Designation Parcelle',
+    'nom': 'Nom Propri',
+    'prenom': 'Prénom Propri',
+    'numero_majic': 'N°MAJIC',
+    'voie': 'Voie',
+    'post_code': 'CP',
+    'city': 'Ville',
+    'id': 'id',
+    'fichier_source': 'Fichier source',
+    'proprietaire_id': 'ID Propriétaire'
+}
+
+# 📦 ENREGISTREMENT COMPACT D'UNE PROPRIÉTÉ (produit par merge_like_make)
+# Schéma fixe, dans l'ordre des colonnes Make Google Sheets
+PROPERTY_FIELDS = (
+    'department', 'commune', 'prefixe', 'section', 'numero',
+    'demandeur', 'date', 'envoye',
+    'designation_parcelle', 'contenance_ha', 'contenance_a', 'contenance_ca',
+    'nom', 'prenom', 'numero_majic', 'voie', 'post_code', 'city',
+    'identifie', 'rdp', 'sig',
+    'id', 'droit_reel',
+    'fichier_source', 'type_propriete',
+    'proprietaire_id'
+)
+_PROPERTY_FIELD_INDEX = {name: index for index, name in enumerate(PROPERTY_FIELDS)}
+_PROPERTY_FIELD_COUNT = len(PROPERTY_FIELDS)
+_PROPERTY_DEFAULTS = ('',) * _PROPERTY_FIELD_COUNT
+
+class PropertyRecord(MutableMapping):
+    """
+    Propriété fusionnée à schéma fixe : valeurs stockées dans une liste ordonnée selon
+    PROPERTY_FIELDS (≈2.5x moins de mémoire qu'un dict de 26 clés, affectation en place).
+    
+    S'utilise comme un dict (get, [], in, items, copy...) dans toute la chaîne de
+    post-traitement ; to_dict() fournit un vrai dict pour les usages externes.
+    """
+    
+    __slots__ = ('_values',)
+    
+    def __init__(self, *values, **fields):
+        if len(values) == _PROPERTY_FIELD_COUNT and not fields:
+            # Cas courant (merge_like_make) : toutes les valeurs dans l'ordre du schéma
+            self._values = list(values)
+            return
+        if not fields.keys() <= _PROPERTY_FIELD_INDEX.keys():
+            unknown = fields.keys() - _PROPERTY_FIELD_INDEX.keys()
+            raise KeyError(f"Champs hors schéma PropertyRecord: {sorted(unknown)}")
+        if len(values) > _PROPERTY_FIELD_COUNT:
+            raise ValueError(f"PropertyRecord attend au plus {_PROPERTY_FIELD_COUNT} valeurs, reçu {len(values)}")
+        row = list(values) + list(_PROPERTY_DEFAULTS[len(values):])
+        for name, value in fields.items():
+            row[_PROPERTY_FIELD_INDEX[name]] = value
+        self._values = row
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PropertyRecord':
+        """Construit un enregistrement depuis un dict (clés hors schéma refusées)."""
+        return cls(**data)
+    
+    def to_dict(self) -> Dict:
+        """Adaptateur de compatibilité : dict ordonné selon PROPERTY_FIELDS."""
+        return dict(zip(PROPERTY_FIELDS, self._values))
+    
+    def as_tuple(self) -> tuple:
+        return tuple(self._values)
+    
+    def copy(self) -> 'PropertyRecord':
+        record = PropertyRecord.__new__(PropertyRecord)
+        record._values = self._values[:]
+        return record
+    
+    def get(self, key, default=None, _index=_PROPERTY_FIELD_INDEX.get):
+        index = _index(key)
+        return default if index is None else self._values[index]
+    
+    def __getitem__(self, key, _index=_PROPERTY_FIELD_INDEX.__getitem__):
+        return self._values[_index(key)]
+    
+    def __setitem__(self, key, value, _index=_PROPERTY_FIELD_INDEX.get):
+        index = _index(key)
+        if index is None:
+            raise KeyError(f"Champ hors schéma PropertyRecord: {key}")
+        self._values[index] = value
+    
+    def update(self, changes=(), **fields):
+        """Modifie plusieurs champs en place."""
+        if fields or not isinstance(changes, dict):
+            changes = dict(changes, **fields)
+        row = self._values
+        for key, value in changes.items():
+            index = _PROPERTY_FIELD_INDEX.get(key)
+            if index is None:
+                raise KeyError(f"Champ hors schéma PropertyRecord: {key}")
+            row[index] = value
+    
+    def __delitem__(self, key):
+        raise TypeError("Les champs d'un PropertyRecord sont fixes")
+    
+    def __contains__(self, key):
+        return key in _PROPERTY_FIELD_INDEX
+    
+    def __iter__(self):
+        return iter(PROPERTY_FIELDS)
+    
+    def __len__(self):
+        return _PROPERTY_FIELD_COUNT
+    
+    def __eq__(self, other):
+        if isinstance(other, PropertyRecord):
+            return self._values == other._values
+        return super().__eq__(other)
+    
+    __hash__ = None
+    
+    def __getstate__(self):
+        return tuple(self._values)
+    
+    def __setstate__(self, state):
+        self._values = list(state)
+    
+    def __repr__(self):
+        return f"PropertyRecord({self.to_dict()!r})"
+
+def properties_to_dataframe(properties) -> pd.DataFrame:
+    """DataFrame depuis une liste de PropertyRecord et/ou de dicts."""
+    properties = list(properties)
+    if properties and all(type(prop) is PropertyRecord for prop in properties):
+        return pd.DataFrame.from_records([prop.as_tuple() for prop in properties], columns=list(PROPERTY_FIELDS))
+    return pd.DataFrame([prop.to_dict() if isinstance(prop, PropertyRecord) else prop for prop in properties])
+
+# Lignes d'export partagées par les exports CSV et Excel (aucun DataFrame intermédiaire)
+EXPORT_HEADERS = [EXPORT_COLUMN_MAPPING.get(col, col) for col in EXPORT_COLUMNS_ORDER]
+_EXPORT_RECORD_GETTER = operator.itemgetter(*(_PROPERTY_FIELD_INDEX[col] for col in EXPORT_COLUMNS_ORDER))
+EXCEL_SHEET_NAME = 'Données Cadastrales'
+EXCEL_MAX_ROWS = 1_048_576  # Limite d'une feuille, en-tête compris
+EXCEL_COLUMN_WIDTH = 15
+EXCEL_HEADER_FORMAT = {'bold': True, 'font_color': '#FFFFFF', 'bg_color': '#4472C4', 'border': 1}
+
+def iter_export_rows(properties):
+    """
+    Tuples dans l'ordre EXPORT_COLUMNS_ORDER, un par propriété, produits à la volée.
+    Valeurs absentes, None ou NaN → ''.
+    """
+    for prop in properties:
+        if type(prop) is PropertyRecord:
+            values = _EXPORT_RECORD_GETTER(prop._values)
+        else:
+            values = [prop.get(col, '') for col in EXPORT_COLUMNS_ORDER]
+        yield tuple('' if value is None or value != value else value for value in values)
+
+def write_export_csv(rows, target, headers=EXPORT_HEADERS, bom: bool = True) -> int:
+    """
+    Écrit les lignes en CSV (séparateur ;, fin de ligne \n, guillemets si nécessaire)
+    dans un chemin ou un flux texte ; utf-8-sig pour un chemin. Renvoie le nombre de lignes.
+    """
+    if isinstance(target, (str, Path)):
+        with open(target, 'w', encoding='utf-8-sig' if bom else 'utf-8', newline='') as handle:
+            return write_export_csv(rows, handle, headers)
+    writer = csv.writer(target, delimiter=';', lineterminator='\n')
+    if headers is not None:
+        writer.writerow(headers)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+def write_export_xlsx(rows, target, headers=EXPORT_HEADERS, sheet_name: str = EXCEL_SHEET_NAME) -> int:
+    """
+    Écrit les lignes en .xlsx avec xlsxwriter en mode constant_memory : chaque ligne
+    est envoyée sur disque dès qu'elle est écrite, la mémoire ne dépend pas du volume.
+    En-têtes stylés, chaînes conservées telles quelles (ni nombres, ni formules, ni liens).
+    Au-delà de EXCEL_MAX_ROWS lignes, la suite part sur une nouvelle feuille.
+    target : chemin ou flux binaire (BytesIO). Renvoie le nombre de lignes.
+    """
+    workbook = xlsxwriter.Workbook(target, {
+        'constant_memory': True, 'strings_to_numbers': False,
+        'strings_to_formulas': False, 'strings_to_urls': False,
+    })
+    header_format = workbook.add_format(EXCEL_HEADER_FORMAT)
+
+    def add_sheet(number):
+        worksheet = workbook.add_worksheet(sheet_name if number == 1 else f"{sheet_name[:26]} ({number})")
+        worksheet.set_column(0, len(headers) - 1, EXCEL_COLUMN_WIDTH)
+        worksheet.write_row(0, 0, headers, header_format)
+        return worksheet
+
+    try:
+        sheets = 1
+        worksheet = add_sheet(sheets)
+        row_index = 1
+        count = 0
+        for row in rows:
+            if row_index >= EXCEL_MAX_ROWS:
+                sheets += 1
+                worksheet = add_sheet(sheets)
+                row_index = 1
+            worksheet.write_row(row_index, 0, row)
+            row_index += 1
+            count += 1
+    finally:
+        workbook.close()
+    return count
+
+def with_clean_commune(properties: List[Dict]) -> List[Dict]:
+    """Copies des lignes au code commune nettoyé (les lignes reçues ne sont pas modifiées)."""
+    cleaned = []
+    for prop in properties:
+        prop = prop.copy()
+        prop['commune'] = clean_commune_code(prop.get('commune', ''))
+        cleaned.append(prop)
+    return cleaned
+
+class ResultSink(abc.ABC):
+    """
+    Destination des lignes validées, alimentée PDF par PDF pendant run().
+
+    open() est appelé avant le premier PDF, write_pdf() après chaque PDF traité,
+    close() en fin de lot (y compris sur erreur). Seul write_pdf() est à implémenter.
+    """
+
+    def open(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def write_pdf(self, properties: List[Dict], pdf_name: str) -> int:
+        """Écrit les lignes d'un PDF, renvoie le nombre de lignes écrites."""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class CSVResultSink(ResultSink):
+    """
+    Ajout incrémental à un CSV au format de export_to_csv (séparateur ;, utf-8-sig).
+
+    Les lignes d'un PDF sont sérialisées en mémoire puis écrites en un seul appel
+    sur un descripteur en O_APPEND et synchronisées (fsync) : un lecteur qui suit
+    le fichier ne voit que des PDF complets. Si l'écriture échoue, le fichier est
+    tronqué à sa taille précédente. Le lot s'écrit dans partial_path (output.csv.partial),
+    qui ne remplace le CSV précédent qu'à la fermeture ; append=True poursuit directement
+    un fichier existant (mode surveillance) au lieu de le recréer.
+    """
+
+    def __init__(self, path, fsync: bool = True, append: bool = False):
+        self.path = Path(path)
+        self.partial_path = self.path if append else self.path.with_name(self.path.name + '.partial')
+        self.fsync = fsync
+        self.append = append
+        self._fd = None
+        self._size = 0
+        self.rows_written = 0
+        self.pdfs_written = 0
+
+    def open(self) -> None:
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | (0 if self.append else os.O_TRUNC)
+        self._fd = os.open(self.partial_path, flags, 0o644)
+        self._size = os.fstat(self._fd).st_size
+        if self._size:
+            return
+        header = io.StringIO()
+        write_export_csv([], header)
+        self._append(header.getvalue().encode('utf-8-sig'))
+
+    def _append(self, data: bytes) -> None:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self._fd, view):]
+            if self.fsync:
+                os.fsync(self._fd)
+        except BaseException:
+            os.ftruncate(self._fd, self._size)
+            raise
+        self._size += len(data)
+
+    def write_pdf(self, properties: List[Dict], pdf_name: str) -> int:
+        if not properties:
+            return 0
+        properties = with_clean_commune(properties)
+        chunk = io.StringIO()
+        count = write_export_csv(iter_export_rows(properties), chunk, headers=None)
+        self._append(chunk.getvalue().encode('utf-8'))
+        self.rows_written += count
+        self.pdfs_written += 1
+        return count
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            if self.partial_path != self.path:
+                os.replace(self.partial_path, self.path)
+
+# Base SQLite interrogeable pendant le lot (une ligne par id + MAJIC + droit réel)
+DEFAULT_SQLITE_OUTPUT_FILENAME = "output.sqlite"
+SQLITE_TABLE = "proprietes"
+SQLITE_KEY_FIELDS = ('id', 'numero_majic', 'droit_reel')
+SQLITE_BATCH_SIZE = 1_000
+
+class SQLiteResultSink(ResultSink):
+    """
+    Base SQLite (WAL) des lignes exportées, consultable pendant que le lot tourne.
+
+    Les lignes d'un PDF sont écrites dans une seule transaction, par executemany de
+    SQLITE_BATCH_SIZE lignes, en upsert sur (id, numero_majic, droit_reel) : retraiter
+    un PDF met ses lignes à jour sans les dupliquer. Index sur (department, commune)
+    et sur nom. Les lignes sans id ne sont pas écrites (clé non significative).
+    """
+
+    def __init__(self, path, batch_size: int = SQLITE_BATCH_SIZE):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._db = None
+        self.rows_written = 0
+        self.rows_skipped = 0
+        columns = list(EXPORT_COLUMNS_ORDER) + ['mis_a_jour']
+        updates = ', '.join(f"{col} = excluded.{col}" for col in columns if col not in SQLITE_KEY_FIELDS)
+        self._upsert = (f"INSERT INTO {SQLITE_TABLE} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                        f"ON CONFLICT({', '.join(SQLITE_KEY_FIELDS)}) DO UPDATE SET {updates}")
+        self._id_position = EXPORT_COLUMNS_ORDER.index('id')
+
+    def open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        columns = ', '.join(f"{col} TEXT NOT NULL DEFAULT ''" for col in EXPORT_COLUMNS_ORDER)
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS {SQLITE_TABLE} ({columns}, mis_a_jour TEXT, "
+                         f"PRIMARY KEY ({', '.join(SQLITE_KEY_FIELDS)}))")
+        # Base créée avant l'ajout d'une colonne d'export (proprietaire_id)
+        existing = {row[1] for row in self._db.execute(f"PRAGMA table_info({SQLITE_TABLE})")}
+        for col in EXPORT_COLUMNS_ORDER:
+            if col not in existing:
+                self._db.execute(f"ALTER TABLE {SQLITE_TABLE} ADD COLUMN {col} TEXT NOT NULL DEFAULT ''")
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_{SQLITE_TABLE}_geo ON {SQLITE_TABLE} (department, commune)")
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_{SQLITE_TABLE}_nom ON {SQLITE_TABLE} (nom)")
+
+    def write_pdf(self, properties: List[Dict], pdf_name: str) -> int:
+        if not properties:
+            return 0
+        properties = with_clean_commune(properties)
+        updated_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        id_position = self._id_position
+        rows = [tuple(str(value) for value in row) + (updated_at,)
+                for row in iter_export_rows(properties) if row[id_position]]
+        self.rows_skipped += len(properties) - len(rows)
+
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                self._db.executemany(self._upsert, rows[start:start + self.batch_size])
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
+        self.rows_written += len(rows)
+        return len(rows)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+# Déduplication en flux : empreintes en mémoire jusqu'au seuil, puis débord sur disque (SQLite)
+DEDUP_MEMORY_LIMIT = int(os.getenv('DEDUP_MEMORY_LIMIT', '1000000'))
+DEDUP_DIGEST_SIZE = 16
+DEDUP_BLOOM_BITS = 1 << 26  # 8 Mo (puissance de 2) : ~2 % de faux positifs à 10 millions de clés
+DEDUP_BLOOM_HASHES = 4
+
+class StreamingDeduplicator:
+    """
+    Ensemble de clés vues, à mémoire bornée.
+
+    Chaque clé est réduite à une empreinte BLAKE2b de taille fixe. Au-delà de
+    memory_limit empreintes en mémoire, elles sont déversées dans une table SQLite
+    temporaire ; un filtre de Bloom (optionnel) évite la lecture disque pour les
+    clés jamais vues. add() renvoie True à la première occurrence : en filtrant un
+    flux avec, les lignes sortent dans l'ordre de première apparition.
+    """
+
+    def __init__(self, memory_limit: Optional[int] = None, use_bloom: bool = True,
+                 bloom_bits: int = DEDUP_BLOOM_BITS, spill_dir: Optional[str] = None):
+        self.memory_limit = memory_limit or DEDUP_MEMORY_LIMIT
+        self.spill_dir = spill_dir
+        self.stats = {'cles': 0, 'deversees': 0, 'lectures_disque': 0, 'evitees_bloom': 0}
+        self._memory = set()
+        self._db = None
+        self._db_path = None
+        self.use_bloom = use_bloom
+        self._bloom = None  # Alloué au premier débord : ne couvre que les empreintes sur disque
+        self._bloom_bits = bloom_bits
+        self._bloom_mask = bloom_bits - 1
+
+    def _bloom_contains(self, digest: bytes) -> bool:
+        # Empreinte déjà uniforme : chaque tranche de 32 bits sert de fonction de hachage
+        bits = int.from_bytes(digest, 'little')
+        bloom, mask = self._bloom, self._bloom_mask
+        for _ in range(DEDUP_BLOOM_HASHES):
+            position = bits & mask
+            if not bloom[position >> 3] & (1 << (position & 7)):
+                return False
+            bits >>= 32
+        return True
+
+    def _spill(self) -> None:
+        """Déverse les empreintes en mémoire dans la table SQLite."""
+        if self._db is None:
+            fd, self._db_path = tempfile.mkstemp(prefix='dedup_', suffix='.sqlite', dir=self.spill_dir)
+            os.close(fd)
+            self._db = sqlite3.connect(self._db_path)
+            self._db.execute('PRAGMA journal_mode=OFF')
+            self._db.execute('PRAGMA synchronous=OFF')
+            self._db.execute('CREATE TABLE seen (digest BLOB PRIMARY KEY) WITHOUT ROWID')
+            if self.use_bloom:
+                self._bloom = bytearray(self._bloom_bits // 8)
+        if self._bloom is not None:
+            bloom, mask = self._bloom, self._bloom_mask
+            for digest in self._memory:
+                bits = int.from_bytes(digest, 'little')
+                for _ in range(DEDUP_BLOOM_HASHES):
+                    position = bits & mask
+                    bloom[position >> 3] |= 1 << (position & 7)
+                    bits >>= 32
+        self._db.executemany('INSERT OR IGNORE INTO seen VALUES (?)', ((digest,) for digest in self._memory))
+        self._db.commit()
+        self.stats['deversees'] += len(self._memory)
+        logger.info(f"💾 Déduplication: {len(self._memory)} empreintes déversées sur disque ({self._db_path})")
+        self._memory = set()
+
+    def _on_disk(self, digest: bytes) -> bool:
+        if self._db is None:
+            return False
+        if self._bloom is not None and not self._bloom_contains(digest):
+            self.stats['evitees_bloom'] += 1
+            return False
+        self.stats['lectures_disque'] += 1
+        return self._db.execute('SELECT 1 FROM seen WHERE digest = ?', (digest,)).fetchone() is not None
+
+    def add(self, key: str) -> bool:
+        """Enregistre key ; True si elle n'avait jamais été vue."""
+        digest = hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=DEDUP_DIGEST_SIZE).digest()
+        if digest in self._memory or self._on_disk(digest):
+            return False
+
+        self._memory.add(digest)
+        self.stats['cles'] += 1
+        if len(self._memory) >= self.memory_limit:
+            self._spill()
+        return True
+
+    def close(self) -> None:
+        """Supprime la table temporaire."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            try:
+                os.unlink(self._db_path)
+            except OSError:
+                pass
+        self._memory = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Inclure le droit réel pour distinguer usufruitier/nu-prop
+BATCH_DEDUP_FIELDS = ('nom', 'prenom', 'section', 'numero', 'department', 'commune', 'numero_majic', 'droit_reel')
+
+def batch_dedup_key(prop: Dict) -> str:
+    """
+    Clé de déduplication inter-fichiers (sans fichier source, avec droit réel).
+    Nom et prénom exacts : deux indivisaires aux noms proches (JEAN / JEANNE) restent distincts,
+    même regroupés sous un même proprietaire_id.
+    """
+    get = prop.get
+    return '|'.join([str(get(field, '')).strip().upper() for field in BATCH_DEDUP_FIELDS])
+
+# Index persistant inter-exécutions : ligne identifiée par l'ID parcelle (14 car.) + la partie
+# propriétaire de la clé de déduplication, comparée sur le contenu exporté
+DEFAULT_PARCEL_INDEX_FILENAME = "parcel_index.sqlite"
+PARCEL_INDEX_OWNER_FIELDS = ('nom', 'prenom', 'numero_majic', 'droit_reel')
+# Identifiant propriétaire hors contenu comparé : dérivé du lot entier, il ne signale pas une ligne modifiée
+PARCEL_INDEX_CONTENT_COLUMNS = tuple(col for col in EXPORT_COLUMNS_ORDER if col != 'proprietaire_id')
+STATUS_NEW = 'nouveau'
+STATUS_CHANGED = 'modifie'
+STATUS_UNCHANGED = 'inchange'
+
+class ParcelIndex:
+    """
+    Index SQLite des lignes déjà exportées, conservé d'une exécution à l'autre.
+
+    Clé et contenu sont des empreintes BLAKE2b de 16 octets ; la table est une
+    WITHOUT ROWID indexée sur la clé (B-arbre de 4 niveaux à quelques dizaines de
+    millions de lignes), interrogée par paquets. tag() classe chaque ligne en
+    nouvelle / modifiée / inchangée et met l'index à jour ; pour une exécution complète,
+    les lignes indexées absentes de l'export sont supprimées, dans les seules communes
+    (département, commune) présentes dans l'export : l'index est partagé par des
+    exécutions partielles (une commune, un département) qui ne se retirent pas leurs lignes.
+    """
+
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS parcelles (cle BLOB PRIMARY KEY, contenu BLOB NOT NULL, '
+                         'run_creation TEXT NOT NULL, run_maj TEXT NOT NULL) WITHOUT ROWID')
+        self._db.execute('CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, nouveaux INTEGER, '
+                         'modifies INTEGER, inchanges INTEGER, supprimes INTEGER NOT NULL DEFAULT 0)')
+        # Index créé avant le suivi des suppressions
+        if 'supprimes' not in {row[1] for row in self._db.execute('PRAGMA table_info(runs)')}:
+            self._db.execute('ALTER TABLE runs ADD COLUMN supprimes INTEGER NOT NULL DEFAULT 0')
+        # Commune de chaque ligne (département|commune), renseignée à son prochain passage si l'index est plus ancien
+        if 'perimetre' not in {row[1] for row in self._db.execute('PRAGMA table_info(parcelles)')}:
+            self._db.execute('ALTER TABLE parcelles ADD COLUMN perimetre TEXT')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_parcelles_perimetre ON parcelles (perimetre)')
+
+    @staticmethod
+    def identity_key(prop: Dict) -> bytes:
+        owner_key = '|'.join(str(prop.get(field, '')).strip().upper() for field in PARCEL_INDEX_OWNER_FIELDS)
+        return hashlib.blake2b(f"{prop.get('id', '')}|{owner_key}".encode('utf-8', 'surrogatepass'),
+                               digest_size=DEDUP_DIGEST_SIZE).digest()
+
+    @staticmethod
+    def scope(prop: Dict) -> str:
+        """Commune de la ligne (département|commune) : périmètre des suppressions d'une exécution complète."""
+        return f"{str(prop.get('department', '')).strip()}|{clean_commune_code(prop.get('commune', ''))}"
+
+    @staticmethod
+    def content_digest(prop: Dict) -> bytes:
+        content = '\x1f'.join(str(prop.get(column, '')) for column in PARCEL_INDEX_CONTENT_COLUMNS)
+        return hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=DEDUP_DIGEST_SIZE).digest()
+
+    def __len__(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM parcelles').fetchone()[0]
+
+    def tag(self, properties: List[Dict], run_id: Optional[str] = None, full_run: bool = False) -> List[tuple]:
+        """
+        Retourne [(statut, ligne)] dans l'ordre d'entrée et enregistre l'exécution.
+        full_run=True : properties est l'export complet des communes qu'il contient ; les
+        lignes indexées de ces communes qui n'y figurent plus (retirées par la déduplication
+        finale, PDF disparu ou en échec) sont supprimées, et seront « nouvelles » si elles
+        réapparaissent. Les lignes des autres communes ne sont pas touchées.
+        """
+        run_id = run_id or time.strftime('%Y%m%dT%H%M%S')
+        counts = {STATUS_NEW: 0, STATUS_CHANGED: 0, STATUS_UNCHANGED: 0}
+        tagged = []
+        removed = 0
+
+        with self._db:
+            if full_run:
+                self._db.execute('CREATE TEMP TABLE IF NOT EXISTS vues (cle BLOB PRIMARY KEY, perimetre TEXT) WITHOUT ROWID')
+                self._db.execute('DELETE FROM temp.vues')
+            for start in range(0, len(properties), self.LOOKUP_CHUNK):
+                chunk = properties[start:start + self.LOOKUP_CHUNK]
+                keys = [self.identity_key(prop) for prop in chunk]
+                distinct_keys = list(dict.fromkeys(keys))
+                known = dict(self._db.execute(
+                    f"SELECT cle, contenu FROM parcelles WHERE cle IN ({','.join('?' * len(distinct_keys))})",
+                    distinct_keys
+                ))
+
+                changes = {}
+                for prop, key in zip(chunk, keys):
+                    content = self.content_digest(prop)
+                    stored = known.get(key)
+                    if stored is None:
+                        status = STATUS_NEW
+                    elif stored != content:
+                        status = STATUS_CHANGED
+                    else:
+                        status = STATUS_UNCHANGED
+                    if status != STATUS_UNCHANGED:
+                        known[key] = changes[key] = content
+                    counts[status] += 1
+                    tagged.append((status, prop))
+
+                scopes = {key: self.scope(prop) for prop, key in zip(chunk, keys)}
+                self._db.executemany(
+                    'INSERT INTO parcelles (cle, contenu, run_creation, run_maj, perimetre) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT(cle) DO UPDATE SET contenu = excluded.contenu, run_maj = excluded.run_maj, '
+                    'perimetre = excluded.perimetre',
+                    ((key, content, run_id, run_id, scopes[key]) for key, content in changes.items())
+                )
+                if full_run:
+                    self._db.executemany('INSERT OR IGNORE INTO temp.vues VALUES (?, ?)', scopes.items())
+
+            if full_run:
+                # Lignes inchangées d'un index antérieur au suivi des communes
+                self._db.execute('UPDATE parcelles SET perimetre = (SELECT perimetre FROM temp.vues WHERE temp.vues.cle = parcelles.cle) '
+                                 'WHERE perimetre IS NULL AND cle IN (SELECT cle FROM temp.vues)')
+                removed = self._db.execute('DELETE FROM parcelles WHERE perimetre IN (SELECT perimetre FROM temp.vues) '
+                                           'AND cle NOT IN (SELECT cle FROM temp.vues)').rowcount
+                self._db.execute('DELETE FROM temp.vues')
+            self._db.execute('INSERT OR REPLACE INTO runs (run_id, nouveaux, modifies, inchanges, supprimes) '
+                             'VALUES (?, ?, ?, ?, ?)',
+                             (run_id, counts[STATUS_NEW], counts[STATUS_CHANGED], counts[STATUS_UNCHANGED], removed))
+
+        logger.info(f"🗂️ Index {self.path.name} ({run_id}): {counts[STATUS_NEW]} nouvelle(s), "
+                    f"{counts[STATUS_CHANGED]} modifiée(s), {counts[STATUS_UNCHANGED]} inchangée(s), "
+                    f"{removed} supprimée(s)")
+        return tagged
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# 📒 JOURNAL DE LOT (reprise après interruption)
+# À incrémenter quand l'extraction change : les résultats journalisés d'une autre version sont recalculés
+PIPELINE_VERSION = "1"
+DEFAULT_BATCH_JOURNAL_FILENAME = "batch_journal.sqlite"
+CHECKPOINT_PENDING = 'en_attente'
+CHECKPOINT_RUNNING = 'en_cours'
+CHECKPOINT_DONE = 'termine'
+CHECKPOINT_FAILED = 'echec'
+CHECKPOINT_TIMED_OUT = 'delai_depasse'  # Journal du lot : PDF abandonné à l'expiration de son délai, retraité à la reprise
+
+def write_results_json(path: Path, properties: List[Dict]) -> None:
+    """
+    Lignes d'un PDF en JSON (fichier temporaire puis remplacement atomique). Nom temporaire
+    unique : plusieurs processus peuvent écrire la même entrée en même temps (cache partagé).
+    """
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump([prop.to_dict() if isinstance(prop, PropertyRecord) else dict(prop) for prop in properties],
+                      handle, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def read_results_json(path) -> List[Dict]:
+    """Lignes écrites par write_results_json (PropertyRecord quand les champs le permettent)."""
+    with open(path, encoding='utf-8') as handle:
+        rows = json.load(handle)
+    fields = set(PROPERTY_FIELDS)
+    return [PropertyRecord(**prop) if prop.keys() <= fields else prop for prop in rows]
+
+class BatchJournal:
+    """
+    Journal SQLite (WAL) de l'avancement d'un lot : un statut par PDF (en attente,
+    en cours, terminé, échec), la version du pipeline, l'empreinte du fichier
+    (taille + date de modification) et le chemin de ses résultats.
+
+    Les lignes d'un PDF terminé sont conservées en JSON dans results_dir (écriture
+    dans un fichier temporaire puis remplacement) ; chaque transition est une seule
+    instruction SQL en autocommit.
+    """
+
+    def __init__(self, path, results_dir=None, version: str = PIPELINE_VERSION):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.results_dir = Path(results_dir) if results_dir else self.path.parent / "checkpoints"
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.version = version
+        self._db = sqlite3.connect(str(self.path), isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS pdfs (nom TEXT PRIMARY KEY, empreinte TEXT, version TEXT, '
+                         'statut TEXT NOT NULL, resultat TEXT, lignes INTEGER, erreur TEXT, maj REAL)')
+
+    @staticmethod
+    def fingerprint(pdf_path: Path) -> str:
+        stat = Path(pdf_path).stat()
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def _result_path(self, pdf_name: str) -> Path:
+        digest = hashlib.blake2b(pdf_name.encode('utf-8', 'surrogatepass'), digest_size=DEDUP_DIGEST_SIZE).hexdigest()
+        return self.results_dir / f"{digest}.json"
+
+    def start_batch(self, pdf_files: List[Path], resume: bool = False) -> List[Path]:
+        """
+        Enregistre le lot et renvoie les PDF dont les résultats sont réutilisables
+        (resume=True : terminés, même version, fichier inchangé, résultats présents).
+        Tous les autres repassent en attente.
+        """
+        known = {row[0]: row[1:] for row in self._db.execute('SELECT nom, empreinte, version, statut, resultat FROM pdfs')}
+        reusable = []
+        pending = []
+        for pdf_path in pdf_files:
+            fingerprint = self.fingerprint(pdf_path)
+            if resume and self._reusable(known.get(pdf_path.name), fingerprint):
+                reusable.append(pdf_path)
+            else:
+                pending.append((pdf_path.name, fingerprint, self.version, CHECKPOINT_PENDING, time.time()))
+        with self._db:
+            self._db.execute('BEGIN')
+            self._db.executemany(
+                'INSERT INTO pdfs (nom, empreinte, version, statut, maj) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(nom) DO UPDATE SET empreinte = excluded.empreinte, version = excluded.version, '
+                'statut = excluded.statut, resultat = NULL, lignes = NULL, erreur = NULL, maj = excluded.maj',
+                pending
+            )
+        return reusable
+
+    def _reusable(self, entry: Optional[tuple], fingerprint: str) -> bool:
+        """entry = (empreinte, version, statut, resultat) du journal."""
+        return bool(entry and entry[0] == fingerprint and entry[1] == self.version
+                    and entry[2] == CHECKPOINT_DONE and entry[3] and Path(entry[3]).exists())
+
+    def start_pdf(self, pdf_path: Path, resume: bool = True) -> bool:
+        """
+        start_batch pour un seul PDF (mode surveillance), sans relire tout le journal.
+        Renvoie True si ses résultats journalisés sont réutilisables.
+        """
+        fingerprint = self.fingerprint(pdf_path)
+        entry = self._db.execute('SELECT empreinte, version, statut, resultat FROM pdfs WHERE nom = ?',
+                                 (pdf_path.name,)).fetchone()
+        if resume and self._reusable(entry, fingerprint):
+            return True
+        self._db.execute('INSERT INTO pdfs (nom, empreinte, version, statut, maj) VALUES (?, ?, ?, ?, ?) '
+                         'ON CONFLICT(nom) DO UPDATE SET empreinte = excluded.empreinte, version = excluded.version, '
+                         'statut = excluded.statut, resultat = NULL, lignes = NULL, erreur = NULL, maj = excluded.maj',
+                         (pdf_path.name, fingerprint, self.version, CHECKPOINT_PENDING, time.time()))
+        return False
+
+    def mark_running(self, pdf_path: Path) -> None:
+        self._db.execute('UPDATE pdfs SET statut = ?, maj = ? WHERE nom = ?', (CHECKPOINT_RUNNING, time.time(), pdf_path.name))
+
+    def mark_done(self, pdf_path: Path, properties: List[Dict]) -> None:
+        result_path = self._result_path(pdf_path.name)
+        write_results_json(result_path, properties)
+        self._db.execute('UPDATE pdfs SET statut = ?, resultat = ?, lignes = ?, erreur = NULL, maj = ? WHERE nom = ?',
+                         (CHECKPOINT_DONE, str(result_path), len(properties), time.time(), pdf_path.name))
+
+    def mark_failed(self, pdf_path: Path, error: str, status: str = CHECKPOINT_FAILED) -> None:
+        self._db.execute('UPDATE pdfs SET statut = ?, erreur = ?, maj = ? WHERE nom = ?',
+                         (status, str(error)[:500], time.time(), pdf_path.name))
+
+    def load_results(self, pdf_path: Path) -> List[Dict]:
+        """Lignes journalisées d'un PDF terminé (PropertyRecord quand les champs le permettent)."""
+        row = self._db.execute('SELECT resultat FROM pdfs WHERE nom = ?', (pdf_path.name,)).fetchone()
+        return read_results_json(row[0])
+
+    def status(self, pdf_path: Path) -> Optional[str]:
+        row = self._db.execute('SELECT statut FROM pdfs WHERE nom = ?', (pdf_path.name,)).fetchone()
+        return row[0] if row else None
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._db.execute('SELECT statut, COUNT(*) FROM pdfs GROUP BY statut'))
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# 🧩 PARTITIONNEMENT STATIQUE D'UN LOT (run --shard i/N sur plusieurs machines, puis merge)
+SHARDS_DIRNAME = "shards"
+SHARD_RESULTS_FILENAME = "results.json"
+SHARD_MANIFEST_FILENAME = "manifest.json"
+SHARD_HASH_CHUNK = 1 << 20
+
+def parse_shard(spec: str) -> tuple:
+    """'i/N' (1 ≤ i ≤ N) → (i, N)."""
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"shard invalide '{spec}' (attendu i/N, par exemple 1/4)") from None
+    if not 1 <= index <= count:
+        raise ValueError(f"shard invalide '{spec}' : il faut 1 ≤ i ≤ N")
+    return index, count
+
+def pdf_content_hash(pdf_path: Path) -> str:
+    """Empreinte du contenu du PDF (indépendante du nom, de la date et de la machine)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(pdf_path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(SHARD_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def shard_of(pdf_path: Path, count: int) -> int:
+    """Shard (1..count) d'un PDF : identique sur toutes les machines qui voient le même fichier."""
+    return int(pdf_content_hash(pdf_path), 16) % count + 1
+
+def select_shard(pdf_files: List[Path], index: int, count: int) -> List[Path]:
+    return [pdf_path for pdf_path in pdf_files if shard_of(pdf_path, count) == index]
+
+def shard_output_dir(output_dir, index: int, count: int) -> Path:
+    return Path(output_dir) / SHARDS_DIRNAME / f"shard-{index:03d}-of-{count:03d}"
+
+def write_shard_manifest(shard_dir: Path, manifest: Dict) -> None:
+    """Manifeste écrit en dernier (remplacement atomique) : sa présence signale un shard complet."""
+    tmp_path = shard_dir / (SHARD_MANIFEST_FILENAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, shard_dir / SHARD_MANIFEST_FILENAME)
+
+def find_shard_manifests(output_dir) -> Dict[int, Dict[int, Dict]]:
+    """Manifestes des shards terminés, par nombre de shards puis par numéro de shard."""
+    manifests = {}
+    for path in sorted((Path(output_dir) / SHARDS_DIRNAME).glob(f"shard-*/{SHARD_MANIFEST_FILENAME}")):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                manifest = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Manifeste de shard illisible {path} ({e})")
+            continue
+        manifest['dossier'] = str(path.parent)
+        manifests.setdefault(manifest['count'], {})[manifest['index']] = manifest
+    return manifests
+
+# 🗃️ CACHE DE RÉSULTATS PAR CONTENU (SHA-256 du PDF + version du pipeline et des prompts)
+# À incrémenter quand un prompt ou le modèle vision change : les résultats en cache ne sont plus servis
+PROMPT_VERSION = "1"
+RESULT_CACHE_VERSION = f"pipeline{PIPELINE_VERSION}-prompts{PROMPT_VERSION}"
+DEFAULT_RESULT_CACHE_DIRNAME = "cache"
+RESULT_CACHE_MAX_BYTES = int(float(os.getenv('RESULT_CACHE_MAX_MB', '512')) * 2 ** 20)
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE', '1') != '0'
+
+def default_result_cache_dir(output_dir="output") -> Path:
+    return Path(os.getenv('RESULT_CACHE_DIR', '') or Path(output_dir) / DEFAULT_RESULT_CACHE_DIRNAME)
+
+def pdf_sha256(pdf_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(SHARD_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    Lignes validées d'un PDF indexées par le SHA-256 de son contenu, une entrée JSON
+    par PDF sous <dossier>/<version>/ : un fichier inchangé (même renommé ou déplacé)
+    est servi sans rendu ni appel API. Une autre version du pipeline ou des prompts ne
+    voit pas les entrées des précédentes (supprimées par prune). La date de
+    modification d'une entrée est celle de son dernier usage : evict supprime les
+    moins récemment utilisées au-delà de la taille maximale. Écritures atomiques,
+    dossier partageable entre processus.
+    """
+
+    def __init__(self, path, version: str = RESULT_CACHE_VERSION, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.version = version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version_dir(self) -> Path:
+        return self.path / self.version
+
+    def entry_path(self, key: str) -> Path:
+        return self.version_dir / f"{key}.json"
+
+    def get(self, pdf_path: Path, key: Optional[str] = None) -> Optional[List[Dict]]:
+        """Lignes en cache du PDF, None si absentes ou illisibles."""
+        entry = self.entry_path(key or pdf_sha256(pdf_path))
+        try:
+            properties = read_results_json(entry)
+            os.utime(entry)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return properties
+
+    def put(self, pdf_path: Path, properties: List[Dict], key: Optional[str] = None) -> Path:
+        self.version_dir.mkdir(parents=True, exist_ok=True)
+        entry = self.entry_path(key or pdf_sha256(pdf_path))
+        write_results_json(entry, properties)
+        return entry
+
+    def invalidate(self, pdf_paths: List[Path]) -> int:
+        """Supprime les entrées (toutes versions) des PDF donnés ; renvoie le nombre d'entrées supprimées."""
+        removed = 0
+        for pdf_path in pdf_paths:
+            key = pdf_sha256(pdf_path)
+            for entry in self.path.glob(f"*/{key}.json"):
+                entry.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def prune(self) -> int:
+        """Supprime les entrées des autres versions du pipeline ou des prompts."""
+        removed = 0
+        for version_dir in self._version_dirs():
+            if version_dir.name != self.version:
+                removed += len(list(version_dir.glob("*.json")))
+                shutil.rmtree(version_dir, ignore_errors=True)
+        return removed
+
+    def clear(self) -> int:
+        removed = sum(len(list(version_dir.glob("*.json"))) for version_dir in self._version_dirs())
+        shutil.rmtree(self.path, ignore_errors=True)
+        return removed
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Supprime les entrées les moins récemment utilisées jusqu'à revenir sous max_bytes."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = []
+        for version_dir in self._version_dirs():
+            for entry in os.scandir(version_dir):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            Path(path).unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict:
+        versions = {}
+        for version_dir in self._version_dirs():
+            sizes = [entry.stat().st_size for entry in os.scandir(version_dir) if entry.name.endswith('.json')]
+            versions[version_dir.name] = {'entries': len(sizes), 'bytes': sum(sizes)}
+        return {'version': self.version, 'versions': versions, 'max_bytes': self.max_bytes,
+                'entries': sum(v['entries'] for v in versions.values()),
+                'bytes': sum(v['bytes'] for v in versions.values()), 'hits': self.hits, 'misses': self.misses}
+
+    def describe(self) -> str:
+        return f"{self.hits} PDF servi(s) depuis le cache, {self.misses} traité(s)"
+
+    def _version_dirs(self) -> List[Path]:
+        return sorted(path for path in self.path.glob("*") if path.is_dir()) if self.path.is_dir() else []
+
+# 📬 FILE DE TRAVAUX PERSISTANTE (workers permanents, voir run_queue_worker)
+DEFAULT_JOB_QUEUE_FILENAME = "job_queue.sqlite"
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '900'))  # Bail sans battement de cœur avant reprise par un autre worker
+JOB_HEARTBEAT_FRACTION = 3  # Bail renouvelé toutes les lease_seconds / 3 pendant le traitement
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_IDLE_SLEEP = 2.0  # Attente d'un worker quand la file est vide
+JOB_THROUGHPUT_WINDOW = 3600  # Fenêtre du débit affiché par `status` (secondes)
+JOB_STATUS_FAILURES = 10
+
+# Ordonnancement : voies prioritaires (ordre = priorité), plus court d'abord dans une voie
+JOB_LANES = ('interactive', 'bulk')
+JOB_DEFAULT_LANE = 'bulk'
+SCHEDULER_SECONDS_PER_PAGE = float(os.getenv('SCHEDULER_SECONDS_PER_PAGE', '8'))  # Appels vision d'une page
+SCHEDULER_SECONDS_PER_MB = float(os.getenv('SCHEDULER_SECONDS_PER_MB', '1'))  # Rendu et envoi des images
+SCHEDULER_AGING = float(os.getenv('SCHEDULER_AGING', '0.1'))  # Secondes de coût retirées par seconde d'attente
+LATENCY_PERCENTILES = (50, 90, 99)
+
+def estimate_pdf_cost(pdf_path: Path, profile: Optional[Dict] = None) -> float:
+    """
+    Durée estimée du traitement d'un PDF (secondes) : nombre de pages (métadonnées
+    fitz, ou empreinte déjà calculée) réparti sur les pages traitées en parallèle,
+    et taille du fichier. Sert uniquement à ordonner les PDF entre eux.
+    """
+    try:
+        size = Path(pdf_path).stat().st_size
+    except OSError:
+        size = 0
+    if profile is None:
+        try:
+            with fitz.open(pdf_path) as doc:
+                profile = {'page_count': doc.page_count, 'page_workers': max(1, min(PAGE_WORKERS_MAX, doc.page_count))}
+        except Exception:
+            profile = {'page_count': 0, 'page_workers': 1}
+    page_rounds = math.ceil(profile.get('page_count', 0) / max(1, profile.get('page_workers', 1)))
+    return page_rounds * SCHEDULER_SECONDS_PER_PAGE + size / 1e6 * SCHEDULER_SECONDS_PER_MB
+
+def shortest_job_first(pdf_files: List[Path], profiles: Optional[Dict[str, Dict]] = None) -> List[Path]:
+    """PDF du moins coûteux au plus coûteux (minimise le temps moyen d'achèvement) ; ordre stable à coût égal."""
+    profiles = profiles or {}
+    costs = {pdf_path: estimate_pdf_cost(pdf_path, profiles.get(pdf_path.name)) for pdf_path in pdf_files}
+    return sorted(pdf_files, key=costs.__getitem__)
+
+def latency_percentiles(values: List[float], percentiles=LATENCY_PERCENTILES) -> Dict[str, float]:
+    """Percentiles (rang le plus proche) d'une liste de durées, {} si vide."""
+    if not values:
+        return {}
+    values = sorted(values)
+    return {f"p{p}": values[max(0, math.ceil(p / 100 * len(values)) - 1)] for p in percentiles}
+
+class Job(NamedTuple):
+    """Travail réservé par un worker (bail jusqu'à lease_expires)."""
+    id: int
+    pdf_path: Path
+    attempts: int
+    lease_expires: float
+    lane: str = JOB_DEFAULT_LANE
+
+def default_job_queue_path(output_dir="output") -> Path:
+    return Path(os.getenv('JOB_QUEUE_FILE', '') or Path(output_dir) / DEFAULT_JOB_QUEUE_FILENAME)
+
+class JobQueue:
+    """
+    File de travaux SQLite (WAL) partagée par plusieurs processus : un travail par PDF
+    (en attente, en cours, terminé, échec), réservé par un worker avec un bail.
+
+    Un bail expiré (worker tué) remet le travail à disposition ; après JOB_MAX_ATTEMPTS
+    tentatives, il passe en échec. Le bail est renouvelé par keep_alive() tant que le
+    PDF est en cours, quelle que soit sa durée. Les lignes d'un travail terminé sont
+    conservées en JSON dans results_dir, un fichier par tentative : seul celui de la
+    tentative qui détient encore le bail est publié. Chaque réservation est une transaction BEGIN IMMEDIATE :
+    deux workers ne peuvent pas réserver le même travail.
+
+    Ordre de réservation : voie la plus prioritaire (JOB_LANES) d'abord, puis le
+    travail au coût estimé le plus faible (estimate_pdf_cost), diminué de SCHEDULER_AGING
+    par seconde d'attente pour qu'un gros PDF ne soit pas repoussé indéfiniment.
+    """
+
+    def __init__(self, path, results_dir=None, lease_seconds: float = JOB_LEASE_SECONDS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.results_dir = Path(results_dir) if results_dir else self.path.parent / "job_results"
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._db = sqlite3.connect(str(self.path), isolation_level=None, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS travaux (id INTEGER PRIMARY KEY AUTOINCREMENT, chemin TEXT NOT NULL, '
+                         'statut TEXT NOT NULL, tentatives INTEGER NOT NULL DEFAULT 0, worker TEXT, bail REAL, '
+                         'ajout REAL, debut REAL, fin REAL, lignes INTEGER, resultat TEXT, erreur TEXT)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_travaux_statut ON travaux (statut, id)')
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(travaux)')}
+        if 'voie' not in columns:
+            # File créée avant l'ordonnancement : voie par défaut, coût inconnu
+            self._db.execute(f"ALTER TABLE travaux ADD COLUMN voie TEXT NOT NULL DEFAULT '{JOB_DEFAULT_LANE}'")
+            self._db.execute('ALTER TABLE travaux ADD COLUMN cout REAL NOT NULL DEFAULT 0')
+
+    def enqueue(self, pdf_paths, lane: str = JOB_DEFAULT_LANE) -> List[int]:
+        """
+        Ajoute des PDF à la file dans une voie (JOB_LANES) ; un PDF déjà en attente ou en
+        cours n'est pas ajouté deux fois (sa voie est relevée si la nouvelle est prioritaire).
+        """
+        if lane not in JOB_LANES:
+            raise ValueError(f"Voie inconnue: {lane} (attendu: {', '.join(JOB_LANES)})")
+        pdf_paths = [Path(pdf_path).resolve() for pdf_path in pdf_paths]
+        costs = [estimate_pdf_cost(pdf_path) for pdf_path in pdf_paths]  # Hors transaction : lecture des PDF
+        ids = []
+        with self._db:
+            self._db.execute('BEGIN IMMEDIATE')
+            for pdf_path, cost in zip(pdf_paths, costs):
+                row = self._db.execute('SELECT id, voie FROM travaux WHERE chemin = ? AND statut IN (?, ?)',
+                                       (str(pdf_path), CHECKPOINT_PENDING, CHECKPOINT_RUNNING)).fetchone()
+                if row is None:
+                    row = (self._db.execute('INSERT INTO travaux (chemin, statut, ajout, voie, cout) VALUES (?, ?, ?, ?, ?)',
+                                            (str(pdf_path), CHECKPOINT_PENDING, time.time(), lane, cost)).lastrowid,)
+                elif JOB_LANES.index(lane) < JOB_LANES.index(row[1]):
+                    self._db.execute('UPDATE travaux SET voie = ? WHERE id = ?', (lane, row[0]))
+                ids.append(row[0])
+        return ids
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Réserve un travail disponible (en attente ou bail expiré), None si la file est vide.
+
+        Ordre : voie la plus prioritaire (JOB_LANES), puis coût estimé diminué du vieillissement
+        (SCHEDULER_AGING par seconde d'attente, pour que les gros PDF finissent par passer), puis id.
+        """
+        now = time.time()
+        with self._db:
+            self._db.execute('BEGIN IMMEDIATE')
+            self._db.execute("UPDATE travaux SET statut = ?, erreur = 'bail expiré', fin = ?, worker = NULL "
+                             'WHERE statut = ? AND bail < ? AND tentatives >= ?',
+                             (CHECKPOINT_FAILED, now, CHECKPOINT_RUNNING, now, self.max_attempts))
+            lane_rank = ' '.join(f"WHEN '{lane}' THEN {rank}" for rank, lane in enumerate(JOB_LANES))
+            row = self._db.execute(f'SELECT id, chemin, tentatives, voie FROM travaux WHERE statut = ? OR (statut = ? AND bail < ?) '
+                                   f'ORDER BY CASE voie {lane_rank} ELSE {len(JOB_LANES)} END, cout - (? - ajout) * ?, id LIMIT 1',
+                                   (CHECKPOINT_PENDING, CHECKPOINT_RUNNING, now, now, SCHEDULER_AGING)).fetchone()
+            if row is None:
+                return None
+            job = Job(row[0], Path(row[1]), row[2] + 1, now + self.lease_seconds, row[3])
+            self._db.execute('UPDATE travaux SET statut = ?, worker = ?, bail = ?, debut = ?, tentatives = ? WHERE id = ?',
+                             (CHECKPOINT_RUNNING, worker, job.lease_expires, now, job.attempts, job.id))
+        return job
+
+    def renew(self, job: Job, worker: str) -> bool:
+        """Battement de cœur : repousse l'expiration du bail ; False s'il a été perdu."""
+        updated = self._db.execute('UPDATE travaux SET bail = ? WHERE id = ? AND worker = ? AND statut = ? AND tentatives = ?',
+                                   (time.time() + self.lease_seconds, job.id, worker, CHECKPOINT_RUNNING,
+                                    job.attempts)).rowcount
+        return bool(updated)
+
+    @contextmanager
+    def keep_alive(self, job: Job, worker: str):
+        """Renouvelle le bail en arrière-plan pendant le traitement du PDF."""
+        stop = threading.Event()
+
+        def beat():
+            # Connexion propre au thread : une connexion sqlite3 ne se partage pas entre threads
+            with JobQueue(self.path, self.results_dir, self.lease_seconds, self.max_attempts) as queue:
+                while not stop.wait(self.lease_seconds / JOB_HEARTBEAT_FRACTION):
+                    if not queue.renew(job, worker):
+                        logger.warning(f"⚠️ Bail perdu pour le travail {job.id}")
+                        return
+        thread = threading.Thread(target=beat, name=f"bail-travail-{job.id}", daemon=True)
+        thread.start()
+        try:
+            yield job
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, job: Job, worker: str, properties: List[Dict]) -> bool:
+        """Enregistre les lignes du travail ; False si le bail a été perdu entre-temps (travail repris ailleurs)."""
+        # Fichier propre à la tentative : un worker dont le bail a expiré n'écrase pas le résultat publié
+        result_path = self.results_dir / f"job-{job.id}-{job.attempts}.json"
+        write_results_json(result_path, properties)
+        updated = self._db.execute('UPDATE travaux SET statut = ?, fin = ?, lignes = ?, resultat = ?, erreur = NULL '
+                                   'WHERE id = ? AND worker = ? AND statut = ? AND tentatives = ?',
+                                   (CHECKPOINT_DONE, time.time(), len(properties), str(result_path),
+                                    job.id, worker, CHECKPOINT_RUNNING, job.attempts)).rowcount
+        if not updated:
+            result_path.unlink(missing_ok=True)
+        return bool(updated)
+
+    def fail(self, job: Job, worker: str, error: str) -> str:
+        """Échec d'une tentative : remis en attente, ou en échec après max_attempts. Renvoie le nouveau statut."""
+        statut = CHECKPOINT_FAILED if job.attempts >= self.max_attempts else CHECKPOINT_PENDING
+        self._db.execute('UPDATE travaux SET statut = ?, erreur = ?, fin = ?, worker = NULL '
+                         'WHERE id = ? AND worker = ? AND statut = ? AND tentatives = ?',
+                         (statut, str(error)[:500], time.time(), job.id, worker, CHECKPOINT_RUNNING, job.attempts))
+        return statut
+
+    def results(self, job_id: int) -> List[Dict]:
+        """Lignes d'un travail terminé."""
+        row = self._db.execute('SELECT resultat FROM travaux WHERE id = ? AND statut = ?', (job_id, CHECKPOINT_DONE)).fetchone()
+        if row is None:
+            raise KeyError(f"Travail {job_id} non terminé")
+        return read_results_json(row[0])
+
+    def job_status(self, job_id: int) -> Optional[str]:
+        row = self._db.execute('SELECT statut FROM travaux WHERE id = ?', (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def lane_latencies(self, since: float) -> Dict[str, Dict]:
+        """
+        Par voie, percentiles (LATENCY_PERCENTILES) des travaux terminés depuis `since` :
+        attente (ajout → réservation) et latence totale (ajout → fin).
+        """
+        by_lane = {}
+        for lane, attente, latence in self._db.execute('SELECT voie, debut - ajout, fin - ajout FROM travaux '
+                                                      'WHERE statut = ? AND fin >= ?', (CHECKPOINT_DONE, since)):
+            waits, totals = by_lane.setdefault(lane, ([], []))
+            waits.append(attente)
+            totals.append(latence)
+        return {lane: {'done': len(totals), 'wait': latency_percentiles(waits), 'latency': latency_percentiles(totals)}
+                for lane, (waits, totals) in by_lane.items()}
+
+    def stats(self, window: float = JOB_THROUGHPUT_WINDOW) -> Dict:
+        """Profondeur de la file (par voie), débit, durée moyenne et latences par voie sur la fenêtre, derniers échecs."""
+        counts = dict.fromkeys((CHECKPOINT_PENDING, CHECKPOINT_RUNNING, CHECKPOINT_DONE, CHECKPOINT_FAILED), 0)
+        counts.update(self._db.execute('SELECT statut, COUNT(*) FROM travaux GROUP BY statut'))
+        since = time.time() - window
+        done, lignes, duree = self._db.execute('SELECT COUNT(*), COALESCE(SUM(lignes), 0), AVG(fin - debut) FROM travaux '
+                                               'WHERE statut = ? AND fin >= ?', (CHECKPOINT_DONE, since)).fetchone()
+        failures = self._db.execute('SELECT id, chemin, tentatives, erreur FROM travaux WHERE statut = ? '
+                                    'ORDER BY fin DESC LIMIT ?', (CHECKPOINT_FAILED, JOB_STATUS_FAILURES)).fetchall()
+        lanes = {lane: 0 for lane in JOB_LANES}
+        lanes.update(self._db.execute('SELECT voie, COUNT(*) FROM travaux WHERE statut = ? GROUP BY voie', (CHECKPOINT_PENDING,)))
+        return {
+            'counts': counts,
+            'depth': counts[CHECKPOINT_PENDING],
+            'depth_by_lane': lanes,
+            'lanes': self.lane_latencies(since),
+            'workers': [row[0] for row in self._db.execute('SELECT DISTINCT worker FROM travaux WHERE statut = ?',
+                                                            (CHECKPOINT_RUNNING,))],
+            'done_in_window': done,
+            'rows_in_window': lignes,
+            'per_minute': done * 60 / window,
+            'avg_seconds': duree or 0.0,
+            'failures': [{'id': row[0], 'chemin': row[1], 'tentatives': row[2], 'erreur': row[3]} for row in failures],
+        }
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# 🤝 VOL DE TRAVAIL ENTRE MACHINES (dossier partagé, sans serveur ni base : voir run_shared_worker)
+# SQLite n'est pas fiable sur un montage réseau : les baux sont des fichiers créés avec O_EXCL
+DEFAULT_SHARED_WORK_DIRNAME = "partage"
+SHARED_LEASE_SECONDS = float(os.getenv('SHARED_LEASE_SECONDS', '120'))  # Bail sans battement de cœur avant reprise
+SHARED_HEARTBEAT_FRACTION = 3  # Bail renouvelé toutes les lease_seconds / 3
+
+class FileLease(NamedTuple):
+    """Bail d'un worker sur un PDF du dossier partagé (fichier leases/<clé>.lease)."""
+    pdf_path: Path
+    key: str
+    token: str
+    worker: str
+    attempts: int
+
+def default_shared_work_dir(output_dir="output") -> Path:
+    return Path(os.getenv('SHARED_WORK_DIR', '') or Path(output_dir) / DEFAULT_SHARED_WORK_DIRNAME)
+
+class SharedWorkDir:
+    """
+    Répartition dynamique des PDF entre workers de plusieurs machines via un dossier
+    partagé (NFS, SMB...) : chaque worker prend le prochain PDF libre, les machines
+    rapides en traitent donc davantage (vol de travail, contrairement à --shard).
+
+    Protocole, uniquement avec des opérations atomiques du système de fichiers :
+    - réservation : création exclusive (O_CREAT | O_EXCL) de leases/<clé>.lease ;
+    - bail : date de modification du fichier, renouvelée par keep_alive() ;
+    - reprise d'un bail expiré : renommage vers un nom unique (un seul worker réussit),
+      puis nouvelle création exclusive avec une tentative de plus ;
+    - publication : results/<clé>.<jeton>.part propre au bail, puis lien exclusif
+      (os.link) vers results/<clé>.json si le bail est toujours détenu, puis suppression
+      du bail ; après max_attempts, failed/<clé>.json.
+    Un worker qui a perdu son bail ne publie pas, et un résultat publié n'est jamais
+    remplacé (deux extractions LLM d'un même PDF peuvent différer) : le premier gagne.
+    """
+
+    def __init__(self, path, lease_seconds: float = SHARED_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.leases_dir = self.path / "leases"
+        self.results_dir = self.path / "results"
+        self.failed_dir = self.path / "failed"
+        for directory in (self.leases_dir, self.results_dir, self.failed_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(pdf_path: Path) -> str:
+        return hashlib.blake2b(Path(pdf_path).name.encode('utf-8', 'surrogatepass'), digest_size=DEDUP_DIGEST_SIZE).hexdigest()
+
+    def _lease_path(self, key: str) -> Path:
+        return self.leases_dir / f"{key}.lease"
+
+    def state(self, pdf_path: Path) -> str:
+        key = self.key(pdf_path)
+        if (self.results_dir / f"{key}.json").exists():
+            return CHECKPOINT_DONE
+        if (self.failed_dir / f"{key}.json").exists():
+            return CHECKPOINT_FAILED
+        return CHECKPOINT_RUNNING if self._lease_path(key).exists() else CHECKPOINT_PENDING
+
+    def _create_lease(self, pdf_path: Path, key: str, worker: str, attempts: int) -> Optional[FileLease]:
+        lease = FileLease(Path(pdf_path), key, uuid.uuid4().hex, worker, attempts)
+        try:
+            fd = os.open(self._lease_path(key), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            json.dump({'pdf': lease.pdf_path.name, 'worker': worker, 'token': lease.token, 'attempts': attempts}, handle)
+        return lease
+
+    def _read_lease(self, path: Path) -> Dict:
+        try:
+            with open(path, encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _expired(self, path: Path) -> bool:
+        return time.time() - path.stat().st_mtime >= self.lease_seconds
+
+    def claim(self, pdf_path: Path, worker: str) -> Optional[FileLease]:
+        """Réserve un PDF (libre, ou dont le bail a expiré) ; None s'il est pris, terminé ou en échec."""
+        if self.state(pdf_path) in (CHECKPOINT_DONE, CHECKPOINT_FAILED):
+            return None
+        key = self.key(pdf_path)
+        lease = self._create_lease(pdf_path, key, worker, 1)
+        if lease is not None:
+            return lease
+
+        lease_path = self._lease_path(key)
+        try:
+            if not self._expired(lease_path):
+                return None
+            tombstone = lease_path.with_name(f"{lease_path.name}.{uuid.uuid4().hex}.expire")
+            os.rename(lease_path, tombstone)
+        except FileNotFoundError:
+            return None  # Terminé ou repris par un autre worker entre-temps
+        if not self._expired(tombstone):
+            # Bail renouvelé juste avant le renommage : rendu à son worker
+            try:
+                os.link(tombstone, lease_path)
+            except OSError:
+                pass
+            os.unlink(tombstone)
+            return None
+        previous = self._read_lease(tombstone)
+        os.unlink(tombstone)
+        attempts = previous.get('attempts', 1)
+        if attempts >= self.max_attempts:
+            self._write_failure(pdf_path, key, previous.get('erreur') or 'bail expiré', attempts)
+            return None
+        return self._create_lease(pdf_path, key, worker, attempts + 1)
+
+    def holds(self, lease: FileLease) -> bool:
+        return self._read_lease(self._lease_path(lease.key)).get('token') == lease.token
+
+    def renew(self, lease: FileLease) -> bool:
+        """Battement de cœur : repousse l'expiration du bail ; False s'il a été perdu."""
+        if not self.holds(lease):
+            return False
+        try:
+            os.utime(self._lease_path(lease.key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    @contextmanager
+    def keep_alive(self, lease: FileLease):
+        """Renouvelle le bail en arrière-plan pendant le traitement du PDF."""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease_seconds / SHARED_HEARTBEAT_FRACTION):
+                if not self.renew(lease):
+                    logger.warning(f"⚠️ Bail perdu pour {lease.pdf_path.name}")
+                    return
+        thread = threading.Thread(target=beat, name=f"bail-{lease.key[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield lease
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, lease: FileLease, properties: List[Dict]) -> bool:
+        """
+        Publie les lignes du PDF et libère le bail ; False si le bail a été perdu entre-temps
+        ou si un résultat a déjà été publié (jamais écrasé).
+        """
+        if not self.holds(lease):
+            return False
+        part_path = self.results_dir / f"{lease.key}.{lease.token}.part"
+        write_results_json(part_path, properties)
+        try:
+            # Bail vérifié à nouveau après l'écriture, lien exclusif : aucun remplacement possible
+            if not self.holds(lease):
+                return False
+            try:
+                os.link(part_path, self.results_dir / f"{lease.key}.json")
+            except FileExistsError:
+                self._release(lease)
+                return False
+        finally:
+            part_path.unlink(missing_ok=True)
+        self._release(lease)
+        return True
+
+    def fail(self, lease: FileLease, error: str) -> str:
+        """Échec d'une tentative : bail expiré immédiatement (repris par le prochain worker), ou échec définitif."""
+        if not self.holds(lease):
+            return CHECKPOINT_RUNNING
+        if lease.attempts >= self.max_attempts:
+            self._write_failure(lease.pdf_path, lease.key, error, lease.attempts)
+            self._release(lease)
+            return CHECKPOINT_FAILED
+        lease_path = self._lease_path(lease.key)
+        tmp_path = lease_path.with_name(f"{lease_path.name}.{lease.token}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump({'pdf': lease.pdf_path.name, 'worker': lease.worker, 'token': lease.token,
+                       'attempts': lease.attempts, 'erreur': str(error)[:500]}, handle)
+        os.utime(tmp_path, (0, 0))
+        os.replace(tmp_path, lease_path)
+        return CHECKPOINT_PENDING
+
+    def _write_failure(self, pdf_path: Path, key: str, error: str, attempts: int) -> None:
+        tmp_path = self.failed_dir / f"{key}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump({'pdf': Path(pdf_path).name, 'erreur': str(error)[:500], 'tentatives': attempts}, handle,
+                      ensure_ascii=False)
+        os.replace(tmp_path, self.failed_dir / f"{key}.json")
+
+    def _release(self, lease: FileLease) -> None:
+        try:
+            os.unlink(self._lease_path(lease.key))
+        except FileNotFoundError:
+            pass
+
+    def results(self) -> List[Dict]:
+        """Lignes de tous les PDF terminés (ordre des clés)."""
+        return [prop for path in sorted(self.results_dir.glob("*.json")) for prop in read_results_json(path)]
+
+    def failures(self) -> List[Dict]:
+        return [self._read_lease(path) for path in sorted(self.failed_dir.glob("*.json"))]
+
+    def counts(self, pdf_files: List[Path]) -> Dict[str, int]:
+        counts = dict.fromkeys((CHECKPOINT_PENDING, CHECKPOINT_RUNNING, CHECKPOINT_DONE, CHECKPOINT_FAILED), 0)
+        for pdf_path in pdf_files:
+            counts[self.state(pdf_path)] += 1
+        return counts
+
+# 👀 SURVEILLANCE DU DOSSIER D'ENTRÉE (mode démon, voir PDFPropertyExtractor.watch)
+# Notifications du système de fichiers (inotify) si watchdog est installé, sinon parcours périodique
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = Observer = None
+
+WATCH_POLL_INTERVAL = float(os.getenv('WATCH_POLL_INTERVAL', '2'))
+WATCH_SETTLE_SECONDS = float(os.getenv('WATCH_SETTLE_SECONDS', '10'))  # Taille et date inchangées depuis (copie terminée)
+
+class InputFolderWatcher:
+    """
+    PDF déposés dans un dossier et prêts à traiter : taille et date de modification
+    inchangées depuis settle_seconds (anti-rebond : fichier encore en cours de copie).
+    Un fichier n'est remis qu'une fois tant qu'il n'est pas modifié.
+
+    Le dossier est parcouru une seule fois au démarrage (os.scandir) ; ensuite, avec
+    watchdog (inotify), seuls les fichiers signalés et ceux encore en attente de
+    stabilité sont examinés. Sans watchdog (ou use_events=False), chaque poll()
+    reparcourt le dossier et le compare au cache des stat.
+    """
+
+    def __init__(self, directory, settle_seconds: float = WATCH_SETTLE_SECONDS, use_events: bool = True):
+        self.directory = Path(directory)
+        self.settle_seconds = settle_seconds
+        self.use_events = use_events and Observer is not None
+        self._settling: Dict[str, tuple] = {}  # nom → (taille, mtime_ns, stable depuis)
+        self._dispatched: Dict[str, tuple] = {}  # nom → (taille, mtime_ns) déjà remis
+        self._events = set()
+        self._lock = threading.Lock()
+        self._observer = None
+        self._started = False
+
+    def start(self) -> None:
+        if self.use_events:
+            handler = FileSystemEventHandler()
+            handler.on_any_event = self._on_event
+            self._observer = Observer()
+            self._observer.schedule(handler, str(self.directory), recursive=False)
+            self._observer.start()
+
+    def _on_event(self, event) -> None:
+        for path in (getattr(event, 'src_path', ''), getattr(event, 'dest_path', '')):
+            if path:
+                path = os.fsdecode(path)
+                if path.endswith('.pdf') and Path(path).parent == self.directory:
+                    with self._lock:
+                        self._events.add(Path(path).name)
+
+    def _observe(self, name: str, stat, now: float) -> None:
+        key = (stat.st_size, stat.st_mtime_ns)
+        if self._dispatched.get(name) == key:
+            return
+        previous = self._settling.get(name)
+        if previous is None:
+            # Première observation : stable depuis sa date de modification (arriéré déjà copié)
+            self._settling[name] = key + (min(now, stat.st_mtime),)
+        elif previous[:2] != key:
+            self._settling[name] = key + (now,)
+
+    def poll(self, now: Optional[float] = None) -> List[Path]:
+        """PDF devenus stables depuis le dernier appel, du plus ancien au plus récent."""
+        now = time.time() if now is None else now
+        if not self._started or not self.use_events:
+            with os.scandir(self.directory) as entries:
+                present = {entry.name: entry.stat() for entry in entries
+                           if entry.name.endswith('.pdf') and entry.is_file()}
+            for name in set(self._settling) - present.keys():
+                del self._settling[name]
+            for name, stat in present.items():
+                self._observe(name, stat, now)
+            self._started = True
+        else:
+            with self._lock:
+                names, self._events = self._events | set(self._settling), set()
+            for name in names:
+                try:
+                    stat = (self.directory / name).stat()
+                except FileNotFoundError:
+                    self._settling.pop(name, None)
+                    continue
+                self._observe(name, stat, now)
+        
+        ready = sorted((since, name) for name, (_, _, since) in self._settling.items()
+                       if now - since >= self.settle_seconds)
+        for _, name in ready:
+            self._dispatched[name] = self._settling.pop(name)[:2]
+        return [self.directory / name for _, name in ready]
+
+    def pending(self) -> int:
+        """Fichiers vus mais pas encore stables."""
+        return len(self._settling)
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+# 👥 RÉSOLUTION D'ENTITÉS PROPRIÉTAIRES (variantes OCR/LLM d'un même propriétaire)
+OWNER_SIMILARITY_THRESHOLD = 0.9
+OWNER_BLOCK_PAIRWISE_LIMIT = 50  # Au-delà : comparaison aux voisins dans l'ordre trié uniquement
+OWNER_BLOCK_WINDOW = 10
+
+# Règles phonétiques françaises simplifiées (ordre significatif)
+FRENCH_PHONETIC_RULES = [
+    (re.compile(r'[^A-Z]'), ''),
+    (re.compile(r'PH'), 'F'),
+    (re.compile(r'(?:QU|Q)'), 'K'),
+    (re.compile(r'GU(?=[EIY])'), 'G'),
+    (re.compile(r'C(?=[EIY])'), 'S'),
+    (re.compile(r'C'), 'K'),
+    (re.compile(r'E?AU'), 'O'),
+    (re.compile(r'[AE]I'), 'E'),
+    (re.compile(r'Y'), 'I'),
+    (re.compile(r'W'), 'V'),
+    (re.compile(r'Z'), 'S'),
+    (re.compile(r'H'), ''),
+    (re.compile(r'(?<=.)[DSTXZ]+$'), ''),  # Finales muettes : DUPONT / DUPOND → DUPON
+    (re.compile(r'(.)\1+'), r'\1'),
+]
+
+def _ascii_upper(text: str) -> str:
+    return unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii').upper()
+
+@functools.lru_cache(maxsize=NAME_FILTER_CACHE_SIZE)
+def french_phonetic_key(word: str) -> str:
+    """
+    Clé phonétique d'un nom de famille : première lettre + consonnes après
+    simplification des graphies françaises ("DUPONT", "DUPOND", "DUPPONT" → "DPN").
+    """
+    word = _ascii_upper(word)
+    for pattern, replacement in FRENCH_PHONETIC_RULES:
+        word = pattern.sub(replacement, word)
+    return word[:1] + re.sub(r'[AEIOU]', '', word[1:])
+
+@functools.lru_cache(maxsize=NAME_FILTER_CACHE_SIZE)
+def normalize_owner_name(nom: str, prenom: str = '') -> str:
+    """
+    Nom complet comparable : sans accents ni ponctuation, mots triés, ce qui neutralise
+    "DUPONT JEAN-PIERRE" / "DUPONT" + "JEAN PIERRE" / "JEAN PIERRE DUPONT".
+    """
+    return ' '.join(sorted(re.findall(r'[A-Z0-9]+', _ascii_upper(f"{nom} {prenom}"))))
+
+def owner_names_match(name_a: str, name_b: str, threshold: float = OWNER_SIMILARITY_THRESHOLD) -> bool:
+    """Similarité de deux noms normalisés (chiffres identiques exigés, ratio difflib sinon)."""
+    if re.sub(r'\D', '', name_a) != re.sub(r'\D', '', name_b):
+        return False
+    # Mots collés / séparés ("JEANPIERRE" / "JEAN PIERRE") : comparaison sans espaces
+    compact_a, compact_b = name_a.replace(' ', ''), name_b.replace(' ', '')
+    if compact_a == compact_b:
+        return True
+    matcher = difflib.SequenceMatcher(None, compact_a, compact_b, autojunk=False)
+    return (matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold
+            and matcher.ratio() >= threshold)
+
+class OwnerEntityResolver:
+    """
+    Regroupe les variantes d'un même propriétaire et leur attribue un identifiant canonique.
+
+    Blocage (jamais de comparaison globale) : une ligne appartient au bloc
+    (clé phonétique du premier mot du nom, code postal) et, si elle en a un, au bloc
+    de son numéro MAJIC. Les signatures distinctes (nom normalisé, code postal, MAJIC)
+    sont comparées deux à deux dans chaque bloc ; les correspondances sont fusionnées
+    par union-find. L'identifiant canonique dérive de la variante la plus fréquente.
+    """
+
+    def __init__(self, threshold: float = OWNER_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.stats = {'signatures': 0, 'blocs': 0, 'comparaisons': 0, 'entites': 0}
+
+    @staticmethod
+    def _find(parents: List[int], index: int) -> int:
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    def _union(self, parents: List[int], first: int, second: int) -> None:
+        root_a, root_b = self._find(parents, first), self._find(parents, second)
+        if root_a != root_b:
+            parents[max(root_a, root_b)] = min(root_a, root_b)
+
+    def resolve(self, properties: List[Dict]) -> List[str]:
+        """Identifiants canoniques alignés sur properties ('' pour les lignes sans nom)."""
+        # 1. Signatures distinctes : les lignes d'un même propriétaire se répètent
+        signature_index = {}
+        signatures = []
+        row_signatures = []
+        row_counts = []
+        for prop in properties:
+            nom = str(prop.get('nom', '') or '')
+            name = normalize_owner_name(nom, str(prop.get('prenom', '') or ''))
+            if not name:
+                row_signatures.append(-1)
+                continue
+            # Nom de famille = premier mot du nom (à défaut, du nom complet)
+            family_name = (nom.split() or name.split())[0]
+            signature = (name, str(prop.get('post_code', '') or '').strip(),
+                         str(prop.get('numero_majic', '') or '').strip().upper(),
+                         french_phonetic_key(family_name))
+            index = signature_index.get(signature)
+            if index is None:
+                index = signature_index[signature] = len(signatures)
+                signatures.append(signature)
+                row_counts.append(0)
+            row_counts[index] += 1
+            row_signatures.append(index)
+
+        # 2. Blocs : phonétique du nom de famille + code postal, et numéro MAJIC
+        blocks = {}
+        for index, (name, post_code, majic, phonetic_key) in enumerate(signatures):
+            blocks.setdefault(('P', phonetic_key, post_code), []).append(index)
+            if majic:
+                blocks.setdefault(('M', majic), []).append(index)
+
+        # 3. Comparaisons intra-bloc sur les noms distincts
+        parents = list(range(len(signatures)))
+        comparisons = 0
+        for members in blocks.values():
+            by_name = {}
+            for index in members:
+                first = by_name.setdefault(signatures[index][0], index)
+                if first != index:
+                    self._union(parents, first, index)  # Même nom normalisé dans le bloc
+            names = sorted(by_name)
+            if len(names) <= OWNER_BLOCK_PAIRWISE_LIMIT:
+                candidates = itertools.combinations(range(len(names)), 2)
+            else:
+                candidates = ((i, j) for i in range(len(names))
+                              for j in range(i + 1, min(i + 1 + OWNER_BLOCK_WINDOW, len(names))))
+            for i, j in candidates:
+                comparisons += 1
+                if owner_names_match(names[i], names[j], self.threshold):
+                    self._union(parents, by_name[names[i]], by_name[names[j]])
+
+        # 4. Identifiant canonique : variante la plus fréquente, puis la première dans l'ordre
+        #    alphabétique (indépendant de l'ordre des lignes, donc stable d'une exécution à l'autre)
+        best = {}
+        for index in range(len(signatures)):
+            root = self._find(parents, index)
+            current = best.get(root)
+            if current is None or (-row_counts[index], signatures[index][:2]) < (-row_counts[current], signatures[current][:2]):
+                best[root] = index
+        canonical_ids = {}
+        for root, index in best.items():
+            name, post_code = signatures[index][:2]
+            digest = hashlib.blake2b(f"{name}|{post_code}".encode('utf-8'), digest_size=6).hexdigest().upper()
+            canonical_ids[root] = f"PR{digest}"
+        signature_ids = [canonical_ids[self._find(parents, index)] for index in range(len(signatures))]
+
+        self.stats = {'signatures': len(signatures), 'blocs': len(blocks), 'comparaisons': comparisons,
+                      'entites': len(canonical_ids)}
+        return [signature_ids[index] if index >= 0 else '' for index in row_signatures]
+
+# Clés portant le numéro MAJIC / le droit réel côté propriétaire et côté parcelle
+OWNER_MAJIC_KEYS = ('numero_proprietaire', 'numero_majic')
+PARCEL_MAJIC_KEYS = ('numero_majic', 'numero_proprietaire', 'N° MAJIC', 'N°MAJIC', 'N° propriétaire')
+PARCEL_DROIT_KEYS = ('droit_reel', 'Droit réel')
+
+def _first_key_value(item: Dict, keys) -> str:
+    """Première valeur non vide parmi keys, normalisée pour comparaison."""
+    for key in keys:
+        value = str(item.get(key) or '').strip().upper()
+        if value:
+            return value
+    return ''
+
+class OwnerParcelAssociation:
+    """
+    Association propriétaires ↔ parcelles sans produit cartésien matérialisé.
+
+    Les tables propriétaires et parcelles sont stockées une seule fois ; seul un index
+    d'appariements (indices entiers) est conservé. Chaque parcelle est associée :
+    1. aux propriétaires de même numéro MAJIC si la parcelle en porte un,
+    2. sinon aux propriétaires de même droit réel si la parcelle en porte un,
+    3. sinon à tous les propriétaires (indivision) - index partagé, coût O(parcelles).
+
+    iter_pairs() parcourt les appariements dans l'ordre de l'ancienne double boucle
+    (bloc par bloc, propriétaire par propriétaire, parcelle par parcelle).
+    """
+
+    def __init__(self, owners: List[Dict]):
+        self.owners = list(owners)
+        self.parcels = []
+        self.parcel_types = []
+        self.stats = {'majic': 0, 'droit_reel': 0, 'indivision': 0}
+        self._blocks = []
+
+        self._owners_by_majic = {}
+        self._owners_by_droit = {}
+        for index, owner in enumerate(self.owners):
+            majic = _first_key_value(owner, OWNER_MAJIC_KEYS)
+            if majic:
+                self._owners_by_majic.setdefault(majic, []).append(index)
+            droit = _first_key_value(owner, ('droit_reel',))
+            if droit:
+                self._owners_by_droit.setdefault(droit, []).append(index)
+
+    def _match_owners(self, parcel: Dict) -> Optional[List[int]]:
+        """Indices des propriétaires de la parcelle, None = tous (indivision)."""
+        matched = self._owners_by_majic.get(_first_key_value(parcel, PARCEL_MAJIC_KEYS))
+        if matched:
+            self.stats['majic'] += 1
+            return matched
+        matched = self._owners_by_droit.get(_first_key_value(parcel, PARCEL_DROIT_KEYS))
+        if matched:
+            self.stats['droit_reel'] += 1
+            return matched
+        self.stats['indivision'] += 1
+        return None
+
+    def add_parcels(self, parcels: List[Dict], prop_type: str = '') -> None:
+        """Ajoute un bloc de parcelles (ex. non bâties puis bâties) et indexe ses appariements."""
+        shared = []
+        restricted = []
+        for parcel in parcels:
+            index = len(self.parcels)
+            self.parcels.append(parcel)
+            self.parcel_types.append(prop_type)
+            owner_indices = self._match_owners(parcel)
+            shared.append(index)
+            restricted.append(owner_indices)
+
+        if all(owner_indices is None for owner_indices in restricted):
+            # Indivision complète : une seule liste partagée par tous les propriétaires
+            self._blocks.append((tuple(shared), None))
+            return
+
+        per_owner = [[] for _ in self.owners]
+        for index, owner_indices in zip(shared, restricted):
+            for owner_index in (range(len(self.owners)) if owner_indices is None else owner_indices):
+                per_owner[owner_index].append(index)
+        self._blocks.append((None, per_owner))
+
+    def iter_pairs(self):
+        """Génère les couples (indice propriétaire, indice parcelle) sans les stocker."""
+        for shared, per_owner in self._blocks:
+            for owner_index in range(len(self.owners)):
+                for parcel_index in (shared if per_owner is None else per_owner[owner_index]):
+                    yield owner_index, parcel_index
+
+    def __len__(self) -> int:
+        return sum(len(shared) * len(self.owners) if per_owner is None else sum(map(len, per_owner))
+                   for shared, per_owner in self._blocks)
+
+# 🔎 EMPREINTE LOCALE DES PDF (pré-analyse du lot sans rendu ni appel API)
+RENDER_ZOOM = 5.0  # ULTRA-HAUTE résolution pour extraction optimale
+RENDER_MAX_SIDE_PX = 4210  # Côté long d'une page A4 à 5× : les grands formats sont rendus à la même taille
+PAGE_WORKERS_MAX = int(os.getenv('PAGE_WORKERS', '4'))
+FINGERPRINT_TEXT_PAGES = 2
+FINGERPRINT_MIN_TEXT_CHARS = 20
+FINGERPRINT_HEADER_MARKERS = {
+    'releve': 'RELEVE DE PROPRIETE',
+    'batie': 'PROPRIETE(S) BATIE(S)',
+    'non_batie': 'PROPRIETE(S) NON BATIE(S)',
+    'contenance_totale': 'CONTENANCE TOTALE',
+}
+ENGINE_TABLES_AND_VISION = 'pdfplumber+vision'
+ENGINE_VISION = 'vision'
+
+def fingerprint_pdf(pdf_path: Path) -> Dict:
+    """
+    Empreinte d'un PDF à partir de signaux locaux (quelques millisecondes) :
+    producteur/créateur, format de page, couche texte, polices et en-têtes de
+    tableaux cadastraux des premières pages. En déduit le moteur (pdfplumber +
+    vision, ou vision seule pour un scan sans texte), le zoom de rendu et le
+    nombre de pages envoyées en parallèle à l'API.
+    """
+    fingerprint = {
+        'producer': '', 'creator': '', 'page_count': 0, 'page_format': '', 'has_text_layer': True,
+        'fonts': [], 'headers': [], 'engine': ENGINE_TABLES_AND_VISION, 'render_zoom': RENDER_ZOOM, 'page_workers': 1,
+    }
+    try:
+        doc = fitz.open(pdf_path)
+    except Exception as e:
+        fingerprint['error'] = str(e)
+        fingerprint['family'] = 'illisible'
+        return fingerprint
+    try:
+        metadata = doc.metadata or {}
+        pages = [doc[index] for index in range(min(doc.page_count, FINGERPRINT_TEXT_PAGES))]
+        text = ' '.join(_ascii_upper(' '.join(page.get_text() for page in pages)).split())
+        fonts = {font[3].split('+', 1)[-1] for page in pages for font in page.get_fonts()}
+        width, height = (pages[0].rect.width, pages[0].rect.height) if pages else (0, 0)
+        has_text_layer = len(text) >= FINGERPRINT_MIN_TEXT_CHARS
+
+        fingerprint.update({
+            'producer': (metadata.get('producer') or '').strip(),
+            'creator': (metadata.get('creator') or '').strip(),
+            'page_count': doc.page_count,
+            'page_format': f"{round(width * 25.4 / 72)}x{round(height * 25.4 / 72)}mm",
+            'has_text_layer': has_text_layer,
+            'fonts': sorted(fonts),
+            'headers': [key for key, marker in FINGERPRINT_HEADER_MARKERS.items() if marker in text],
+            'engine': ENGINE_TABLES_AND_VISION if has_text_layer else ENGINE_VISION,
+            'render_zoom': min(RENDER_ZOOM, RENDER_MAX_SIDE_PX / max(width, height)) if pages else RENDER_ZOOM,
+            'page_workers': max(1, min(PAGE_WORKERS_MAX, doc.page_count)),
+        })
+    finally:
+        doc.close()
+    fingerprint['family'] = '|'.join((fingerprint['producer'], fingerprint['creator'], fingerprint['page_format'],
+                                      'texte' if fingerprint['has_text_layer'] else 'scan'))
+    return fingerprint
+
+# 🧠 BUDGET MÉMOIRE DU PROCESSUS (rendus de pages, charges base64, lignes en cours)
+MEMORY_BUDGET_BYTES = int(float(os.getenv('MEMORY_BUDGET_MB', '2048')) * 2 ** 20)  # Par processus worker
+PAYLOAD_COPIES = 2  # Image d'une page envoyée à l'API : chaîne base64 + corps JSON de la requête
+RESULT_ROW_BYTES = 2048  # Estimation d'une ligne de résultat en mémoire
+MAX_DOCUMENT_ROWS = int(os.getenv('MAX_DOCUMENT_ROWS', '250000'))  # Lignes propriétaires × parcelles par PDF
+
+class MemoryGovernor:
+    """
+    Budget d'octets partagé par tous les threads du processus. Chaque étape réserve
+    avant de détenir ses données (rendus, base64, lignes) ; quand le budget est épuisé,
+    la réservation suivante attend qu'une autre soit libérée (contre-pression), dans
+    l'ordre d'arrivée. Une demande plus grande que le budget passe seule.
+    Expose l'usage courant et le pic pour régler la concurrence.
+    """
+
+    def __init__(self, budget_bytes: int = MEMORY_BUDGET_BYTES):
+        self.budget = budget_bytes
+        self.used = 0
+        self.peak = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.overcommits = 0
+        self._tickets = itertools.count()
+        self._queue = []
+        self._cond = threading.Condition()
+
+    def _grant(self, nbytes: int) -> None:
+        self.used += nbytes
+        self.peak = max(self.peak, self.used)
+        if self.used > self.budget:
+            self.overcommits += 1
+
+    def acquire(self, nbytes: int, block: bool = True) -> None:
+        """Réserve nbytes ; attend (block=True) que le budget le permette, sinon dépasse le budget."""
+        with self._cond:
+            if not block or (not self._queue and self.used + nbytes <= self.budget):
+                self._grant(nbytes)
+                return
+            ticket = next(self._tickets)
+            self._queue.append(ticket)
+            self.waits += 1
+            start = time.perf_counter()
+            self._cond.wait_for(lambda: self._queue[0] == ticket and (self.used == 0 or self.used + nbytes <= self.budget))
+            self._queue.pop(0)
+            self.wait_seconds += time.perf_counter() - start
+            self._grant(nbytes)
+            self._cond.notify_all()
+
+    def release(self, nbytes: int) -> None:
+        with self._cond:
+            self.used -= nbytes
+            self._cond.notify_all()
+
+    def reservation(self) -> 'MemoryReservation':
+        return MemoryReservation(self)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {'budget': self.budget, 'used': self.used, 'peak': self.peak, 'waiting': len(self._queue),
+                    'waits': self.waits, 'wait_seconds': self.wait_seconds, 'overcommits': self.overcommits}
+
+    def describe(self) -> str:
+        stats = self.stats()
+        return (f"pic {stats['peak'] / 2 ** 20:.0f} Mo / budget {stats['budget'] / 2 ** 20:.0f} Mo, "
+                f"{stats['waits']} attente(s) ({stats['wait_seconds']:.1f}s), {stats['overcommits']} dépassement(s)")
+
+class MemoryReservation:
+    """
+    Part du budget détenue par un document. Seule une réservation vide attend : un
+    document qui détient déjà de la mémoire ne bloque jamais (pas d'interblocage entre
+    documents qui attendraient chacun la mémoire de l'autre), il grandit au-delà si besoin.
+    """
+
+    def __init__(self, governor: MemoryGovernor):
+        self.governor = governor
+        self.nbytes = 0
+
+    def resize(self, nbytes: int) -> None:
+        delta = nbytes - self.nbytes
+        if delta > 0:
+            self.governor.acquire(delta, block=self.nbytes == 0)
+        elif delta < 0:
+            self.governor.release(-delta)
+        self.nbytes = nbytes
+
+    def grow(self, nbytes: int) -> None:
+        self.resize(self.nbytes + nbytes)
+
+    def release(self) -> None:
+        self.resize(0)
+
+memory_governor = MemoryGovernor()
+
+def render_memory_estimate(pdf_path: Path, zoom: float, page_workers: int = 1) -> int:
+    """
+    Mémoire maximale du rendu d'un PDF, calculée depuis la géométrie des pages avant
+    tout rendu : PNG de chaque page (au plus la taille du pixmap RGB), pixmap de la
+    page en cours, charges base64 des pages envoyées en parallèle.
+    """
+    try:
+        with fitz.open(pdf_path) as doc:
+            raw = [math.ceil(page.rect.width * zoom) * math.ceil(page.rect.height * zoom) * 3 for page in doc]
+    except Exception:
+        return 0
+    if not raw:
+        return 0
+    return sum(raw) + max(raw) + page_workers * PAYLOAD_COPIES * math.ceil(max(raw) * 4 / 3)
+
+def rendered_memory(images: List[bytes], page_workers: int = 1) -> int:
+    """Mémoire des pages rendues (PNG) et de leurs charges base64 envoyées en parallèle."""
+    if not images:
+        return 0
+    return sum(map(len, images)) + min(page_workers, len(images)) * PAYLOAD_COPIES * math.ceil(max(map(len, images)) * 4 / 3)
+
+# ⏱️ DÉLAIS D'EXTRACTION (appel API, page, PDF) ET ANNULATION COOPÉRATIVE
+API_CALL_TIMEOUT = float(os.getenv('API_CALL_TIMEOUT', '90'))  # Secondes par requête OpenAI
+PAGE_TIMEOUT = float(os.getenv('PAGE_TIMEOUT', '300'))  # Toutes les stratégies d'une page
+PDF_TIMEOUT = float(os.getenv('PDF_TIMEOUT', '1200'))  # Traitement complet d'un PDF
+API_MAX_RETRIES = 2  # Nouvelles tentatives du client OpenAI (valeur par défaut de la bibliothèque)
+TIMEOUT_ERROR_PREFIX = "Délai dépassé"
+TIMEOUT_SCOPES = ('api', 'page', 'pdf')
+
+class TimeoutLimits(NamedTuple):
+    api_call: float = API_CALL_TIMEOUT
+    page: float = PAGE_TIMEOUT
+    pdf: float = PDF_TIMEOUT
+
+class Deadline(NamedTuple):
+    """Échéance absolue (horloge monotone) d'une page ou d'un PDF."""
+    scope: str
+    label: str
+    seconds: float
+    expires: float
+
+    @classmethod
+    def start(cls, scope: str, label: str, seconds: float, parent: Optional['Deadline'] = None) -> 'Deadline':
+        """Nouvelle échéance, jamais plus tardive que celle qui l'englobe (une page ne survit pas à son PDF)."""
+        deadline = cls(scope, label, seconds, time.monotonic() + seconds)
+        return parent if parent is not None and parent.expires <= deadline.expires else deadline
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    def check(self) -> None:
+        if self.remaining() <= 0:
+            raise ExtractionTimeout(self)
+
+class ExtractionTimeout(BaseException):
+    """
+    Échéance d'une page ou d'un PDF dépassée. Dérive de BaseException, comme
+    asyncio.CancelledError : les `except Exception` des stratégies d'extraction ne
+    l'absorbent pas, l'annulation remonte jusqu'à process_like_make.
+    """
+
+    def __init__(self, deadline: Deadline):
+        super().__init__(f"{TIMEOUT_ERROR_PREFIX} ({deadline.label}, {deadline.seconds:g}s)")
+        self.deadline = deadline
+
+def is_timeout_error(error: Optional[str]) -> bool:
+    """Erreur d'un PDF abandonné à l'expiration de son délai (last_pdf_error, journal, files)."""
+    return bool(error) and str(error).startswith(TIMEOUT_ERROR_PREFIX)
+
+class TimeoutStats:
+    """Délais dépassés depuis le démarrage (thread-safe) : compteurs par portée et PDF abandonnés."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(TIMEOUT_SCOPES, 0)
+        self.pdfs: Dict[str, str] = {}
+
+    def record(self, scope: str, pdf_name: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.counts[scope] += 1
+            if pdf_name is not None:
+                self.pdfs[pdf_name] = error
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {'counts': dict(self.counts), 'pdfs': dict(self.pdfs)}
+
+    def describe(self) -> str:
+        counts = self.snapshot()['counts']
+        return f"{counts['pdf']} PDF, {counts['page']} page(s), {counts['api']} appel(s) API"
+
+# 🔒 CONTEXTE PAR DOCUMENT : isolation par construction (aucun état du PDF sur l'extracteur)
+DOCUMENT_WORKSPACE_PREFIX = 'pdf_extract_'
+
+class DocumentContext(NamedTuple):
+    """
+    Contexte immuable d'un PDF en cours de traitement, transmis le long du pipeline :
+    identifiant d'isolation, espace de travail temporaire propre au document, profil
+    (empreinte) figé, caches du document (rendu des pages, en-tête) et sa réservation
+    dans le budget mémoire. Rien n'est partagé entre deux documents : plusieurs PDF
+    peuvent être traités en parallèle.
+    """
+    pdf_path: Path
+    isolation_id: str
+    workspace: Path
+    profile: Mapping
+    caches: Dict
+    memory: Optional[MemoryReservation] = None
+
+    @property
+    def name(self) -> str:
+        return self.pdf_path.name
+
+    def cached(self, key: str, compute):
+        """Valeur calculée une seule fois pour ce document."""
+        if key not in self.caches:
+            self.caches[key] = compute()
+        return self.caches[key]
+
+@contextmanager
+def document_context(pdf_path: Path, profile: Optional[Dict] = None, governor: Optional[MemoryGovernor] = None):
+    """
+    Ouvre le contexte d'un PDF ; son espace de travail est supprimé et sa mémoire rendue
+    au budget à la sortie, même en cas d'erreur.
+    """
+    pdf_path = Path(pdf_path)
+    isolation_id = f"{pdf_path.stem}-{uuid.uuid4().hex[:12]}"
+    workspace = Path(tempfile.mkdtemp(prefix=f"{DOCUMENT_WORKSPACE_PREFIX}{isolation_id}_"))
+    memory = (governor or memory_governor).reservation()
+    try:
+        yield DocumentContext(pdf_path, isolation_id, workspace,
+                              MappingProxyType(dict(profile if profile is not None else fingerprint_pdf(pdf_path))), {},
+                              memory)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+        memory.release()
+
+# 🏭 PIPELINE PAR ÉTAPES (run --pipeline) : rendu → tableaux → vision → fusion → écriture
+PIPELINE_STAGES = ('render', 'tables', 'vision', 'merge', 'sink')
+
+class PipelineSettings(NamedTuple):
+    """Workers par étape et capacité des files entre étapes (l'écriture reste unique, sur la boucle)."""
+    render: int = int(os.getenv('PIPELINE_RENDER_WORKERS', '2'))
+    tables: int = int(os.getenv('PIPELINE_TABLES_WORKERS', '2'))
+    vision: int = int(os.getenv('PIPELINE_VISION_WORKERS', '4'))
+    merge: int = int(os.getenv('PIPELINE_MERGE_WORKERS', '1'))
+    queue_size: int = int(os.getenv('PIPELINE_QUEUE_SIZE', '2'))
+
+class PipelineItem:
+    """PDF en transit dans le pipeline : son contexte ouvert, le résultat de chaque étape franchie, son erreur."""
+
+    def __init__(self, pdf_path: Path):
+        self.pdf_path = pdf_path
+        self.stack = ExitStack()
+        self.context: Optional[DocumentContext] = None
+        self.deadline: Optional[Deadline] = None
+        self.structured_data: Dict = {}
+        self.owners: List[Dict] = []
+        self.properties: List[Dict] = []
+        self.error: Optional[str] = None
+        self.cache_key: Optional[str] = None
+        self.cached = False
+        self.api_failures: List[str] = []
+        self.started = time.perf_counter()
+
+# 🧮 NORMALISATION VECTORISÉE (voir PDFPropertyExtractor.normalize_properties_vectorized)
+# Motifs précompilés partagés par les versions ligne par ligne et vectorisées.
+STUCK_PREFIX_PATTERN = re.compile(r'^(\d+)\s*([A-Z]+)$')
+SPACED_PREFIX_PATTERN = re.compile(r'^(\d+)\s+([A-Z]+)$')
+# Sans groupe de capture : str.contains n'émet pas d'avertissement pandas
+STUCK_PREFIX_TEST = r'^\d+\s*[A-Z]+$'
+SCALAR_FALLBACK_PATTERN = r'[^\t\n\r\x20-\x7e]'
+LEGAL_ENTITY_SPLIT_KEYWORDS = ['COM', 'COMMUNE', 'VILLE', 'MAIRIE', 'ÉTAT', 'DÉPARTEMENT', 'RÉGION', 'SCI', 'SARL', 'SA', 'EURL']
+LEGAL_ENTITY_SPLIT_PATTERN = '|'.join(re.escape(keyword) for keyword in LEGAL_ENTITY_SPLIT_KEYWORDS)
+
+# Chaînes stockées en colonnes Arrow si pyarrow est installé (opérations .str en C) ; export Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pa_dataset
+    import pyarrow.parquet as pq
+    TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    pa = pa_dataset = pq = None
+    TEXT_DTYPE = pd.StringDtype("python")
+
+# Export Parquet : partitions Hive department=XX/commune=YYY, colonnes typées
+PARQUET_PARTITION_FIELDS = ('department', 'commune')
+PARQUET_DICTIONARY_FIELDS = ('department', 'commune', 'section')
+PARQUET_INTEGER_FIELDS = ('contenance_ha', 'contenance_a', 'contenance_ca')
+PARQUET_ROW_GROUP_SIZE = 50_000
+PARQUET_BUFFER_LIMIT = 200_000  # Lignes en attente toutes partitions confondues
+PARQUET_MAX_OPEN_WRITERS = int(os.getenv('PARQUET_MAX_OPEN_WRITERS', '64'))  # Fichiers ouverts (une région : 1 000+ communes)
+PARQUET_DEFAULT_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+def parquet_schema(include_partitions: bool = False):
+    """
+    Schéma Arrow de l'export (colonnes EXPORT_COLUMNS_ORDER, noms techniques) :
+    department/commune/section encodés en dictionnaire, contenances en int32,
+    le reste en chaînes. Les colonnes de partition sont portées par les dossiers.
+    """
+    fields = []
+    for col in EXPORT_COLUMNS_ORDER:
+        if col in PARQUET_PARTITION_FIELDS and not include_partitions:
+            continue
+        if col in PARQUET_DICTIONARY_FIELDS:
+            fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+        elif col in PARQUET_INTEGER_FIELDS:
+            fields.append(pa.field(col, pa.int32()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+def parquet_partitioning():
+    """
+    Partitionnement Hive de l'export, typé en chaînes (dictionnaire) : sans lui, pyarrow
+    infère des entiers et perd les zéros de tête ('01', '038') ou échoue sur '2A'.
+    """
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa_dataset.partitioning(pa.schema([pa.field(col, dictionary) for col in PARQUET_PARTITION_FIELDS]),
+                                   flavor='hive', dictionaries='infer')
+
+def read_parquet_export(path, filters=None, columns=None):
+    """Relit un export Parquet (pa.Table) ; filters=[('department', '=', '89')] ne lit que les partitions utiles."""
+    if pa is None:
+        raise ImportError("pyarrow est requis pour lire l'export Parquet (pip install pyarrow)")
+    return pq.read_table(path, partitioning=parquet_partitioning(), filters=filters, columns=columns)
+
+def _parquet_int(value) -> Optional[int]:
+    """Contenance en entier (None si vide ou non numérique)."""
+    text = str(value).strip() if value is not None else ''
+    return int(text) if text.isdigit() else None
+
+class ParquetResultSink(ResultSink):
+    """
+    Export Parquet partitionné department=XX/commune=YYY/part-N.parquet.
+
+    Les lignes sont mises en attente par partition et converties en Arrow un groupe
+    de lignes à la fois (row_group_size) : la mémoire reste bornée quel que soit le
+    volume. Au plus max_open_writers ParquetWriter restent ouverts (les moins
+    récemment utilisés sont fermés) : une partition rouverte reçoit un nouveau
+    fichier part-N+1.parquet, sans dépasser la limite de fichiers ouverts du système.
+    """
+
+    def __init__(self, root, row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+                 buffer_limit: int = PARQUET_BUFFER_LIMIT, compression: str = 'zstd',
+                 max_open_writers: int = PARQUET_MAX_OPEN_WRITERS):
+        if pa is None:
+            raise ImportError("pyarrow est requis pour l'export Parquet (pip install pyarrow)")
+        self.root = Path(root)
+        self.row_group_size = row_group_size
+        self.buffer_limit = buffer_limit
+        self.compression = compression
+        self.max_open_writers = max(1, max_open_writers)
+        self.schema = parquet_schema()
+        self._columns = [field.name for field in self.schema]
+        self._buffers: Dict[tuple, List[tuple]] = {}
+        self._buffered = 0
+        self._writers = {}  # Ordre d'insertion = du moins au plus récemment utilisé
+        self._parts: Dict[tuple, int] = {}
+        self.rows_written = 0
+        self.row_groups_written = 0
+
+    def open(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def write_pdf(self, properties: List[Dict], pdf_name: str) -> int:
+        columns = self._columns
+        for prop in properties:
+            department = prop.get('department', '') or PARQUET_DEFAULT_PARTITION
+            commune = clean_commune_code(prop.get('commune', '')) or PARQUET_DEFAULT_PARTITION
+            row = tuple(prop.get(col, '') for col in columns)
+            buffer = self._buffers.setdefault((department, commune), [])
+            buffer.append(row)
+            self._buffered += 1
+            if len(buffer) >= self.row_group_size:
+                self._flush((department, commune))
+        # Trop de lignes en attente réparties sur de nombreuses partitions : vider la plus grosse
+        while self._buffered > self.buffer_limit:
+            self._flush(max(self._buffers, key=lambda key: len(self._buffers[key])))
+        return len(properties)
+
+    def _flush(self, partition: tuple) -> None:
+        rows = self._buffers.pop(partition, None)
+        if not rows:
+            return
+        self._buffered -= len(rows)
+        arrays = []
+        for field, values in zip(self.schema, zip(*rows)):
+            if field.name in PARQUET_INTEGER_FIELDS:
+                values = [_parquet_int(value) for value in values]
+            else:
+                values = [None if value is None else str(value) for value in values]
+            arrays.append(pa.array(values, type=field.type))
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+
+        writer = self._writers.pop(partition, None)
+        if writer is None:
+            if len(self._writers) >= self.max_open_writers:
+                self._writers.pop(next(iter(self._writers))).close()
+            department, commune = partition
+            directory = self.root / f"department={department}" / f"commune={commune}"
+            directory.mkdir(parents=True, exist_ok=True)
+            part = self._parts.get(partition, 0)
+            self._parts[partition] = part + 1
+            writer = pq.ParquetWriter(directory / f"part-{part}.parquet", self.schema, compression=self.compression)
+        self._writers[partition] = writer
+        writer.write_table(table, row_group_size=self.row_group_size)
+        self.rows_written += len(rows)
+        self.row_groups_written += 1
+
+    def close(self) -> None:
+        try:
+            for partition in list(self._buffers):
+                self._flush(partition)
+        finally:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers = {}
+
+def _text_series(values) -> pd.Series:
+    """Convertit une colonne en chaînes ("" pour None/NaN)."""
+    series = pd.Series(values, dtype=object) if not isinstance(values, pd.Series) else values
+    series = series.astype(object).where(series.notna(), "").astype(TEXT_DTYPE)
+    return series.reset_index(drop=True)
+
 class PDFPropertyExtractor:
     """Classe principale pour l'extraction d'informations de propriétaires depuis des PDFs."""
     
@@ -155,7 +2681,7 @@ class PDFPropertyExtractor:
         if not api_key:
             raise ValueError("La clé API OpenAI n'est pas configurée. Veuillez définir OPENAI_API_KEY dans le fichier .env")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(api_key=api_key, timeout=API_CALL_TIMEOUT, max_retries=API_MAX_RETRIES)
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.default_section = os.getenv('DEFAULT_SECTION', 'A')
@@ -165,134 +2691,115 @@ class PDFPropertyExtractor:
         self.input_dir.mkdir(exist_ok=True)
         self.output_dir.mkdir(exist_ok=True)
         
-        logger.info(f"Extracteur initialisé - Input: {self.input_dir}, Output: {self.output_dir}")
-
-    def clean_extraction_context(self, pdf_path: Path) -> None:
-        """
-        🧹 NETTOYAGE ANTI-CONTAMINATION ULTRA-SÉCURISÉ avant chaque PDF.
+        # Statistiques des chemins de parsing d'en-tête (local regex / repli ChatGPT / échec)
+        self.header_parse_stats = {'local': 0, 'llm': 0, 'echec': 0}
         
-        VERSION 2.0 : Isolation complète pour éliminer toute contamination batch.
-        """
-        logger.info(f"🧹 NETTOYAGE ULTRA-SÉCURISÉ pour {pdf_path.name}")
+        # Dictionnaires compilés du filtrage propriétaires/adresses (data/name_filters.json)
+        self.name_filters = load_name_filters()
+        
+        # Destinations alimentées PDF par PDF pendant run() (CSV incrémental par défaut)
+        self.sinks: List[ResultSink] = []
+        
+        # Journal d'avancement du lot en cours (ouvert par run())
+        self.journal: Optional[BatchJournal] = None
         
+        # État propre à chaque thread (erreur du dernier PDF traité) : PDF traitables en parallèle
+        self._thread_state = threading.local()
+        
+        # Empreintes locales des PDF (moteur, zoom de rendu, pages en parallèle)
+        self.pdf_profiles: Dict[str, Dict] = {}
+
+        # Shard (i, N) traité par run(shard=...) : journal et sorties propres au shard
+        self.shard: Optional[tuple] = None
+
+        # Budget mémoire du processus (MEMORY_BUDGET_MB), partagé par tous les PDF en cours
+        self.memory = memory_governor
+
+        # Délais par appel API, page et PDF (API_CALL_TIMEOUT, PAGE_TIMEOUT, PDF_TIMEOUT) et dépassements
+        self.timeout_limits = TimeoutLimits()
+        self.timeouts = TimeoutStats()
+
+        # PDF tronqués à MAX_DOCUMENT_ROWS lignes : nom → lignes propriétaires × parcelles attendues
+        self.oversized_pdfs: Dict[str, int] = {}
+
+        # Cache des résultats par contenu de PDF (RESULT_CACHE_DIR, par défaut output/cache ; RESULT_CACHE=0 : aucun)
+        self.result_cache: Optional[ResultCache] = (ResultCache(default_result_cache_dir(self.output_dir))
+                                                    if RESULT_CACHE_ENABLED else None)
+
+        logger.info(f"Extracteur initialisé - Input: {self.input_dir}, Output: {self.output_dir}")
+
+    @property
+    def last_pdf_error(self) -> Optional[str]:
+        """Erreur interceptée lors du dernier PDF traité par le thread courant."""
+        return getattr(self._thread_state, 'last_pdf_error', None)
+
+    @last_pdf_error.setter
+    def last_pdf_error(self, error: Optional[str]) -> None:
+        self._thread_state.last_pdf_error = error
+
+    @property
+    def deadline(self) -> Optional[Deadline]:
+        """Échéance en cours dans le thread courant (page ou PDF), None hors traitement."""
+        return getattr(self._thread_state, 'deadline', None)
+
+    @contextmanager
+    def use_deadline(self, deadline: Optional[Deadline]):
+        """Échéance du thread courant le temps du bloc (étapes d'un même PDF sur plusieurs threads)."""
+        previous = self.deadline
+        self._thread_state.deadline = deadline
         try:
-            # 1. FORCER LE GARBAGE COLLECTOR AGRESSIVEMENT
-            import gc
-            gc.collect()
-            gc.collect()  # Double nettoyage
-            
-            # 2. CRÉER UN NOUVEAU CLIENT OPENAI TOTALEMENT ISOLÉ
-            api_key = os.getenv('OPENAI_API_KEY')
-            if api_key:
-                # Fermer l'ancien client si possible
-                if hasattr(self.client, '_client') and hasattr(self.client._client, 'close'):
-                    try:
-                        self.client._client.close()
-                    except:
-                        pass
-                
-                # Créer un client complètement nouveau
-                self.client = OpenAI(api_key=api_key)
-                logger.info("✅ Nouveau client OpenAI créé (isolation complète)")
-            
-            # 3. VIDER TOUS LES CACHES ET VARIABLES D'ÉTAT
-            cache_attrs = [
-                '_image_cache', '_text_cache', '_extraction_cache', 
-                '_prompt_cache', '_response_cache', '_header_cache'
-            ]
-            for attr in cache_attrs:
-                if hasattr(self, attr):
-                    getattr(self, attr).clear()
-            
-            # 4. RÉINITIALISER TOUTES LES VARIABLES DE TRAITEMENT
-            reset_attrs = [
-                '_last_processed_pdf', '_current_context', '_last_department',
-                '_last_commune', '_extraction_history', '_contamination_context',
-                '_temp_owners', '_temp_props', '_temp_results', '_current_extraction_state'
-            ]
-            for attr in reset_attrs:
-                if hasattr(self, attr):
-                    setattr(self, attr, None)
-            
-            # 5. NETTOYAGE SPÉCIAL POUR CONTAMINATION GÉOGRAPHIQUE
-            self._geographic_cache = {}
-            self._department_context = {}
-            self._commune_context = {}
-            
-            # 6. FORCER LE NETTOYAGE DES VARIABLES GLOBALES POTENTIELLES
-            globals_to_clear = [
-                'CURRENT_PDF_CONTEXT', 'LAST_EXTRACTION', 'CURRENT_DEPARTMENT',
-                'CURRENT_COMMUNE', 'EXTRACTION_MEMORY'
-            ]
-            for var_name in globals_to_clear:
-                if var_name in globals():
-                    globals()[var_name] = None
-            
-            # 7. NETTOYAGE TEMPORAIRE
-            try:
-                import tempfile
-                temp_dir = tempfile.gettempdir()
-                # Nettoyer les fichiers temporaires liés à l'extraction PDF
-                for temp_file in Path(temp_dir).glob("*pdf_extract*"):
-                    try:
-                        temp_file.unlink()
-                    except:
-                        pass
-            except:
-                pass
-            
-            logger.info(f"✅ NETTOYAGE ULTRA-SÉCURISÉ TERMINÉ pour {pdf_path.name}")
-            
-        except Exception as e:
-            logger.warning(f"Erreur lors du nettoyage: {e}")
+            yield deadline
+        finally:
+            self._thread_state.deadline = previous
+
+    @property
+    def api_failures(self) -> Optional[List[str]]:
+        """Appels API en échec du PDF en cours dans le thread courant, None hors suivi."""
+        return getattr(self._thread_state, 'api_failures', None)
+
+    @contextmanager
+    def track_api_failures(self, failures: Optional[List[str]]):
+        """Appels API en échec du thread courant consignés dans `failures` le temps du bloc (pages d'un même PDF)."""
+        previous = self.api_failures
+        self._thread_state.api_failures = failures
+        try:
+            yield failures
+        finally:
+            self._thread_state.api_failures = previous
+
+    def deadline_scope(self, scope: str, label: str, seconds: float, parent: Optional[Deadline] = None):
+        """Nouvelle échéance pour le thread courant, bornée par `parent` (par défaut l'échéance en cours)."""
+        return self.use_deadline(Deadline.start(scope, label, seconds, parent if parent is not None else self.deadline))
+
+    def check_deadline(self) -> None:
+        """Point d'annulation coopérative : lève ExtractionTimeout si l'échéance en cours est dépassée."""
+        if self.deadline is not None:
+            self.deadline.check()
 
-    def batch_ultra_secure_cleanup(self, pdf_index: int, total_pdfs: int, pdf_path: Path) -> None:
+    def chat_completion(self, **request):
         """
-        🛡️ NETTOYAGE BATCH ULTRA-SÉCURISÉ SPÉCIALISÉ
-        
-        Mécanismes d'isolation renforcés spécifiquement pour le traitement par lots.
+        chat.completions.create borné par le délai par appel et par l'échéance en cours :
+        la requête HTTP en vol est abandonnée à l'expiration, sans nouvelle tentative au-delà.
         """
-        logger.info(f"🛡️ BATCH CLEANUP [{pdf_index}/{total_pdfs}] - {pdf_path.name}")
-        
+        self.check_deadline()
+        timeout, retries = self.timeout_limits.api_call, API_MAX_RETRIES
+        deadline = self.deadline
+        if deadline is not None and deadline.remaining() < timeout * (retries + 1):
+            timeout, retries = min(timeout, max(deadline.remaining(), 0.001)), 0
         try:
-            # 1. NETTOYAGE STANDARD ULTRA-SÉCURISÉ
-            self.clean_extraction_context(pdf_path)
-            
-            # 2. ISOLATION BATCH SPÉCIALISÉE
-            
-            # 2.1 Forcer l'oubli du contexte conversationnel OpenAI
-            # En créant un délai artificiel pour laisser le temps au serveur OpenAI d'oublier
-            if pdf_index > 1:  # Pas pour le premier PDF
-                import time
-                time.sleep(0.5)  # Micro-pause pour isolation serveur
-            
-            # 2.2 Réinitialiser complètement l'état du processeur
-            self.__dict__.update({
-                '_batch_contamination_guard': pdf_path.name,
-                '_current_pdf_isolation_id': f"{pdf_path.name}_{pdf_index}_{int(time.time())}",
-                '_batch_processing_state': 'isolated'
-            })
-            
-            # 2.3 Variables spécifiques au batch à nettoyer
-            batch_vars = [
-                '_batch_context', '_cross_pdf_memory', '_accumulated_data',
-                '_batch_department_history', '_batch_commune_history'
-            ]
-            for var in batch_vars:
-                if hasattr(self, var):
-                    setattr(self, var, {})
-            
-            # 2.4 Nettoyage mémoire Python agressif
-            import gc
-            collected = gc.collect()
-            logger.debug(f"🗑️ Garbage collector: {collected} objets supprimés")
-            
-            # 2.5 Log de vérification isolation
-            logger.info(f"✅ ISOLATION BATCH ACTIVÉE - PDF {pdf_index}/{total_pdfs}")
-            logger.info(f"🔒 ID d'isolation: {getattr(self, '_current_pdf_isolation_id', 'unknown')}")
-            
+            return self.client.with_options(timeout=timeout, max_retries=retries).chat.completions.create(**request)
         except Exception as e:
-            logger.error(f"❌ Erreur nettoyage batch ultra-sécurisé: {e}")
+            # La stratégie suivante peut prendre le relais, mais le résultat du PDF n'ira pas dans le cache
+            if self.api_failures is not None:
+                self.api_failures.append(str(e)[:200])
+            if isinstance(e, APITimeoutError):
+                self.timeouts.record('api')
+                self.check_deadline()
+            raise
+
+    def open_document_context(self, pdf_path: Path):
+        """Contexte isolé d'un PDF (voir DocumentContext), profil issu de la pré-analyse du lot."""
+        return document_context(pdf_path, self.get_pdf_profile(pdf_path), self.memory)
 
     def validate_extraction_consistency(self, owners: List[Dict], structured_data: Dict, pdf_path: Path) -> bool:
         """
@@ -419,12 +2926,13 @@ class PDFPropertyExtractor:
         logger.info(f"Trouvé {len(pdf_files)} fichier(s) PDF dans {self.input_dir}")
         return pdf_files
 
-    def pdf_to_images(self, pdf_path: Path) -> List[bytes]:
+    def pdf_to_images(self, pdf_path: Path, zoom: Optional[float] = None) -> List[bytes]:
         """
         Convertit toutes les pages d'un PDF en images PNG.
         
         Args:
             pdf_path: Chemin vers le fichier PDF
+            zoom: Facteur de rendu (par défaut celui de l'empreinte du PDF, RENDER_ZOOM au plus)
             
         Returns:
             Liste des bytes des images PNG ou liste vide en cas d'erreur
@@ -440,14 +2948,17 @@ class PDFPropertyExtractor:
                 return []
             
             images = []
+            if zoom is None:
+                zoom = self.get_pdf_profile(pdf_path)['render_zoom']
             
             # Traiter chaque page
             for page_num in range(len(doc)):
+                self.check_deadline()
                 try:
                     page = doc[page_num]
                     
-                    # Convertir chaque page en image avec une résolution MAXIMALE
-                    mat = fitz.Matrix(5.0, 5.0)  # ULTRA-HAUTE résolution pour extraction optimale
+                    # Convertir chaque page en image avec une résolution MAXIMALE (grands formats plafonnés)
+                    mat = fitz.Matrix(zoom, zoom)
                     pix = page.get_pixmap(matrix=mat)
                     
                     # Convertir en PNG
@@ -615,7 +3126,7 @@ EXEMPLE 2:
 """
             
             # PREMIÈRE PASSE: Extraction principale ultra-détaillée
-            response = self.client.chat.completions.create(
+            response = self.chat_completion(
                 model="gpt-4o",
                 messages=[
                     {
@@ -718,35 +3229,8 @@ EXEMPLE 2:
         Beaucoup plus fiable que l'analyse d'image.
         """
         try:
-            # Convertir filename en Path si nécessaire
-            if isinstance(filename, str):
-                # Si c'est juste un nom de fichier, chercher dans input/
-                pdf_path = Path(self.input_dir) / filename
-                if not pdf_path.exists():
-                    # Essayer d'autres chemins possibles
-                    for possible_path in [Path(filename), Path(self.input_dir) / f"{filename}.pdf"]:
-                        if possible_path.exists():
-                            pdf_path = possible_path
-                            break
-            else:
-                pdf_path = filename
-            
-            if not pdf_path.exists():
-                logger.warning(f"⚠️ Fichier PDF introuvable pour extraction en-tête: {pdf_path}")
-                return properties
-            
-            # Étape 1: Extraire le texte de l'en-tête avec pdfplumber
-            header_text = self.extract_header_text_with_pdfplumber(pdf_path)
-            
-            if not header_text:
-                logger.warning(f"⚠️ Impossible d'extraire l'en-tête textuel: {pdf_path.name}")
-                return properties
-            
-            # Étape 2: Analyser l'en-tête avec ChatGPT
-            location_data = self.parse_header_text_with_gpt(header_text, pdf_path.name)
-            
+            location_data = self.get_header_location(filename)
             if not location_data:
-                logger.warning(f"⚠️ Échec analyse en-tête: {pdf_path.name}")
                 return properties
             
             # Étape 3: Appliquer les données extraites aux propriétés
@@ -759,23 +3243,9 @@ EXEMPLE 2:
                 missing_dept_count = 0
                 
                 for prop in properties:
-                    if not prop.get("department") and dept:
-                        prop["department"] = dept
-                        missing_dept_count += 1
-                    if not prop.get("commune") and commune:
-                        # ✅ NETTOYAGE immédiat du code commune
-                        cleaned_commune = clean_commune_code(commune)
-                        prop["commune"] = cleaned_commune
-                        missing_commune_count += 1
-                        if cleaned_commune != commune:
-                            logger.debug(f"🧹 Commune nettoyée: '{commune}' → '{cleaned_commune}'")
-                    
-                    # 🎯 NOUVEAU : PROPAGATION FORCÉE du code pdfplumber sur TOUTES les lignes
-                    if commune and commune.isdigit() and len(commune) == 3:
-                        original_commune = prop.get("commune", "")
-                        if original_commune != commune:
-                            prop["commune"] = commune
-                            logger.debug(f"🔄 Commune forcée depuis pdfplumber: '{original_commune}' → '{commune}'")
+                    dept_added, commune_added = self._apply_header_location(prop, dept, commune)
+                    missing_dept_count += dept_added
+                    missing_commune_count += commune_added
                 
                 if missing_commune_count > 0:
                     logger.info(f"🔄 PROPAGATION FORCÉE: commune '{commune}' ajoutée à {missing_commune_count} propriétés")
@@ -784,13 +3254,76 @@ EXEMPLE 2:
                 
                 logger.info(f"✅ En-tête traité avec pdfplumber: dept={dept}, commune={commune} → {len(properties)} propriétés")
             else:
-                logger.warning(f"⚠️ Aucune donnée géographique trouvée dans l'en-tête: {pdf_path.name}")
+                logger.warning(f"⚠️ Aucune donnée géographique trouvée dans l'en-tête: {filename}")
             
         except Exception as e:
             logger.error(f"❌ Erreur extraction en-tête pdfplumber: {e}")
         
         return properties
 
+    def get_header_location(self, filename) -> Dict:
+        """
+        Lit l'en-tête du PDF (pdfplumber) et en extrait département/commune.
+        Retourne {} si le fichier ou l'en-tête sont inexploitables.
+        """
+        # Convertir filename en Path si nécessaire
+        if isinstance(filename, str):
+            # Si c'est juste un nom de fichier, chercher dans input/
+            pdf_path = Path(self.input_dir) / filename
+            if not pdf_path.exists():
+                # Essayer d'autres chemins possibles
+                for possible_path in [Path(filename), Path(self.input_dir) / f"{filename}.pdf"]:
+                    if possible_path.exists():
+                        pdf_path = possible_path
+                        break
+        else:
+            pdf_path = filename
+        
+        if not pdf_path.exists():
+            logger.warning(f"⚠️ Fichier PDF introuvable pour extraction en-tête: {pdf_path}")
+            return {}
+        
+        # Étape 1: Extraire le texte de l'en-tête avec pdfplumber
+        header_text = self.extract_header_text_with_pdfplumber(pdf_path)
+        
+        if not header_text:
+            logger.warning(f"⚠️ Impossible d'extraire l'en-tête textuel: {pdf_path.name}")
+            return {}
+        
+        # Étape 2: Analyser l'en-tête (regex locales, repli ChatGPT si incertain)
+        location_data = self.parse_header_text(header_text, pdf_path.name)
+        
+        if not location_data:
+            logger.warning(f"⚠️ Échec analyse en-tête: {pdf_path.name}")
+            return {}
+        
+        return location_data
+
+    def _apply_header_location(self, prop: Dict, dept: Optional[str], commune: Optional[str]) -> tuple:
+        """
+        Applique département/commune de l'en-tête à une propriété (modification en place).
+        Retourne (département ajouté, commune ajoutée).
+        """
+        dept_added = commune_added = False
+        if not prop.get("department") and dept:
+            prop["department"] = dept
+            dept_added = True
+        if not prop.get("commune") and commune:
+            # ✅ NETTOYAGE immédiat du code commune
+            cleaned_commune = clean_commune_code(commune)
+            prop["commune"] = cleaned_commune
+            commune_added = True
+            if cleaned_commune != commune:
+                logger.debug(f"🧹 Commune nettoyée: '{commune}' → '{cleaned_commune}'")
+        
+        # 🎯 NOUVEAU : PROPAGATION FORCÉE du code pdfplumber sur TOUTES les lignes
+        if commune and commune.isdigit() and len(commune) == 3:
+            original_commune = prop.get("commune", "")
+            if original_commune != commune:
+                prop["commune"] = commune
+                logger.debug(f"🔄 Commune forcée depuis pdfplumber: '{original_commune}' → '{commune}'")
+        return dept_added, commune_added
+
     def extract_header_text_with_pdfplumber(self, pdf_path: Path) -> str:
         """
         Extrait le texte brut de l'en-tête du PDF avec pdfplumber.
@@ -834,6 +3367,38 @@ EXEMPLE 2:
             logger.warning(f"Erreur extraction en-tête pdfplumber: {e}")
             return ""
 
+    def parse_header_text(self, header_text: str, filename: str) -> Dict:
+        """
+        Analyse l'en-tête en local (regex + table INSEE optionnelle) et ne fait
+        appel à ChatGPT que si aucune correspondance sûre n'est trouvée.
+        """
+        location_data = parse_header_text_locally(header_text)
+        if location_data:
+            self.header_parse_stats['local'] += 1
+            logger.info(f"✅ En-tête analysé localement: dept={location_data['department']}, commune={location_data['commune']}")
+            return location_data
+        
+        logger.info(f"🤖 En-tête non reconnu localement pour {filename} - repli ChatGPT")
+        location_data = self.parse_header_text_with_gpt(header_text, filename)
+        if location_data and (location_data.get("department") or location_data.get("commune")):
+            self.header_parse_stats['llm'] += 1
+        else:
+            self.header_parse_stats['echec'] += 1
+        return location_data
+
+    def log_header_parse_stats(self) -> Dict:
+        """Journalise le taux de réussite de chaque chemin de parsing d'en-tête."""
+        stats = self.header_parse_stats
+        total = sum(stats.values())
+        if total == 0:
+            return stats
+        
+        logger.info("📍 PARSING EN-TÊTES:")
+        logger.info(f"  🧮 Local (regex/INSEE): {stats['local']}/{total} ({stats['local'] / total * 100:.1f}%)")
+        logger.info(f"  🤖 Repli ChatGPT:       {stats['llm']}/{total} ({stats['llm'] / total * 100:.1f}%)")
+        logger.info(f"  ❌ Échecs:              {stats['echec']}/{total} ({stats['echec'] / total * 100:.1f}%)")
+        return stats
+
     def parse_header_text_with_gpt(self, header_text: str, filename: str) -> Dict:
         """
         Analyse le texte d'en-tête avec ChatGPT pour extraire département et commune.
@@ -876,7 +3441,7 @@ Output: {{"department": "51", "commune": "179"}}
 - Si aucun code trouvé, retourner {{"department": null, "commune": null}}
 """
 
-            response = self.client.chat.completions.create(
+            response = self.chat_completion(
                 model="gpt-4o-mini",  # Plus rapide et moins cher pour analyse textuelle
                 messages=[
                     {"role": "user", "content": header_prompt}
@@ -931,7 +3496,7 @@ Output: {{"department": "51", "commune": "179"}}
 ⚠️ Scan TOUT le document pour les propriétaires !
 """
             
-            response = self.client.chat.completions.create(
+            response = self.chat_completion(
                 model="gpt-4o",
                 messages=[
                     {
@@ -1012,7 +3577,7 @@ Retourne TOUT ce que tu vois en JSON:
 }
 """
             
-            response = self.client.chat.completions.create(
+            response = self.chat_completion(
                 model="gpt-4o",
                 messages=[
                     {
@@ -1505,7 +4070,7 @@ RÉPONSE JSON OBLIGATOIRE (avec TOUTES les lignes trouvées):
 🚨 VALIDATION FINALE: Vérifie que ton array "owners" contient UNE entrée pour CHAQUE ligne de données du tableau !"""
                 
                 # Appel OpenAI (paramètres identiques à Make)
-                response = self.client.chat.completions.create(
+                response = self.chat_completion(
                     model="gpt-4o",
                     messages=[
                         {
@@ -1813,7 +4378,7 @@ RÉPONSE JSON OBLIGATOIRE (avec TOUTES les lignes trouvées):
         """
 
         try:
-            response = self.client.chat.completions.create(
+            response = self.chat_completion(
                 model="gpt-4o",
                 messages=[
                     {
@@ -2077,14 +4642,19 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
             last_seen_values = {field: None for field in fields}
             
             for prop in file_props:
-                updated_prop = prop.copy()
+                # Copie uniquement si un champ est complété (les lignes inchangées sont partagées)
+                filled_values = {}
                 for field in fields:
-                    if updated_prop.get(field) is None or updated_prop.get(field) == "":
+                    value = prop.get(field)
+                    if value is None or value == "":
                         if last_seen_values[field] is not None:
-                            updated_prop[field] = last_seen_values[field]
+                            filled_values[field] = last_seen_values[field]
                     else:
-                        last_seen_values[field] = updated_prop[field]
-                all_updated_properties.append(updated_prop)
+                        last_seen_values[field] = value
+                if filled_values:
+                    prop = prop.copy()
+                    prop.update(filled_values)
+                all_updated_properties.append(prop)
         
         return all_updated_properties
 
@@ -2093,34 +4663,13 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         SÉPARATION AUTOMATIQUE des préfixes collés aux sections.
         Détecte et sépare les patterns comme "302A" → préfixe="302", section="A"
         """
-        import re
-        
         updated_properties = []
         separated_count = 0
         
         for prop in properties:
-            updated_prop = prop.copy()
-            section = str(updated_prop.get('section', '')).strip()
-            current_prefixe = str(updated_prop.get('prefixe', '')).strip()
-            
-            # Ne traiter que si la section n'est pas vide et le préfixe est vide
-            if section and not current_prefixe:
-                # Pattern pour détecter préfixe numérique collé à section alphabétique
-                # Exemples: "302A", "302 A", "302AB", "001ZD", "123AC", etc.
-                pattern = r'^(\d+)\s*([A-Z]+)$'  # \s* permet les espaces optionnels
-                match = re.match(pattern, section)
-                
-                if match:
-                    detected_prefixe = match.group(1)  # La partie numérique (302)
-                    detected_section = match.group(2)  # La partie alphabétique (A)
-                    
-                    # Mettre à jour les champs
-                    updated_prop['prefixe'] = detected_prefixe
-                    updated_prop['section'] = detected_section
-                    
-                    separated_count += 1
-                    logger.info(f"🔍 Préfixe séparé: '{section}' → préfixe='{detected_prefixe}' section='{detected_section}'")
-            
+            updated_prop = self._split_stuck_prefix(prop)
+            if updated_prop is not prop:
+                separated_count += 1
             updated_properties.append(updated_prop)
         
         if separated_count > 0:
@@ -2245,6 +4794,266 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         
         return address_clean
 
+    # 🧮 NORMALISATION VECTORISÉE
+    # Chaque méthode vectorized_* reproduit À L'IDENTIQUE la version ligne par ligne
+    # pour des colonnes de chaînes (valeurs manquantes None/NaN traitées comme "").
+    # Les regex vectorisées (RE2 avec pyarrow) et str.isdigit()/str.split() de Python divergent
+    # hors ASCII imprimable ("²".isdigit() est vrai, "\x1f" est un espace pour Python) :
+    # les rares lignes concernées repassent par la méthode scalaire d'origine.
+
+    def _scalar_fallback_mask(self, *columns: pd.Series) -> pd.Series:
+        """Lignes contenant au moins un caractère hors ASCII imprimable."""
+        mask = pd.Series(False, index=columns[0].index)
+        for column in columns:
+            mask |= column.str.contains(SCALAR_FALLBACK_PATTERN, regex=True)
+        return mask
+
+    def _fallback_values(self, mask: pd.Series, values) -> pd.Series:
+        """
+        Résultats scalaires des lignes de repli, alignés sur leur index : une liste affectée
+        par masque échoue avec le dtype chaîne pyarrow quand toutes les lignes sont concernées.
+        """
+        return pd.Series(list(values), index=mask.index[mask], dtype=TEXT_DTYPE)
+
+    def vectorized_clean_commune_code(self, communes) -> pd.Series:
+        """Version vectorisée de clean_commune_code."""
+        communes = _text_series(communes)
+        stripped = communes.str.strip()
+        has_number = stripped.str.contains(r'\d', regex=True)
+        first_number = stripped.str.replace(r'(?s)^\D*(\d+).*$', r'\1', regex=True)
+        padded = first_number.str.pad(3, side='left', fillchar='0').str[:3]
+        result = padded.where(has_number, stripped).where(communes.ne(""), "")
+        
+        fallback = self._scalar_fallback_mask(communes)
+        if fallback.any():
+            result[fallback] = self._fallback_values(fallback, (clean_commune_code(value) for value in communes[fallback]))
+        
+        without_digits = ~has_number & ~fallback & communes.ne("")
+        if without_digits.any():
+            logger.warning(f"🔍 {int(without_digits.sum())} commune(s) sans chiffres - Préservée(s) telle(s) quelle(s)")
+        return result
+
+    def vectorized_parse_contenance(self, values) -> pd.Series:
+        """Version vectorisée de parse_contenance_value."""
+        values = _text_series(values)
+        stripped = values.str.strip()
+        is_missing = stripped.eq("") | stripped.str.lower().isin(['n/a', 'null', 'none'])
+        
+        # Format français : espaces des milliers supprimés, partie entière avant la virgule
+        cleaned = stripped.str.replace(' ', '', regex=False).str.replace(',', '.', regex=False)
+        cleaned = cleaned.str.replace(r'(?s)\..*$', '', regex=True)
+        digits_only = cleaned.str.replace(r'[^0-9]', '', regex=True)
+        result = cleaned.where(cleaned.str.isdigit(), digits_only).where(~is_missing, "")
+        
+        fallback = self._scalar_fallback_mask(values)
+        if fallback.any():
+            result[fallback] = self._fallback_values(fallback, (self.parse_contenance_value(value) for value in values[fallback]))
+        return result
+
+    def vectorized_separate_stuck_prefixes(self, prefixes, sections) -> tuple:
+        """
+        Version vectorisée de separate_stuck_prefixes.
+        Retourne (préfixes, sections, masque des lignes séparées).
+        """
+        prefixes = _text_series(prefixes)
+        sections = _text_series(sections)
+        section_stripped = sections.str.strip()
+        
+        # Ne traiter que si la section n'est pas vide et le préfixe est vide
+        candidates = section_stripped.ne("") & prefixes.str.strip().eq("")
+        fallback = self._scalar_fallback_mask(prefixes, sections)
+        separated = candidates & section_stripped.str.contains(STUCK_PREFIX_TEST, regex=True) & ~fallback
+        
+        result_prefixes = prefixes.copy()
+        result_sections = sections.copy()
+        stuck = section_stripped[separated]
+        result_prefixes[separated] = stuck.str.replace(STUCK_PREFIX_PATTERN.pattern, r'\1', regex=True)
+        result_sections[separated] = stuck.str.replace(STUCK_PREFIX_PATTERN.pattern, r'\2', regex=True)
+        
+        # Les lignes hors ASCII imprimable passent par la version ligne par ligne
+        if fallback.any():
+            fallback_rows = self.separate_stuck_prefixes([
+                {'prefixe': prefixe, 'section': section}
+                for prefixe, section in zip(prefixes[fallback], sections[fallback])
+            ])
+            result_prefixes[fallback] = self._fallback_values(fallback, (row['prefixe'] for row in fallback_rows))
+            result_sections[fallback] = self._fallback_values(fallback, (row['section'] for row in fallback_rows))
+            separated = separated | (fallback & result_sections.ne(sections))
+        
+        return result_prefixes, result_sections, separated
+
+    def vectorized_split_names(self, noms, prenoms) -> tuple:
+        """Version vectorisée de split_name_intelligently. Retourne (noms, prénoms)."""
+        noms = _text_series(noms)
+        prenoms = _text_series(prenoms)
+        nom_clean = noms.str.strip()
+        prenom_clean = prenoms.str.strip()
+        
+        # Cas 1: prénom dupliqué au début du nom (préfixe différent pour chaque ligne)
+        with_prenom = prenom_clean.ne("")
+        nom_head = pd.Series(
+            [n[:len(p) + 1] for n, p in zip(nom_clean[with_prenom], prenom_clean[with_prenom])],
+            index=nom_clean.index[with_prenom], dtype=nom_clean.dtype
+        )
+        duplicated_prenom = pd.Series(False, index=nom_clean.index)
+        duplicated_prenom[with_prenom] = nom_head.eq(prenom_clean[with_prenom] + ' ')
+        
+        # Mots séparés par des blancs (équivalent de str.split() sans argument)
+        words = nom_clean.str.replace(r'\s+', ' ', regex=True)
+        part_count = (words.str.count(' ') + 1).where(words.ne(""), 0)
+        last_word = words.str.replace(r'^.* ', '', regex=True)
+        other_words = words.str.replace(r' [^ ]*$', '', regex=True)
+        
+        # Cas 2: personne morale conservée telle quelle (priorité sur les cas 3 et 4)
+        without_prenom = ~with_prenom
+        legal_entity = without_prenom & (part_count >= 2) & nom_clean.str.upper().str.contains(LEGAL_ENTITY_SPLIT_PATTERN, regex=True)
+        # Cas 3: plus de 2 mots → dernier mot = nom, reste = prénom
+        # Cas 4: 2 mots → premier mot = prénom, second = nom (même découpage)
+        split_words = without_prenom & ~legal_entity & (part_count >= 2)
+        
+        result_nom = nom_clean.copy()
+        result_prenom = prenom_clean.copy()
+        if duplicated_prenom.any():
+            prefix_lengths = prenom_clean[duplicated_prenom].str.len()
+            result_nom[duplicated_prenom] = pd.Series(
+                [n[length:].strip() for n, length in zip(nom_clean[duplicated_prenom], prefix_lengths)],
+                index=prefix_lengths.index
+            )
+        result_nom[split_words] = last_word[split_words]
+        result_prenom[split_words] = other_words[split_words]
+        
+        fallback = self._scalar_fallback_mask(noms, prenoms)
+        if fallback.any():
+            fallback_names = [self.split_name_intelligently(n, p) for n, p in zip(noms[fallback], prenoms[fallback])]
+            result_nom[fallback] = self._fallback_values(fallback, (nom for nom, _ in fallback_names))
+            result_prenom[fallback] = self._fallback_values(fallback, (prenom for _, prenom in fallback_names))
+        return result_nom, result_prenom
+
+    def vectorized_generate_unique_id(self, departments, communes, sections, numeros, prefixes) -> pd.Series:
+        """Version vectorisée de generate_unique_id (ID 14 caractères)."""
+        departments = _text_series(departments)
+        communes = _text_series(communes)
+        sections = _text_series(sections)
+        numeros = _text_series(numeros)
+        prefixes = _text_series(prefixes)
+        
+        # ÉTAPES 1-2: Département (2) et commune (3)
+        dept = departments.str.strip()
+        dept = dept.where(~dept.isin(["N/A", ""]), "00").str.pad(2, side='left', fillchar='0').str[:2]
+        comm = communes.str.strip()
+        comm = comm.where(~comm.isin(["N/A", ""]), "000").str.pad(3, side='left', fillchar='0').str[:3]
+        
+        # ÉTAPE 3: Section avec préfixe intégré (5)
+        prefix_stripped = prefixes.str.strip()
+        section_raw = sections.str.strip().str.upper()
+        has_section = section_raw.ne("") & sections.ne("N/A")
+        embedded_prefix = (
+            prefix_stripped.ne("") & section_raw.str.contains(' ', regex=False)
+            & section_raw.str.replace(r'(?s) .*$', '', regex=True).eq(prefix_stripped)
+        )
+        sect = section_raw.copy()
+        sect[embedded_prefix] = section_raw[embedded_prefix].str.replace(r'^[^ ]* ', '', regex=True)
+        sect = sect.where(has_section, "A")
+        
+        pref = prefix_stripped.where(prefix_stripped.ne("") & prefixes.ne("N/A"), "")
+        pref_length = pref.str.len()
+        sect_length = sect.str.len()
+        
+        # Sans préfixe : zéros à gauche ; avec préfixe : traitement par longueur de préfixe
+        section_final = sect.str.pad(5, side='left', fillchar='0')
+        for length in sorted(pref_length[pref_length > 0].unique()):
+            rows = pref_length.eq(length)
+            available = 5 - int(length)
+            if available <= 0:
+                section_final[rows] = pref[rows].str[:5]
+                continue
+            fits = rows & sect_length.le(available)
+            truncated = rows & sect_length.gt(available)
+            section_final[fits] = pref[fits] + ('0' * available + sect[fits]).str[-available:]
+            section_final[truncated] = pref[truncated] + sect[truncated].str[:available]
+        section_final = (section_final + "00000").str[:5]
+        
+        # ÉTAPE 4: Numéro (4)
+        numero_stripped = numeros.str.strip()
+        num_digits = numero_stripped.str.replace(r'[^0-9]', '', regex=True)
+        num = num_digits.str.pad(4, side='left', fillchar='0').str[-4:].where(num_digits.ne(""), "0001")
+        num = num.where(numero_stripped.ne("") & numeros.ne("N/A"), "0001")
+        
+        unique_ids = dept + comm + section_final + num
+        
+        # str.zfill conserve un signe initial ("-5" → "-05") : ces lignes passent aussi en scalaire
+        fallback = self._scalar_fallback_mask(departments, communes, sections, numeros, prefixes)
+        fallback |= departments.str.strip().str.contains(r'^[+-]', regex=True)
+        fallback |= communes.str.strip().str.contains(r'^[+-]', regex=True)
+        fallback |= section_raw.str.contains(r'(?:^| )[+-]', regex=True)
+        if fallback.any():
+            unique_ids[fallback] = self._fallback_values(fallback, (
+                self.generate_unique_id(*values)
+                for values in zip(departments[fallback], communes[fallback], sections[fallback],
+                                  numeros[fallback], prefixes[fallback])
+            ))
+        return unique_ids
+
+    def normalize_properties_vectorized(self, properties) -> pd.DataFrame:
+        """
+        🧮 NORMALISATION COLONNAIRE d'un lot complet (liste de dicts ou DataFrame).
+        
+        Applique en une passe par colonne les mêmes règles que le traitement ligne par ligne :
+        1. separate_stuck_prefixes   (préfixe/section)
+        2. clean_commune_code        (commune sur 3 chiffres)
+        3. parse_contenance_value    (contenance HA/A/CA)
+        4. split_name_intelligently  (nom/prénom)
+        5. generate_unique_id        (ID 14 caractères)
+        
+        Résultats identiques aux fonctions ligne par ligne, sans appel de fonction par ligne.
+        """
+        df = properties.copy() if isinstance(properties, pd.DataFrame) else properties_to_dataframe(properties)
+        if df.empty:
+            return df
+        df = df.reset_index(drop=True)
+        
+        for column in ['department', 'commune', 'prefixe', 'section', 'numero', 'nom', 'prenom']:
+            if column not in df.columns:
+                df[column] = ""
+        
+        df['prefixe'], df['section'], separated = self.vectorized_separate_stuck_prefixes(df['prefixe'], df['section'])
+        df['commune'] = self.vectorized_clean_commune_code(df['commune'])
+        for column in ['contenance_ha', 'contenance_a', 'contenance_ca']:
+            if column in df.columns:
+                df[column] = self.vectorized_parse_contenance(df[column])
+        df['nom'], df['prenom'] = self.vectorized_split_names(df['nom'], df['prenom'])
+        df['id'] = self.vectorized_generate_unique_id(
+            df['department'], df['commune'], df['section'], df['numero'], df['prefixe']
+        )
+        
+        logger.info(f"🧮 Normalisation vectorisée: {len(df)} lignes, {int(separated.sum())} préfixe(s) séparé(s)")
+        return df
+
+    def renormalize_export_csv(self, input_csv: str, output_filename: str = "output_normalise.csv", chunksize: int = 500_000) -> Path:
+        """
+        Re-normalise un export CSV historique (format export_to_csv) par blocs de lignes.
+        
+        Args:
+            input_csv: Chemin du CSV historique (séparateur point-virgule)
+            output_filename: Nom du fichier produit dans output_dir
+            chunksize: Nombre de lignes traitées par bloc (mémoire bornée)
+        """
+        reverse_mapping = {label: column for column, label in EXPORT_COLUMN_MAPPING.items()}
+        output_path = self.output_dir / output_filename
+        total_rows = 0
+        
+        reader = pd.read_csv(input_csv, sep=';', dtype=str, keep_default_na=False,
+                             encoding='utf-8-sig', chunksize=chunksize)
+        for chunk_index, chunk in enumerate(reader):
+            df = self.normalize_properties_vectorized(chunk.rename(columns=reverse_mapping))
+            df = df.reindex(columns=EXPORT_COLUMNS_ORDER, fill_value='').rename(columns=EXPORT_COLUMN_MAPPING)
+            df.to_csv(output_path, index=False, sep=';', mode='w' if chunk_index == 0 else 'a',
+                      header=chunk_index == 0, encoding='utf-8-sig' if chunk_index == 0 else 'utf-8')
+            total_rows += len(df)
+        
+        logger.info(f"🧮 Export re-normalisé: {total_rows} lignes → {output_path}")
+        return output_path
+
     def smart_merge_multi_page_data(self, all_page_data: List[Dict], filename: str) -> List[Dict]:
         """
         FUSION INTELLIGENTE des données multi-pages.
@@ -2308,11 +5117,15 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
             # Fusion propriétaires + parcelles
             logger.info(f"🔗 Fusion {len(owners_data)} propriétaires avec {len(parcels_data)} parcelles")
             
-            # Stratégie: croiser chaque propriétaire avec chaque parcelle
-            for owner in owners_data:
-                for parcel in parcels_data:
-                    merged_prop = self.merge_owner_parcel(owner, parcel, location_data)
-                    merged_properties.append(merged_prop)
+            # Stratégie: appariement par MAJIC / droit réel, sinon chaque propriétaire avec chaque parcelle
+            association = OwnerParcelAssociation(owners_data)
+            association.add_parcels(parcels_data)
+            logger.info(f"🔗 {len(association)} appariements (par MAJIC: {association.stats['majic']}, "
+                        f"par droit réel: {association.stats['droit_reel']}, en indivision: {association.stats['indivision']})")
+            for owner_index, parcel_index in association.iter_pairs():
+                merged_prop = self.merge_owner_parcel(association.owners[owner_index],
+                                                      association.parcels[parcel_index], location_data)
+                merged_properties.append(merged_prop)
                     
         elif owners_data:
             # Seulement des propriétaires - enrichir avec localisation
@@ -2391,7 +5204,6 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         logger.info(f"🧹 NETTOYAGE INTELLIGENT pour {filename} - {len(properties)} propriétés")
         
         cleaned = []
-        seen_combinations = set()
         
         # 1. VALIDATION GÉOGRAPHIQUE PRÉALABLE
         geo_stats = {}
@@ -2409,57 +5221,57 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
             logger.info(f"🎯 Géographie dominante: {main_geo} ({geo_stats[main_geo]} occurrences)")
         
         contaminated_removed = 0
-        for prop in properties:
-            # 2. FILTRAGE ANTI-CONTAMINATION GÉOGRAPHIQUE
-            dept = prop.get('department', '').strip()
-            comm = prop.get('commune', '').strip()
+        with StreamingDeduplicator() as seen_combinations:
+            for prop in properties:
+                # 2. FILTRAGE ANTI-CONTAMINATION GÉOGRAPHIQUE
+                dept = prop.get('department', '').strip()
+                comm = prop.get('commune', '').strip()
             
-            if main_geo and dept and comm:
-                prop_geo = f"{dept}-{comm}"
-                if prop_geo != main_geo:
-                    contaminated_removed += 1
-                    logger.info(f"❌ CONTAMINATION: {prop.get('nom', '')} {prop.get('prenom', '')} (Geo: {prop_geo} vs {main_geo})")
-                    continue  # Skip cette propriété contaminée
-            
-            # 3. CRÉATION CLÉ UNIQUE INTELLIGENTE pour déduplication fine
-            key_fields = [
-                prop.get('nom', '').strip().upper(),
-                prop.get('prenom', '').strip().upper(),
-                prop.get('section', '').strip(),
-                prop.get('numero', '').strip(),
-                prop.get('numero_majic', '').strip()
-            ]
-            unique_key = '|'.join(str(f) for f in key_fields)
-            
-            # 4. IGNORER LES ENTRÉES COMPLÈTEMENT VIDES OU INVALIDES
-            if not any(key_fields) or unique_key == '||||':
-                continue
+                if main_geo and dept and comm:
+                    prop_geo = f"{dept}-{comm}"
+                    if prop_geo != main_geo:
+                        contaminated_removed += 1
+                        logger.info(f"❌ CONTAMINATION: {prop.get('nom', '')} {prop.get('prenom', '')} (Geo: {prop_geo} vs {main_geo})")
+                        continue  # Skip cette propriété contaminée
+            
+                # 3. CRÉATION CLÉ UNIQUE INTELLIGENTE pour déduplication fine
+                key_fields = [
+                    prop.get('nom', '').strip().upper(),
+                    prop.get('prenom', '').strip().upper(),
+                    prop.get('section', '').strip(),
+                    prop.get('numero', '').strip(),
+                    prop.get('numero_majic', '').strip()
+                ]
+                unique_key = '|'.join(str(f) for f in key_fields)
             
-            # Vérification spéciale pour noms suspects
-            nom = prop.get('nom', '').strip()
-            prenom = prop.get('prenom', '').strip()
-            if not self.is_likely_real_owner(nom, prenom):
-                logger.info(f"❌ NOM SUSPECT REJETÉ: {nom} {prenom}")
-                continue
+                # 4. IGNORER LES ENTRÉES COMPLÈTEMENT VIDES OU INVALIDES
+                if not any(key_fields) or unique_key == '||||':
+                    continue
+            
+                # Vérification spéciale pour noms suspects
+                nom = prop.get('nom', '').strip()
+                prenom = prop.get('prenom', '').strip()
+                if not self.is_likely_real_owner(nom, prenom):
+                    logger.info(f"❌ NOM SUSPECT REJETÉ: {nom} {prenom}")
+                    continue
             
-            # 5. DÉDUPLICATION INTELLIGENTE
-            if unique_key not in seen_combinations:
-                seen_combinations.add(unique_key)
+                # 5. DÉDUPLICATION INTELLIGENTE
+                if seen_combinations.add(unique_key):
                 
-                # 6. ASSURER LA COMPLÉTUDE DES CHAMPS
-                required_fields = [
-                    'department', 'commune', 'prefixe', 'section', 'numero', 
-                    'contenance', 'droit_reel', 'designation_parcelle', 
-                    'nom', 'prenom', 'numero_majic', 'voie', 'post_code', 'city'
-                ]
+                    # 6. ASSURER LA COMPLÉTUDE DES CHAMPS
+                    required_fields = [
+                        'department', 'commune', 'prefixe', 'section', 'numero', 
+                        'contenance', 'droit_reel', 'designation_parcelle', 
+                        'nom', 'prenom', 'numero_majic', 'voie', 'post_code', 'city'
+                    ]
                 
-                for field in required_fields:
-                    if field not in prop:
-                        prop[field] = ''
+                    for field in required_fields:
+                        if field not in prop:
+                            prop[field] = ''
                 
-                cleaned.append(prop)
-            else:
-                logger.debug(f"🔄 DOUBLON IGNORÉ: {nom} {prenom} (déjà traité)")
+                    cleaned.append(prop)
+                else:
+                    logger.debug(f"🔄 DOUBLON IGNORÉ: {nom} {prenom} (déjà traité)")
         
         if contaminated_removed > 0:
             logger.warning(f"🧽 CONTAMINATION NETTOYÉE: {contaminated_removed} propriétaires d'autres PDFs supprimés")
@@ -2467,126 +5279,82 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         logger.info(f"✅ NETTOYAGE TERMINÉ: {len(properties)} → {len(cleaned)} propriétés valides après déduplication intelligente")
         return cleaned
 
-    def export_to_csv(self, all_properties: List[Dict], output_filename: str = "output.csv") -> None:
+    def export_to_excel(self, all_properties: List[Dict], output_filename: str = "output.xlsx") -> None:
         """
-        Exporte toutes les données vers un fichier CSV avec séparateur point-virgule.
+        Exporte toutes les données vers un fichier Excel (.xlsx).
         """
         if not all_properties:
-            logger.warning("Aucune donnée à exporter")
+            logger.warning("Aucune donnée à exporter en Excel")
             return
         # Nettoyage du code commune avant export
         for prop in all_properties:
             prop['commune'] = clean_commune_code(prop.get('commune', ''))
-        # Créer le DataFrame
-        df = pd.DataFrame(all_properties)
-        
-        # Colonnes selon les spécifications du client (avec contenance détaillée)
-        columns_order = [
-            'department', 'commune', 'prefixe', 'section', 'numero', 
-            'contenance_ha', 'contenance_a', 'contenance_ca',
-            'droit_reel', 'designation_parcelle', 'nom', 'prenom', 'numero_majic', 
-            'voie', 'post_code', 'city', 'id', 'fichier_source'
-        ]
         
-        # Renommer les colonnes pour plus de clarté
-        column_mapping = {
-            'department': 'Département',
-            'commune': 'Commune', 
-            'prefixe': 'Préfixe',
-            'section': 'Section',
-            'numero': 'Numéro',
-            'contenance_ha': 'Contenance HA',
-            'contenance_a': 'Contenance A', 
-            'contenance_ca': 'Contenance CA',
-            'droit_reel': 'Droit réel',
-            'designation_parcelle': 'Designation Parcelle',
-            'nom': 'Nom Propri',
-            'prenom': 'Prénom Propri',
-            'numero_majic': 'N°MAJIC',
-            'voie': 'Voie',
-            'post_code': 'CP',
-            'city': 'Ville',
-            'id': 'id',
-            'fichier_source': 'Fichier source'
-        }
-        
-        # Réorganiser et renommer
-        df = df.reindex(columns=columns_order, fill_value='')
-        df = df.rename(columns=column_mapping)
-        
-        # Export CSV avec séparateur point-virgule (meilleur pour Excel français)
+        # Export Excel en flux (xlsxwriter constant_memory), colonnes selon les spécifications du client
         output_path = self.output_dir / output_filename
-        df.to_csv(output_path, index=False, encoding='utf-8-sig', sep=';')
+        count = write_export_xlsx(iter_export_rows(all_properties), str(output_path))
         
-        logger.info(f"📊 Données CSV exportées vers {output_path} (séparateur: ;)")
-        logger.info(f"📈 Total: {len(all_properties)} propriété(s) dans {len(df['Fichier source'].unique())} fichier(s)")
+        files = len({prop.get('fichier_source', '') for prop in all_properties})
+        logger.info(f"📊 Données Excel exportées vers {output_path}")
+        logger.info(f"📈 Total: {count} propriété(s) dans {files} fichier(s)")
         
         return output_path
 
-    def export_to_excel(self, all_properties: List[Dict], output_filename: str = "output.xlsx") -> None:
+    def export_to_parquet(self, all_properties: List[Dict], output_dirname: str = "output_parquet") -> Optional[Path]:
         """
-        Exporte toutes les données vers un fichier Excel (.xlsx).
+        Exporte vers un jeu de données Parquet partitionné par département/commune
+        (lecture par pyarrow, pandas, DuckDB, GeoPandas...). Nécessite pyarrow.
         """
         if not all_properties:
-            logger.warning("Aucune donnée à exporter en Excel")
-            return
-        # Nettoyage du code commune avant export
-        for prop in all_properties:
-            prop['commune'] = clean_commune_code(prop.get('commune', ''))
-        # Créer le DataFrame
-        df = pd.DataFrame(all_properties)
-        
-        # Colonnes selon les spécifications du client (avec contenance détaillée)
-        columns_order = [
-            'department', 'commune', 'prefixe', 'section', 'numero', 
-            'contenance_ha', 'contenance_a', 'contenance_ca',
-            'droit_reel', 'designation_parcelle', 'nom', 'prenom', 'numero_majic', 
-            'voie', 'post_code', 'city', 'id', 'fichier_source'
-        ]
-        
-        # Renommer les colonnes pour plus de clarté
-        column_mapping = {
-            'department': 'Département',
-            'commune': 'Commune', 
-            'prefixe': 'Préfixe',
-            'section': 'Section',
-            'numero': 'Numéro',
-            'contenance_ha': 'Contenance HA',
-            'contenance_a': 'Contenance A', 
-            'contenance_ca': 'Contenance CA',
-            'droit_reel': 'Droit réel',
-            'designation_parcelle': 'Designation Parcelle',
-            'nom': 'Nom Propri',
-            'prenom': 'Prénom Propri',
-            'numero_majic': 'N°MAJIC',
-            'voie': 'Voie',
-            'post_code': 'CP',
-            'city': 'Ville',
-            'id': 'id',
-            'fichier_source': 'Fichier source'
-        }
-        
-        # Réorganiser et renommer
-        df = df.reindex(columns=columns_order, fill_value='')
-        df = df.rename(columns=column_mapping)
-        
-        # Export Excel
-        output_path = self.output_dir / output_filename
-        df.to_excel(output_path, index=False, engine='openpyxl')
-        
-        logger.info(f"📊 Données Excel exportées vers {output_path}")
-        logger.info(f"📈 Total: {len(all_properties)} propriété(s) dans {len(df['Fichier source'].unique())} fichier(s)")
-        
+            logger.warning("Aucune donnée à exporter en Parquet")
+            return None
+        if pa is None:
+            logger.warning("⚠️ pyarrow non installé - export Parquet ignoré")
+            return None
+
+        # Écriture dans un dossier temporaire puis remplacement de l'export précédent
+        output_path = self.output_dir / output_dirname
+        tmp_path = self.output_dir / (output_dirname + '.tmp')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        try:
+            with ParquetResultSink(tmp_path) as sink:
+                sink.write_pdf(all_properties, output_dirname)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        shutil.rmtree(output_path, ignore_errors=True)
+        os.replace(tmp_path, output_path)
+
+        logger.info(f"📦 Données Parquet exportées vers {output_path}: {sink.rows_written} ligne(s), "
+                    f"{sink.row_groups_written} groupe(s) de lignes")
         return output_path
 
-    def run(self) -> None:
+    def run(self, resume: bool = False, shard: Optional[tuple] = None, pipeline: bool = False) -> None:
         """
         TRAITEMENT PAR LOTS OPTIMISÉ pour extraction maximale.
+        
+        Args:
+            resume: Reprendre le lot journalisé : les PDF déjà terminés (même version du
+                    pipeline, fichier inchangé) ne sont pas retraités, leurs lignes sont
+                    relues depuis le journal et réexportées
+            shard: (i, N) - ne traiter que le i-ème des N shards (partition par contenu,
+                   voir shard_of) et écrire ses lignes dans output/shards/ ; les exports
+                   consolidés sont produits ensuite par merge_shards
+            pipeline: Traiter les PDF avec le pipeline par étapes (process_pdf_pipeline) :
+                      rendu et tableaux des PDF suivants pendant les appels vision
         """
         logger.info("🚀 Démarrage de l'extraction BATCH OPTIMISÉE")
+        self.shard = shard
         
         # Lister les fichiers PDF
         pdf_files = self.list_pdf_files()
+        if shard is not None:
+            total = len(pdf_files)
+            pdf_files = select_shard(pdf_files, *shard)
+            logger.info(f"🧩 Shard {shard[0]}/{shard[1]}: {len(pdf_files)} PDF(s) sur {total}")
+            if not pdf_files:
+                self.write_shard_results([], pdf_files, {})
+                return
         
         if not pdf_files:
             logger.warning("❌ Aucun fichier PDF trouvé dans le dossier input/")
@@ -2594,12 +5362,53 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         
         logger.info(f"📄 {len(pdf_files)} PDF(s) détecté(s) pour traitement par lots")
         
-        # PHASE 1: PRÉ-ANALYSE du lot pour stratégie globale
-        batch_strategy = self.analyze_pdf_batch(pdf_files)
-        logger.info(f"🧠 Stratégie globale: {batch_strategy.get('approach', 'standard')}")
-        
-        # PHASE 2: TRAITEMENT OPTIMISÉ par lots
-        all_properties = self.process_pdf_batch_optimized(pdf_files, batch_strategy)
+        self.journal = BatchJournal(self.batch_journal_path())
+        self.sinks = self.create_result_sinks()
+        try:
+            for sink in self.sinks:
+                sink.open()
+            
+            # PHASE 0: REPRISE - résultats journalisés des PDF déjà terminés
+            completed = set(self.journal.start_batch(pdf_files, resume=resume))
+            restored = {}
+            for pdf_file in pdf_files:
+                if pdf_file in completed:
+                    try:
+                        restored[pdf_file] = self.journal.load_results(pdf_file)
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"⚠️ Résultats journalisés illisibles pour {pdf_file.name} ({e}) - retraitement")
+                        continue
+                    self.write_to_sinks(restored[pdf_file], pdf_file)
+            remaining = [pdf_file for pdf_file in pdf_files if pdf_file not in restored]
+            if resume:
+                logger.info(f"⏩ Reprise: {len(restored)} PDF(s) déjà terminé(s), {len(remaining)} à traiter")
+            
+            # PHASE 1: PRÉ-ANALYSE du lot pour stratégie globale
+            # PHASE 2: TRAITEMENT OPTIMISÉ par lots, lignes validées ajoutées à output.csv.partial après chaque PDF
+            # (publié en output.csv à la fermeture des destinations)
+            new_properties = []
+            if remaining:
+                batch_strategy = self.analyze_pdf_batch(remaining)
+                logger.info(f"🧠 Stratégie globale: {batch_strategy.get('approach', 'standard')}")
+                # Plus courts d'abord (pages, taille) : un gros PDF ne retarde plus les petits
+                remaining = shortest_job_first(remaining, self.pdf_profiles)
+                if pipeline:
+                    new_properties = self.process_pdf_pipeline(remaining)
+                else:
+                    new_properties = self.process_pdf_batch_optimized(remaining, batch_strategy)
+            all_properties = [prop for properties in restored.values() for prop in properties] + new_properties
+            journal_counts = self.journal.counts()
+            logger.info(f"📒 Journal: {journal_counts}")
+        finally:
+            for sink in self.sinks:
+                sink.close()
+            self.journal.close()
+            self.journal = None
+        
+        # Shard : lignes brutes conservées pour merge_shards (déduplication et validation globales)
+        if shard is not None:
+            self.write_shard_results(all_properties, pdf_files, journal_counts)
+            return
         
         # PHASE 3: POST-TRAITEMENT pour combler les trous
         if all_properties:
@@ -2618,12 +5427,282 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
             logger.info(f"📈 Moyenne: {avg_per_pdf:.1f} propriétés/PDF")
         else:
             logger.warning("❌ Aucune donnée extraite du lot")
+        logger.info(f"🧠 Mémoire: {self.memory.describe()}")
+        logger.info(f"⏱️ Délais dépassés: {self.timeouts.describe()}")
+        if self.result_cache is not None:
+            evicted = self.result_cache.evict()
+            logger.info(f"🗃️ Cache: {self.result_cache.describe()}" + (f", {evicted} entrée(s) évincée(s)" if evicted else ""))
+
+    def watch(self, poll_interval: float = WATCH_POLL_INTERVAL, settle_seconds: float = WATCH_SETTLE_SECONDS,
+              stop_event: Optional[threading.Event] = None, use_events: bool = True) -> int:
+        """
+        MODE DÉMON : surveille input_dir et traite chaque PDF déposé dès que sa copie est
+        terminée (InputFolderWatcher). Ses lignes sont ajoutées à output.csv et à la base
+        SQLite ; les PDF déjà terminés d'après le journal (fichier inchangé) sont ignorés,
+        y compris après un redémarrage.
+        
+        Args:
+            poll_interval: Attente entre deux examens du dossier (secondes)
+            settle_seconds: Durée sans changement de taille ni de date avant traitement
+            stop_event: Arrêt propre quand l'événement est levé (sinon Ctrl+C)
+        
+        Returns:
+            Nombre de PDF traités
+        """
+        logger.info(f"👀 Surveillance de {self.input_dir} (stabilité {settle_seconds:.0f}s, "
+                    f"{'inotify' if use_events and Observer is not None else 'parcours périodique'})")
+        self.journal = BatchJournal(self.batch_journal_path())
+        self.sinks = self.create_result_sinks(append=True)
+        watcher = InputFolderWatcher(self.input_dir, settle_seconds, use_events)
+        processed = skipped = 0
+        try:
+            for sink in self.sinks:
+                sink.open()
+            watcher.start()
+            while stop_event is None or not stop_event.is_set():
+                for pdf_file in watcher.poll():
+                    if stop_event is not None and stop_event.is_set():
+                        break
+                    if self.journal.start_pdf(pdf_file):
+                        skipped += 1
+                        continue
+                    logger.info(f"📥 Nouveau PDF: {pdf_file.name} ({watcher.pending()} en cours de dépôt)")
+                    self.process_pdf_with_checkpoint(pdf_file)
+                    processed += 1
+                if stop_event is None:
+                    time.sleep(poll_interval)
+                else:
+                    stop_event.wait(poll_interval)
+        except KeyboardInterrupt:
+            logger.info("⏹️ Surveillance interrompue")
+        finally:
+            watcher.stop()
+            for sink in self.sinks:
+                sink.close()
+            self.journal.close()
+            self.journal = None
+        logger.info(f"👀 Surveillance arrêtée: {processed} PDF traité(s), {skipped} déjà terminé(s)")
+        return processed
+
+    def batch_journal_path(self) -> Path:
+        """Journal du lot (BATCH_JOURNAL_FILE, par défaut output/batch_journal.sqlite ; propre au shard avec --shard)."""
+        if self.shard is not None:
+            return self.shard_dir() / DEFAULT_BATCH_JOURNAL_FILENAME
+        return Path(os.getenv('BATCH_JOURNAL_FILE', '') or self.output_dir / DEFAULT_BATCH_JOURNAL_FILENAME)
+
+    def shard_dir(self) -> Path:
+        """Dossier du shard en cours (output/shards/shard-iii-of-nnn), partagé entre les machines."""
+        return shard_output_dir(self.output_dir, *self.shard)
+
+    def write_shard_results(self, properties: List[Dict], pdf_files: List[Path], journal_counts: Dict) -> Path:
+        """Lignes brutes du shard (avant déduplication du lot) puis son manifeste."""
+        shard_dir = self.shard_dir()
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        write_results_json(shard_dir / SHARD_RESULTS_FILENAME, properties)
+        index, count = self.shard
+        write_shard_manifest(shard_dir, {
+            'index': index, 'count': count, 'version': PIPELINE_VERSION, 'hote': socket.gethostname(),
+            'pdfs': sorted(pdf_path.name for pdf_path in pdf_files), 'lignes': len(properties),
+            'echecs': journal_counts.get(CHECKPOINT_FAILED, 0), 'hors_delai': journal_counts.get(CHECKPOINT_TIMED_OUT, 0),
+            'fin': time.time(),
+        })
+        logger.info(f"🧩 Shard {index}/{count} terminé: {len(pdf_files)} PDF(s), {len(properties)} ligne(s) → {shard_dir}")
+        return shard_dir
+
+    def merge_shards(self, count: Optional[int] = None) -> List[Dict]:
+        """
+        Combine les shards terminés (run --shard i/N) : déduplication à l'échelle du lot
+        complet (post_process_batch_results), validation finale et exports CSV, Excel,
+        Parquet, SQLite et delta (export_to_csv_with_stats).
+        
+        Args:
+            count: Nombre de shards N (déduit des manifestes s'il n'y en a qu'un)
+        
+        Returns:
+            Lignes consolidées, [] si un shard manque
+        """
+        manifests = find_shard_manifests(self.output_dir)
+        if count is None:
+            if len(manifests) > 1:
+                logger.error(f"❌ Shards de plusieurs découpages ({sorted(manifests)}) : préciser --shards N")
+                return []
+            count = next(iter(manifests), None)
+        shards = manifests.get(count, {})
+        missing = [index for index in range(1, (count or 0) + 1) if index not in shards]
+        if not shards or missing:
+            logger.error(f"❌ Fusion impossible: shard(s) manquant(s) {missing or 'tous'} dans {self.output_dir / SHARDS_DIRNAME}")
+            return []
+        
+        all_properties, pdf_files = [], []
+        for index in range(1, count + 1):
+            manifest = shards[index]
+            if manifest.get('version') != PIPELINE_VERSION:
+                logger.warning(f"⚠️ Shard {index}/{count} produit par la version {manifest.get('version')} du pipeline")
+            if manifest.get('echecs'):
+                logger.warning(f"⚠️ Shard {index}/{count}: {manifest['echecs']} PDF en échec")
+            all_properties.extend(read_results_json(Path(manifest['dossier']) / SHARD_RESULTS_FILENAME))
+            pdf_files.extend(Path(name) for name in manifest['pdfs'])
+        logger.info(f"🧩 Fusion de {count} shard(s): {len(pdf_files)} PDF(s), {len(all_properties)} ligne(s)")
+        return self.export_merged_results(all_properties, pdf_files)
+
+    def merge_shared_results(self, shared_dir=None) -> List[Dict]:
+        """Comme merge_shards, pour les lignes publiées par les workers à vol de travail (SharedWorkDir)."""
+        shared = SharedWorkDir(shared_dir or self.shared_work_dir())
+        all_properties = shared.results()
+        for failure in shared.failures():
+            logger.warning(f"⚠️ {failure.get('pdf')} en échec après {failure.get('tentatives')} tentative(s): {failure.get('erreur')}")
+        pdf_files = [Path(name) for name in sorted({prop.get('fichier_source', '') for prop in all_properties})]
+        logger.info(f"🤝 Fusion de {shared.path}: {len(pdf_files)} PDF(s), {len(all_properties)} ligne(s)")
+        return self.export_merged_results(all_properties, pdf_files)
+
+    def export_merged_results(self, all_properties: List[Dict], pdf_files: List[Path]) -> List[Dict]:
+        """Déduplication et validation à l'échelle du lot complet, puis exports finaux."""
+        if not all_properties:
+            logger.warning("❌ Aucune donnée à fusionner")
+            return []
+        merged = self.post_process_batch_results(all_properties, pdf_files)
+        self.export_to_csv_with_stats(merged)
+        return merged
+
+    def shared_work_dir(self) -> Path:
+        """Dossier partagé des workers à vol de travail (SHARED_WORK_DIR, par défaut output/partage)."""
+        return default_shared_work_dir(self.output_dir)
+
+    def job_queue_path(self) -> Path:
+        """File de travaux des workers (JOB_QUEUE_FILE, par défaut output/job_queue.sqlite)."""
+        return default_job_queue_path(self.output_dir)
+
+    def process_pdf_with_checkpoint(self, pdf_path: Path) -> List[Dict]:
+        """
+        Traite un PDF (process_like_make) en journalisant son statut, puis transmet ses
+        lignes validées aux destinations incrémentales. Une erreur interceptée par
+        process_like_make le marque en échec : il sera retraité à la reprise.
+        """
+        if self.journal is not None:
+            self.journal.mark_running(pdf_path)
+        try:
+            properties = self.process_pdf_cached(pdf_path)
+        except Exception as e:
+            if self.journal is not None:
+                self.journal.mark_failed(pdf_path, str(e))
+            raise
+        self.record_pdf_result(pdf_path, properties, self.last_pdf_error)
+        return properties
+
+    def process_pdf_cached(self, pdf_path: Path) -> List[Dict]:
+        """
+        process_like_make précédé du cache de résultats : un PDF au contenu déjà traité
+        par cette version du pipeline et des prompts est servi sans rendu ni appel API.
+        """
+        if self.result_cache is None:
+            return self.process_like_make(pdf_path)
+        try:
+            key = pdf_sha256(pdf_path)
+        except OSError:
+            return self.process_like_make(pdf_path)
+        properties = self.cached_results(pdf_path, key)
+        if properties is not None:
+            self.last_pdf_error = None
+            return properties
+        api_failures = []
+        with self.track_api_failures(api_failures):
+            properties = self.process_like_make(pdf_path)
+        if self.cacheable_result(pdf_path, properties, self.last_pdf_error, api_failures):
+            self.result_cache.put(pdf_path, properties, key)
+        return properties
+
+    def cacheable_result(self, pdf_path: Path, properties: List[Dict], error: Optional[str],
+                         api_failures: List[str]) -> bool:
+        """
+        Résultat à mettre en cache : PDF sans erreur, au moins une ligne, non tronqué à
+        MAX_DOCUMENT_ROWS, et aucun appel API en échec (quota, réseau) dont le résultat
+        aurait été remplacé par une liste vide.
+        """
+        if error or not properties or pdf_path.name in self.oversized_pdfs:
+            return False
+        if api_failures:
+            logger.warning(f"🗃️ {pdf_path.name}: résultat non mis en cache, {len(api_failures)} appel(s) API "
+                           f"en échec ({api_failures[-1]})")
+            return False
+        return True
+
+    def cached_results(self, pdf_path: Path, key: str) -> Optional[List[Dict]]:
+        """Lignes en cache pour ce contenu, rattachées au fichier courant (copie ou renommage possibles)."""
+        properties = self.result_cache.get(pdf_path, key)
+        if properties is None:
+            return None
+        for prop in properties:
+            prop['fichier_source'] = pdf_path.name
+        logger.info(f"🗃️ {pdf_path.name}: {len(properties)} ligne(s) servie(s) depuis le cache")
+        return properties
+
+    def record_pdf_result(self, pdf_path: Path, properties: List[Dict], error: Optional[str]) -> None:
+        """Statut du PDF dans le journal (terminé, en échec ou hors délai), puis ses lignes aux destinations."""
+        if self.journal is not None:
+            if error:
+                status = CHECKPOINT_TIMED_OUT if is_timeout_error(error) else CHECKPOINT_FAILED
+                self.journal.mark_failed(pdf_path, error, status)
+            else:
+                self.journal.mark_done(pdf_path, properties)
+        self.write_to_sinks(properties, pdf_path)
+
+    def create_result_sinks(self, append: bool = False) -> List[ResultSink]:
+        """
+        Destinations incrémentales du lot : output.csv (consolidé, dédupliqué, en fin de lot ;
+        poursuivi sans être recréé si append=True) et la base SQLite (SQLITE_OUTPUT_FILE,
+        par défaut output/output.sqlite). Avec --shard : output.csv du shard uniquement.
+        """
+        if self.shard is not None:
+            # La base SQLite consolidée est écrite par merge_shards
+            return [CSVResultSink(self.shard_dir() / "output.csv", append=append)]
+        return [CSVResultSink(self.output_dir / "output.csv", append=append), SQLiteResultSink(self.sqlite_output_path())]
+
+    def sqlite_output_path(self) -> Path:
+        return Path(os.getenv('SQLITE_OUTPUT_FILE', '') or self.output_dir / DEFAULT_SQLITE_OUTPUT_FILENAME)
+
+    def export_to_sqlite(self, all_properties: List[Dict], path: Optional[str] = None) -> Optional[Path]:
+        """
+        Upsert des lignes validées dans la base SQLite (mêmes clés que pendant le lot :
+        les lignes déjà écrites PDF par PDF sont mises à jour, pas dupliquées).
+        """
+        if not all_properties:
+            logger.warning("Aucune donnée à exporter en SQLite")
+            return None
+        output_path = Path(path) if path else self.sqlite_output_path()
+        with SQLiteResultSink(output_path) as sink:
+            # Une transaction par fichier source, comme pendant le lot
+            by_file = {}
+            for prop in all_properties:
+                by_file.setdefault(prop.get('fichier_source', ''), []).append(prop)
+            for pdf_name, properties in by_file.items():
+                sink.write_pdf(properties, pdf_name)
+        if sink.rows_skipped:
+            logger.warning(f"⚠️ SQLite: {sink.rows_skipped} ligne(s) sans ID non écrite(s)")
+        logger.info(f"🗄️ Données SQLite exportées vers {output_path}: {sink.rows_written} ligne(s) (upsert)")
+        return output_path
+
+    def write_to_sinks(self, properties: List[Dict], pdf_path: Path) -> None:
+        """
+        Valide les lignes d'un PDF (mêmes critères que l'export final) et les transmet
+        aux destinations incrémentales.
+        """
+        if not self.sinks or not properties:
+            return
+        validated = self.final_validation_before_export(list(properties))
+        for sink in self.sinks:
+            written = sink.write_pdf(validated, pdf_path.name)
+            logger.info(f"💾 {written} ligne(s) de {pdf_path.name} écrite(s) dans {getattr(sink, 'path', sink)}")
 
     def analyze_pdf_batch(self, pdf_files: List[Path]) -> Dict:
         """
         PRÉ-ANALYSE du lot de PDFs pour déterminer la stratégie optimale.
+        
+        Empreinte locale de chaque PDF (fingerprint_pdf : métadonnées, format, couche
+        texte, polices, en-têtes de tableaux), sans rendu d'image ni appel API. Les
+        empreintes pilotent le traitement de chaque PDF (moteur, zoom, pages en parallèle).
         """
-        logger.info(f"🔍 Pré-analyse de {len(pdf_files)} PDFs...")
+        logger.info(f"🔍 Pré-analyse locale de {len(pdf_files)} PDFs...")
+        start = time.perf_counter()
         
         batch_info = {
             'total_files': len(pdf_files),
@@ -2631,28 +5710,19 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
             'total_pages': 0,
             'approach': 'standard',
             'common_location': {},
-            'estimated_properties': 0
+            'estimated_properties': 0,
+            'engines': {},
+            'fingerprints': {},
         }
         
-        # Analyser un échantillon pour détecter les patterns
-        sample_size = min(3, len(pdf_files))  # Analyser max 3 PDFs pour la stratégie
-        
-        for i, pdf_file in enumerate(pdf_files[:sample_size]):
-            logger.info(f"🔍 Analyse échantillon {i+1}/{sample_size}: {pdf_file.name}")
-            
-            # Convertir première page pour analyse rapide
-            images = self.pdf_to_images(pdf_file)
-            if images:
-                batch_info['total_pages'] += len(images)
-                
-                # Détecter le format de ce PDF
-                format_info = self.detect_pdf_format(images[0])
-                format_key = f"{format_info.get('document_type')}_{format_info.get('format_era')}"
-                
-                if format_key in batch_info['formats_detected']:
-                    batch_info['formats_detected'][format_key] += 1
-                else:
-                    batch_info['formats_detected'][format_key] = 1
+        for pdf_file in pdf_files:
+            fingerprint = fingerprint_pdf(pdf_file)
+            self.pdf_profiles[pdf_file.name] = fingerprint
+            batch_info['fingerprints'][pdf_file.name] = fingerprint
+            batch_info['total_pages'] += fingerprint['page_count']
+            family = fingerprint['family']
+            batch_info['formats_detected'][family] = batch_info['formats_detected'].get(family, 0) + 1
+            batch_info['engines'][fingerprint['engine']] = batch_info['engines'].get(fingerprint['engine'], 0) + 1
         
         # Déterminer la stratégie globale basée sur l'analyse
         if len(batch_info['formats_detected']) == 1:
@@ -2666,10 +5736,18 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
             batch_info['approach'] = 'mixed_adaptive'
         
         logger.info(f"📊 Formats détectés: {batch_info['formats_detected']}")
-        logger.info(f"🎯 Stratégie choisie: {batch_info['approach']}")
+        logger.info(f"⚙️ Moteurs: {batch_info['engines']} - {batch_info['total_pages']} page(s)")
+        logger.info(f"🎯 Stratégie choisie: {batch_info['approach']} ({(time.perf_counter() - start) * 1000:.0f} ms)")
         
         return batch_info
 
+    def get_pdf_profile(self, pdf_path: Path) -> Dict:
+        """Empreinte du PDF (calculée par analyze_pdf_batch, sinon à la demande)."""
+        profile = self.pdf_profiles.get(pdf_path.name)
+        if profile is None:
+            profile = self.pdf_profiles[pdf_path.name] = fingerprint_pdf(pdf_path)
+        return profile
+
     def process_pdf_batch_optimized(self, pdf_files: List[Path], batch_strategy: Dict) -> List[Dict]:
         """
         TRAITEMENT PAR LOTS OPTIMISÉ selon la stratégie déterminée.
@@ -2692,21 +5770,153 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         logger.info(f"📊 {len(all_properties)} propriétés extraites au total")
         return all_properties
 
+    def process_pdf_pipeline(self, pdf_files: List[Path], settings: Optional[PipelineSettings] = None) -> List[Dict]:
+        """
+        PIPELINE PAR ÉTAPES : rendu → tableaux → vision → fusion → écriture.
+        
+        Chaque étape a ses propres workers (PipelineSettings), reliés par des files asyncio
+        bornées : le rendu et les tableaux des PDF suivants avancent pendant que les appels
+        vision des PDF en cours attendent l'API. L'admission (empreinte, cache, contexte),
+        le rendu, les tableaux et la fusion tournent dans un pool de threads CPU, la vision
+        dans un pool d'E/S à sa concurrence ; l'écriture (journal, destinations
+        incrémentales) reste sur la boucle, dans le thread appelant.
+        Un PDF en échec ou hors délai sort du pipeline sans retenir les autres.
+        
+        Returns:
+            Lignes de tous les PDF, dans l'ordre de pdf_files
+        """
+        return asyncio.run(self._run_pipeline(pdf_files, settings or PipelineSettings()))
+
+    async def _run_pipeline(self, pdf_files: List[Path], settings: PipelineSettings) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        # +1 : admission des PDF (empreinte, cache, contexte) sans prendre le thread d'une étape
+        cpu_pool = concurrent.futures.ThreadPoolExecutor(max_workers=settings.render + settings.tables + settings.merge + 1,
+                                                         thread_name_prefix='pipeline-cpu')
+        io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=settings.vision, thread_name_prefix='pipeline-vision')
+        stages = [
+            ('render', settings.render, cpu_pool, lambda item: self.render_document_pages(item.context)),
+            ('tables', settings.tables, cpu_pool, self._pipeline_tables),
+            ('vision', settings.vision, io_pool, self._pipeline_vision),
+            ('merge', settings.merge, cpu_pool, self._pipeline_merge),
+        ]
+        queues = [asyncio.Queue(maxsize=settings.queue_size) for _ in range(len(stages) + 1)]
+        busy = dict.fromkeys(PIPELINE_STAGES, 0.0)
+        in_flight: Dict[Path, PipelineItem] = {}
+        results: Dict[Path, List[Dict]] = {}
+        logger.info(f"🏭 Pipeline: {len(pdf_files)} PDF, workers {dict(zip(PipelineSettings._fields, settings))}")
+        start = time.perf_counter()
+
+        async def admit():
+            for pdf_path in pdf_files:
+                item = in_flight[pdf_path] = PipelineItem(pdf_path)
+                if self.journal is not None:
+                    self.journal.mark_running(pdf_path)
+                # Lecture du PDF et réservation mémoire hors de la boucle : le journal et l'écriture continuent
+                await loop.run_in_executor(cpu_pool, self._pipeline_admit, item)
+                await queues[0].put(item)
+            for _ in range(stages[0][1]):
+                await queues[0].put(None)
+
+        async def stage_worker(name, pool, function, inbox, outbox):
+            while (item := await inbox.get()) is not None:
+                if item.error is None and not item.cached:
+                    started = time.perf_counter()
+                    await loop.run_in_executor(pool, self._run_pipeline_stage, name, item, function)
+                    busy[name] += time.perf_counter() - started
+                await outbox.put(item)
+
+        async def stage(index):
+            name, workers, pool, function = stages[index]
+            await asyncio.gather(*(stage_worker(name, pool, function, queues[index], queues[index + 1])
+                                   for _ in range(workers)))
+            downstream = stages[index + 1][1] if index + 1 < len(stages) else 1
+            for _ in range(downstream):
+                await queues[index + 1].put(None)
+
+        async def sink():
+            # Sur la boucle : journal et destinations restent dans le thread qui les a ouverts
+            while (item := await queues[-1].get()) is not None:
+                started = time.perf_counter()
+                item.stack.close()
+                if (not item.cached and item.cache_key
+                        and self.cacheable_result(item.pdf_path, item.properties, item.error, item.api_failures)):
+                    self.result_cache.put(item.pdf_path, item.properties, item.cache_key)
+                self.record_pdf_result(item.pdf_path, item.properties, item.error)
+                results[item.pdf_path] = item.properties
+                del in_flight[item.pdf_path]
+                busy['sink'] += time.perf_counter() - started
+                status = f"❌ {item.error}" if item.error else f"{len(item.properties)} ligne(s)"
+                if item.cached:
+                    status += " (cache)"
+                logger.info(f"🏭 {item.pdf_path.name}: {status} ({time.perf_counter() - item.started:.1f}s)")
+
+        try:
+            await asyncio.gather(admit(), *(stage(index) for index in range(len(stages))), sink())
+        finally:
+            # Pools arrêtés d'abord : aucun contexte ouvert par un thread après sa fermeture
+            cpu_pool.shutdown(wait=True, cancel_futures=True)
+            io_pool.shutdown(wait=True, cancel_futures=True)
+            for item in in_flight.values():
+                item.stack.close()
+
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        workers = dict(zip(PIPELINE_STAGES, (settings.render, settings.tables, settings.vision, settings.merge, 1)))
+        occupation = ', '.join(f"{name} {busy[name] / (elapsed * workers[name]) * 100:.0f}%" for name in PIPELINE_STAGES)
+        logger.info(f"🏭 Pipeline terminé en {elapsed:.1f}s - occupation des workers: {occupation}")
+        return [prop for pdf_path in pdf_files for prop in results.get(pdf_path, [])]
+
+    def _pipeline_admit(self, item: PipelineItem) -> None:
+        """Entrée d'un PDF dans le pipeline (thread du pool CPU) : cache de résultats, sinon contexte du document."""
+        try:
+            if self.result_cache is not None:
+                item.cache_key = pdf_sha256(item.pdf_path)
+            cached = self.cached_results(item.pdf_path, item.cache_key) if item.cache_key else None
+            if cached is not None:
+                # Contenu déjà traité : directement à l'écriture, sans rendu ni appel API
+                item.properties, item.cached = cached, True
+            else:
+                item.context = item.stack.enter_context(self.open_document_context(item.pdf_path))
+        except Exception as e:
+            item.error = str(e)
+
+    def _run_pipeline_stage(self, name: str, item: PipelineItem, function) -> None:
+        """Une étape d'un PDF (thread d'un pool) sous l'échéance du PDF, démarrée à sa première étape."""
+        if item.deadline is None:
+            item.deadline = Deadline.start('pdf', f"PDF {item.pdf_path.name}", self.timeout_limits.pdf)
+        with self.use_deadline(item.deadline), self.track_api_failures(item.api_failures):
+            try:
+                function(item)
+            except ExtractionTimeout as e:
+                logger.error(f"⏱️ {item.pdf_path.name} abandonné (étape {name}): {e}")
+                item.error = str(e)
+                self.timeouts.record('pdf', item.pdf_path.name, item.error)
+            except Exception as e:
+                logger.error(f"❌ Erreur pipeline {item.pdf_path.name} (étape {name}): {e}")
+                item.error = str(e)
+
+    def _pipeline_tables(self, item: PipelineItem) -> None:
+        item.structured_data = self.extract_document_tables(item.pdf_path, item.context)
+
+    def _pipeline_vision(self, item: PipelineItem) -> None:
+        item.owners = self.extract_owners_make_style(item.pdf_path, item.context)
+        logger.info(f"Proprietaires extraits ({item.pdf_path.name}): {len(item.owners)}")
+
+    def _pipeline_merge(self, item: PipelineItem) -> None:
+        item.properties = self.merge_document_results(item.pdf_path, item.context, item.structured_data, item.owners)
+
     def process_homogeneous_batch(self, pdf_files: List[Path]) -> List[Dict]:
         """
-        Traitement optimisé pour un lot de PDFs homogènes avec isolation ultra-sécurisée.
+        Traitement optimisé pour un lot de PDFs homogènes, chaque PDF dans son propre contexte.
         """
         logger.info("🔄 Traitement homogène optimisé STYLE MAKE - MODE ULTRA-SÉCURISÉ")
         all_properties = []
         
-        # Traiter avec approche Make exacte + isolation batch
+        # Traiter avec approche Make exacte, un contexte isolé par PDF
         for i, pdf_file in enumerate(pdf_files, 1):
             logger.info(f"📄 Traitement Make [{i}/{len(pdf_files)}]: {pdf_file.name}")
             
-            # 🛡️ NETTOYAGE BATCH ULTRA-SÉCURISÉ avant chaque PDF
-            self.batch_ultra_secure_cleanup(i, len(pdf_files), pdf_file)
-            
-            properties = self.process_like_make(pdf_file)
+            # 🔒 Isolation assurée par le contexte propre à chaque PDF (process_like_make)
+            properties = self.process_pdf_with_checkpoint(pdf_file)
             all_properties.extend(properties)
             
             # Log intermédiaire pour suivi
@@ -2717,7 +5927,7 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
 
     def process_high_volume_batch(self, pdf_files: List[Path]) -> List[Dict]:
         """
-        Traitement optimisé pour gros volume avec style Make et isolation ultra-sécurisée.
+        Traitement optimisé pour gros volume avec style Make, chaque PDF dans son propre contexte.
         """
         logger.info("🚀 Traitement haut volume STYLE MAKE - MODE ULTRA-SÉCURISÉ")
         all_properties = []
@@ -2725,10 +5935,8 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         for i, pdf_file in enumerate(pdf_files, 1):
             logger.info(f"📄 Volume Make [{i}/{len(pdf_files)}]: {pdf_file.name}")
             
-            # 🛡️ NETTOYAGE BATCH ULTRA-SÉCURISÉ avant chaque PDF
-            self.batch_ultra_secure_cleanup(i, len(pdf_files), pdf_file)
-            
-            properties = self.process_like_make(pdf_file)
+            # 🔒 Isolation assurée par le contexte propre à chaque PDF (process_like_make)
+            properties = self.process_pdf_with_checkpoint(pdf_file)
             all_properties.extend(properties)
             
             # Logs de progression
@@ -2739,7 +5947,7 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
 
     def process_mixed_adaptive_batch(self, pdf_files: List[Path]) -> List[Dict]:
         """
-        Traitement adaptatif mixte avec style Make et isolation ultra-sécurisée.
+        Traitement adaptatif mixte avec style Make, chaque PDF dans son propre contexte.
         """
         logger.info("🎯 Traitement adaptatif mixte STYLE MAKE - MODE ULTRA-SÉCURISÉ")
         all_properties = []
@@ -2747,10 +5955,8 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         for i, pdf_file in enumerate(pdf_files, 1):
             logger.info(f"📄 Adaptatif Make [{i}/{len(pdf_files)}]: {pdf_file.name}")
             
-            # 🛡️ NETTOYAGE BATCH ULTRA-SÉCURISÉ avant chaque PDF
-            self.batch_ultra_secure_cleanup(i, len(pdf_files), pdf_file)
-            
-            properties = self.process_like_make(pdf_file)
+            # 🔒 Isolation assurée par le contexte propre à chaque PDF (process_like_make)
+            properties = self.process_pdf_with_checkpoint(pdf_file)
             all_properties.extend(properties)
             
             # Suivi adaptatif
@@ -2819,30 +6025,13 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
     def deduplicate_batch_results(self, properties: List[Dict]) -> List[Dict]:
         """
         ✅ DÉDUPLICATION STRICTE CORRIGÉE - Élimine les vrais doublons même entre fichiers.
-        """
-        seen_keys = set()
-        deduplicated = []
         
-        for prop in properties:
-            # ✅ CLÉ UNIQUE STRICTE - SANS fichier source pour éliminer les vrais doublons
-            key_parts = [
-                prop.get('nom', ''),
-                prop.get('prenom', ''),
-                prop.get('section', ''),
-                prop.get('numero', ''),
-                prop.get('department', ''),
-                prop.get('commune', ''),
-                prop.get('numero_majic', ''),
-                prop.get('droit_reel', '')  # Inclure le droit réel pour distinguer usufruitier/nu-prop
-            ]
-            unique_key = '|'.join(str(p).strip().upper() for p in key_parts)
-            
-            # ✅ ÉVITER les entrées complètement vides ET les vrais doublons
-            if unique_key not in seen_keys and unique_key != '|||||||':
-                seen_keys.add(unique_key)
-                deduplicated.append(prop)
-            else:
-                logger.debug(f"🗑️ Doublon éliminé: {prop.get('nom', '')}-{prop.get('section', '')}-{prop.get('numero', '')}")
+        Les lignes conservées portent l'identifiant canonique de leur propriétaire
+        (resolve_owner_entities), exporté dans la colonne 'ID Propriétaire' de chaque
+        destination ; il n'entre pas dans la clé.
+        """
+        properties = self.resolve_owner_entities(properties)
+        deduplicated = list(self.iter_deduplicated_batch(properties))
         
         removed = len(properties) - len(deduplicated)
         if removed > 0:
@@ -2850,6 +6039,44 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         
         return deduplicated
 
+    def resolve_owner_entities(self, properties: List[Dict]) -> List[Dict]:
+        """
+        👥 Copie de chaque ligne annotée de l'identifiant canonique de son propriétaire
+        (proprietaire_id), en regroupant les variantes OCR/LLM ("DUPONT JEAN-PIERRE" /
+        "DUPOND JEAN PIERRE"). Les lignes reçues ne sont pas modifiées.
+        """
+        resolver = OwnerEntityResolver()
+        owner_ids = resolver.resolve(properties)
+        annotated = []
+        for prop, owner_id in zip(properties, owner_ids):
+            prop = prop.copy()
+            prop['proprietaire_id'] = owner_id
+            annotated.append(prop)
+        
+        stats = resolver.stats
+        logger.info(f"👥 Résolution propriétaires: {stats['signatures']} variante(s) → {stats['entites']} entité(s) "
+                    f"({stats['blocs']} blocs, {stats['comparaisons']} comparaisons)")
+        return annotated
+
+    def iter_deduplicated_batch(self, properties, memory_limit: Optional[int] = None, use_bloom: bool = True):
+        """
+        Version en flux de deduplicate_batch_results : accepte un itérateur, garde les
+        premières occurrences dans l'ordre, mémoire bornée (StreamingDeduplicator).
+        """
+        with StreamingDeduplicator(memory_limit, use_bloom=use_bloom) as seen_keys:
+            for prop in properties:
+                # ✅ CLÉ UNIQUE STRICTE - SANS fichier source pour éliminer les vrais doublons
+                unique_key = batch_dedup_key(prop)
+                
+                # ✅ ÉVITER les entrées complètement vides ET les vrais doublons
+                if unique_key != '|||||||' and seen_keys.add(unique_key):
+                    yield prop
+                else:
+                    logger.debug(f"🗑️ Doublon éliminé: {prop.get('nom', '')}-{prop.get('section', '')}-{prop.get('numero', '')}")
+            
+            if seen_keys.stats['deversees']:
+                logger.info(f"💾 Déduplication sur disque: {seen_keys.stats}")
+
     def export_to_csv_with_stats(self, all_properties: List[Dict]) -> None:
         """
         🧹 EXPORT CSV ET EXCEL AVEC VALIDATION FINALE ET STATISTIQUES DÉTAILLÉES.
@@ -2869,6 +6096,16 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         # Export CSV (avec point-virgule) ET Excel
         csv_path = self.export_to_csv(validated_properties)
         excel_path = self.export_to_excel(validated_properties, "output.xlsx")
+        try:
+            parquet_path = self.export_to_parquet(validated_properties)
+        except Exception as e:
+            # Export complémentaire : son échec n'empêche pas les exports SQLite et delta
+            logger.error(f"❌ Export Parquet impossible: {e}")
+            parquet_path = None
+        sqlite_path = self.export_to_sqlite(validated_properties)
+        
+        # Delta depuis la dernière exécution (index persistant)
+        delta_path = self.export_delta_with_index(validated_properties)
         
         # Générer des statistiques de qualité
         self.generate_quality_report(validated_properties)
@@ -2876,8 +6113,31 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         logger.info(f"✅ EXPORTS TERMINÉS AVEC VALIDATION:")
         logger.info(f"📄 CSV: {csv_path}")
         logger.info(f"📊 Excel: {excel_path}")
+        logger.info(f"📦 Parquet: {parquet_path}")
+        logger.info(f"🗄️ SQLite: {sqlite_path}")
+        logger.info(f"🔁 Delta: {delta_path}")
         logger.info(f"🛡️ Données validées: {len(validated_properties)} propriétés finales")
 
+    def export_delta_with_index(self, properties: List[Dict], output_filename: str = "output_delta.csv",
+                                index_path: Optional[str] = None) -> Path:
+        """
+        Classe les lignes avec l'index persistant (PARCEL_INDEX_FILE, par défaut
+        output/parcel_index.sqlite) et exporte uniquement les nouvelles et modifiées,
+        avec une colonne 'Statut' en tête. properties est l'export complet : les lignes
+        indexées qui n'y figurent plus sont retirées de l'index.
+        """
+        index_path = index_path or os.getenv('PARCEL_INDEX_FILE', '') or self.output_dir / DEFAULT_PARCEL_INDEX_FILENAME
+        with ParcelIndex(index_path) as index:
+            tagged = index.tag(properties, full_run=True)
+
+        delta = [(status, prop) for status, prop in tagged if status != STATUS_UNCHANGED]
+        rows = ((status,) + row for (status, _), row in zip(delta, iter_export_rows(prop for _, prop in delta)))
+
+        output_path = self.output_dir / output_filename
+        write_export_csv(rows, output_path, headers=['Statut'] + EXPORT_HEADERS)
+        logger.info(f"🔁 Delta exporté vers {output_path}: {len(delta)} ligne(s) nouvelle(s) ou modifiée(s) sur {len(tagged)}")
+        return output_path
+
     def generate_quality_report(self, properties: List[Dict]) -> None:
         """
         Génère un rapport de qualité détaillé pour le lot traité.
@@ -2913,6 +6173,24 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         overall_status = "🟢" if avg_completion >= 90 else "🟡" if avg_completion >= 70 else "🔴"
         logger.info(f"\n{overall_status} TAUX GLOBAL DE COMPLÉTION: {avg_completion:.1f}%")
         
+        # Chemins utilisés pour l'analyse des en-têtes (local vs ChatGPT)
+        self.log_header_parse_stats()
+        
+        # PDF abandonnés à l'expiration de leur délai : aucune de leurs lignes n'est exportée
+        timeouts = self.timeouts.snapshot()
+        if timeouts['pdfs']:
+            logger.warning(f"\n⏱️ PDF HORS DÉLAI: {len(timeouts['pdfs'])} (à retraiter)")
+            for name, error in sorted(timeouts['pdfs'].items()):
+                logger.warning(f"  ⏱️ {name}: {error}")
+        logger.info(f"⏱️ Délais dépassés: {self.timeouts.describe()}")
+        
+        # PDF dont les lignes propriétaires × parcelles dépassaient MAX_DOCUMENT_ROWS : export partiel
+        oversized = dict(self.oversized_pdfs)
+        if oversized:
+            logger.warning(f"\n✂️ PDF TRONQUÉS À {MAX_DOCUMENT_ROWS} LIGNES: {len(oversized)} (à retraiter)")
+            for name, rows in sorted(oversized.items()):
+                logger.warning(f"  ✂️ {name}: {rows} lignes attendues")
+        
         # Message de sécurité
         logger.info("\n🎯 GARANTIES DE FIABILITÉ:")
         logger.info("  ✅ Toutes les données proviennent directement des PDFs")
@@ -2920,7 +6198,7 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         logger.info("  ✅ Colonnes vides = vraiment absentes du PDF original")
         logger.info("  ✅ Aucun risque de mélange entre propriétaires/adresses")
 
-    def process_like_make(self, pdf_path: Path) -> List[Dict]:
+    def process_like_make(self, pdf_path: Path, context: Optional[DocumentContext] = None) -> List[Dict]:
         """
         RÉPLIQUE EXACTE DU WORKFLOW MAKE - CORRIGÉE ANTI-DUPLICATION
         
@@ -2930,264 +6208,199 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         3. DÉTECTION TYPE PDF et traitement adapté
         4. Génération ID avec OpenAI (comme Make)
         5. Fusion 1:1 intelligente
+        
+        Tout l'état du PDF vit dans son DocumentContext (ouvert ici si non fourni).
+        """
+        if context is None:
+            with self.open_document_context(pdf_path) as context:
+                return self.process_like_make(pdf_path, context)
+        
+        logger.info(f"🎯 TRAITEMENT STYLE MAKE pour {pdf_path.name} (🔒 {context.isolation_id})")
+        self.last_pdf_error = None
+        self.oversized_pdfs.pop(pdf_path.name, None)
+        
+        try:
+            with self.deadline_scope('pdf', f"PDF {pdf_path.name}", self.timeout_limits.pdf):
+                # ÉTAPE 1: Extraction tableaux (comme Python Anywhere)
+                structured_data = self.extract_document_tables(pdf_path, context)
+            
+                # ÉTAPE 2: Extraction propriétaires (prompt Make exact)
+                owners = self.extract_owners_make_style(pdf_path, context)
+                logger.info(f"Proprietaires extraits: {len(owners)}")
+            
+                # ÉTAPES 2.1 à 7: validation, filtrage, fusion propriétaires × parcelles, post-traitement
+                return self.merge_document_results(pdf_path, context, structured_data, owners)
+            
+        except ExtractionTimeout as e:
+            # Requêtes en vol abandonnées à l'échéance : PDF marqué hors délai, le lot continue
+            logger.error(f"⏱️ {pdf_path.name} abandonné: {e}")
+            self.last_pdf_error = str(e)
+            self.timeouts.record('pdf', pdf_path.name, str(e))
+            return []
+        except Exception as e:
+            logger.error(f"❌ Erreur traitement Make {pdf_path.name}: {e}")
+            self.last_pdf_error = str(e)
+            return []
+
+    def extract_document_tables(self, pdf_path: Path, context: DocumentContext) -> Dict:
+        """Tableaux pdfplumber du PDF (bâtis / non bâtis) - inutile sur un scan sans couche texte."""
+        if context.profile['engine'] == ENGINE_VISION:
+            logger.info(f"🖼️ Scan sans couche texte: extraction des tableaux pdfplumber ignorée")
+            structured_data = {"prop_batie": [], "non_batie": []}
+        else:
+            structured_data = self.extract_tables_with_pdfplumber(pdf_path)
+        logger.info(f"📋 Tableaux extraits: {len(structured_data.get('prop_batie', []))} bâtis, {len(structured_data.get('non_batie', []))} non-bâtis")
+        return structured_data
+
+    def merge_document_results(self, pdf_path: Path, context: DocumentContext, structured_data: Dict,
+                               owners: List[Dict]) -> List[Dict]:
         """
-        logger.info(f"🎯 TRAITEMENT STYLE MAKE pour {pdf_path.name}")
-        
-        try:
-            # 🧹 ÉTAPE 0: NETTOYAGE ANTI-CONTAMINATION (ultra-sécurisé si pas déjà fait en batch)
-            if not hasattr(self, '_batch_processing_state') or self._batch_processing_state != 'isolated':
-                # Mode single PDF - utiliser nettoyage ultra-sécurisé
-                self.clean_extraction_context(pdf_path)
+        Fin du workflow Make d'un PDF, une fois ses tableaux et ses propriétaires extraits :
+        validation croisée, filtrage des vrais propriétaires, fusion propriétaires × parcelles
+        selon le type de PDF et post-traitement des lignes.
+        """
+        # 🔍 ÉTAPE 2.1: VALIDATION CROISÉE ANTI-CONTAMINATION
+        if not self.validate_extraction_consistency(owners, structured_data, pdf_path):
+            logger.warning(f"⚠️ CONTAMINATION DÉTECTÉE - Application du nettoyage")
+            owners = self.clean_contaminated_data(owners, pdf_path)
+            logger.info(f"🧽 Propriétaires après nettoyage: {len(owners)}")
+        
+        # 🔍 VALIDATION EXTRACTION COMPLÈTE: Vérifier si extraction semble incomplète
+        if len(owners) > 0:
+            # Estimer le nombre attendu de lignes basé sur les tableaux structurés
+            expected_lines = len(structured_data.get('prop_batie', [])) + len(structured_data.get('non_batie', []))
+        
+            # Si différence significative, alerter et possiblement re-extraire
+            if expected_lines > 0 and len(owners) < (expected_lines * 0.5):  # Si moins de 50% du attendu
+                logger.warning(f"⚠️ EXTRACTION POTENTIELLEMENT INCOMPLÈTE:")
+                logger.warning(f"   - Propriétaires extraits: {len(owners)}")
+                logger.warning(f"   - Lignes tableaux détectées: {expected_lines}")
+                logger.warning(f"   - Ratio: {len(owners)}/{expected_lines} = {len(owners)/expected_lines*100:.1f}%")
+        
+                # Stratégie de secours : extraction d'urgence
+                if len(owners) <= 2 and expected_lines > 5:
+                    logger.warning(f"🆘 ACTIVATION EXTRACTION DE SECOURS pour données manquantes")
+                    try:
+                        # Re-extraction avec prompt ultra-directif sur données manquantes
+                        images = self.render_document_pages(context)
+                        if images:
+                            base64_image = base64.b64encode(images[0]).decode('utf-8')
+                            backup_owners = self.extract_line_by_line_debug(base64_image, 1)
+                            if len(backup_owners) > len(owners):
+                                logger.info(f"✅ SECOURS RÉUSSI: {len(backup_owners)} vs {len(owners)} propriétaires")
+                                owners = backup_owners
+                    except Exception as e:
+                        logger.error(f"❌ Erreur extraction de secours: {e}")
+        
+            logger.info(f"👤 PROPRIÉTAIRES FINAUX APRÈS VALIDATION: {len(owners)}")
+        
+        # ✅ CORRECTION CRITIQUE: Filtrage des VRAIS propriétaires uniquement
+        filtered_owners = []
+        for owner in owners:
+            nom = owner.get('nom', '').strip()
+            prenom = owner.get('prenom', '').strip()
+            if self.is_likely_real_owner(nom, prenom):
+                filtered_owners.append(owner)
+                logger.info(f"✅ Vrai propriétaire: {nom} {prenom}")
             else:
-                # Mode batch - nettoyage déjà fait par batch_ultra_secure_cleanup
-                logger.debug("🔒 Nettoyage batch déjà effectué - isolation préservée")
-            
-            # ÉTAPE 1: Extraction tableaux (comme Python Anywhere)
-            structured_data = self.extract_tables_with_pdfplumber(pdf_path)
-            logger.info(f"📋 Tableaux extraits: {len(structured_data.get('prop_batie', []))} bâtis, {len(structured_data.get('non_batie', []))} non-bâtis")
-            
-            # ÉTAPE 2: Extraction propriétaires (prompt Make exact)
-            owners = self.extract_owners_make_style(pdf_path)
-            logger.info(f"Proprietaires extraits: {len(owners)}")
-            
-            # 🔍 ÉTAPE 2.1: VALIDATION CROISÉE ANTI-CONTAMINATION
-            if not self.validate_extraction_consistency(owners, structured_data, pdf_path):
-                logger.warning(f"⚠️ CONTAMINATION DÉTECTÉE - Application du nettoyage")
-                owners = self.clean_contaminated_data(owners, pdf_path)
-                logger.info(f"🧽 Propriétaires après nettoyage: {len(owners)}")
-            
-            # 🔍 VALIDATION EXTRACTION COMPLÈTE: Vérifier si extraction semble incomplète
-            if len(owners) > 0:
-                # Estimer le nombre attendu de lignes basé sur les tableaux structurés
-                expected_lines = len(structured_data.get('prop_batie', [])) + len(structured_data.get('non_batie', []))
-                
-                # Si différence significative, alerter et possiblement re-extraire
-                if expected_lines > 0 and len(owners) < (expected_lines * 0.5):  # Si moins de 50% du attendu
-                    logger.warning(f"⚠️ EXTRACTION POTENTIELLEMENT INCOMPLÈTE:")
-                    logger.warning(f"   - Propriétaires extraits: {len(owners)}")
-                    logger.warning(f"   - Lignes tableaux détectées: {expected_lines}")
-                    logger.warning(f"   - Ratio: {len(owners)}/{expected_lines} = {len(owners)/expected_lines*100:.1f}%")
-                    
-                    # Stratégie de secours : extraction d'urgence
-                    if len(owners) <= 2 and expected_lines > 5:
-                        logger.warning(f"🆘 ACTIVATION EXTRACTION DE SECOURS pour données manquantes")
-                        try:
-                            # Re-extraction avec prompt ultra-directif sur données manquantes
-                            images = self.pdf_to_images(pdf_path)
-                            if images:
-                                base64_image = base64.b64encode(images[0]).decode('utf-8')
-                                backup_owners = self.extract_line_by_line_debug(base64_image, 1)
-                                if len(backup_owners) > len(owners):
-                                    logger.info(f"✅ SECOURS RÉUSSI: {len(backup_owners)} vs {len(owners)} propriétaires")
-                                    owners = backup_owners
-                        except Exception as e:
-                            logger.error(f"❌ Erreur extraction de secours: {e}")
-                
-                logger.info(f"👤 PROPRIÉTAIRES FINAUX APRÈS VALIDATION: {len(owners)}")
-            
-            # ✅ CORRECTION CRITIQUE: Filtrage des VRAIS propriétaires uniquement
+                logger.info(f"❌ Rejeté (lieu-dit/adresse): {nom} {prenom}")
+        
+        owners = filtered_owners
+        logger.info(f"👤 Propriétaires valides après filtrage: {len(owners)}")
+        
+        # 🚨 DÉTECTION EXPLOSION COMBINATOIRE ULTRA-STRICTE
+        if len(owners) > 50:  # Seuil très strict
+            logger.error(f"🚨 EXPLOSION DÉTECTÉE: {len(owners)} propriétaires extraits (limite: 50)")
+            logger.error(f"💡 CAUSE PROBABLE: Contamination ou explosion combinatoire")
+        
+            # Filtrer UNIQUEMENT les propriétaires avec données géographiques complètes
             filtered_owners = []
             for owner in owners:
+                dept = owner.get('department', '').strip()
+                comm = owner.get('commune', '').strip()
                 nom = owner.get('nom', '').strip()
-                prenom = owner.get('prenom', '').strip()
-                if self.is_likely_real_owner(nom, prenom):
+        
+                # Ne garder QUE si : département ET commune ET nom valide
+                if dept and comm and nom and self.is_likely_real_owner(nom, owner.get('prenom', '')):
                     filtered_owners.append(owner)
-                    logger.info(f"✅ Vrai propriétaire: {nom} {prenom}")
-                else:
-                    logger.info(f"❌ Rejeté (lieu-dit/adresse): {nom} {prenom}")
-            
-            owners = filtered_owners
-            logger.info(f"👤 Propriétaires valides après filtrage: {len(owners)}")
-            
-            # 🚨 DÉTECTION EXPLOSION COMBINATOIRE ULTRA-STRICTE
-            if len(owners) > 50:  # Seuil très strict
-                logger.error(f"🚨 EXPLOSION DÉTECTÉE: {len(owners)} propriétaires extraits (limite: 50)")
-                logger.error(f"💡 CAUSE PROBABLE: Contamination ou explosion combinatoire")
-                
-                # Filtrer UNIQUEMENT les propriétaires avec données géographiques complètes
-                filtered_owners = []
-                for owner in owners:
-                    dept = owner.get('department', '').strip()
-                    comm = owner.get('commune', '').strip()
-                    nom = owner.get('nom', '').strip()
-                    
-                    # Ne garder QUE si : département ET commune ET nom valide
-                    if dept and comm and nom and self.is_likely_real_owner(nom, owner.get('prenom', '')):
-                        filtered_owners.append(owner)
-                
-                logger.warning(f"🧽 FILTRAGE STRICT: {len(filtered_owners)} propriétaires conservés sur {len(owners)}")
-                owners = filtered_owners[:20]  # Limite de sécurité absolue
-                logger.info(f"✅ SÉCURITÉ: Limitation à {len(owners)} propriétaires maximum")
-            
-            if not owners and not structured_data.get('prop_batie') and not structured_data.get('non_batie'):
-                logger.warning(f"Aucune donnée extraite pour {pdf_path.name}")
-                return []
-            
-            # ÉTAPE 3: 🎯 DÉTECTION TYPE PDF ET TRAITEMENT ADAPTÉ
-            pdf_type = self.detect_pdf_ownership_type(owners, structured_data)
-            logger.info(f"🔍 Type PDF détecté: {pdf_type}")
-            
-            final_results = []
-            
-            # Traiter les propriétés non bâties
-            non_batie_props = structured_data.get('non_batie', [])
-            if non_batie_props and owners:
-                logger.info("🏞️ Traitement propriétés non bâties style Make")
-                
-                if pdf_type == "single_owner":
-                    # TYPE 2: Un seul propriétaire pour toutes les propriétés
-                    main_owner = self.select_main_owner(owners)
-                    logger.info(f"👤 Propriétaire unique sélectionné: {main_owner.get('nom', '')} {main_owner.get('prenom', '')}")
-                    
-                    for prop in non_batie_props:
-                        if prop.get('Adresse'):  # Filtre comme Make
-                            # Génération ID avec OpenAI (comme Make)
-                            unique_id = self.generate_id_with_openai_like_make(main_owner, prop)
-                            
-                            # Fusion 1:1 simple (comme Make)
-                            combined = self.merge_like_make(main_owner, prop, unique_id, 'non_batie', pdf_path.name)
-                            final_results.append(combined)
-                
-                else:
-                    # TYPE 1: Plusieurs propriétaires (logique originale)
-                    logger.info("👥 Multiple propriétaires - association complexe")
-                    
-                    # 🚨 LIMITE ANTI-EXPLOSION : Éviter le produit cartésien massif
-                    potential_combinations = len(owners) * len([p for p in non_batie_props if p.get('Adresse')])
-                    if potential_combinations > 100:
-                        logger.warning(f"🚨 EXPLOSION DÉTECTÉE: {potential_combinations} combinaisons potentielles ({len(owners)} propriétaires × {len([p for p in non_batie_props if p.get('Adresse')])} parcelles)")
-                        logger.warning(f"🛡️ LIMITE ACTIVÉE: Traitement en mode single_owner pour éviter les données artificielles")
-                        
-                        # Basculer en mode single_owner avec le premier propriétaire
-                        main_owner = self.select_main_owner(owners)
-                        for prop in non_batie_props:
-                            if prop.get('Adresse'):
-                                unique_id = self.generate_id_with_openai_like_make(main_owner, prop)
-                                combined = self.merge_like_make(main_owner, prop, unique_id, 'non_batie', pdf_path.name)
-                                final_results.append(combined)
-                    else:
-                        for owner in owners:
-                            for prop in non_batie_props:
-                                if prop.get('Adresse'):  # Filtre comme Make
-                                    # Génération ID avec OpenAI (comme Make)
-                                    unique_id = self.generate_id_with_openai_like_make(owner, prop)
-                                    
-                                    # Fusion 1:1 simple (comme Make)
-                                    combined = self.merge_like_make(owner, prop, unique_id, 'non_batie', pdf_path.name)
-                                    final_results.append(combined)
-            
-            # Traiter les propriétés bâties
-            prop_batie = structured_data.get('prop_batie', [])
-            if prop_batie and owners:
-                logger.info("🏠 Traitement propriétés bâties style Make")
-                
-                if pdf_type == "single_owner":
-                    # TYPE 2: Un seul propriétaire pour toutes les propriétés
-                    main_owner = self.select_main_owner(owners)
-                    
-                    for prop in prop_batie:
-                        if prop.get('Adresse'):  # Filtre comme Make
-                            # Génération ID avec OpenAI (comme Make)
-                            unique_id = self.generate_id_with_openai_like_make(main_owner, prop)
-                            
-                            # Fusion 1:1 simple (comme Make)
-                            combined = self.merge_like_make(main_owner, prop, unique_id, 'batie', pdf_path.name)
-                            final_results.append(combined)
-                            
-                else:
-                    # TYPE 1: Plusieurs propriétaires (logique originale)
-                    
-                    # 🚨 LIMITE ANTI-EXPLOSION : Éviter le produit cartésien massif
-                    potential_combinations = len(owners) * len([p for p in prop_batie if p.get('Adresse')])
-                    if potential_combinations > 100:
-                        logger.warning(f"🚨 EXPLOSION DÉTECTÉE (bâties): {potential_combinations} combinaisons potentielles ({len(owners)} propriétaires × {len([p for p in prop_batie if p.get('Adresse')])} parcelles)")
-                        logger.warning(f"🛡️ LIMITE ACTIVÉE: Traitement en mode single_owner pour éviter les données artificielles")
-                        
-                        # Basculer en mode single_owner avec le premier propriétaire
-                        main_owner = self.select_main_owner(owners)
-                        for prop in prop_batie:
-                            if prop.get('Adresse'):
-                                unique_id = self.generate_id_with_openai_like_make(main_owner, prop)
-                                combined = self.merge_like_make(main_owner, prop, unique_id, 'batie', pdf_path.name)
-                                final_results.append(combined)
-                    else:
-                        for owner in owners:
-                            for prop in prop_batie:
-                                if prop.get('Adresse'):  # Filtre comme Make
-                                    # Génération ID avec OpenAI (comme Make)
-                                    unique_id = self.generate_id_with_openai_like_make(owner, prop)
-                                    
-                                    # Fusion 1:1 simple (comme Make)
-                                    combined = self.merge_like_make(owner, prop, unique_id, 'batie', pdf_path.name)
-                                    final_results.append(combined)
-            
-            # Si pas de structured data, juste les propriétaires
-            if not non_batie_props and not prop_batie and owners:
-                logger.info("👤 Seulement propriétaires (pas de tableaux)")
-                if pdf_type == "single_owner":
-                    main_owner = self.select_main_owner(owners)
-                    combined = self.merge_like_make(main_owner, {}, "", 'owners_only', pdf_path.name)
-                    final_results.append(combined)
-                else:
-                    for owner in owners:
-                        combined = self.merge_like_make(owner, {}, "", 'owners_only', pdf_path.name)
-                        final_results.append(combined)
-            
-            # ÉTAPE 4: Séparation automatique des préfixes collés
-            final_results = self.separate_stuck_prefixes(final_results)
-            
-            # ÉTAPE 5: Propagation des valeurs manquantes (prefixe, contenance détaillée)
-            final_results = self.propagate_values_downward(final_results, ['prefixe', 'contenance_ha', 'contenance_a', 'contenance_ca'])
-            
-            # ÉTAPE 6: Suppression des lignes sans numéro de parcelle
-            final_results = self.remove_empty_parcel_numbers(final_results, pdf_path.name)
-            
-            # ÉTAPE 6.5: PROPAGATION GÉOGRAPHIQUE FORCÉE (ANTI-CONTAMINATION)
-            logger.info("🎯 ÉTAPE 6.5: Propagation géographique forcée (anti-contamination)")
-            
-            if final_results:
-                # Extraire géographie depuis en-tête PDF si disponible
-                location_info = self.extract_location_info(final_results, "", pdf_path.name)
-                if location_info and location_info[0] if isinstance(location_info, list) else location_info:
-                    header_data = location_info[0] if isinstance(location_info, list) else location_info
-                    header_dept = str(header_data.get('department', '')).strip()
-                    header_commune = str(header_data.get('commune', '')).strip()
-                    
-                    # Vérifier si la géographie de l'en-tête est valide
-                    if (header_dept.isdigit() and len(header_dept) == 2 and 
-                        header_commune.isdigit() and len(header_commune) == 3):
-                        
-                        # PROPAGATION FORCÉE sur toutes les lignes Unknown/invalides
-                        propagated_count = 0
-                        for prop in final_results:
-                            dept = str(prop.get('department', '')).strip()
-                            comm = str(prop.get('commune', '')).strip()
-                            
-                            # Si géographie manquante/invalide → forcer avec en-tête
-                            if (not dept or not comm or 
-                                dept in ['Unknown', 'XX', 'COMMUNE'] or 
-                                comm in ['Unknown', 'XX', 'COMMUNE'] or
-                                not dept.isdigit() or not comm.isdigit()):
-                                
-                                prop['department'] = header_dept
-                                prop['commune'] = header_commune
-                                propagated_count += 1
-                        
-                        logger.info(f"   ✅ Propagation forcée: {propagated_count} lignes corrigées avec {header_dept}/{header_commune}")
-                    else:
-                        logger.warning(f"   ⚠️ En-tête géographique invalide: {header_dept}/{header_commune}")
-                else:
-                    logger.warning(f"   ⚠️ Impossible d'extraire géographie depuis en-tête PDF")
-            
-            # ÉTAPE 7: Filtrage géographique par référence (première ligne valide)
-            final_results = self.filter_by_geographic_reference(final_results, pdf_path.name)
-            
-            logger.info(f"Traitement Make termine: {len(final_results)} proprietes finales")
-            return final_results
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur traitement Make {pdf_path.name}: {e}")
+        
+            logger.warning(f"🧽 FILTRAGE STRICT: {len(filtered_owners)} propriétaires conservés sur {len(owners)}")
+            owners = filtered_owners[:20]  # Limite de sécurité absolue
+            logger.info(f"✅ SÉCURITÉ: Limitation à {len(owners)} propriétaires maximum")
+        
+        if not owners and not structured_data.get('prop_batie') and not structured_data.get('non_batie'):
+            logger.warning(f"Aucune donnée extraite pour {pdf_path.name}")
             return []
+        
+        # ÉTAPE 3: 🎯 DÉTECTION TYPE PDF ET TRAITEMENT ADAPTÉ
+        pdf_type = self.detect_pdf_ownership_type(owners, structured_data)
+        logger.info(f"🔍 Type PDF détecté: {pdf_type}")
+        
+        # Pages rendues inutiles pour la fusion : leur mémoire est rendue au budget
+        context.caches.pop('images', None)
+        
+        # Appariements indexés propriétaires ↔ parcelles, lignes générées à la volée
+        # (mémoire réservée pour les lignes réellement appariées, bornée par MAX_DOCUMENT_ROWS)
+        final_results = self.merge_owners_and_parcels(owners, structured_data, pdf_type, pdf_path.name,
+                                                      context=context)
+        
+        # ÉTAPES 4 à 7 en une passe : préfixes collés, propagation (prefixe, contenance détaillée),
+        # suppression des lignes sans numéro, géographie forcée (anti-contamination), filtrage par référence
+        final_results = self.post_process_file_results(final_results, pdf_path.name, context=context)
+        context.memory.resize(len(final_results) * RESULT_ROW_BYTES)
+        
+        logger.info(f"Traitement Make termine: {len(final_results)} proprietes finales")
+        return final_results
+
+    def merge_owners_and_parcels(self, owners: List[Dict], structured_data: Dict, pdf_type: str, pdf_path_name: str,
+                                 context: Optional[DocumentContext] = None):
+        """
+        Fusion propriétaires × parcelles (non bâties puis bâties) via OwnerParcelAssociation.
+
+        Les grands documents en indivision sont traités en entier, l'index d'appariements
+        restant linéaire en mémoire. Retourne un itérateur de lignes, dont la mémoire est
+        réservée sur le budget du document. Les lignes étant ensuite post-traitées en liste,
+        un document qui en produirait plus de MAX_DOCUMENT_ROWS est limité à ses
+        MAX_DOCUMENT_ROWS premières lignes et signalé dans le rapport de qualité (oversized_pdfs).
+        """
+        non_batie_props = structured_data.get('non_batie', [])
+        prop_batie = structured_data.get('prop_batie', [])
+        
+        if not owners:
+            return iter([])
+        
+        if pdf_type == "single_owner":
+            # TYPE 2: Un seul propriétaire pour toutes les propriétés
+            main_owner = self.select_main_owner(owners)
+            logger.info(f"👤 Propriétaire unique sélectionné: {main_owner.get('nom', '')} {main_owner.get('prenom', '')}")
+            owners = [main_owner]
+        else:
+            # TYPE 1: Plusieurs propriétaires
+            logger.info("👥 Multiple propriétaires - association indexée")
+        
+        # Si pas de structured data, juste les propriétaires
+        if not non_batie_props and not prop_batie:
+            logger.info("👤 Seulement propriétaires (pas de tableaux)")
+            if context is not None:
+                context.memory.resize(len(owners) * RESULT_ROW_BYTES)
+            return (self.merge_like_make(owner, {}, "", 'owners_only', pdf_path_name) for owner in owners)
+        
+        association = OwnerParcelAssociation(owners)
+        # Filtre comme Make : uniquement les parcelles avec une adresse
+        association.add_parcels([prop for prop in non_batie_props if prop.get('Adresse')], 'non_batie')
+        association.add_parcels([prop for prop in prop_batie if prop.get('Adresse')], 'batie')
+        
+        rows = len(association)
+        logger.info(f"🔗 Association: {len(association.owners)} propriétaire(s) × {len(association.parcels)} parcelle(s) "
+                    f"→ {rows} ligne(s) (parcelles par MAJIC: {association.stats['majic']}, "
+                    f"par droit réel: {association.stats['droit_reel']}, en indivision: {association.stats['indivision']})")
+        if rows > MAX_DOCUMENT_ROWS:
+            logger.warning(f"⚠️ {pdf_path_name}: {rows} lignes propriétaires × parcelles, seules les "
+                           f"{MAX_DOCUMENT_ROWS} premières sont conservées (MAX_DOCUMENT_ROWS) - à retraiter")
+            self.oversized_pdfs[pdf_path_name] = rows
+        if context is not None:
+            context.memory.resize(max(1, min(rows, MAX_DOCUMENT_ROWS)) * RESULT_ROW_BYTES)
+        return itertools.islice(self.iter_association_rows(association, pdf_path_name), MAX_DOCUMENT_ROWS)
 
     def detect_pdf_ownership_type(self, owners: List[Dict], structured_data: Dict) -> str:
         """
@@ -3316,7 +6529,21 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         
         return main_owner
 
-    def extract_owners_make_style(self, pdf_path: Path) -> List[Dict]:
+    def render_document_pages(self, context: DocumentContext) -> List[bytes]:
+        """
+        Pages du PDF rendues une seule fois par document (zoom du profil). Le rendu attend
+        que le budget mémoire couvre l'estimation (render_memory_estimate), puis la
+        réservation est ramenée à la taille réelle des pages rendues.
+        """
+        def render():
+            workers = context.profile['page_workers']
+            context.memory.resize(render_memory_estimate(context.pdf_path, context.profile['render_zoom'], workers))
+            images = self.pdf_to_images(context.pdf_path)
+            context.memory.resize(rendered_memory(images, workers))
+            return images
+        return context.cached('images', render)
+
+    def extract_owners_make_style(self, pdf_path: Path, context: Optional[DocumentContext] = None) -> List[Dict]:
         """
         ✅ EXTRACTION ULTRA-ROBUSTE - Stratégies multiples pour capturer TOUS les propriétaires.
         
@@ -3326,52 +6553,44 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         3. Mode debugging avec extraction ligne par ligne
         4. Extraction d'urgence simplifiée
         """
+        if context is None:
+            with self.open_document_context(pdf_path) as context:
+                return self.extract_owners_make_style(pdf_path, context)
+        
         logger.info(f"🎯 EXTRACTION ULTRA-ROBUSTE pour {pdf_path.name}")
         
         # Convertir PDF en images
-        images = self.pdf_to_images(pdf_path)
+        images = self.render_document_pages(context)
         if not images:
             return []
         
-        all_owners = []
-        
-        for page_num, image_data in enumerate(images, 1):
-            logger.info(f"📄 Traitement page {page_num}/{len(images)}")
-            base64_image = base64.b64encode(image_data).decode('utf-8')
-            
-            # 🎯 STRATÉGIE 1: Prompt ultra-directif (version améliorée)
-            page_owners = self.extract_with_ultra_directive_prompt(base64_image, page_num)
-            
-            # ✅ Si extraction insuffisante, essayer stratégies de secours
-            if len(page_owners) <= 1:
-                logger.warning(f"⚠️ Page {page_num}: Seulement {len(page_owners)} propriétaire(s) - Activation stratégies de secours")
-                
-                # 🎯 STRATÉGIE 2: Extraction spécialisée usufruitiers/nu-propriétaires
-                backup_owners = self.extract_usufruit_nu_propriete_specialized(base64_image, page_num)
-                if len(backup_owners) > len(page_owners):
-                    logger.info(f"🔄 Stratégie usufruitier meilleure: {len(backup_owners)} vs {len(page_owners)}")
-                    page_owners = backup_owners
-                
-                # 🎯 STRATÉGIE 3: Mode debugging ligne par ligne
-                if len(page_owners) <= 1:
-                    debug_owners = self.extract_line_by_line_debug(base64_image, page_num)
-                    if len(debug_owners) > len(page_owners):
-                        logger.info(f"🔄 Mode debug meilleur: {len(debug_owners)} vs {len(page_owners)}")
-                        page_owners = debug_owners
-                
-                # 🎯 STRATÉGIE 4: Extraction d'urgence ultra-simple
-                if len(page_owners) <= 1:
-                    emergency_owners = self.extract_emergency_all_names(base64_image, page_num)
-                    if len(emergency_owners) > len(page_owners):
-                        logger.info(f"🆘 Mode urgence meilleur: {len(emergency_owners)} vs {len(page_owners)}")
-                        page_owners = emergency_owners
-            
-            # Ajouter les propriétaires trouvés
-            if page_owners:
-                all_owners.extend(page_owners)
-                logger.info(f"✅ Page {page_num}: {len(page_owners)} propriétaire(s) finalement extraits")
-            else:
-                logger.warning(f"❌ Page {page_num}: Aucun propriétaire extrait malgré toutes les stratégies")
+        # Chaque page a son échéance (PAGE_TIMEOUT), bornée par celle du PDF ; appels API en échec suivis par PDF
+        pdf_deadline, api_failures = self.deadline, self.api_failures
+
+        def extract_page(image_data: bytes, page_num: int) -> List[Dict]:
+            label = f"page {page_num}/{len(images)} de {pdf_path.name}"
+            with self.deadline_scope('page', label, self.timeout_limits.page, pdf_deadline):
+                with self.track_api_failures(api_failures):
+                    try:
+                        return self.extract_page_owners(image_data, page_num, len(images))
+                    except ExtractionTimeout as e:
+                        if e.deadline.scope == 'page':
+                            self.timeouts.record('page')
+                        raise
+
+        # Pages envoyées en parallèle à l'API (appels indépendants), résultats dans l'ordre des pages
+        workers = min(context.profile['page_workers'], len(images))
+        if workers > 1:
+            logger.info(f"⚡ {len(images)} pages, {workers} en parallèle")
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+            try:
+                pages_owners = list(executor.map(extract_page, images, range(1, len(images) + 1)))
+            finally:
+                # Échéance dépassée : les pages pas encore commencées sont annulées
+                executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            pages_owners = [extract_page(image_data, page_num) for page_num, image_data in enumerate(images, 1)]
+        all_owners = [owner for page_owners in pages_owners for owner in page_owners]
         
         logger.info(f"📊 TOTAL APRÈS TOUTES STRATÉGIES: {len(all_owners)} propriétaire(s)")
         
@@ -3381,6 +6600,47 @@ Tu es un EXPERT en extraction de données cadastrales françaises. Ce document a
         
         return validated_owners
     
+    def extract_page_owners(self, image_data: bytes, page_num: int, page_count: int) -> List[Dict]:
+        """Propriétaires d'une page : prompt ultra-directif puis stratégies de secours."""
+        self.check_deadline()
+        logger.info(f"📄 Traitement page {page_num}/{page_count}")
+        base64_image = base64.b64encode(image_data).decode('utf-8')
+        
+        # 🎯 STRATÉGIE 1: Prompt ultra-directif (version améliorée)
+        page_owners = self.extract_with_ultra_directive_prompt(base64_image, page_num)
+        
+        # ✅ Si extraction insuffisante, essayer stratégies de secours
+        if len(page_owners) <= 1:
+            logger.warning(f"⚠️ Page {page_num}: Seulement {len(page_owners)} propriétaire(s) - Activation stratégies de secours")
+            self.check_deadline()
+            
+            # 🎯 STRATÉGIE 2: Extraction spécialisée usufruitiers/nu-propriétaires
+            backup_owners = self.extract_usufruit_nu_propriete_specialized(base64_image, page_num)
+            if len(backup_owners) > len(page_owners):
+                logger.info(f"🔄 Stratégie usufruitier meilleure: {len(backup_owners)} vs {len(page_owners)}")
+                page_owners = backup_owners
+            
+            # 🎯 STRATÉGIE 3: Mode debugging ligne par ligne
+            if len(page_owners) <= 1:
+                debug_owners = self.extract_line_by_line_debug(base64_image, page_num)
+                if len(debug_owners) > len(page_owners):
+                    logger.info(f"🔄 Mode debug meilleur: {len(debug_owners)} vs {len(page_owners)}")
+                    page_owners = debug_owners
+            
+            # 🎯 STRATÉGIE 4: Extraction d'urgence ultra-simple
+            if len(page_owners) <= 1:
+                emergency_owners = self.extract_emergency_all_names(base64_image, page_num)
+                if len(emergency_owners) > len(page_owners):
+                    logger.info(f"🆘 Mode urgence meilleur: {len(emergency_owners)} vs {len(page_owners)}")
+                    page_owners = emergency_owners
+        
+        # Ajouter les propriétaires trouvés
+        if page_owners:
+            logger.info(f"✅ Page {page_num}: {len(page_owners)} propriétaire(s) finalement extraits")
+        else:
+            logger.warning(f"❌ Page {page_num}: Aucun propriétaire extrait malgré toutes les stratégies")
+        return page_owners
+    
     def extract_with_ultra_directive_prompt(self, base64_image: str, page_num: int) -> List[Dict]:
         """Stratégie 1: Prompt ultra-directif avec emphase sur la multiplicité"""
         try:
@@ -3418,7 +6678,7 @@ RÉPONSE JSON:
 
 🚨 JAMAIS moins de propriétaires qu'il n'y en a réellement dans le document !"""
 
-            response = self.client.chat.completions.create(
+            response = self.chat_completion(
                 model="gpt-4o",
                 messages=[{
                     "role": "user",
@@ -3470,7 +6730,7 @@ EXEMPLE TYPIQUE:
     {"nom": "...", "prenom": "...", "droit_reel": "Nu-propriétaire", "numero_proprietaire": "...", "street_address": "...", "city": "...", "post_code": "...", "department": "...", "commune": "..."}
 ]}"""
 
-            response = self.client.chat.completions.create(
+            response = self.chat_completion(
                 model="gpt-4o",
                 messages=[{
                     "role": "user", 
@@ -3516,7 +6776,7 @@ Retourne TOUS les noms trouvés:
     {"nom": "NOM1", "prenom": "Prénom1", "droit_reel": "...", "numero_proprietaire": "...", "street_address": "...", "city": "...", "post_code": "...", "department": "...", "commune": "..."}
 ]}"""
 
-            response = self.client.chat.completions.create(
+            response = self.chat_completion(
                 model="gpt-4o",
                 messages=[{
                     "role": "user",
@@ -3553,7 +6813,7 @@ Cherche:
     {"nom": "TOUS_LES_NOMS_TROUVÉS", "prenom": "TOUS_LES_PRÉNOMS", "droit_reel": "", "numero_proprietaire": "", "street_address": "", "city": "", "post_code": "", "department": "", "commune": ""}
 ]}"""
 
-            response = self.client.chat.completions.create(
+            response = self.chat_completion(
                 model="gpt-4o",
                 messages=[{
                     "role": "user",
@@ -3589,14 +6849,12 @@ Cherche:
         raw_prefixe = prop.get('Préfixe', prop.get('Pfxe', ''))  # Support des deux variantes
         
         # 🔧 NETTOYAGE PRÉALABLE: Séparer préfixe et section si collés avec espace
-        import re
         final_section = raw_section
         final_prefixe = raw_prefixe
         
         # Si pas de préfixe et section contient pattern numérique+alphabétique avec espace
         if not raw_prefixe and raw_section:
-            pattern = r'^(\d+)\s+([A-Z]+)$'  # \s+ pour détecter les espaces
-            match = re.match(pattern, raw_section)
+            match = SPACED_PREFIX_PATTERN.match(raw_section)
             if match:
                 final_prefixe = match.group(1)  # 302
                 final_section = match.group(2)  # A (sans espace)
@@ -3756,20 +7014,22 @@ Cherche:
         
         return owners
 
-    def merge_like_make(self, owner: Dict, prop: Dict, unique_id: str, prop_type: str, pdf_path_name: str) -> Dict:
+    def merge_like_make(self, owner: Dict, prop: Dict, unique_id: str, prop_type: str, pdf_path_name: str) -> PropertyRecord:
         """
         ✅ FUSION CORRIGÉE avec gestion optimisée des contenances et adresses.
         """
-        
+        return self._assemble_record(self._owner_merge_fields(owner), self._parcel_merge_fields(prop),
+                                     unique_id, prop_type, pdf_path_name)
+
+    def _parcel_merge_fields(self, prop: Dict) -> tuple:
+        """Champs côté parcelle de merge_like_make : (prefixe, section, numero, designation, ha, a, ca)."""
         # SÉPARATION AUTOMATIQUE DES PRÉFIXES COLLÉS
-        import re
         raw_section = str(prop.get('Sec', ''))
         raw_prefixe = str(prop.get('Préfixe', prop.get('Pfxe', '')))
         
         # Si pas de préfixe et section contient pattern numérique+alphabétique
         if not raw_prefixe and raw_section:
-            pattern = r'^(\d+)\s*([A-Z]+)$'  # \s* permet les espaces optionnels
-            match = re.match(pattern, raw_section)
+            match = STUCK_PREFIX_PATTERN.match(raw_section)
             if match:
                 final_prefixe = match.group(1)  # 302
                 final_section = match.group(2)  # A
@@ -3782,61 +7042,103 @@ Cherche:
             final_section = raw_section
         
         # ✅ CORRECTION CONTENANCE : Gestion des formats français et parsing robuste
-        contenance_ha = self.parse_contenance_value(prop.get('HA', prop.get('Contenance', '')))
-        contenance_a = self.parse_contenance_value(prop.get('A', ''))
-        contenance_ca = self.parse_contenance_value(prop.get('CA', ''))
-        
+        return (
+            final_prefixe,
+            final_section,
+            str(prop.get('N° Plan', '')),
+            str(prop.get('Adresse', '')),
+            self.parse_contenance_value(prop.get('HA', prop.get('Contenance', ''))),
+            self.parse_contenance_value(prop.get('A', '')),
+            self.parse_contenance_value(prop.get('CA', '')),
+        )
+
+    def _owner_merge_fields(self, owner: Dict) -> tuple:
+        """Champs côté propriétaire de merge_like_make : (department, commune, nom, prenom, majic, voie, post_code, city, droit_reel)."""
         # ✅ CORRECTION NOMS/PRÉNOMS : Séparation intelligente des noms composés
         nom_final, prenom_final = self.split_name_intelligently(
             owner.get('nom', ''), owner.get('prenom', '')
         )
+        return (
+            str(owner.get('department', '')),
+            clean_commune_code(str(owner.get('commune', ''))),
+            nom_final,
+            prenom_final,
+            str(owner.get('numero_proprietaire', '')),
+            # ✅ CORRECTION ADRESSES : Nettoyage et validation des adresses
+            self.clean_address(owner.get('street_address', '')),
+            str(owner.get('post_code', '')),
+            str(owner.get('city', '')),
+            str(owner.get('droit_reel', '')),
+        )
+
+    def _assemble_record(self, owner_fields: tuple, parcel_fields: tuple, unique_id: str,
+                         prop_type: str, pdf_path_name: str) -> PropertyRecord:
+        """Assemble une ligne à partir des champs propriétaire et parcelle déjà nettoyés."""
+        department, commune, nom, prenom, numero_majic, voie, post_code, city, droit_reel = owner_fields
+        prefixe, section, numero, designation, contenance_ha, contenance_a, contenance_ca = parcel_fields
         
-        # ✅ CORRECTION ADRESSES : Nettoyage et validation des adresses
-        voie_cleaned = self.clean_address(owner.get('street_address', ''))
-        
-        # Mapping exact comme dans Make Google Sheets (CORRIGÉ)
-        merged = {
+        # Mapping exact comme dans Make Google Sheets (CORRIGÉ) - valeurs dans l'ordre de PROPERTY_FIELDS
+        return PropertyRecord(
             # Colonnes A-E (informations parcelle)
-            'department': str(owner.get('department', '')),  # Colonne A
-            'commune': clean_commune_code(str(owner.get('commune', ''))),        # Colonne B - CORRIGÉ avec nettoyage  
-            'prefixe': final_prefixe,                        # Colonne C (CORRIGÉ - séparation auto)
-            'section': final_section,                        # Colonne D (CORRIGÉ - séparation auto)
-            'numero': str(prop.get('N° Plan', '')),         # Colonne E
+            department,  # department - Colonne A
+            commune,  # commune - Colonne B - CORRIGÉ avec nettoyage
+            prefixe,  # prefixe - Colonne C (CORRIGÉ - séparation auto)
+            section,  # section - Colonne D (CORRIGÉ - séparation auto)
+            numero,  # numero - Colonne E
             
             # Colonnes F-H (gestion/demande - vides dans Make)
-            'demandeur': '',    # Colonne F
-            'date': '',         # Colonne G  
-            'envoye': '',       # Colonne H
+            '',  # demandeur - Colonne F
+            '',  # date - Colonne G
+            '',  # envoye - Colonne H
             
             # Colonne I (designation + contenance détaillée CORRIGÉE)
-            'designation_parcelle': str(prop.get('Adresse', '')),  # Colonne I
-            'contenance_ha': contenance_ha,     # ✅ CORRIGÉ - Parsing français
-            'contenance_a': contenance_a,       # ✅ CORRIGÉ - Parsing français  
-            'contenance_ca': contenance_ca,     # ✅ CORRIGÉ - Parsing français
+            designation,  # designation_parcelle - Colonne I
+            contenance_ha,  # contenance_ha - ✅ CORRIGÉ - Parsing français
+            contenance_a,  # contenance_a - ✅ CORRIGÉ - Parsing français
+            contenance_ca,  # contenance_ca - ✅ CORRIGÉ - Parsing français
             
             # Colonnes J-O (propriétaire CORRIGÉES)
-            'nom': nom_final,                                    # ✅ CORRIGÉ - Séparation intelligente
-            'prenom': prenom_final,                             # ✅ CORRIGÉ - Séparation intelligente
-            'numero_majic': str(owner.get('numero_proprietaire', '')),  # Colonne L
-            'voie': voie_cleaned,                               # ✅ CORRIGÉ - Adresse nettoyée
-            'post_code': str(owner.get('post_code', '')),       # Colonne N
-            'city': str(owner.get('city', '')),                 # Colonne O
+            nom,  # nom - ✅ CORRIGÉ - Séparation intelligente
+            prenom,  # prenom - ✅ CORRIGÉ - Séparation intelligente
+            numero_majic,  # numero_majic - Colonne L
+            voie,  # voie - ✅ CORRIGÉ - Adresse nettoyée
+            post_code,  # post_code - Colonne N
+            city,  # city - Colonne O
             
             # Colonnes P-R (statuts - vides dans Make)
-            'identifie': '',    # Colonne P
-            'rdp': '',          # Colonne Q
-            'sig': '',          # Colonne R
+            '',  # identifie - Colonne P
+            '',  # rdp - Colonne Q
+            '',  # sig - Colonne R
             
             # Colonnes S-T (ID et droit)
-            'id': unique_id,                                    # Colonne S
-            'droit_reel': str(owner.get('droit_reel', '')),    # Colonne T - ✅ CORRIGÉ: clé avec underscore
+            unique_id,  # id - Colonne S
+            droit_reel,  # droit_reel - Colonne T - ✅ CORRIGÉ: clé avec underscore
             
             # Métadonnées internes
-            'fichier_source': pdf_path_name,
-            'type_propriete': prop_type
-        }
-        
-        return merged
+            pdf_path_name,  # fichier_source
+            prop_type,  # type_propriete
+            ''  # proprietaire_id - attribué par resolve_owner_entities
+        )
+
+    def iter_association_rows(self, association: OwnerParcelAssociation, pdf_path_name: str):
+        """
+        Matérialise paresseusement les lignes d'une OwnerParcelAssociation.
+
+        Champs propriétaire et parcelle nettoyés une seule fois chacun ; l'ID n'est
+        recalculé que lorsque la géographie du propriétaire change pour une parcelle.
+        """
+        owner_fields = [self._owner_merge_fields(owner) for owner in association.owners]
+        parcel_fields = [self._parcel_merge_fields(parcel) for parcel in association.parcels]
+        ids = {}
+        for owner_index, parcel_index in association.iter_pairs():
+            owner = association.owners[owner_index]
+            id_key = (parcel_index, owner.get('department', ''), owner.get('commune', ''))
+            unique_id = ids.get(id_key)
+            if unique_id is None:
+                # Génération ID (comme Make) : ne dépend que de la parcelle et de la géographie du propriétaire
+                unique_id = ids[id_key] = self.generate_id_with_openai_like_make(owner, association.parcels[parcel_index])
+            yield self._assemble_record(owner_fields[owner_index], parcel_fields[parcel_index], unique_id,
+                                        association.parcel_types[parcel_index], pdf_path_name)
 
     def generate_parcel_id(self, department: str, commune: str, section: str = None, plan_number: int = None) -> str:
         """
@@ -3892,113 +7194,15 @@ Cherche:
         ou à une adresse/lieu confondu par GPT-4 Vision.
         
         RENFORCÉ : Filtre strictement les résidus parasites et lignes artificielles.
+        Les dictionnaires sont dans data/name_filters.json (voir NameFilters).
         """
-        if not nom.strip():
-            return False
-            
-        nom_upper = nom.upper().strip()
-        prenom_clean = prenom.strip()
-        
-        # 🚨 FILTRE STRICT: Éliminer immédiatement les mots parasites spécifiques
-        parasitic_words = [
-            'AUX', 'LAVES', 'ECHASSIR', 'ECURIE', 'GABOIS', 'NAUX', 'MANDE', 
-            'NOIX', 'MONTANT', 'PUISEAU', 'REMEMBRES', 'PRINCESSES', 'PARC',
-            'MARECHAUX', 'AUXERRE', 'FORETS', 'BLANC', 'MALVOISINE', 'LONGEVAS',
-            'VAL', 'COTE', 'MONT', 'CHAMPS', 'PRES', 'BOIS', 'DESSUS', 'DESSOUS'
-        ]
-
-        # Si le nom exact correspond à un mot parasite, REJETER immédiatement
-        if nom_upper in parasitic_words:
-            logger.debug(f"🗑️ REJETÉ (mot parasite): {nom}")
-            return False
-
-        # Si le nom commence par un pattern suspect, REJETER
-        suspicious_starts = ['LE ', 'LA ', 'LES ', 'DU ', 'DE ', 'AU ', 'AUX ']
-        if any(nom_upper.startswith(pattern) for pattern in suspicious_starts):
-            logger.debug(f"🗑️ REJETÉ (préfixe suspect): {nom}")
-            return False
-        
-        # ✅ CRITÈRE 1: Personnes morales (communes, sociétés) - PRIORITÉ ABSOLUE
-        legal_entity_keywords = [
-            'COM', 'COMMUNE', 'VILLE', 'MAIRIE', 'ÉTAT', 'DÉPARTEMENT', 'RÉGION',
-            'SCI', 'SARL', 'SASU', 'EURL', 'SA', 'SOCIÉTÉ', 'ENTERPRISE',
-            'ASSOCIATION', 'SYNDICAT', 'FEDERATION', 'UNION'
-        ]
-        
-        for keyword in legal_entity_keywords:
-            if keyword in nom_upper and len(nom.strip()) >= 8:  # Nom suffisamment long
-                return True
-        
-        # ✅ CRITÈRE 2: Rejet des adresses/lieux-dits (APRÈS vérification personnes morales)
-        if self.looks_like_address(nom_upper):
-            return False
-        
-        # ✅ CRITÈRE 3: Personnes physiques avec prénom
-        if prenom_clean and len(prenom_clean) >= 2:
-            # Nom de famille classique (pas trop court, pas d'adresse)
-            if len(nom.strip()) >= 3 and not self.looks_like_address(nom_upper):
-                return True
-        
-        # ✅ CRITÈRE 4: Noms de famille seuls mais plausibles
-        if not prenom_clean:
-            # Doit ressembler à un nom de famille (pas d'adresse, longueur raisonnable)
-            if (len(nom.strip()) >= 5 and 
-                not self.looks_like_address(nom_upper) and
-                not any(char.isdigit() for char in nom) and  # Pas de chiffres
-                nom_upper not in ['N/A', 'NULL', 'VIDE', 'INCONNU']):
-                return True
-        
-        # ✅ CRITÈRE 5: Patterns de noms classiques français
-        classic_patterns = ['MC', 'MAC', 'DE ', 'DU ', 'LE ', 'LA ']
-        for pattern in classic_patterns:
-            if pattern in nom_upper and len(nom.strip()) >= 5:
-                return True
-        
-        # Par défaut : REJETER si aucun critère positif
-        return False
+        return self.name_filters.is_likely_real_owner(nom, prenom)
 
     def looks_like_address(self, nom_upper: str) -> bool:
         """
         Détermine si un nom ressemble à une adresse plutôt qu'à un propriétaire.
         """
-        # Mots-clés d'adresses (très étendu)
-        address_keywords = [
-            'RUE', 'AVENUE', 'PLACE', 'CHEMIN', 'ROUTE', 'LIEU-DIT', 'IMPASSE',
-            'AU VILLAGE', 'AU ', 'LA ', 'LE ', 'LES ', 'DE LA', 'DU ', 'DES ',
-            'CHAMPS', 'PRES', 'BOIS', 'FORET', 'COTE', 'SUR ', 'SOUS ', 'HAUTE',
-            'DESSUS', 'DESSOUS', 'HAUT', 'BAS', 'GRAND', 'PETIT', 'VIEUX', 'NOUVEAU',
-            'GRANDE', 'PETITE', 'VIEILLE', 'NOUVELLE', 'RANG', 'TETE', 'BOUT',
-            'MILIEU', 'ENTRE', 'VERS', 'PRES DE', 'PROCHE', 'CUDRET', 'SEUT',
-            'ROCHE', 'PIERRE', 'MONT', 'COL', 'VALLEE', 'PLAINE', 'PLATEAU',
-            # ✅ AJOUTS SPÉCIFIQUES aux données utilisateur
-            'NOIX', 'MANDE', 'NAUX', 'GOBAIN', 'MONTANT', 'REMEMBRES', 'PUISEAU',
-            'GABOIS', 'PRINCESSES', 'PARC', 'MARECHAUX', 'AUXERRE', 'FORETS',
-            'BLANC', 'MALVOISINE', 'LONGEVAS',
-            # 🚨 AJOUTS ANTI-RÉSIDUS STRICTS
-            'CUDRET', 'SEUT', 'GIBELIN', 'VALLON', 'TERRES', 'CHAMP', 'PRE',
-            'VIGNE', 'VIGNOBLE', 'ETANG', 'MARE', 'SOURCE', 'FONTAINE',
-            'CROIX', 'CALVAIRE', 'CHAPELLE', 'MOULIN', 'FERME', 'GRANGE'
-        ]
-        
-        # Si le nom contient des mots-clés d'adresse
-        for keyword in address_keywords:
-            if keyword in nom_upper:
-                return True
-        
-        # Patterns d'adresses typiques (enrichis)
-        address_patterns = [
-            'GIRARDET', 'HAUTETERRE', 'HAUTEPIERRE', 'REISSILLE',
-            # ✅ Patterns spécifiques aux données utilisateur
-            'MONT DE NOIX', 'COTE DE MANDE', 'SUR LES NAUX', 'MONTANT DU NOYER',
-            'VAL DE PUISEAU', 'LA VALLEE DE', 'CHE DES VIGNES', 'RUE D EN HAUT',
-            'RENVERS DES FORETS', 'HAM DE MALVOISINE', 'VIEILLE RUE D'
-        ]
-        
-        for pattern in address_patterns:
-            if pattern in nom_upper:
-                return True
-        
-        return False
+        return self.name_filters.looks_like_address(nom_upper)
 
     def clean_inconsistent_location_data(self, properties: List[Dict], filename: str) -> List[Dict]:
         """
@@ -4161,12 +7365,7 @@ Cherche:
                 commune = str(prop.get('commune', '')).strip()
                 
                 # ✅ CRITÈRES ULTRA-STRICTS pour géographie valide
-                if (dept and commune and 
-                    dept not in ['', 'N/A', 'None', 'XX', 'Unknown'] and 
-                    commune not in ['', 'N/A', 'None', 'COMMUNE', 'Unknown'] and
-                    # OBLIGATOIRE : codes numériques seulement
-                    dept.isdigit() and len(dept) == 2 and
-                    commune.isdigit() and len(commune) == 3):
+                if self._is_reference_geography(dept, commune):
                     
                     reference_dept = dept
                     reference_commune = commune
@@ -4180,9 +7379,7 @@ Cherche:
                 for index, prop in enumerate(file_props):
                     dept = str(prop.get('department', '')).strip()
                     commune = str(prop.get('commune', '')).strip()
-                    if (dept and commune and 
-                        any(c.isdigit() for c in dept) and any(c.isdigit() for c in commune) and
-                        dept not in ['XX', 'COMMUNE', 'Unknown'] and commune not in ['XX', 'COMMUNE', 'Unknown']):
+                    if self._is_fallback_reference_geography(dept, commune):
                         reference_dept = dept
                         reference_commune = commune
                         logger.warning(f"   🆘 Mode de secours: {dept}/{commune}")
@@ -4203,8 +7400,7 @@ Cherche:
                 commune = str(prop.get('commune', '')).strip()
                 
                 # Ignorer le filtrage si département/commune vides ou sans chiffres (comme demandé)
-                if (not dept or not commune or dept in ['', 'N/A', 'None'] or commune in ['', 'N/A', 'None'] or
-                    not any(c.isdigit() for c in dept) or not any(c.isdigit() for c in commune)):
+                if self._is_geography_unfilterable(dept, commune):
                     file_filtered.append(prop)
                     logger.debug(f"      ⏭️ Ignoré (valeurs vides ou sans chiffres): ligne {index + 1}")
                     continue
@@ -4228,6 +7424,262 @@ Cherche:
         
         return filtered_properties
 
+    def apply_forced_geography(self, properties: List[Dict], filename: str) -> List[Dict]:
+        """
+        ÉTAPE 6.5 : Propagation géographique forcée (anti-contamination).
+        Applique l'en-tête PDF puis force la géographie de la première ligne
+        sur toutes les lignes à géographie manquante/invalide (modification en place).
+        """
+        logger.info("🎯 ÉTAPE 6.5: Propagation géographique forcée (anti-contamination)")
+        
+        if properties:
+            # Extraire géographie depuis en-tête PDF si disponible
+            location_info = self.extract_location_info(properties, "", filename)
+            if location_info and location_info[0] if isinstance(location_info, list) else location_info:
+                header_data = location_info[0] if isinstance(location_info, list) else location_info
+                header_dept = str(header_data.get('department', '')).strip()
+                header_commune = str(header_data.get('commune', '')).strip()
+                
+                # Vérifier si la géographie de l'en-tête est valide
+                if self._is_forced_geography_source(header_dept, header_commune):
+                    
+                    # PROPAGATION FORCÉE sur toutes les lignes Unknown/invalides
+                    propagated_count = 0
+                    for prop in properties:
+                        if self._needs_forced_geography(prop):
+                            prop['department'] = header_dept
+                            prop['commune'] = header_commune
+                            propagated_count += 1
+                    
+                    logger.info(f"   ✅ Propagation forcée: {propagated_count} lignes corrigées avec {header_dept}/{header_commune}")
+                else:
+                    logger.warning(f"   ⚠️ En-tête géographique invalide: {header_dept}/{header_commune}")
+            else:
+                logger.warning(f"   ⚠️ Impossible d'extraire géographie depuis en-tête PDF")
+        
+        return properties
+
+    # 🔗 PRÉDICATS LIGNE PAR LIGNE (partagés par les étapes en liste et le pipeline fusionné)
+
+    def _split_stuck_prefix(self, prop: Dict) -> Dict:
+        """Sépare un préfixe collé à la section ("302A" → "302" + "A"). Copie la ligne si modifiée."""
+        section = str(prop.get('section', '')).strip()
+        current_prefixe = str(prop.get('prefixe', '')).strip()
+        
+        # Ne traiter que si la section n'est pas vide et le préfixe est vide
+        if section and not current_prefixe:
+            # Pattern pour détecter préfixe numérique collé à section alphabétique
+            # Exemples: "302A", "302 A", "302AB", "001ZD", "123AC", etc.
+            match = STUCK_PREFIX_PATTERN.match(section)
+            
+            if match:
+                detected_prefixe = match.group(1)  # La partie numérique (302)
+                detected_section = match.group(2)  # La partie alphabétique (A)
+                
+                # Mettre à jour les champs (sur une copie, l'original reste intact)
+                updated_prop = prop.copy()
+                updated_prop['prefixe'] = detected_prefixe
+                updated_prop['section'] = detected_section
+                
+                logger.info(f"🔍 Préfixe séparé: '{section}' → préfixe='{detected_prefixe}' section='{detected_section}'")
+                return updated_prop
+        return prop
+
+    def _has_parcel_number(self, prop: Dict) -> bool:
+        """Vrai si la ligne a un numéro de parcelle exploitable."""
+        numero = str(prop.get('numero', '')).strip()
+        return bool(numero) and numero not in ['', 'N/A', 'None', 'null', '0']
+
+    def _is_forced_geography_source(self, dept: str, commune: str) -> bool:
+        """Géographie utilisable comme source de propagation forcée (codes 2 + 3 chiffres)."""
+        return dept.isdigit() and len(dept) == 2 and commune.isdigit() and len(commune) == 3
+
+    def _needs_forced_geography(self, prop: Dict) -> bool:
+        """Vrai si la géographie de la ligne est manquante ou invalide."""
+        dept = str(prop.get('department', '')).strip()
+        comm = str(prop.get('commune', '')).strip()
+        return (not dept or not comm or 
+                dept in ['Unknown', 'XX', 'COMMUNE'] or 
+                comm in ['Unknown', 'XX', 'COMMUNE'] or
+                not dept.isdigit() or not comm.isdigit())
+
+    def _is_reference_geography(self, dept: str, commune: str) -> bool:
+        """✅ CRITÈRES ULTRA-STRICTS pour une géographie de référence."""
+        return bool(dept and commune and 
+                    dept not in ['', 'N/A', 'None', 'XX', 'Unknown'] and 
+                    commune not in ['', 'N/A', 'None', 'COMMUNE', 'Unknown'] and
+                    # OBLIGATOIRE : codes numériques seulement
+                    dept.isdigit() and len(dept) == 2 and
+                    commune.isdigit() and len(commune) == 3)
+
+    def _is_fallback_reference_geography(self, dept: str, commune: str) -> bool:
+        """Critères du mode de secours (aucune géographie ultra-valide dans le fichier)."""
+        return bool(dept and commune and 
+                    any(c.isdigit() for c in dept) and any(c.isdigit() for c in commune) and
+                    dept not in ['XX', 'COMMUNE', 'Unknown'] and commune not in ['XX', 'COMMUNE', 'Unknown'])
+
+    def _is_geography_unfilterable(self, dept: str, commune: str) -> bool:
+        """Lignes conservées sans comparaison (valeurs vides ou sans chiffres)."""
+        return (not dept or not commune or dept in ['', 'N/A', 'None'] or commune in ['', 'N/A', 'None'] or
+                not any(c.isdigit() for c in dept) or not any(c.isdigit() for c in commune))
+
+    # 🔗 PIPELINE FUSIONNÉ DE POST-TRAITEMENT (un regroupement, une passe en flux)
+    # Chaque étape est un générateur ligne → ligne ; les étapes dépendant de l'ordre
+    # ne mémorisent que le strict nécessaire (première ligne, lignes avant la référence).
+
+    def _stream_separate_prefixes(self, rows, stats: Dict):
+        for prop in rows:
+            updated_prop = self._split_stuck_prefix(prop)
+            if updated_prop is not prop:
+                stats['prefixes_separes'] += 1
+            yield updated_prop
+
+    def _stream_propagate_values(self, rows, fields: List[str]):
+        last_seen_values = {field: None for field in fields}
+        for prop in rows:
+            filled_values = {}
+            for field in fields:
+                value = prop.get(field)
+                if value is None or value == "":
+                    if last_seen_values[field] is not None:
+                        filled_values[field] = last_seen_values[field]
+                else:
+                    last_seen_values[field] = value
+            if filled_values:
+                prop = prop.copy()
+                prop.update(filled_values)
+            yield prop
+
+    def _stream_remove_empty_parcel_numbers(self, rows, stats: Dict):
+        for prop in rows:
+            if self._has_parcel_number(prop):
+                yield prop
+            else:
+                stats['sans_numero'] += 1
+
+    def _stream_header_location(self, rows, filename: str, context: Optional[DocumentContext] = None):
+        """Lecture de l'en-tête PDF au passage de la première ligne (aucune lecture si aucune ligne)."""
+        location_data = None
+        for prop in rows:
+            if location_data is None:
+                try:
+                    if context is not None:
+                        location_data = context.cached('header_location', lambda: self.get_header_location(context.pdf_path))
+                    else:
+                        location_data = self.get_header_location(filename)
+                except Exception as e:
+                    logger.error(f"❌ Erreur extraction en-tête pdfplumber: {e}")
+                    location_data = {}
+                dept = location_data.get("department")
+                commune = location_data.get("commune")
+                if location_data and not (dept or commune):
+                    logger.warning(f"⚠️ Aucune donnée géographique trouvée dans l'en-tête: {filename}")
+            if dept or commune:
+                self._apply_header_location(prop, dept, commune)
+            yield prop
+
+    def _stream_forced_geography(self, rows, stats: Dict):
+        """La première ligne (après en-tête) sert de source pour les géographies invalides."""
+        header_dept = header_commune = None
+        for index, prop in enumerate(rows):
+            if index == 0:
+                if prop:
+                    header_dept = str(prop.get('department', '')).strip()
+                    header_commune = str(prop.get('commune', '')).strip()
+                    if not self._is_forced_geography_source(header_dept, header_commune):
+                        logger.warning(f"   ⚠️ En-tête géographique invalide: {header_dept}/{header_commune}")
+                        header_dept = None
+                else:
+                    logger.warning(f"   ⚠️ Impossible d'extraire géographie depuis en-tête PDF")
+            if header_dept is not None and self._needs_forced_geography(prop):
+                prop['department'] = header_dept
+                prop['commune'] = header_commune
+                stats['geographie_forcee'] += 1
+            yield prop
+
+    def _stream_geographic_reference(self, rows, stats: Dict):
+        """
+        Filtrage par la première géographie ultra-valide. Les lignes qui précèdent la
+        référence sont mises en attente puis filtrées dès qu'elle est connue ; si le fichier
+        n'en contient aucune, le mode de secours s'applique à la fin du flux.
+        """
+        pending = []
+        reference = None
+        fallback_reference = None
+        
+        def keep(prop, ref):
+            dept = str(prop.get('department', '')).strip()
+            commune = str(prop.get('commune', '')).strip()
+            if self._is_geography_unfilterable(dept, commune) or (dept, commune) == ref:
+                return True
+            stats['hors_reference'] += 1
+            return False
+        
+        for prop in rows:
+            if reference is not None:
+                if keep(prop, reference):
+                    yield prop
+                continue
+            
+            pending.append(prop)
+            dept = str(prop.get('department', '')).strip()
+            commune = str(prop.get('commune', '')).strip()
+            if self._is_reference_geography(dept, commune):
+                reference = (dept, commune)
+                logger.info(f"   📍 Référence VALIDE trouvée: {dept}/{commune} (ligne {len(pending)})")
+                yield from (pending_prop for pending_prop in pending if keep(pending_prop, reference))
+                pending = []
+            elif fallback_reference is None and self._is_fallback_reference_geography(dept, commune):
+                fallback_reference = (dept, commune)
+        
+        if reference is None and pending:
+            if fallback_reference is None:
+                logger.warning(f"⚠️ Aucune référence géographique valide trouvée - conservation de toutes les lignes")
+                yield from pending
+            else:
+                logger.warning(f"   🆘 Mode de secours: {fallback_reference[0]}/{fallback_reference[1]}")
+                yield from (pending_prop for pending_prop in pending if keep(pending_prop, fallback_reference))
+
+    def post_process_file_results(self, properties: List[Dict], filename: str,
+                                  propagate_fields: Optional[List[str]] = None,
+                                  context: Optional[DocumentContext] = None) -> List[Dict]:
+        """
+        🔗 POST-TRAITEMENT FUSIONNÉ : équivalent exact de la séquence
+        separate_stuck_prefixes → propagate_values_downward → remove_empty_parcel_numbers
+        → apply_forced_geography → filter_by_geographic_reference,
+        avec un seul regroupement par fichier source et une seule passe par ligne.
+        """
+        if propagate_fields is None:
+            propagate_fields = ['prefixe', 'contenance_ha', 'contenance_a', 'contenance_ca']
+        
+        # Grouper UNE SEULE FOIS par fichier source (ordre de première apparition conservé)
+        # properties peut être un itérateur (lignes générées par iter_association_rows)
+        files_groups = {}
+        input_count = 0
+        for prop in properties:
+            files_groups.setdefault(prop.get('fichier_source', 'unknown'), []).append(prop)
+            input_count += 1
+        if not input_count:
+            return []
+        
+        # L'en-tête et la géographie forcée s'appliquent à l'ensemble du lot (comme la séquence en liste)
+        stats = dict.fromkeys(['prefixes_separes', 'sans_numero', 'geographie_forcee', 'hors_reference'], 0)
+        rows = (prop for file_props in files_groups.values()
+                for prop in self._stream_remove_empty_parcel_numbers(
+                    self._stream_propagate_values(
+                        self._stream_separate_prefixes(file_props, stats), propagate_fields), stats))
+        rows = self._stream_forced_geography(self._stream_header_location(rows, filename, context), stats)
+        
+        # Le filtrage par référence est propre à chaque fichier (lignes déjà contiguës par fichier)
+        results = []
+        for _, file_rows in itertools.groupby(rows, key=lambda prop: prop.get('fichier_source', 'unknown')):
+            results.extend(self._stream_geographic_reference(file_rows, stats))
+        
+        logger.info(f"🔗 Post-traitement fusionné {filename}: {input_count} → {len(results)} lignes "
+                    f"({stats['prefixes_separes']} préfixe(s) séparé(s), {stats['sans_numero']} sans numéro, "
+                    f"{stats['geographie_forcee']} géographie(s) forcée(s), {stats['hors_reference']} hors référence)")
+        return results
+
     def remove_empty_parcel_numbers(self, properties: List[Dict], filename: str) -> List[Dict]:
         """
         Supprime les lignes où la colonne 'numero' (numéro de parcelle) est vide.
@@ -4247,10 +7699,8 @@ Cherche:
         # Filtrer les propriétés avec un numéro de parcelle non vide
         filtered_properties = []
         for prop in properties:
-            numero = str(prop.get('numero', '')).strip()
-            
             # Garder seulement les lignes avec un numéro de parcelle valide
-            if numero and numero not in ['', 'N/A', 'None', 'null', '0']:
+            if self._has_parcel_number(prop):
                 filtered_properties.append(prop)
             else:
                 logger.debug(f"🗑️ Ligne supprimée (numéro de parcelle vide): {prop.get('nom', 'N/A')} - {prop.get('designation_parcelle', 'N/A')}")
@@ -4402,61 +7852,279 @@ Cherche:
         # Nettoyage du code commune avant export
         for prop in all_properties:
             prop['commune'] = clean_commune_code(prop.get('commune', ''))
-        # Créer le DataFrame
-        df = pd.DataFrame(all_properties)
-        
-        # Colonnes selon les spécifications du client (avec contenance détaillée)
-        columns_order = [
-            'department', 'commune', 'prefixe', 'section', 'numero', 
-            'contenance_ha', 'contenance_a', 'contenance_ca',
-            'droit_reel', 'designation_parcelle', 'nom', 'prenom', 'numero_majic', 
-            'voie', 'post_code', 'city', 'id', 'fichier_source'
-        ]
-        
-        # Renommer les colonnes pour plus de clarté
-        column_mapping = {
-            'department': 'Département',
-            'commune': 'Commune', 
-            'prefixe': 'Préfixe',
-            'section': 'Section',
-            'numero': 'Numéro',
-            'contenance_ha': 'Contenance HA',
-            'contenance_a': 'Contenance A', 
-            'contenance_ca': 'Contenance CA',
-            'droit_reel': 'Droit réel',
-            'designation_parcelle': 'Designation Parcelle',
-            'nom': 'Nom Propri',
-            'prenom': 'Prénom Propri',
-            'numero_majic': 'N°MAJIC',
-            'voie': 'Voie',
-            'post_code': 'CP',
-            'city': 'Ville',
-            'id': 'id',
-            'fichier_source': 'Fichier source'
-        }
-        
-        # Réorganiser et renommer
-        df = df.reindex(columns=columns_order, fill_value='')
-        df = df.rename(columns=column_mapping)
-        
-        # Export CSV avec séparateur point-virgule (meilleur pour Excel français)
+        # Export CSV avec séparateur point-virgule (meilleur pour Excel français), lignes produites
+        # à la volée dans l'ordre et sous les noms de colonnes du client (mêmes lignes que l'Excel).
+        # Fichier temporaire puis remplacement : output.csv, alimenté PDF par PDF pendant
+        # le lot (CSVResultSink), n'est jamais vu à moitié réécrit
         output_path = self.output_dir / output_filename
-        df.to_csv(output_path, index=False, encoding='utf-8-sig', sep=';')
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
+        count = write_export_csv(iter_export_rows(all_properties), tmp_path)
+        os.replace(tmp_path, output_path)
         
+        files = len({prop.get('fichier_source', '') for prop in all_properties})
         logger.info(f"📊 Données CSV exportées vers {output_path} (séparateur: ;)")
-        logger.info(f"📈 Total: {len(all_properties)} propriété(s) dans {len(df['Fichier source'].unique())} fichier(s)")
+        logger.info(f"📈 Total: {count} propriété(s) dans {files} fichier(s)")
         
         return output_path
 
 
+def run_queue_worker(queue_path=None, input_dir: str = "input", output_dir: str = "output",
+                     worker_id: Optional[str] = None, max_jobs: Optional[int] = None, idle_exit: bool = False,
+                     idle_sleep: float = JOB_IDLE_SLEEP, lease_seconds: float = JOB_LEASE_SECONDS,
+                     extractor: Optional[PDFPropertyExtractor] = None) -> int:
+    """
+    Worker permanent : réserve les travaux de la file un par un et les traite avec
+    process_like_make. L'extracteur (et son client OpenAI) est créé une seule fois.
+    
+    Args:
+        queue_path: File de travaux (par défaut JOB_QUEUE_FILE ou output/job_queue.sqlite)
+        max_jobs: Arrêt après ce nombre de travaux (None : sans limite)
+        idle_exit: Arrêt dès que la file est vide au lieu d'attendre de nouveaux travaux
+    
+    Returns:
+        Nombre de travaux traités
+    """
+    extractor = extractor or PDFPropertyExtractor(input_dir, output_dir)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    processed = 0
+    with JobQueue(queue_path or extractor.job_queue_path(), lease_seconds=lease_seconds) as queue:
+        logger.info(f"👷 Worker {worker_id} démarré sur {queue.path}")
+        while max_jobs is None or processed < max_jobs:
+            job = queue.claim(worker_id)
+            if job is None:
+                if idle_exit:
+                    break
+                time.sleep(idle_sleep)
+                continue
+            
+            logger.info(f"📬 [{worker_id}] Travail {job.id} ({job.lane}, tentative {job.attempts}): {job.pdf_path.name}")
+            with queue.keep_alive(job, worker_id):
+                try:
+                    properties, error = process_claimed_pdf(extractor, job.pdf_path)
+                except KeyboardInterrupt:
+                    queue.fail(job, worker_id, "interrompu")
+                    raise
+            
+            if error:
+                statut = queue.fail(job, worker_id, error)
+                logger.warning(f"⚠️ [{worker_id}] Travail {job.id} en échec ({statut}): {error}")
+            elif queue.complete(job, worker_id, properties):
+                logger.info(f"✅ [{worker_id}] Travail {job.id} terminé: {len(properties)} lignes")
+            else:
+                logger.warning(f"⚠️ [{worker_id}] Bail du travail {job.id} perdu, résultat ignoré")
+            processed += 1
+    logger.info(f"👷 Worker {worker_id} arrêté après {processed} travail(aux) - mémoire: {extractor.memory.describe()}"
+                f" - délais dépassés: {extractor.timeouts.describe()}")
+    return processed
+
+def process_claimed_pdf(extractor: PDFPropertyExtractor, pdf_path: Path) -> tuple:
+    """Traitement d'un PDF réservé par un worker : (lignes, erreur ou None), exceptions converties en erreur."""
+    try:
+        if not pdf_path.exists():
+            return [], f"Fichier introuvable: {pdf_path}"
+        properties = extractor.process_like_make(pdf_path)
+        return properties, extractor.last_pdf_error
+    except KeyboardInterrupt:
+        raise
+    except Exception as e:
+        return [], str(e)
+
+def run_shared_worker(shared_dir=None, input_dir: str = "input", output_dir: str = "output",
+                      worker_id: Optional[str] = None, max_jobs: Optional[int] = None, idle_exit: bool = False,
+                      idle_sleep: float = JOB_IDLE_SLEEP, lease_seconds: float = SHARED_LEASE_SECONDS,
+                      extractor: Optional[PDFPropertyExtractor] = None) -> int:
+    """
+    Worker à vol de travail (SharedWorkDir) : parcourt input_dir, réserve chaque PDF libre
+    ou abandonné, le traite avec process_like_make et publie ses lignes dans le dossier
+    partagé. Autant de workers que voulu, sur autant de machines que voulu, sans serveur.
+    
+    Args:
+        shared_dir: Dossier partagé (par défaut SHARED_WORK_DIR ou output/partage)
+        max_jobs: Arrêt après ce nombre de PDF (None : sans limite)
+        idle_exit: Arrêt quand tous les PDF sont terminés ou en échec
+    
+    Returns:
+        Nombre de PDF traités
+    """
+    extractor = extractor or PDFPropertyExtractor(input_dir, output_dir)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    shared = SharedWorkDir(shared_dir or extractor.shared_work_dir(), lease_seconds)
+    # Point de départ propre au worker : les workers ne se disputent pas les mêmes PDF
+    offset = int(hashlib.blake2b(worker_id.encode('utf-8'), digest_size=4).hexdigest(), 16)
+    processed = 0
+    logger.info(f"🤝 Worker {worker_id} démarré sur {shared.path}")
+    while max_jobs is None or processed < max_jobs:
+        pdf_files = extractor.list_pdf_files()
+        if pdf_files:
+            start = offset % len(pdf_files)
+            pdf_files = pdf_files[start:] + pdf_files[:start]
+        claimed = False
+        for pdf_path in pdf_files:
+            if max_jobs is not None and processed >= max_jobs:
+                break
+            lease = shared.claim(pdf_path, worker_id)
+            if lease is None:
+                continue
+            claimed = True
+            logger.info(f"🤝 [{worker_id}] {pdf_path.name} (tentative {lease.attempts})")
+            with shared.keep_alive(lease):
+                try:
+                    properties, error = process_claimed_pdf(extractor, pdf_path)
+                except KeyboardInterrupt:
+                    shared.fail(lease, "interrompu")
+                    raise
+            if error:
+                statut = shared.fail(lease, error)
+                logger.warning(f"⚠️ [{worker_id}] {pdf_path.name} en échec ({statut}): {error}")
+            elif shared.complete(lease, properties):
+                logger.info(f"✅ [{worker_id}] {pdf_path.name}: {len(properties)} lignes publiées")
+            else:
+                logger.warning(f"⚠️ [{worker_id}] Bail de {pdf_path.name} perdu, résultat ignoré")
+            processed += 1
+        if not claimed:
+            counts = shared.counts(pdf_files)
+            if idle_exit and counts[CHECKPOINT_PENDING] == counts[CHECKPOINT_RUNNING] == 0:
+                break
+            time.sleep(idle_sleep)
+    logger.info(f"🤝 Worker {worker_id} arrêté après {processed} PDF - mémoire: {extractor.memory.describe()}"
+                f" - délais dépassés: {extractor.timeouts.describe()}")
+    return processed
+
+def start_queue_workers(count: int, target=run_queue_worker, **worker_kwargs) -> List[multiprocessing.Process]:
+    """Lance `count` processus workers (run_queue_worker ou run_shared_worker) et les renvoie démarrés."""
+    processes = [multiprocessing.Process(target=target, kwargs=worker_kwargs, name=f"{target.__name__}-{index}")
+                 for index in range(1, count + 1)]
+    for process in processes:
+        process.start()
+    return processes
+
+def print_queue_status(stats: Dict) -> None:
+    counts = stats['counts']
+    print(f"📬 File: {stats['depth']} en attente, {counts[CHECKPOINT_RUNNING]} en cours, "
+          f"{counts[CHECKPOINT_DONE]} terminé(s), {counts[CHECKPOINT_FAILED]} en échec")
+    print(f"⚡ Dernière heure: {stats['done_in_window']} PDF ({stats['per_minute']:.2f}/min), "
+          f"{stats['rows_in_window']} lignes, {stats['avg_seconds']:.1f}s par PDF")
+    for lane, depth in stats['depth_by_lane'].items():
+        latencies = stats['lanes'].get(lane)
+        detail = ''
+        if latencies:
+            detail = ', latence ' + ' / '.join(f"{name} {value:.1f}s" for name, value in latencies['latency'].items())
+            detail += f" ({latencies['done']} terminé(s), attente p50 {latencies['wait']['p50']:.1f}s)"
+        print(f"🛣️ Voie {lane}: {depth} en attente{detail}")
+    if stats['workers']:
+        print(f"👷 Workers actifs: {', '.join(stats['workers'])}")
+    for failure in stats['failures']:
+        print(f"❌ #{failure['id']} {Path(failure['chemin']).name} ({failure['tentatives']} tentative(s)): {failure['erreur']}")
+
 def main():
     """Fonction principale."""
+    import argparse
+
+    def shard_argument(spec):
+        try:
+            return parse_shard(spec)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+
+    parser = argparse.ArgumentParser(description="Extraction des propriétaires depuis les PDF cadastraux (input/ → output/)")
+    parser.add_argument('--resume', action='store_true',
+                        help="reprendre le lot interrompu sans retraiter les PDF déjà terminés")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="pipeline par étapes : rendu et tableaux des PDF suivants pendant les appels vision")
+    subparsers = parser.add_subparsers(dest='command')
+    enqueue_parser = subparsers.add_parser('enqueue', help="ajouter des PDF à la file de travaux")
+    enqueue_parser.add_argument('paths', nargs='+', help="PDF ou dossiers contenant des PDF")
+    enqueue_parser.add_argument('--lane', choices=JOB_LANES, default=JOB_DEFAULT_LANE,
+                                help="voie de priorité (interactive passe avant bulk)")
+    worker_parser = subparsers.add_parser('worker', help="lancer des workers permanents sur la file de travaux")
+    worker_parser.add_argument('--workers', type=int, default=int(os.getenv('QUEUE_WORKERS', '2')),
+                               help="nombre de processus workers")
+    worker_parser.add_argument('--idle-exit', action='store_true', help="s'arrêter quand la file est vide")
+    run_parser = subparsers.add_parser('run', help="traiter input/ (commande par défaut), éventuellement un seul shard")
+    run_parser.add_argument('--resume', action='store_true', default=argparse.SUPPRESS,
+                            help="reprendre le lot interrompu sans retraiter les PDF déjà terminés")
+    run_parser.add_argument('--pipeline', action='store_true', default=argparse.SUPPRESS,
+                            help="pipeline par étapes : rendu et tableaux des PDF suivants pendant les appels vision")
+    run_parser.add_argument('--shard', type=shard_argument, metavar='i/N',
+                            help="ne traiter que le shard i sur N (partition par contenu des PDF)")
+    merge_parser = subparsers.add_parser('merge', help="fusionner les shards terminés et écrire les exports finaux")
+    merge_parser.add_argument('--shards', type=int, help="nombre de shards N (déduit s'il n'y a qu'un découpage)")
+    merge_parser.add_argument('--shared', nargs='?', const='', metavar='DOSSIER',
+                              help="fusionner les résultats des workers `steal` (dossier partagé) au lieu des shards")
+    steal_parser = subparsers.add_parser('steal', help="workers à vol de travail sur un dossier partagé entre machines")
+    steal_parser.add_argument('--workers', type=int, default=int(os.getenv('QUEUE_WORKERS', '2')),
+                              help="nombre de processus workers sur cette machine")
+    steal_parser.add_argument('--idle-exit', action='store_true', help="s'arrêter quand tous les PDF sont traités")
+    steal_parser.add_argument('--shared', metavar='DOSSIER', help="dossier partagé (SHARED_WORK_DIR, par défaut output/partage)")
+    status_parser = subparsers.add_parser('status', help="état de la file : profondeur, débit, échecs")
+    cache_parser = subparsers.add_parser('cache', help="cache des résultats par contenu de PDF : état, invalidation, éviction")
+    cache_parser.add_argument('action', choices=('stats', 'invalidate', 'prune', 'clear', 'evict'),
+                              help="invalidate: entrées des PDF donnés ; prune: autres versions ; evict: au-delà de --max-mb")
+    cache_parser.add_argument('paths', nargs='*', help="PDF ou dossiers contenant des PDF (invalidate)")
+    cache_parser.add_argument('--max-mb', type=float, help="taille maximale pour evict (RESULT_CACHE_MAX_MB par défaut)")
+    watch_parser = subparsers.add_parser('watch', help="surveiller input/ et traiter chaque PDF déposé")
+    watch_parser.add_argument('--interval', type=float, default=WATCH_POLL_INTERVAL, help="secondes entre deux examens")
+    watch_parser.add_argument('--settle', type=float, default=WATCH_SETTLE_SECONDS,
+                              help="secondes sans changement avant de traiter un fichier")
+    for subparser in (enqueue_parser, worker_parser, status_parser):
+        subparser.add_argument('--queue', help="file de travaux (JOB_QUEUE_FILE, par défaut output/job_queue.sqlite)")
+    args = parser.parse_args()
+    
     # Charger les variables d'environnement
     load_dotenv()
     
-    # Créer et lancer l'extracteur
-    extractor = PDFPropertyExtractor()
-    extractor.run()
+    if args.command == 'enqueue':
+        pdf_files = []
+        for path in map(Path, args.paths):
+            pdf_files.extend(sorted(path.glob("*.pdf")) if path.is_dir() else [path])
+        with JobQueue(args.queue or default_job_queue_path()) as queue:
+            ids = queue.enqueue(pdf_files, lane=args.lane)
+            print(f"📬 {len(ids)} PDF dans la file, voie {args.lane} ({queue.stats()['depth']} en attente)")
+    elif args.command == 'status':
+        with JobQueue(args.queue or default_job_queue_path()) as queue:
+            print_queue_status(queue.stats())
+    elif args.command == 'cache':
+        cache = ResultCache(default_result_cache_dir())
+        if args.action == 'invalidate':
+            pdf_files = []
+            for path in map(Path, args.paths):
+                pdf_files.extend(sorted(path.glob("*.pdf")) if path.is_dir() else [path])
+            print(f"🗃️ {cache.invalidate(pdf_files)} entrée(s) invalidée(s) pour {len(pdf_files)} PDF")
+        elif args.action == 'prune':
+            print(f"🗃️ {cache.prune()} entrée(s) d'autres versions supprimée(s)")
+        elif args.action == 'clear':
+            print(f"🗃️ Cache vidé: {cache.clear()} entrée(s) supprimée(s)")
+        elif args.action == 'evict':
+            max_bytes = int(args.max_mb * 2 ** 20) if args.max_mb is not None else None
+            print(f"🗃️ {cache.evict(max_bytes)} entrée(s) évincée(s)")
+        stats = cache.stats()
+        print(f"🗃️ Cache {cache.path} (version {stats['version']}): {stats['entries']} entrée(s), "
+              f"{stats['bytes'] / 2 ** 20:.1f} Mo sur {stats['max_bytes'] / 2 ** 20:.0f} Mo")
+        for version, counts in stats['versions'].items():
+            print(f"   {version}: {counts['entries']} entrée(s), {counts['bytes'] / 2 ** 20:.1f} Mo")
+    elif args.command == 'worker':
+        processes = start_queue_workers(args.workers, queue_path=args.queue, idle_exit=args.idle_exit)
+        for process in processes:
+            process.join()
+    elif args.command == 'watch':
+        PDFPropertyExtractor().watch(poll_interval=args.interval, settle_seconds=args.settle)
+    elif args.command == 'merge':
+        extractor = PDFPropertyExtractor()
+        if args.shared is not None:
+            merged = extractor.merge_shared_results(args.shared or None)
+        else:
+            merged = extractor.merge_shards(args.shards)
+        if not merged:
+            sys.exit(1)
+    elif args.command == 'steal':
+        processes = start_queue_workers(args.workers, target=run_shared_worker, shared_dir=args.shared,
+                                        idle_exit=args.idle_exit)
+        for process in processes:
+            process.join()
+    else:
+        # Créer et lancer l'extracteur
+        extractor = PDFPropertyExtractor()
+        extractor.run(resume=args.resume, shard=getattr(args, 'shard', None), pipeline=args.pipeline)
 
 
 if __name__ == "__main__":
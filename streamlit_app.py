@@ -9,7 +9,7 @@ import streamlit as st
 import tempfile
 import pandas as pd
 from pathlib import Path
-from pdf_extractor import PDFPropertyExtractor
+from pdf_extractor import PDFPropertyExtractor, properties_to_dataframe, write_export_xlsx, is_timeout_error
 import os
 import io
 import logging
@@ -148,39 +148,11 @@ def initialize_extractor(temp_dir):
     )
 
 def create_excel_download(df, filename):
-    """Crée un fichier Excel téléchargeable."""
+    """Crée un fichier Excel téléchargeable (écriture en flux, en-têtes stylés)."""
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Données Cadastrales')
-        
-        # Formatter le fichier Excel
-        workbook = writer.book
-        worksheet = writer.sheets['Données Cadastrales']
-        
-        # Style pour les en-têtes (pour compatibilité)
-        try:
-            from openpyxl.styles import Font, PatternFill, Border, Side
-            
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            
-            # Appliquer le style aux en-têtes
-            for col_num, value in enumerate(df.columns.values, 1):
-                cell = worksheet.cell(row=1, column=col_num)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.border = border
-                worksheet.column_dimensions[cell.column_letter].width = 15
-        except ImportError:
-            # Fallback si openpyxl n'a pas les styles
-            pass
-    
+    rows = ([None if pd.isna(value) else value for value in row]
+            for row in df.itertuples(index=False, name=None))
+    write_export_xlsx(rows, output, headers=list(df.columns))
     return output.getvalue()
 
 def main():
@@ -323,6 +295,9 @@ def main():
                                     st.error(f"Erreur diagnostic: {e}")
                             
                             properties = extractor.process_like_make(pdf_file)
+                            if is_timeout_error(extractor.last_pdf_error):
+                                # PDF abandonné à l'expiration de son délai : les suivants sont traités
+                                st.warning(f"⏱️ {pdf_file.name}: {extractor.last_pdf_error} - PDF ignoré")
                             all_properties.extend(properties)
                         
                         # ✅ CORRECTION 7: Stockage sécurisé des résultats
@@ -361,7 +336,7 @@ def main():
                         st.info("Résultats conservés. Vous pouvez les télécharger ci-dessous.")
         
         # Préparation des données
-        df = pd.DataFrame(st.session_state.extraction_results)
+        df = properties_to_dataframe(st.session_state.extraction_results)
         
         # Colonnes d'affichage
         display_columns = [
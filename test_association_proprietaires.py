@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Test de l'association indexée propriétaires ↔ parcelles (sans produit cartésien tronqué)
+"""
+
+import time
+import logging
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+import pdf_extractor
+from pdf_extractor import PDFPropertyExtractor, OwnerParcelAssociation, MemoryGovernor, RESULT_ROW_BYTES
+
+def make_owners(count):
+    return [
+        {'nom': f'MARTIN{chr(65 + i % 26)}', 'prenom': 'JEAN', 'department': '89', 'commune': '238',
+         'numero_proprietaire': f'M{i:05d}', 'street_address': '12 RUE DE LA PAIX',
+         'post_code': '89000', 'city': 'AUXERRE', 'droit_reel': 'PP' if i % 2 else 'US'}
+        for i in range(count)
+    ]
+
+def make_props(count):
+    return [
+        {'Sec': '302A' if i % 3 == 0 else 'ZY', 'N° Plan': str(i + 1), 'Adresse': '' if i % 7 == 6 else 'LES GRANDS CHAMPS',
+         'HA': '' if i % 2 else '1', 'A': '25', 'CA': '40'}
+        for i in range(count)
+    ]
+
+def ancienne_double_boucle(extractor, owners, structured_data, pdf_type):
+    """Référence : fusion par double boucle (sans la troncature à 100 combinaisons)."""
+    if pdf_type == "single_owner":
+        owners = [extractor.select_main_owner(owners)]
+    rows = []
+    for prop_type, props in (('non_batie', structured_data['non_batie']), ('batie', structured_data['prop_batie'])):
+        for owner in owners:
+            for prop in props:
+                if prop.get('Adresse'):
+                    unique_id = extractor.generate_id_with_openai_like_make(owner, prop)
+                    rows.append(extractor.merge_like_make(owner, prop, unique_id, prop_type, 'test.pdf'))
+    return rows
+
+def test_identique_double_boucle():
+    print("🧪 TEST ASSOCIATION INDEXÉE = DOUBLE BOUCLE")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    logging.disable(logging.INFO)
+    try:
+        # Sans MAJIC côté parcelle : indivision, tous les propriétaires sur toutes les parcelles
+        for owners_count, props_count, pdf_type in [(3, 10, "multiple_owners"), (12, 40, "multiple_owners"), (4, 15, "single_owner")]:
+            owners = make_owners(owners_count)
+            structured = {'non_batie': make_props(props_count), 'prop_batie': make_props(props_count // 2)}
+            obtenu = list(extractor.merge_owners_and_parcels(owners, structured, pdf_type, 'test.pdf'))
+            attendu = ancienne_double_boucle(extractor, owners, structured, pdf_type)
+            assert obtenu == attendu
+            print(f"  ✅ {owners_count} propriétaires × {props_count} parcelles ({pdf_type}): {len(obtenu)} lignes identiques")
+
+        # Propriétaires seuls (pas de tableaux)
+        owners = make_owners(3)
+        rows = list(extractor.merge_owners_and_parcels(owners, {}, "multiple_owners", 'test.pdf'))
+        assert [row['type_propriete'] for row in rows] == ['owners_only'] * 3
+        assert list(extractor.merge_owners_and_parcels([], {'non_batie': make_props(3)}, "multiple_owners", 'test.pdf')) == []
+        print("  ✅ Propriétaires seuls et absence de propriétaires")
+    finally:
+        logging.disable(logging.NOTSET)
+    return True
+
+def test_appariement_majic_et_droit():
+    print("\n🧪 TEST APPARIEMENT PAR MAJIC / DROIT RÉEL")
+    print("=" * 50)
+
+    owners = make_owners(4)
+    parcels = [
+        {'Sec': 'A', 'N° Plan': '1', 'N° MAJIC': 'm00002'},      # MAJIC (casse ignorée) → propriétaire 2
+        {'Sec': 'A', 'N° Plan': '2', 'Droit réel': 'US'},        # droit réel → propriétaires 0 et 2
+        {'Sec': 'A', 'N° Plan': '3', 'N° MAJIC': 'INCONNU'},     # MAJIC inconnu → indivision
+        {'Sec': 'A', 'N° Plan': '4'},                            # rien → indivision
+    ]
+    association = OwnerParcelAssociation(owners)
+    association.add_parcels(parcels, 'non_batie')
+    pairs = list(association.iter_pairs())
+    print(f"  Appariements: {pairs}")
+    assert pairs == [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 0), (2, 1), (2, 2), (2, 3), (3, 2), (3, 3)]
+    assert len(association) == len(pairs)
+    assert association.stats == {'majic': 1, 'droit_reel': 1, 'indivision': 2}
+    print("  ✅ MAJIC prioritaire, puis droit réel, sinon indivision")
+
+    # Fusion multi-pages : parcelle avec droit réel NP rattachée aux seuls nus-propriétaires
+    extractor = PDFPropertyExtractor()
+    page_data = [
+        {'nom': 'DUPONT', 'prenom': 'PIERRE', 'numero_majic': 'M00001', 'droit_reel': 'US', 'department': '89', 'commune': '238'},
+        {'nom': 'DURAND', 'prenom': 'MARIE', 'numero_majic': 'M00002', 'droit_reel': 'NP'},
+        {'section': 'ZY', 'numero': '12', 'droit_reel': 'NP'},
+        {'section': 'ZY', 'numero': '13'},
+    ]
+    merged = extractor.smart_merge_multi_page_data(page_data, 'test.pdf')
+    couples = sorted((row['nom'], row['numero']) for row in merged)
+    print(f"  Fusion multi-pages: {couples}")
+    assert couples == [('DUPONT', '13'), ('DURAND', '12'), ('DURAND', '13')]
+    print("  ✅ Fusion multi-pages appariée par droit réel")
+    return True
+
+def test_grande_indivision():
+    print("\n🧪 TEST GRANDE INDIVISION (sans troncature)")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    owners = make_owners(40)
+    structured = {'non_batie': make_props(700), 'prop_batie': make_props(140)}
+    expected_rows = 40 * sum(1 for props in structured.values() for prop in props if prop['Adresse'])
+
+    tracemalloc.start()
+    association = OwnerParcelAssociation(owners)
+    for prop_type, key in (('non_batie', 'non_batie'), ('batie', 'prop_batie')):
+        association.add_parcels([prop for prop in structured[key] if prop['Adresse']], prop_type)
+    index_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"  📦 Index d'appariements: {index_memory / 1e3:.0f} Ko pour {len(association)} couples")
+
+    logging.disable(logging.INFO)
+    try:
+        start = time.perf_counter()
+        rows = list(extractor.merge_owners_and_parcels(owners, structured, "multiple_owners", 'test.pdf'))
+        indexed_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reference = ancienne_double_boucle(extractor, owners, structured, "multiple_owners")
+        loop_time = time.perf_counter() - start
+    finally:
+        logging.disable(logging.NOTSET)
+
+    print(f"  ⏱️ Double boucle: {loop_time:.2f}s, association indexée: {indexed_time:.2f}s ({len(rows)} lignes)")
+    assert len(rows) == len(association) == expected_rows and rows == reference
+    assert index_memory < 200_000
+    print(f"  ✅ {len(rows)} lignes produites (ancienne limite: 100 combinaisons)")
+    return True
+
+def test_borne_lignes_document():
+    print("\n🧪 TEST MÉMOIRE RÉSERVÉE SELON LES APPARIEMENTS, BORNE PAR DOCUMENT")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    owners = make_owners(40)
+    # Une parcelle sur deux rattachée par droit réel aux seuls usufruitiers (20 propriétaires)
+    props = [dict(prop, **({'Droit réel': 'US'} if i % 2 else {})) for i, prop in enumerate(make_props(700))]
+    structured = {'non_batie': props, 'prop_batie': []}
+    governor = MemoryGovernor(budget_bytes=2 ** 40)
+    context = SimpleNamespace(memory=governor.reservation())
+
+    logging.disable(logging.INFO)
+    limite = pdf_extractor.MAX_DOCUMENT_ROWS
+    try:
+        rows = extractor.merge_owners_and_parcels(owners, structured, "multiple_owners", 'test.pdf', context=context)
+        reserve = context.memory.nbytes
+        count = sum(1 for _ in rows)
+        print(f"  📦 {count} lignes, {reserve / 2 ** 20:.1f} Mo réservés "
+              f"(produit complet: {40 * 600 * RESULT_ROW_BYTES / 2 ** 20:.1f} Mo)")
+        assert reserve == count * RESULT_ROW_BYTES and count < 40 * 600
+
+        assert extractor.oversized_pdfs == {}
+
+        # Au-delà de la borne : premières lignes conservées, réservation bornée, PDF signalé
+        pdf_extractor.MAX_DOCUMENT_ROWS = count - 10
+        context.memory.release()
+        rows = list(extractor.merge_owners_and_parcels(owners, structured, "multiple_owners", 'test.pdf',
+                                                       context=context))
+        print(f"  ✂️ {len(rows)} lignes conservées sur {count}, signalés: {extractor.oversized_pdfs}")
+        assert len(rows) == count - 10 and context.memory.nbytes == (count - 10) * RESULT_ROW_BYTES
+        assert extractor.oversized_pdfs == {'test.pdf': count}
+        assert not extractor.cacheable_result(Path('test.pdf'), rows, None, [])
+    finally:
+        pdf_extractor.MAX_DOCUMENT_ROWS = limite
+        logging.disable(logging.NOTSET)
+    print("  ✅ Réservation = lignes appariées, document hors borne tronqué et signalé")
+    return True
+
+if __name__ == "__main__":
+    test_identique_double_boucle()
+    test_appariement_majic_et_droit()
+    test_grande_indivision()
+    test_borne_lignes_document()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test du budget mémoire (réservations, contre-pression sur les rendus, usage courant et pic)
+"""
+
+import time
+import logging
+import tempfile
+import threading
+import concurrent.futures
+from pathlib import Path
+import fitz
+from pdf_extractor import (PDFPropertyExtractor, MemoryGovernor, render_memory_estimate, fingerprint_pdf,
+                           document_context)
+
+def creer_pdf(path, pages=3):
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page(width=100, height=140)
+        for line in range(8):
+            page.insert_text((5, 12 + 15 * line), f"RELEVÉ DE PROPRIÉTÉ {path.stem} {number + 1}", fontsize=5)
+    doc.save(path)
+    doc.close()
+    return path
+
+def make_props(count):
+    return [{'Sec': 'ZY', 'N° Plan': str(i + 1), 'Adresse': 'LES GRANDS CHAMPS', 'HA': '', 'A': '25', 'CA': '40'}
+            for i in range(count)]
+
+def test_reservations():
+    print("🧪 TEST RÉSERVATIONS ET CONTRE-PRESSION")
+    print("=" * 50)
+
+    governor = MemoryGovernor(100)
+    governor.acquire(60)
+    ordre = []
+
+    def reserver(nom, nbytes):
+        governor.acquire(nbytes)
+        ordre.append(nom)
+
+    gros = threading.Thread(target=reserver, args=("gros", 60))
+    gros.start()
+    time.sleep(0.05)
+    # Le petit tiendrait dans le budget mais passe après le gros arrivé avant lui
+    petit = threading.Thread(target=reserver, args=("petit", 10))
+    petit.start()
+    time.sleep(0.05)
+    assert ordre == [] and governor.stats()['waiting'] == 2
+    governor.release(60)
+    gros.join()
+    petit.join()
+    stats = governor.stats()
+    print(f"  📊 {stats}")
+    assert ordre == ["gros", "petit"] and stats['used'] == 70 and stats['peak'] == 70 and stats['waits'] == 2
+    print("  ✅ Attente quand le budget est épuisé, ordre d'arrivée respecté")
+
+    governor = MemoryGovernor(100)
+    governor.acquire(500)
+    assert governor.stats()['overcommits'] == 1
+    governor.release(500)
+    reservation = governor.reservation()
+    reservation.resize(80)
+    autre = governor.reservation()
+    autre.resize(10)
+    autre.grow(50)  # Réservation non vide : grandit sans attendre (pas d'interblocage)
+    assert governor.used == 140
+    reservation.release()
+    autre.release()
+    assert governor.used == 0 and governor.peak == 500
+    print("  ✅ Demande plus grande que le budget servie seule, réservation non vide jamais bloquée")
+    return True
+
+def test_rendus_bornes(documents=8):
+    print(f"\n🧪 TEST {documents} PDF EN PARALLÈLE SOUS UN BUDGET DE DEUX DOCUMENTS")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "input").mkdir()
+        pdfs = [creer_pdf(Path(tmp) / "input" / f"doc{i}.pdf") for i in range(documents)]
+        profile = fingerprint_pdf(pdfs[0])
+        par_document = render_memory_estimate(pdfs[0], profile['render_zoom'], profile['page_workers'])
+        print(f"  📐 Estimation par document: {par_document / 1024:.0f} Ko")
+
+        def executer(budget):
+            extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+            extractor.memory = MemoryGovernor(budget)
+            depassements = []
+
+            def appel_api(base64_image, page_num):
+                if extractor.memory.used > extractor.memory.budget:
+                    depassements.append(extractor.memory.used)
+                time.sleep(0.05)
+                return [{'nom': 'MARTIN', 'prenom': 'JEAN', 'department': '89', 'commune': '238', 'droit_reel': 'PP'},
+                        {'nom': 'DURAND', 'prenom': 'MARIE', 'department': '89', 'commune': '238', 'droit_reel': 'PP'}]
+
+            extractor.extract_tables_with_pdfplumber = lambda path: {'non_batie': make_props(3), 'prop_batie': []}
+            extractor.extract_with_ultra_directive_prompt = appel_api
+            extractor.validate_complete_extraction = lambda owners, filename: owners
+            extractor.get_header_location = lambda path: {'department': '89', 'commune': '238'}
+            logging.disable(logging.WARNING)
+            try:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=documents) as executor:
+                    resultats = list(executor.map(extractor.process_like_make, pdfs))
+            finally:
+                logging.disable(logging.NOTSET)
+            return resultats, extractor.memory.stats(), depassements
+
+        libres, sans_limite, _ = executer(100 * par_document)
+        bornes, stats, depassements = executer(2 * par_document)
+        print(f"  🧠 Sans contrainte: pic {sans_limite['peak'] / 1024:.0f} Ko ; "
+              f"budget {stats['budget'] / 1024:.0f} Ko: pic {stats['peak'] / 1024:.0f} Ko, {stats['waits']} attente(s)")
+        assert sans_limite['peak'] > stats['budget']
+        assert stats['peak'] <= stats['budget'] and not depassements and stats['waits'] > 0
+        assert stats['used'] == 0 and sans_limite['used'] == 0
+        assert [len(rows) for rows in bornes] == [len(rows) for rows in libres] == [18] * documents
+        print("  ✅ Rendus retardés quand le budget est atteint, mêmes résultats, mémoire rendue en fin de PDF")
+    return True
+
+def test_memoire_rendue_en_cas_d_erreur():
+    print("\n🧪 TEST MÉMOIRE RENDUE EN CAS D'ERREUR")
+    print("=" * 50)
+
+    governor = MemoryGovernor(10 ** 6)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = creer_pdf(Path(tmp) / "doc.pdf")
+        try:
+            with document_context(pdf, governor=governor) as context:
+                context.memory.resize(1000)
+                raise RuntimeError("échec du PDF")
+        except RuntimeError:
+            pass
+    assert governor.used == 0 and governor.peak == 1000
+    print("  ✅ Réservation du document libérée à la sortie du contexte")
+    return True
+
+if __name__ == "__main__":
+    test_reservations()
+    test_rendus_bornes()
+    test_memoire_rendue_en_cas_d_erreur()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Test du cache de résultats par contenu (SHA-256 du PDF + version, invalidation, éviction)
+"""
+
+import os
+import sys
+import time
+import logging
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+import fitz
+import pandas as pd
+from pdf_extractor import (PDFPropertyExtractor, ResultCache, PropertyRecord, pdf_sha256, RESULT_CACHE_VERSION)
+
+def make_rows(pdf_name, count=3, start=0):
+    return [PropertyRecord(department='89', commune='238', section='ZY', numero=str(i), id=f"89238000ZY{i:04d}",
+                           nom=f'MARTIN{i}', prenom='JEAN', droit_reel='PP', fichier_source=pdf_name)
+            for i in range(start, start + count)]
+
+def creer_pdf(path, pages=1):
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page(width=100, height=140)
+        for line in range(8):
+            page.insert_text((5, 12 + 15 * line), f"RELEVÉ DE PROPRIÉTÉ {path.stem} {number + 1}", fontsize=5)
+    doc.save(path)
+    doc.close()
+    return path
+
+def ecrire(path, contenu):
+    path.write_bytes(b"%PDF-1.4 " + contenu.encode())
+    return path
+
+def test_relance_avec_nouveaux_fichiers():
+    print("🧪 TEST RELANCE D'UN DOSSIER AVEC DE NOUVEAUX FICHIERS")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        for index in range(3):
+            ecrire(extractor.input_dir / f"doc{index}.pdf", f"contenu {index}")
+        traites = []
+
+        def process(pdf_path):
+            extractor.last_pdf_error = None
+            traites.append(pdf_path.name)
+            if pdf_path.name == "echec.pdf":
+                extractor.last_pdf_error = "quota API dépassé"
+                return []
+            return make_rows(pdf_path.name, start=10 * int(pdf_path.stem[3]))
+
+        extractor.list_pdf_files = lambda: sorted(extractor.input_dir.glob("*.pdf"))
+        extractor.analyze_pdf_batch = lambda files: {'approach': 'mixed_adaptive'}
+        extractor.process_like_make = process
+        logging.disable(logging.WARNING)
+        try:
+            extractor.run()
+            assert sorted(traites) == ["doc0.pdf", "doc1.pdf", "doc2.pdf"]
+
+            # Deux nouveaux PDF, un PDF renommé, un PDF en échec
+            traites.clear()
+            ecrire(extractor.input_dir / "doc3.pdf", "contenu 3")
+            (extractor.input_dir / "doc2.pdf").rename(extractor.input_dir / "doc2_renomme.pdf")
+            ecrire(extractor.input_dir / "echec.pdf", "contenu échec")
+            extractor.run()
+            assert sorted(traites) == ["doc3.pdf", "echec.pdf"]
+
+            # Un échec n'est pas mis en cache : retraité à la relance suivante
+            traites.clear()
+            extractor.run()
+            assert traites == ["echec.pdf"]
+        finally:
+            logging.disable(logging.NOTSET)
+
+        sortie = pd.read_csv(extractor.output_dir / "output.csv", sep=';', dtype=str, encoding='utf-8-sig')
+        assert sorted(sortie['Fichier source'].unique()) == ["doc0.pdf", "doc1.pdf", "doc2_renomme.pdf", "doc3.pdf"]
+        assert len(sortie) == 12
+        print(f"  🗃️ {extractor.result_cache.describe()}")
+        print("  ✅ Seuls les nouveaux contenus sont traités, lignes d'un PDF renommé rattachées à son nouveau nom")
+    return True
+
+def test_version_et_invalidation():
+    print("\n🧪 TEST VERSION DU PIPELINE ET INVALIDATION")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        a = ecrire(Path(tmp) / "a.pdf", "a")
+        b = ecrire(Path(tmp) / "b.pdf", "b")
+        copie = ecrire(Path(tmp) / "copie_de_a.pdf", "a")
+        assert pdf_sha256(a) == pdf_sha256(copie) != pdf_sha256(b)
+
+        ancien = ResultCache(Path(tmp) / "cache", version="pipeline0-prompts0")
+        ancien.put(a, make_rows(a.name))
+        cache = ResultCache(Path(tmp) / "cache")
+        assert cache.get(a) is None and cache.misses == 1
+        cache.put(a, make_rows(a.name))
+        cache.put(b, make_rows(b.name, count=2))
+        assert len(cache.get(copie)) == 3 and cache.hits == 1
+        assert cache.stats()['versions'][RESULT_CACHE_VERSION]['entries'] == 2
+
+        assert cache.prune() == 1 and list(cache.stats()['versions']) == [RESULT_CACHE_VERSION]
+        assert cache.invalidate([copie]) == 1 and cache.get(a) is None and cache.get(b) is not None
+        assert cache.clear() == 1 and cache.stats()['entries'] == 0
+        print("  ✅ Autre version non servie puis supprimée, invalidation par contenu, vidage")
+    return True
+
+def test_ecritures_concurrentes():
+    print("\n🧪 TEST MÊME CONTENU MIS EN CACHE PAR PLUSIEURS WORKERS EN MÊME TEMPS")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = ecrire(Path(tmp) / "a.pdf", "a")
+        copie = ecrire(Path(tmp) / "copie_de_a.pdf", "a")
+        erreurs = []
+
+        def worker(path):
+            cache = ResultCache(Path(tmp) / "cache")
+            try:
+                for _ in range(200):
+                    cache.put(path, make_rows(path.name, count=50))
+            except Exception as e:
+                erreurs.append(e)
+
+        threads = [threading.Thread(target=worker, args=(path,)) for path in (pdf, copie) * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        cache = ResultCache(Path(tmp) / "cache")
+        print(f"  🗃️ {len(threads)} workers, erreurs: {erreurs[:1]}")
+        assert not erreurs and len(cache.get(pdf)) == 50
+        assert [path.name for path in cache.version_dir.iterdir()] == [f"{pdf_sha256(pdf)}.json"]
+        print("  ✅ Aucun fichier temporaire partagé, une seule entrée complète")
+    return True
+
+def test_eviction_moins_recemment_utilises():
+    print("\n🧪 TEST ÉVICTION PAR TAILLE (MOINS RÉCEMMENT UTILISÉS)")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(Path(tmp) / "cache")
+        pdfs = [ecrire(Path(tmp) / f"doc{i}.pdf", f"doc {i}") for i in range(5)]
+        maintenant = time.time()
+        for age, pdf in zip(range(5, 0, -1), pdfs):
+            entry = cache.put(pdf, make_rows(pdf.name, count=10))
+            os.utime(entry, (maintenant - age * 60, maintenant - age * 60))
+        taille = cache.stats()['bytes'] // 5
+        # doc0, le plus ancien, vient d'être relu
+        assert cache.get(pdfs[0]) is not None
+
+        assert cache.evict(taille * 3) == 2
+        restants = [pdf.name for pdf in pdfs if cache.get(pdf) is not None]
+        print(f"  🗃️ Entrées conservées: {restants}")
+        assert restants == ["doc0.pdf", "doc3.pdf", "doc4.pdf"] and cache.stats()['bytes'] <= taille * 3
+        assert cache.evict() == 0
+        print("  ✅ Entrées les moins récemment utilisées évincées au-delà de la taille maximale")
+    return True
+
+def test_pipeline_et_commande_cache():
+    print("\n🧪 TEST PIPELINE: AUCUN RENDU NI APPEL API POUR UN PDF EN CACHE, COMMANDE cache")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        pdfs = [creer_pdf(extractor.input_dir / f"doc{i}.pdf") for i in range(3)]
+        rendus, appels = [], []
+        pdf_to_images = extractor.pdf_to_images
+
+        def rendu(path, zoom=None):
+            rendus.append(path.name)
+            return pdf_to_images(path, zoom)
+
+        def appel_api(base64_image, page_num):
+            appels.append(page_num)
+            return [{'nom': 'MARTIN', 'prenom': 'JEAN', 'department': '89', 'commune': '238', 'droit_reel': 'PP'},
+                    {'nom': 'DURAND', 'prenom': 'MARIE', 'department': '89', 'commune': '238', 'droit_reel': 'PP'}]
+
+        extractor.list_pdf_files = lambda: sorted(extractor.input_dir.glob("*.pdf"))
+        extractor.pdf_to_images = rendu
+        extractor.extract_tables_with_pdfplumber = lambda path: {
+            'non_batie': [{'Sec': 'ZY', 'N° Plan': str(10 * pdfs.index(path) + i), 'Adresse': 'LES GRANDS CHAMPS',
+                           'HA': '', 'A': '25', 'CA': '40'} for i in range(1, 4)], 'prop_batie': []}
+        extractor.extract_with_ultra_directive_prompt = appel_api
+        extractor.validate_complete_extraction = lambda owners, filename: owners
+        extractor.get_header_location = lambda path: {'department': '89', 'commune': '238'}
+        logging.disable(logging.CRITICAL)
+        try:
+            extractor.run(pipeline=True)
+            premier = pd.read_csv(extractor.output_dir / "output.csv", sep=';', dtype=str, encoding='utf-8-sig')
+            assert len(rendus) == 3 and len(appels) == 3
+            rendus.clear()
+            appels.clear()
+            extractor.run(pipeline=True)
+        finally:
+            logging.disable(logging.NOTSET)
+        second = pd.read_csv(extractor.output_dir / "output.csv", sep=';', dtype=str, encoding='utf-8-sig')
+        assert rendus == [] and appels == [] and second.equals(premier) and len(second) == 18
+        print("  ✅ Relance du pipeline servie par le cache, export identique")
+
+        env = dict(os.environ, OPENAI_API_KEY=os.getenv('OPENAI_API_KEY', 'sk-test'))
+        script = str(Path(__file__).resolve().parent / "pdf_extractor.py")
+        sortie = subprocess.run([sys.executable, script, "cache", "invalidate", str(pdfs[0])], capture_output=True,
+                                text=True, check=True, env=env, cwd=tmp).stdout
+        print("  " + sortie.strip().replace("\n", "\n  "))
+        assert "1 entrée(s) invalidée(s)" in sortie and "2 entrée(s)" in sortie
+        sortie = subprocess.run([sys.executable, script, "cache", "evict", "--max-mb", "0"], capture_output=True,
+                                text=True, check=True, env=env, cwd=tmp).stdout
+        assert "2 entrée(s) évincée(s)" in sortie
+        print("  ✅ Commandes `cache invalidate` et `cache evict`")
+    return True
+
+class ClientQuota:
+    """Client OpenAI dont chaque requête échoue (quota dépassé)."""
+
+    def __init__(self):
+        self.appels = 0
+        self.chat = self.completions = self
+
+    def with_options(self, **options):
+        return self
+
+    def create(self, **request):
+        self.appels += 1
+        raise RuntimeError("Error code: 429 - rate limit exceeded")
+
+def test_echecs_api_non_mis_en_cache():
+    print("\n🧪 TEST QUOTA API DÉPASSÉ: AUCUN RÉSULTAT MIS EN CACHE")
+    print("=" * 50)
+
+    for pipeline in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+            pdfs = [creer_pdf(extractor.input_dir / f"doc{i}.pdf") for i in range(2)]
+            client = extractor.client = ClientQuota()
+            extractor.list_pdf_files = lambda: sorted(extractor.input_dir.glob("*.pdf"))
+            extractor.extract_tables_with_pdfplumber = lambda path: {
+                'non_batie': [{'Sec': 'ZY', 'N° Plan': str(10 * pdfs.index(path) + 1), 'Adresse': 'LES GRANDS CHAMPS',
+                               'HA': '', 'A': '25', 'CA': '40'}], 'prop_batie': []}
+            extractor.get_header_location = lambda path: {'department': '89', 'commune': '238'}
+            logging.disable(logging.CRITICAL)
+            try:
+                extractor.run(pipeline=pipeline)
+                premier = client.appels
+                extractor.run(pipeline=pipeline)
+            finally:
+                logging.disable(logging.NOTSET)
+            print(f"  📡 {'Pipeline' if pipeline else 'Lot'}: {premier} appel(s) API, puis {client.appels - premier} à la relance")
+            assert premier > 0 and client.appels - premier == premier
+            assert extractor.result_cache.stats()['entries'] == 0 and extractor.result_cache.hits == 0
+    print("  ✅ Relance après un quota dépassé : PDF retraités, rien servi depuis le cache")
+    return True
+
+if __name__ == "__main__":
+    test_relance_avec_nouveaux_fichiers()
+    test_version_et_invalidation()
+    test_ecritures_concurrentes()
+    test_eviction_moins_recemment_utilises()
+    test_pipeline_et_commande_cache()
+    test_echecs_api_non_mis_en_cache()
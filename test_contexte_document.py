@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test du contexte immuable par document (isolation par construction, PDF traités en parallèle)
+"""
+
+import time
+import base64
+import contextlib
+import logging
+import tempfile
+import threading
+import concurrent.futures
+from pathlib import Path
+import fitz
+from pdf_extractor import PDFPropertyExtractor, DocumentContext, document_context, DOCUMENT_WORKSPACE_PREFIX
+
+DOCUMENTS = {'auxerre': ('89', 'MARTIN'), 'reims': ('51', 'DURAND'), 'dijon': ('21', 'ROUSSEAU')}
+
+def creer_pdf(path):
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 60), f"RELEVÉ DE PROPRIÉTÉ - {path.stem.upper()}")
+    doc.save(path)
+    doc.close()
+
+def make_props(count):
+    return [{'Sec': 'ZY', 'N° Plan': str(i + 1), 'Adresse': 'LES GRANDS CHAMPS', 'HA': '', 'A': '25', 'CA': '40'}
+            for i in range(count)]
+
+def extracteur_simule(tmp, latence=0.05):
+    """Extracteur réel, étapes externes (pdfplumber, rendu, API, en-tête) simulées par document."""
+    extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+    extractor.result_cache = None  # Chaque PDF passe par l'extraction, même déjà vu
+    rendus = []
+
+    def rendu(path, zoom=None):
+        rendus.append(path.name)
+        time.sleep(latence)
+        return [path.stem.encode()]
+
+    def appel_api(base64_image, page_num):
+        time.sleep(latence)
+        dept, nom = DOCUMENTS[base64.b64decode(base64_image).decode()]
+        return [{'nom': nom, 'prenom': 'JEAN', 'department': dept, 'commune': '238', 'droit_reel': 'PP'},
+                {'nom': nom, 'prenom': 'MARIE', 'department': dept, 'commune': '238', 'droit_reel': 'PP'}]
+
+    def en_tete(path):
+        time.sleep(latence)
+        return {'department': DOCUMENTS[Path(path).stem][0], 'commune': '238'}
+
+    extractor.extract_tables_with_pdfplumber = lambda path: {'non_batie': make_props(3), 'prop_batie': []}
+    extractor.pdf_to_images = rendu
+    extractor.extract_with_ultra_directive_prompt = appel_api
+    extractor.validate_complete_extraction = lambda owners, filename: owners
+    extractor.get_header_location = en_tete
+    return extractor, rendus
+
+def test_contexte_immuable():
+    print("🧪 TEST CONTEXTE IMMUABLE ET ESPACE DE TRAVAIL")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = Path(tmp) / "auxerre.pdf"
+        creer_pdf(pdf)
+        with document_context(pdf) as context, document_context(pdf) as autre:
+            assert isinstance(context, DocumentContext) and context.name == "auxerre.pdf"
+            assert context.isolation_id != autre.isolation_id and context.workspace != autre.workspace
+            assert context.workspace.is_dir() and context.workspace.name.startswith(DOCUMENT_WORKSPACE_PREFIX)
+            for modification in (lambda: setattr(context, 'pdf_path', Path("autre.pdf")),
+                                 lambda: context.profile.__setitem__('engine', 'autre')):
+                try:
+                    modification()
+                    raise AssertionError("le contexte aurait dû être immuable")
+                except (AttributeError, TypeError):
+                    pass
+            assert context.cached('images', lambda: [b'page']) is context.cached('images', lambda: [])
+            (context.workspace / "page.png").write_bytes(b"x")
+            workspaces = [context.workspace, autre.workspace]
+        assert not any(workspace.exists() for workspace in workspaces)
+        print(f"  ✅ {context.isolation_id}: attributs et profil figés, caches propres au document")
+
+        try:
+            with document_context(pdf) as context:
+                raise RuntimeError("échec du PDF")
+        except RuntimeError:
+            pass
+        assert not context.workspace.exists()
+        print("  ✅ Espace de travail supprimé à la sortie, même en cas d'erreur")
+    return True
+
+def test_lot_sans_pause_ni_reinitialisation():
+    print("\n🧪 TEST LOT SANS PAUSE NI RÉINITIALISATION GLOBALE")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor, rendus = extracteur_simule(tmp, latence=0)
+        pdf_files = []
+        for index in range(6):
+            pdf = Path(tmp) / "input" / f"{list(DOCUMENTS)[index % 3]}.pdf"
+            if not pdf.exists():
+                creer_pdf(pdf)
+            pdf_files.append(pdf)
+        client = extractor.client
+        # Espaces de travail de ce test uniquement (le dossier temporaire global est partagé)
+        workspaces = []
+        ouvrir_contexte = extractor.open_document_context
+
+        @contextlib.contextmanager
+        def contexte_suivi(pdf_path):
+            with ouvrir_contexte(pdf_path) as context:
+                workspaces.append(context.workspace)
+                yield context
+
+        extractor.open_document_context = contexte_suivi
+        attributs = set(vars(extractor))
+
+        logging.disable(logging.WARNING)
+        try:
+            start = time.perf_counter()
+            properties = extractor.process_homogeneous_batch(pdf_files)
+            elapsed = time.perf_counter() - start
+        finally:
+            logging.disable(logging.NOTSET)
+
+        print(f"  ⏱️ {len(pdf_files)} PDF en {elapsed:.2f}s (ancien nettoyage: ≥ 0,5 s de pause par PDF)")
+        assert len(properties) == len(pdf_files) * 2 * 3 and rendus == [pdf.name for pdf in pdf_files]
+        assert extractor.client is client and set(vars(extractor)) == attributs
+        # Un espace de travail par PDF, distinct et supprimé après son traitement
+        assert len(set(workspaces)) == len(pdf_files)
+        assert all(workspace.name.startswith(DOCUMENT_WORKSPACE_PREFIX) for workspace in workspaces)
+        assert not any(workspace.exists() for workspace in workspaces)
+        print("  ✅ Client conservé, aucun attribut ajouté à l'extracteur, une seule conversion par PDF")
+    return True
+
+def test_documents_en_parallele():
+    print("\n🧪 TEST DOCUMENTS TRAITÉS EN PARALLÈLE")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor, _ = extracteur_simule(tmp)
+        pdf_files = []
+        for name in DOCUMENTS:
+            pdf = Path(tmp) / "input" / f"{name}.pdf"
+            creer_pdf(pdf)
+            pdf_files.append(pdf)
+
+        def traiter(pdf):
+            rows = extractor.process_like_make(pdf)
+            return rows, extractor.last_pdf_error
+
+        logging.disable(logging.WARNING)
+        try:
+            sequentiel = [traiter(pdf)[0] for pdf in pdf_files]
+            start = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(pdf_files)) as executor:
+                paralleles = list(executor.map(traiter, pdf_files * 4))
+            elapsed = time.perf_counter() - start
+        finally:
+            logging.disable(logging.NOTSET)
+
+        for index, (rows, error) in enumerate(paralleles):
+            pdf = pdf_files[index % len(pdf_files)]
+            dept, nom = DOCUMENTS[pdf.stem]
+            assert error is None and rows == sequentiel[index % len(pdf_files)]
+            assert {(row['department'], row['nom'], row['fichier_source']) for row in rows} == {(dept, nom, pdf.name)}
+        print(f"  ⏱️ {len(paralleles)} PDF sur {len(pdf_files)} threads en {elapsed:.2f}s")
+        print("  ✅ Résultats identiques au traitement séquentiel, aucune donnée d'un autre PDF")
+
+        # L'erreur d'un PDF reste propre au thread qui l'a traité
+        erreurs = {}
+        barriere = threading.Barrier(2)
+
+        def avec_erreur(pdf, message):
+            extractor.last_pdf_error = message
+            barriere.wait()
+            erreurs[pdf] = extractor.last_pdf_error
+        threads = [threading.Thread(target=avec_erreur, args=(pdf, message))
+                   for pdf, message in (("a.pdf", "quota API dépassé"), ("b.pdf", None))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert erreurs == {"a.pdf": "quota API dépassé", "b.pdf": None}
+        print("  ✅ Erreur du dernier PDF propre à chaque thread")
+    return True
+
+if __name__ == "__main__":
+    test_contexte_immuable()
+    test_lot_sans_pause_ni_reinitialisation()
+    test_documents_en_parallele()
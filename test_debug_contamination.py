@@ -40,11 +40,11 @@ def debug_single_pdf_step_by_step(pdf_path: str):
     extractor = PDFPropertyExtractor("input", "output")
     pdf_path_obj = Path(pdf_path)
     
-    # 🧹 ÉTAPE 1: NETTOYAGE CONTEXTE
-    print("\n🧹 ÉTAPE 1: NETTOYAGE ANTI-CONTAMINATION")
+    # 🔒 ÉTAPE 1: CONTEXTE ISOLÉ DU DOCUMENT
+    print("\n🔒 ÉTAPE 1: CONTEXTE ISOLÉ DU DOCUMENT")
     print("-" * 50)
-    extractor.clean_extraction_context(pdf_path_obj)
-    print("✅ Nettoyage terminé")
+    with extractor.open_document_context(pdf_path_obj) as context:
+        print(f"✅ ID d'isolation: {context.isolation_id}, moteur: {context.profile['engine']}")
     
     # 📊 ÉTAPE 2: EXTRACTION TABLEAUX PDFPLUMBER
     print("\n📊 ÉTAPE 2: EXTRACTION TABLEAUX AVEC PDFPLUMBER")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test de la déduplication en flux avec débord sur disque (SQLite) et filtre de Bloom
+"""
+
+import os
+import time
+import random
+import logging
+import tempfile
+import tracemalloc
+from pathlib import Path
+import pdf_extractor
+from pdf_extractor import PDFPropertyExtractor, StreamingDeduplicator, batch_dedup_key
+
+def generer_lignes(count, seed=0, distinct=None):
+    """Lignes avec doublons (casse/espaces différents), clés vides et séparateurs dans les valeurs."""
+    rng = random.Random(seed)
+    distinct = distinct or count // 2
+    rows = []
+    for _ in range(count):
+        index = rng.randrange(distinct)
+        rows.append({
+            'nom': rng.choice([f'MARTIN{index}', f' martin{index} ']), 'prenom': 'JEAN',
+            'section': 'ZY', 'numero': str(index % 997), 'department': '89', 'commune': str(index % 7),
+            'numero_majic': rng.choice(['', 'M12|34']), 'droit_reel': 'PP', 'ligne': len(rows),
+        })
+        if rng.random() < 0.01:
+            rows.append({'nom': '', 'ligne': len(rows)})
+    return rows
+
+def reference_en_memoire(properties):
+    """Ancienne implémentation : ensemble de chaînes en mémoire."""
+    seen_keys = set()
+    deduplicated = []
+    for prop in properties:
+        unique_key = batch_dedup_key(prop)
+        if unique_key not in seen_keys and unique_key != '|||||||':
+            seen_keys.add(unique_key)
+            deduplicated.append(prop)
+    return deduplicated
+
+def test_identique_en_memoire():
+    print("🧪 TEST DÉDUPLICATION EN FLUX = ENSEMBLE EN MÉMOIRE")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    rows = generer_lignes(20_000, seed=1)
+    attendu = [row['ligne'] for row in reference_en_memoire(rows)]
+
+    assert [row['ligne'] for row in extractor.deduplicate_batch_results(rows)] == attendu
+    print(f"  ✅ Sans débord: {len(attendu)} lignes sur {len(rows)}, ordre de première apparition")
+
+    for use_bloom in (True, False):
+        obtenu = [row['ligne'] for row in extractor.iter_deduplicated_batch(iter(rows), memory_limit=500, use_bloom=use_bloom)]
+        assert obtenu == attendu
+        print(f"  ✅ Débord toutes les 500 empreintes (Bloom={use_bloom}): identique")
+    return True
+
+def test_debord_et_bloom():
+    print("\n🧪 TEST DÉBORD SUR DISQUE ET FILTRE DE BLOOM")
+    print("=" * 50)
+
+    keys = [f"CLE{index}" for index in range(5_000)]
+    stats = {}
+    for use_bloom in (True, False):
+        with StreamingDeduplicator(memory_limit=1_000, use_bloom=use_bloom) as seen:
+            assert all(seen.add(key) for key in keys)
+            assert not any(seen.add(key) for key in keys)
+            db_path = seen._db_path
+            assert os.path.exists(db_path)
+            stats[use_bloom] = dict(seen.stats)
+        assert not os.path.exists(db_path)
+        print(f"  📊 Bloom={use_bloom}: {stats[use_bloom]}")
+
+    assert stats[True]['deversees'] == stats[False]['deversees'] == 5_000
+    # Sans Bloom, chaque clé neuve arrivée après le premier débord est cherchée sur disque
+    assert stats[True]['lectures_disque'] < stats[False]['lectures_disque']
+    print("  ✅ Table temporaire supprimée, lectures disque évitées par le filtre de Bloom")
+    return True
+
+def test_memoire_bornee():
+    print("\n🧪 TEST MÉMOIRE BORNÉE (100 000 lignes)")
+    print("=" * 50)
+
+    rows = generer_lignes(100_000, seed=2, distinct=80_000)
+    extractor = PDFPropertyExtractor()
+    logging.disable(logging.INFO)
+    try:
+        resultats = {}
+        # Sans filtre de Bloom : on mesure la mémoire des clés seule (le filtre réserve 8 Mo fixes)
+        for label, function in [
+            ("ensemble en mémoire", lambda: sum(1 for _ in reference_en_memoire(rows))),
+            ("flux, débord à 5 000", lambda: sum(1 for _ in extractor.iter_deduplicated_batch(rows, memory_limit=5_000, use_bloom=False))),
+        ]:
+            tracemalloc.start()
+            start = time.perf_counter()
+            count = function()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            resultats[label] = (count, peak)
+            print(f"  ⏱️ {label}: {count} lignes, {elapsed:.2f}s, pic mémoire {peak / 1e6:.1f} Mo")
+    finally:
+        logging.disable(logging.NOTSET)
+
+    (count_ref, peak_ref), (count_flux, peak_flux) = resultats.values()
+    assert count_ref == count_flux
+    assert peak_flux < peak_ref
+    print("  ✅ Même résultat, mémoire des clés bornée")
+    return True
+
+def test_debord_supprime_apres_erreur():
+    print("\n🧪 TEST NETTOYAGE D'UN FICHIER: DÉBORD SUPPRIMÉ MÊME EN CAS D'ERREUR")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    rows = [{'nom': f'MARTIN{i}', 'prenom': 'JEAN', 'section': 'ZY', 'numero': str(i), 'department': '89',
+             'commune': '238'} for i in range(200)]
+    verifies = []
+
+    def verification(nom, prenom):
+        verifies.append(nom)
+        if len(verifies) == 150:
+            raise RuntimeError("ligne illisible")
+        return True
+
+    limite, dossier_temp = pdf_extractor.DEDUP_MEMORY_LIMIT, tempfile.tempdir
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_extractor.DEDUP_MEMORY_LIMIT = 20
+        tempfile.tempdir = tmp
+        extractor.is_likely_real_owner = verification
+        logging.disable(logging.INFO)
+        try:
+            try:
+                extractor.clean_and_deduplicate(rows, 'test.pdf')
+                raise AssertionError("erreur non propagée")
+            except RuntimeError:
+                pass
+        finally:
+            pdf_extractor.DEDUP_MEMORY_LIMIT, tempfile.tempdir = limite, dossier_temp
+            logging.disable(logging.NOTSET)
+        restants = list(Path(tmp).glob("dedup_*.sqlite"))
+    print(f"  💾 Fichiers de débord restants: {restants}")
+    assert len(verifies) == 150 and restants == []
+    print("  ✅ Table temporaire supprimée à la sortie du nettoyage")
+    return True
+
+if __name__ == "__main__":
+    test_identique_en_memoire()
+    test_debord_et_bloom()
+    test_memoire_bornee()
+    test_debord_supprime_apres_erreur()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test des délais d'extraction (appel API, page, PDF) et de l'annulation coopérative
+"""
+
+import time
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import fitz
+import pandas as pd
+from openai import OpenAI, APITimeoutError
+from pdf_extractor import (PDFPropertyExtractor, BatchJournal, Deadline, ExtractionTimeout, TimeoutLimits,
+                           is_timeout_error, CHECKPOINT_DONE, CHECKPOINT_TIMED_OUT)
+
+class ServeurBloque:
+    """API OpenAI locale qui ne répond jamais avant la fin du test (requêtes en vol)."""
+
+    def __init__(self):
+        stop = self.stop = threading.Event()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stop.wait(30)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = OpenAI(api_key='sk-test', base_url=f"http://127.0.0.1:{self.server.server_port}/v1")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+def creer_pdf(path, pages=3):
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page(width=100, height=140)
+        for line in range(8):
+            page.insert_text((5, 12 + 15 * line), f"RELEVÉ DE PROPRIÉTÉ {path.stem} {number + 1}", fontsize=5)
+    doc.save(path)
+    doc.close()
+    return path
+
+def make_props(count, start=0):
+    return [{'Sec': 'ZY', 'N° Plan': str(start + i + 1), 'Adresse': 'LES GRANDS CHAMPS', 'HA': '', 'A': '25', 'CA': '40'}
+            for i in range(count)]
+
+def test_echeances():
+    print("🧪 TEST ÉCHÉANCES IMBRIQUÉES")
+    print("=" * 50)
+
+    pdf = Deadline.start('pdf', "PDF doc.pdf", 0.2)
+    assert Deadline.start('page', "page 1", 10, pdf) is pdf
+    page = Deadline.start('page', "page 1", 0.05, pdf)
+    assert page.scope == 'page' and page.expires < pdf.expires
+    time.sleep(0.06)
+    try:
+        page.check()
+        raise AssertionError("échéance dépassée non signalée")
+    except ExtractionTimeout as e:
+        assert e.deadline is page and is_timeout_error(str(e))
+    pdf.check()
+    # Une stratégie qui intercepte Exception n'absorbe pas l'annulation
+    assert not issubclass(ExtractionTimeout, Exception)
+    assert not is_timeout_error("Fichier introuvable") and not is_timeout_error(None)
+    print("  ✅ Page bornée par son PDF, annulation non interceptée par `except Exception`")
+    return True
+
+def test_appel_api_abandonne():
+    print("\n🧪 TEST REQUÊTE EN VOL ABANDONNÉE À L'ÉCHÉANCE")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp, ServeurBloque() as serveur:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        extractor.client = serveur.client
+        extractor.timeout_limits = TimeoutLimits(api_call=0.3, page=5, pdf=5)
+        requete = {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'test'}]}
+
+        # Délai par appel : la stratégie reçoit l'erreur et peut passer à la suivante
+        with extractor.deadline_scope('page', "page 1", 0.8):
+            start = time.perf_counter()
+            try:
+                extractor.chat_completion(**requete)
+                raise AssertionError("réponse inattendue")
+            except APITimeoutError:
+                pass
+            elapsed = time.perf_counter() - start
+        print(f"  ⏱️ Appel abandonné après {elapsed:.2f}s")
+        # Délai par appel (0,3s) atteint avant l'échéance de la page : aucune annulation de la page
+        assert extractor.timeouts.counts['api'] == 1 and extractor.deadline is None
+        assert elapsed < 5, "requête en vol non abandonnée"
+
+        # Échéance de la page plus proche que le délai par appel : annulation de toute la page
+        with extractor.deadline_scope('page', "page 2", 0.15):
+            start = time.perf_counter()
+            try:
+                extractor.chat_completion(**requete)
+                raise AssertionError("réponse inattendue")
+            except ExtractionTimeout as e:
+                assert e.deadline.label == "page 2" and e.deadline.scope == 'page'
+            elapsed = time.perf_counter() - start
+        assert extractor.timeouts.counts['api'] == 2 and extractor.deadline is None
+        assert elapsed < 5, "requête en vol non abandonnée à l'échéance"
+        print("  ✅ Requête HTTP en vol coupée au plus tard à l'échéance de la page")
+    return True
+
+def test_lot_continue_apres_delai():
+    print("\n🧪 TEST LOT: PDF HORS DÉLAI MARQUÉ, LES AUTRES TRAITÉS")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp, ServeurBloque() as serveur:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        pdfs = [creer_pdf(extractor.input_dir / f"{nom}.pdf") for nom in ("a_rapide", "b_lent", "c_rapide")]
+        extractor.client = serveur.client
+        extractor.timeout_limits = TimeoutLimits(api_call=0.2, page=0.5, pdf=2.0)
+        extraction_reelle = extractor.extract_with_ultra_directive_prompt
+
+        def appel_api(base64_image, page_num):
+            if "b_lent" in extractor.deadline.label:
+                # Toutes les stratégies interrogent une API qui ne répond pas
+                return extraction_reelle(base64_image, page_num)
+            return [{'nom': 'MARTIN', 'prenom': 'JEAN', 'department': '89', 'commune': '238', 'droit_reel': 'PP'},
+                    {'nom': 'DURAND', 'prenom': 'MARIE', 'department': '89', 'commune': '238', 'droit_reel': 'PP'}]
+
+        extractor.list_pdf_files = lambda: sorted(extractor.input_dir.glob("*.pdf"))
+        # Parcelles propres à chaque PDF : aucune ligne dédupliquée entre fichiers
+        extractor.extract_tables_with_pdfplumber = lambda path: {'non_batie': make_props(3, 10 * pdfs.index(path)),
+                                                                 'prop_batie': []}
+        extractor.extract_with_ultra_directive_prompt = appel_api
+        extractor.validate_complete_extraction = lambda owners, filename: owners
+        extractor.get_header_location = lambda path: {'department': '89', 'commune': '238'}
+        logging.disable(logging.CRITICAL)
+        try:
+            start = time.perf_counter()
+            extractor.run()
+            elapsed = time.perf_counter() - start
+        finally:
+            logging.disable(logging.NOTSET)
+
+        stats = extractor.timeouts.snapshot()
+        print(f"  ⏱️ Lot en {elapsed:.2f}s, délais dépassés: {extractor.timeouts.describe()}")
+        assert list(stats['pdfs']) == ["b_lent.pdf"] and is_timeout_error(stats['pdfs']["b_lent.pdf"])
+        assert stats['counts']['pdf'] == 1 and stats['counts']['page'] >= 1 and stats['counts']['api'] >= 1
+        assert elapsed < 10, "PDF bloqué au-delà de ses délais"
+
+        with BatchJournal(extractor.batch_journal_path()) as journal:
+            statuts = {pdf.name: journal.status(pdf) for pdf in pdfs}
+        print(f"  📒 Journal: {statuts}")
+        assert statuts == {"a_rapide.pdf": CHECKPOINT_DONE, "b_lent.pdf": CHECKPOINT_TIMED_OUT,
+                           "c_rapide.pdf": CHECKPOINT_DONE}
+        sortie = pd.read_csv(extractor.output_dir / "output.csv", sep=';', dtype=str, encoding='utf-8-sig')
+        assert set(sortie['Fichier source']) == {"a_rapide.pdf", "c_rapide.pdf"}
+        assert extractor.memory.used == 0
+        print("  ✅ PDF hors délai journalisé et compté, lot poursuivi, mémoire rendue")
+    return True
+
+if __name__ == "__main__":
+    test_echeances()
+    test_appel_api_abandonne()
+    test_lot_continue_apres_delai()
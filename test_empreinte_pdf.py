@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test de la pré-analyse locale des PDF (empreinte sans rendu ni appel API)
+"""
+
+import time
+import logging
+import tempfile
+import threading
+from pathlib import Path
+import fitz
+from pdf_extractor import PDFPropertyExtractor, fingerprint_pdf, ENGINE_VISION, ENGINE_TABLES_AND_VISION, RENDER_ZOOM
+
+def creer_pdf_texte(path, pages=2, size=fitz.paper_size("a4"), producer="Service cadastre"):
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page(width=size[0], height=size[1])
+        page.insert_text((50, 60), "RELEVÉ DE PROPRIÉTÉ - Département 89 Commune 238 MAILLY-LE-CHATEAU")
+        page.insert_text((50, 100), "Propriété(s) bâtie(s)")
+        page.insert_text((50, 140), "Propriété(s)   non bâtie(s)")
+        page.insert_text((50, 180), f"Contenance totale - page {number + 1}")
+    doc.set_metadata({'producer': producer, 'creator': 'MAJIC'})
+    doc.save(path)
+    doc.close()
+
+def creer_pdf_scan(path, pages=1):
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 60, 80), False)
+    pixmap.clear_with(200)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_image(page.rect, pixmap=pixmap)
+    doc.set_metadata({'producer': 'Scanner XYZ'})
+    doc.save(path)
+    doc.close()
+
+def test_empreintes():
+    print("🧪 TEST EMPREINTES LOCALES")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        texte, scan, a3 = Path(tmp) / "texte.pdf", Path(tmp) / "scan.pdf", Path(tmp) / "a3.pdf"
+        creer_pdf_texte(texte)
+        creer_pdf_scan(scan, pages=3)
+        creer_pdf_texte(a3, pages=1, size=fitz.paper_size("a3"))
+
+        fp_texte, fp_scan, fp_a3 = fingerprint_pdf(texte), fingerprint_pdf(scan), fingerprint_pdf(a3)
+        for name, fp in (("texte", fp_texte), ("scan", fp_scan), ("a3", fp_a3)):
+            print(f"  {name:6} {fp['family']:45} {fp['engine']:18} zoom={fp['render_zoom']:.2f} "
+                  f"pages//={fp['page_workers']} en-têtes={fp['headers']}")
+
+        assert fp_texte['has_text_layer'] and fp_texte['engine'] == ENGINE_TABLES_AND_VISION
+        assert fp_texte['headers'] == ['releve', 'batie', 'non_batie', 'contenance_totale']
+        assert fp_texte['page_format'] == '210x297mm' and fp_texte['producer'] == 'Service cadastre'
+        assert fp_texte['fonts'] and fp_texte['render_zoom'] == RENDER_ZOOM and fp_texte['page_workers'] == 2
+        assert not fp_scan['has_text_layer'] and fp_scan['engine'] == ENGINE_VISION and fp_scan['page_workers'] == 3
+        assert fp_a3['render_zoom'] < RENDER_ZOOM and fp_a3['page_workers'] == 1
+        assert fingerprint_pdf(Path(tmp) / "absent.pdf")['family'] == 'illisible'
+        print("  ✅ Couche texte, en-têtes, format, zoom plafonné, parallélisme par page")
+    return True
+
+def test_pre_analyse_sans_api():
+    print("\n🧪 TEST PRÉ-ANALYSE DU LOT SANS RENDU NI API")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        files = []
+        for i in range(20):
+            path = Path(tmp) / "input" / f"doc{i:02d}.pdf"
+            creer_pdf_scan(path) if i % 5 == 0 else creer_pdf_texte(path)
+            files.append(path)
+
+        def interdit(*args, **kwargs):
+            raise AssertionError("aucun rendu ni appel API pendant la pré-analyse")
+        extractor.pdf_to_images = interdit
+        extractor.detect_pdf_format = interdit
+
+        start = time.perf_counter()
+        strategy = extractor.analyze_pdf_batch(files)
+        elapsed = time.perf_counter() - start
+        print(f"  ⏱️ {len(files)} PDF en {elapsed * 1000:.0f} ms - {strategy['formats_detected']}")
+        assert strategy['engines'] == {ENGINE_TABLES_AND_VISION: 16, ENGINE_VISION: 4}
+        assert strategy['approach'] == 'high_volume_batch' and strategy['total_pages'] == 16 * 2 + 4
+        assert extractor.get_pdf_profile(files[0])['engine'] == ENGINE_VISION
+        assert elapsed < 2
+        print("  ✅ Stratégie et profils par PDF en quelques millisecondes")
+    return True
+
+def test_moteur_et_pages_paralleles():
+    print("\n🧪 TEST MOTEUR PAR PDF ET PAGES EN PARALLÈLE")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        texte, scan = Path(tmp) / "texte.pdf", Path(tmp) / "scan.pdf"
+        creer_pdf_texte(texte)
+        creer_pdf_scan(scan, pages=4)
+
+        appels_tableaux = []
+        extractor.extract_tables_with_pdfplumber = lambda path: appels_tableaux.append(path.name) or {"prop_batie": [], "non_batie": []}
+        extractor.extract_owners_make_style = lambda path, context=None: []
+        logging.disable(logging.WARNING)
+        try:
+            extractor.process_like_make(texte)
+            extractor.process_like_make(scan)
+        finally:
+            logging.disable(logging.NOTSET)
+        assert appels_tableaux == ['texte.pdf']
+        print("  ✅ pdfplumber ignoré pour le scan")
+
+        # 4 pages, appels API simulés (0,3 s chacun) : exécutés en parallèle, ordre des pages conservé
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        actifs, pic = [0], [0]
+        verrou = threading.Lock()
+
+        def faux_appel(base64_image, page_num):
+            with verrou:
+                actifs[0] += 1
+                pic[0] = max(pic[0], actifs[0])
+            time.sleep(0.3)
+            with verrou:
+                actifs[0] -= 1
+            return [{'nom': f'MARTIN{page_num}', 'prenom': 'JEAN'}, {'nom': f'DURAND{page_num}', 'prenom': 'MARIE'}]
+
+        extractor.extract_with_ultra_directive_prompt = faux_appel
+        extractor.validate_complete_extraction = lambda owners, filename: owners
+        timings = {}
+        logging.disable(logging.INFO)
+        try:
+            for workers in (1, 4):
+                extractor.get_pdf_profile(scan)['page_workers'] = workers
+                pic[0] = 0
+                start = time.perf_counter()
+                owners = extractor.extract_owners_make_style(scan)
+                timings[workers] = (time.perf_counter() - start, pic[0])
+                assert [owner['nom'] for owner in owners] == [f'{nom}{page}' for page in range(1, 5) for nom in ('MARTIN', 'DURAND')]
+        finally:
+            logging.disable(logging.NOTSET)
+        print(f"  ⏱️ 4 pages (rendu compris): série {timings[1][0]:.2f}s, parallèle {timings[4][0]:.2f}s "
+              f"({timings[4][1]} appels simultanés)")
+        # Le parallélisme se vérifie sur les appels simultanés, la durée (rendu compris) varie avec la charge
+        assert timings[1][1] == 1 and timings[4][1] == 4
+        assert timings[4][0] < timings[1][0]
+        print("  ✅ Pages traitées en parallèle, propriétaires dans l'ordre des pages")
+    return True
+
+def test_zoom_de_rendu():
+    print("\n🧪 TEST ZOOM DE RENDU SELON LE FORMAT")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        sizes = {}
+        for name, size in (("a4", fitz.paper_size("a4")), ("a3", fitz.paper_size("a3"))):
+            path = Path(tmp) / f"{name}.pdf"
+            creer_pdf_texte(path, pages=1, size=size)
+            logging.disable(logging.INFO)
+            try:
+                image = extractor.pdf_to_images(path)[0]
+            finally:
+                logging.disable(logging.NOTSET)
+            pixmap = fitz.Pixmap(image)
+            sizes[name] = (pixmap.width, pixmap.height)
+        print(f"  🖼️ {sizes}")
+        assert sizes['a4'] == (2975, 4210)
+        assert max(sizes['a3']) <= 4211
+        print("  ✅ A4 inchangé (5×), A3 rendu à la même taille au lieu de 5×")
+    return True
+
+if __name__ == "__main__":
+    test_empreintes()
+    test_pre_analyse_sans_api()
+    test_moteur_et_pages_paralleles()
+    test_zoom_de_rendu()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test des exports CSV/Excel en flux (itérateur de lignes partagé, xlsxwriter constant_memory)
+"""
+
+import io
+import logging
+import tempfile
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+import pandas as pd
+from openpyxl import load_workbook
+from pdf_extractor import (PDFPropertyExtractor, PropertyRecord, properties_to_dataframe, iter_export_rows,
+                           write_export_xlsx, EXPORT_COLUMNS_ORDER, EXPORT_COLUMN_MAPPING, EXPORT_HEADERS)
+
+def make_rows(count):
+    return [
+        PropertyRecord(department='89', commune='238', section='ZY', numero=str(i), contenance_a=f"{i % 100:02d}",
+                       nom=f'MARTIN{i % 500}', prenom='JEAN', droit_reel='PP', id=f"89238000ZY{i % 10_000:04d}",
+                       voie='12 RUE DE LA PAIX', post_code='89000', city='AUXERRE', fichier_source=f'doc{i % 50}.pdf')
+        for i in range(count)
+    ]
+
+def ancien_dataframe(properties):
+    """Référence : DataFrame réordonné et renommé comme les anciens exports."""
+    df = properties_to_dataframe(properties)
+    df = df.reindex(columns=EXPORT_COLUMNS_ORDER, fill_value='')
+    return df.rename(columns=EXPORT_COLUMN_MAPPING)
+
+def test_csv_identique():
+    print("🧪 TEST CSV EN FLUX = ANCIEN EXPORT PANDAS")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        records = make_rows(200)
+        records[3]['nom'] = 'DE LA "TOUR"; MARIE'
+        records[4]['voie'] = 'LIGNE 1\nLIGNE 2'
+        dicts = [{'nom': 'DURAND', 'prenom': None, 'department': '89', 'commune': '238', 'contenance_a': float('nan'),
+                  'fichier_source': 'x.pdf', 'inconnu': 'ignoré'}]
+
+        for label, properties in (("PropertyRecord", records), ("dicts", dicts)):
+            reference = Path(tmp) / "reference.csv"
+            ancien_dataframe(properties).to_csv(reference, index=False, encoding='utf-8-sig', sep=';')
+            path = extractor.export_to_csv(properties, "flux.csv")
+            assert path.read_bytes() == reference.read_bytes(), label
+            print(f"  ✅ {label}: octets identiques (guillemets, retours ligne, valeurs manquantes)")
+    return True
+
+def test_excel_contenu_et_style():
+    print("\n🧪 TEST EXCEL EN FLUX: CONTENU ET STYLE")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        records = make_rows(50)
+        records[0]['nom'] = '=SOMME(A1:A2)'
+        records[1]['numero'] = '0012'
+        records[2]['voie'] = 'http://exemple.fr'
+        path = extractor.export_to_excel(records, "flux.xlsx")
+
+        df = pd.read_excel(path, dtype=str).fillna('')
+        assert list(df.columns) == EXPORT_HEADERS
+        assert df.values.tolist() == [list(row) for row in iter_export_rows(records)]
+
+        sheet = load_workbook(path).active
+        header = sheet.cell(row=1, column=1)
+        assert sheet.title == 'Données Cadastrales' and header.font.bold and header.fill.fgColor.rgb.endswith('4472C4')
+        assert sheet.cell(row=2, column=EXPORT_HEADERS.index('Nom Propri') + 1).data_type == 's'
+        assert sheet.cell(row=3, column=EXPORT_HEADERS.index('Numéro') + 1).value == '0012'
+        print("  ✅ Valeurs identiques au CSV, en-têtes stylés, chaînes non converties (formule, zéros, lien)")
+
+        # Au-delà de la limite d'une feuille : feuilles supplémentaires
+        output = io.BytesIO()
+        with mock.patch('pdf_extractor.EXCEL_MAX_ROWS', 21):
+            assert write_export_xlsx(iter_export_rows(records), output) == 50
+        sheets = load_workbook(output).worksheets
+        assert [sheet.max_row for sheet in sheets] == [21, 21, 11]
+        print(f"  ✅ Débordement: {[sheet.title for sheet in sheets]}")
+    return True
+
+def test_memoire_grand_volume(count=2_000):
+    print(f"\n🧪 EXCEL {count:,} LIGNES: openpyxl vs xlsxwriter constant_memory".replace(",", " "))
+    print("=" * 50)
+
+    records = make_rows(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        exports = {
+            "DataFrame + openpyxl": lambda: ancien_dataframe(records).to_excel(Path(tmp) / "ancien.xlsx", index=False,
+                                                                              engine='openpyxl'),
+            "flux xlsxwriter": lambda: extractor.export_to_excel(records, "flux.xlsx"),
+        }
+        # Pic des allocations Python de l'export seul (lignes d'entrée déjà en mémoire)
+        pics = {}
+        logging.disable(logging.INFO)
+        try:
+            for label, export in exports.items():
+                tracemalloc.start()
+                export()
+                pics[label] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"  📦 {label}: pic {pics[label] / 1e6:.1f} Mo")
+        finally:
+            logging.disable(logging.NOTSET)
+        assert len(pd.read_excel(Path(tmp) / "output" / "flux.xlsx", dtype=str)) == count
+
+    assert pics["flux xlsxwriter"] * 5 < pics["DataFrame + openpyxl"]
+    print("  ✅ Mémoire de l'export en flux indépendante du nombre de lignes")
+    return True
+
+if __name__ == "__main__":
+    test_csv_identique()
+    test_excel_contenu_et_style()
+    test_memoire_grand_volume()
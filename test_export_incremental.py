@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test de l'export CSV incrémental (output.csv alimenté PDF par PDF pendant le lot)
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+from unittest import mock
+import pandas as pd
+from pdf_extractor import PDFPropertyExtractor, CSVResultSink, PropertyRecord, ResultSink
+
+def make_rows(pdf_name, count, start=0, commune='238'):
+    return [
+        PropertyRecord(department='89', commune=commune, section='ZY', numero=str(i),
+                       id=f"89238000ZY{i:04d}", nom=f'MARTIN{i % 7}', prenom='JEAN; "PIERRE"',
+                       droit_reel='PP', contenance_a='25', fichier_source=pdf_name)
+        for i in range(start, start + count)
+    ]
+
+def test_identique_export_final():
+    print("🧪 TEST CSV INCRÉMENTAL = EXPORT FINAL")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        lots = [make_rows('a.pdf', 5, commune='238 MAILLY-LE-CHATEAU'), make_rows('b.pdf', 0), make_rows('c.pdf', 3, start=5)]
+
+        sink_path = Path(tmp) / "incremental.csv"
+        with CSVResultSink(sink_path) as sink:
+            for number, rows in enumerate(lots):
+                sink.write_pdf(rows, f"{number}.pdf")
+        final_path = extractor.export_to_csv([row for rows in lots for row in rows], "final.csv")
+
+        assert sink_path.read_bytes() == final_path.read_bytes()
+        assert sink.rows_written == 8 and sink.pdfs_written == 2
+        df = pd.read_csv(sink_path, sep=';', dtype=str, encoding='utf-8-sig')
+        assert df['Commune'].unique().tolist() == ['238'] and df['Prénom Propri'].iloc[0] == 'JEAN; "PIERRE"'
+        print(f"  ✅ {len(df)} lignes, octets identiques à export_to_csv (BOM, ;, guillemets)")
+    return True
+
+def test_interruption_en_cours_de_lot():
+    print("\n🧪 TEST INTERRUPTION AU 3e PDF")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        pdf_files = [Path(f"{tmp}/input/doc{i}.pdf") for i in range(1, 5)]
+        for pdf_file in pdf_files:
+            pdf_file.write_bytes(b"%PDF-1.4")
+        extractor.result_cache = None  # PDF factices au contenu identique
+        seen_sizes = []
+
+        def fake_process(pdf_path):
+            if pdf_path.name == 'doc3.pdf':
+                raise KeyboardInterrupt("arrêt brutal")
+            # Un lecteur qui suit le fichier du lot voit les PDF précédents en entier
+            seen_sizes.append(len(pd.read_csv(extractor.output_dir / "output.csv.partial", sep=';', encoding='utf-8-sig')))
+            rows = make_rows(pdf_path.name, 4)
+            rows.append(PropertyRecord(nom='LIEU DIT', department='XX', commune='COMMUNE', fichier_source=pdf_path.name))
+            return rows
+
+        extractor.list_pdf_files = lambda: pdf_files
+        extractor.analyze_pdf_batch = lambda files: {'approach': 'mixed_adaptive'}
+        extractor.process_like_make = fake_process
+        logging.disable(logging.WARNING)
+        try:
+            extractor.run()
+            raise AssertionError("l'interruption aurait dû remonter")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            logging.disable(logging.NOTSET)
+
+        df = pd.read_csv(extractor.output_dir / "output.csv", sep=';', dtype=str, encoding='utf-8-sig')
+        print(f"  📄 output.csv après interruption: {len(df)} lignes de {sorted(df['Fichier source'].unique())}")
+        assert seen_sizes == [0, 4]
+        assert df['Fichier source'].tolist() == ['doc1.pdf'] * 4 + ['doc2.pdf'] * 4
+        print("  ✅ Lignes validées des PDF terminés conservées, ligne parasite écartée")
+    return True
+
+def test_ecriture_atomique():
+    print("\n🧪 TEST ÉCRITURE ATOMIQUE PAR PDF")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "output.csv"
+        path.write_text("export précédent")
+        with CSVResultSink(path) as sink:
+            rows = make_rows('a.pdf', 3, commune='238 MAILLY-LE-CHATEAU')
+            sink.write_pdf(rows, 'a.pdf')
+            assert rows[0]['commune'] == '238 MAILLY-LE-CHATEAU', "lignes de l'appelant modifiées"
+            assert path.read_text() == "export précédent"
+            before = sink.partial_path.read_bytes()
+            with mock.patch('pdf_extractor.os.fsync', side_effect=OSError("disque plein")):
+                try:
+                    sink.write_pdf(make_rows('b.pdf', 500), 'b.pdf')
+                    raise AssertionError("l'erreur d'écriture aurait dû remonter")
+                except OSError:
+                    pass
+            assert sink.partial_path.read_bytes() == before
+            sink.write_pdf(make_rows('c.pdf', 2), 'c.pdf')
+        df = pd.read_csv(path, sep=';', dtype=str, encoding='utf-8-sig')
+        assert df['Fichier source'].tolist() == ['a.pdf'] * 3 + ['c.pdf'] * 2
+        assert not sink.partial_path.exists()
+        print("  ✅ PDF en échec retiré du fichier, écritures suivantes intactes")
+        print("  ✅ Export précédent conservé jusqu'à la fermeture, lignes reçues non modifiées")
+    return True
+
+def test_destination_abstraite():
+    print("\n🧪 TEST DESTINATION ABSTRAITE (write_pdf OBLIGATOIRE)")
+    print("=" * 50)
+
+    class SansEcriture(ResultSink):
+        pass
+
+    class EnMemoire(ResultSink):
+        def __init__(self):
+            self.rows = []
+
+        def write_pdf(self, properties, pdf_name):
+            self.rows.extend(properties)
+            return len(properties)
+
+    for classe in (ResultSink, SansEcriture):
+        try:
+            classe()
+            raise AssertionError(f"{classe.__name__} instanciée sans write_pdf")
+        except TypeError:
+            pass
+    with EnMemoire() as sink:
+        assert sink.write_pdf(make_rows('a.pdf', 3), 'a.pdf') == 3
+    print("  ✅ Destination sans write_pdf refusée à la construction, open/close par défaut")
+    return True
+
+if __name__ == "__main__":
+    test_identique_export_final()
+    test_interruption_en_cours_de_lot()
+    test_ecriture_atomique()
+    test_destination_abstraite()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test de l'export Parquet partitionné (department=XX/commune=YYY, schéma typé)
+"""
+
+import time
+import logging
+import resource
+import tempfile
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pdf_extractor import PDFPropertyExtractor, ParquetResultSink, PropertyRecord, read_parquet_export
+
+def make_rows(count, departments=('89', '51', '21'), communes=20):
+    return [
+        PropertyRecord(department=departments[i % len(departments)], commune=f"{(i // 7) % communes + 1:03d}",
+                       section=['ZY', 'A', '302A'][i % 3], numero=str(i % 2000), contenance_ha='' if i % 4 else '1',
+                       contenance_a=str(i % 100), contenance_ca='05', droit_reel='PP', nom=f'MARTIN{i % 500}',
+                       prenom='JEAN', id=f"89238000ZY{i % 10_000:04d}", fichier_source=f'doc{i % 50}.pdf')
+        for i in range(count)
+    ]
+
+def test_schema_et_partitions():
+    print("🧪 TEST SCHÉMA TYPÉ ET PARTITIONS")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        rows = make_rows(3_000)
+        rows.append(PropertyRecord(department='2A', commune='004', section='C', numero='1', nom='SANTONI', fichier_source='f.pdf'))
+        rows.append(PropertyRecord(department='89', commune='238 MAILLY', section='B', numero='7',
+                                   contenance_a='XX', nom='DURAND', fichier_source='e.pdf'))
+        path = extractor.export_to_parquet(rows)
+
+        partitions = sorted(str(p.relative_to(path).parent) for p in path.rglob("*.parquet"))
+        print(f"  📁 {len(partitions)} partitions, ex: {partitions[0]}")
+        assert len(partitions) == 3 * 20 + 2 and "department=2A/commune=004" in partitions and "department=89/commune=238" in partitions
+
+        file_schema = pq.read_schema(path / "department=89" / "commune=238" / "part-0.parquet")
+        assert file_schema.field('section').type == pa.dictionary(pa.int32(), pa.string())
+        assert file_schema.field('contenance_a').type == pa.int32()
+        assert 'department' not in file_schema.names
+
+        table = read_parquet_export(path)
+        df = table.to_pandas()
+        assert len(df) == len(rows)
+        assert pa.types.is_dictionary(table.schema.field('department').type)
+        durand = df[df['nom'] == 'DURAND'].iloc[0]
+        assert durand['commune'] == '238' and pd.isna(durand['contenance_a'])
+        assert df[df['nom'] == 'SANTONI'].iloc[0][['department', 'commune']].tolist() == ['2A', '004']
+        attendu = pd.DataFrame([r.to_dict() for r in rows[:-2]])
+        obtenu = df[~df['nom'].isin(['DURAND', 'SANTONI'])]
+        assert sorted(obtenu['contenance_a'].astype(int)) == sorted(attendu['contenance_a'].astype(int))
+        print("  ✅ Dictionnaires, entiers, zéros de tête et Corse préservés, commune nettoyée, contenance invalide → nulle")
+
+        # Réexport : l'ancien jeu de données est remplacé, pas complété
+        extractor.export_to_parquet(rows[:10])
+        assert read_parquet_export(path).num_rows == 10
+        print("  ✅ Réexport remplaçant l'export précédent")
+    return True
+
+def test_groupes_de_lignes_bornes():
+    print("\n🧪 TEST ÉCRITURE PAR GROUPES DE LIGNES")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "parquet"
+        with ParquetResultSink(root, row_group_size=1_000, buffer_limit=3_000) as sink:
+            for pdf in range(20):
+                sink.write_pdf(make_rows(1_000, departments=('89',), communes=4), f"doc{pdf}.pdf")
+                assert sink._buffered <= 3_000 + 1_000
+        metadata = pq.ParquetFile(root / "department=89" / "commune=001" / "part-0.parquet").metadata
+        print(f"  📊 {sink.rows_written} lignes, {sink.row_groups_written} groupes, commune 001: "
+              f"{metadata.num_row_groups} groupes de {metadata.row_group(0).num_rows} lignes")
+        assert sink.rows_written == 20_000
+        assert all(metadata.row_group(i).num_rows <= 1_000 for i in range(metadata.num_row_groups))
+    print("  ✅ Mise en attente bornée, groupes de lignes de taille fixe")
+    return True
+
+def test_region_nombreuses_communes(count=20_000):
+    print("\n🧪 TEST RÉGION: 1 350 PARTITIONS SOUS UNE LIMITE DE 256 FICHIERS OUVERTS")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "parquet"
+        rows = make_rows(count, communes=450)
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(256, hard), hard))
+        try:
+            with ParquetResultSink(root, buffer_limit=2_000, max_open_writers=32) as sink:
+                for start in range(0, count, 1_000):
+                    sink.write_pdf(rows[start:start + 1_000], f"doc{start}.pdf")
+                    assert len(sink._writers) <= 32
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+        partitions = {path.parent for path in root.rglob("*.parquet")}
+        fichiers = len(list(root.rglob("*.parquet")))
+        print(f"  📁 {len(partitions)} partitions, {fichiers} fichiers part-N.parquet")
+        assert len(partitions) == 3 * 450 and fichiers > len(partitions)
+        table = read_parquet_export(root)
+        assert table.num_rows == count
+        assert sorted(table.column('nom').to_pylist()) == sorted(row['nom'] for row in rows)
+    print("  ✅ Écrivains fermés au fil de l'eau, partitions rouvertes dans un nouveau fichier, aucune ligne perdue")
+    return True
+
+def test_echec_parquet_sans_bloquer_les_exports():
+    print("\n🧪 TEST ÉCHEC DE L'EXPORT PARQUET: SQLITE ET DELTA ÉCRITS")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+
+        def export_impossible(properties):
+            raise OSError(24, "Too many open files")
+
+        extractor.export_to_parquet = export_impossible
+        logging.disable(logging.CRITICAL)
+        try:
+            extractor.export_to_csv_with_stats(make_rows(100))
+        finally:
+            logging.disable(logging.NOTSET)
+        assert (extractor.output_dir / "output.csv").exists() and (extractor.output_dir / "output_delta.csv").exists()
+        assert extractor.sqlite_output_path().exists()
+    print("  ✅ Erreur Parquet journalisée, exports suivants réalisés")
+    return True
+
+def test_lecture_region_vs_csv(count=600_000):
+    print(f"\n🧪 LECTURE D'UN DÉPARTEMENT: CSV vs PARQUET ({count:,} lignes)".replace(",", " "))
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        rows = make_rows(count, departments=("89",) + tuple(f"{d:02d}" for d in range(1, 12)))
+        logging.disable(logging.INFO)
+        try:
+            csv_path = extractor.export_to_csv(rows)
+            parquet_path = extractor.export_to_parquet(rows)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        start = time.perf_counter()
+        df = pd.read_csv(csv_path, sep=';', dtype=str, encoding='utf-8-sig')
+        region_csv = df[df['Département'] == '89']
+        csv_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        region = read_parquet_export(parquet_path, filters=[('department', '=', '89')])
+        parquet_time = time.perf_counter() - start
+
+    print(f"  ⏱️ CSV: {csv_time:.2f}s, Parquet: {parquet_time:.3f}s ({len(region_csv)} lignes)")
+    assert region.num_rows == len(region_csv) > 0
+    assert set(region.column('department').to_pylist()) == {'89'}
+    assert parquet_time < csv_time
+    print("  ✅ Seules les partitions du département sont lues")
+    return True
+
+if __name__ == "__main__":
+    test_schema_et_partitions()
+    test_groupes_de_lignes_bornes()
+    test_region_nombreuses_communes()
+    test_echec_parquet_sans_bloquer_les_exports()
+    test_lecture_region_vs_csv()
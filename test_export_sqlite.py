@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test de la base SQLite de sortie (upsert par PDF, WAL, lecture pendant le lot)
+"""
+
+import time
+import sqlite3
+import logging
+import tempfile
+from pathlib import Path
+from pdf_extractor import PDFPropertyExtractor, SQLiteResultSink, PropertyRecord
+
+def make_rows(pdf_name, count, start=0, contenance='25', droit='PP'):
+    return [
+        PropertyRecord(department='89', commune='238', section='ZY', numero=str(i), id=f"89238000ZY{i:04d}",
+                       nom=f'MARTIN{i % 7}', prenom='JEAN', numero_majic=f'M{i % 3:05d}', droit_reel=droit,
+                       contenance_a=contenance, fichier_source=pdf_name)
+        for i in range(start, start + count)
+    ]
+
+def test_upsert_par_pdf():
+    print("🧪 TEST UPSERT (id, MAJIC, droit réel)")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "output.sqlite"
+        with SQLiteResultSink(path, batch_size=7) as sink:
+            assert sink.write_pdf(make_rows('a.pdf', 30), 'a.pdf') == 30
+            # Retraitement du même PDF : contenance mise à jour, pas de doublon
+            sink.write_pdf(make_rows('a.pdf', 30, contenance='40'), 'a.pdf')
+            # Même parcelle, autre droit réel : nouvelle ligne ; ligne sans ID ignorée
+            sans_id = make_rows('b.pdf', 1, start=100)[0]
+            sans_id['id'] = ''
+            rows = make_rows('b.pdf', 5, droit='US') + [sans_id]
+            rows[0]['commune'] = '238 MAILLY-LE-CHATEAU'
+            assert sink.write_pdf(rows, 'b.pdf') == 5
+            assert sink.rows_skipped == 1
+            assert rows[0]['commune'] == '238 MAILLY-LE-CHATEAU', "lignes de l'appelant modifiées"
+
+        db = sqlite3.connect(str(path))
+        assert db.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert db.execute('SELECT COUNT(*) FROM proprietes').fetchone()[0] == 35
+        assert db.execute("SELECT DISTINCT contenance_a FROM proprietes WHERE droit_reel = 'PP'").fetchall() == [('40',)]
+        assert db.execute("SELECT DISTINCT commune FROM proprietes").fetchall() == [('238',)]
+        indexes = {row[1] for row in db.execute("PRAGMA index_list('proprietes')")}
+        assert {'idx_proprietes_geo', 'idx_proprietes_nom'} <= indexes
+        plan = ' '.join(str(row) for row in db.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM proprietes WHERE department = '89' AND commune = '238'"))
+        assert 'idx_proprietes_geo' in plan
+        print(f"  ✅ 35 lignes (30 PP mises à jour + 5 US), index utilisés: {plan}")
+    return True
+
+def test_transaction_par_pdf():
+    print("\n🧪 TEST TRANSACTION PAR PDF")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "output.sqlite"
+        with SQLiteResultSink(path, batch_size=10) as sink:
+            sink.write_pdf(make_rows('a.pdf', 10), 'a.pdf')
+            sink._db.execute("CREATE TRIGGER refus BEFORE INSERT ON proprietes WHEN NEW.nom = 'REFUS' "
+                             "BEGIN SELECT RAISE(ABORT, 'ligne refusée'); END")
+            rows = make_rows('b.pdf', 25, start=10)
+            rows[-1]['nom'] = 'REFUS'  # Échec au 3e paquet, après deux executemany réussis
+            try:
+                sink.write_pdf(rows, 'b.pdf')
+                raise AssertionError("l'échec aurait dû remonter")
+            except sqlite3.IntegrityError:
+                pass
+            sink.write_pdf(make_rows('c.pdf', 3, start=50), 'c.pdf')
+
+        fichiers = sqlite3.connect(str(path)).execute(
+            'SELECT fichier_source, COUNT(*) FROM proprietes GROUP BY fichier_source').fetchall()
+        print(f"  📊 {fichiers}")
+        assert fichiers == [('a.pdf', 10), ('c.pdf', 3)]
+        print("  ✅ PDF en échec entièrement annulé, PDF suivants écrits")
+    return True
+
+def test_lecture_pendant_le_lot():
+    print("\n🧪 TEST LECTURE PENDANT LE LOT")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        pdf_files = [Path(f"{tmp}/input/doc{i}.pdf") for i in range(1, 4)]
+        for pdf_file in pdf_files:
+            pdf_file.write_bytes(b"%PDF-1.4")
+        extractor.result_cache = None  # PDF factices au contenu identique
+        visibles = []
+
+        def fake_process(pdf_path):
+            db_path = extractor.output_dir / "output.sqlite"
+            with sqlite3.connect(str(db_path)) as reader:
+                visibles.append(reader.execute('SELECT COUNT(*) FROM proprietes').fetchone()[0])
+            number = int(pdf_path.stem[-1])
+            rows = make_rows(pdf_path.name, 4, start=number * 10)
+            rows.append(PropertyRecord(nom='LIEU DIT', department='XX', commune='COMMUNE', id='X',
+                                       fichier_source=pdf_path.name))
+            return rows
+
+        extractor.list_pdf_files = lambda: pdf_files
+        extractor.analyze_pdf_batch = lambda files: {'approach': 'mixed_adaptive'}
+        extractor.process_like_make = fake_process
+        logging.disable(logging.WARNING)
+        try:
+            extractor.run()
+        finally:
+            logging.disable(logging.NOTSET)
+
+        db = sqlite3.connect(str(extractor.output_dir / "output.sqlite"))
+        total = db.execute('SELECT COUNT(*) FROM proprietes').fetchone()[0]
+        print(f"  📊 Lignes visibles avant chaque PDF: {visibles}, total final: {total}")
+        assert visibles == [0, 4, 8]
+        assert total == 12 and db.execute("SELECT COUNT(*) FROM proprietes WHERE nom = 'LIEU DIT'").fetchone()[0] == 0
+        print("  ✅ Base lisible pendant le lot, validation finale appliquée, export final sans doublon")
+    return True
+
+def test_debit(count=100_000):
+    print(f"\n🧪 DÉBIT SQLITE ({count:,} lignes".replace(",", " ") + ", 200 PDF)")
+    print("=" * 50)
+
+    rows = make_rows('x.pdf', count)
+    with tempfile.TemporaryDirectory() as tmp:
+        with SQLiteResultSink(Path(tmp) / "output.sqlite") as sink:
+            start = time.perf_counter()
+            step = count // 200
+            for offset in range(0, count, step):
+                sink.write_pdf(rows[offset:offset + step], f"doc{offset}.pdf")
+            elapsed = time.perf_counter() - start
+    print(f"  ⏱️ {elapsed:.2f}s ({count / elapsed:,.0f} lignes/s)".replace(",", " "))
+    assert sink.rows_written == count
+    print("  ✅ Écriture par transactions groupées")
+    return True
+
+if __name__ == "__main__":
+    test_upsert_par_pdf()
+    test_transaction_par_pdf()
+    test_lecture_pendant_le_lot()
+    test_debit()
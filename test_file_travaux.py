@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Test de la file de travaux persistante (baux, workers concurrents, commandes enqueue/status)
+"""
+
+import os
+import sys
+import time
+import logging
+import tempfile
+import subprocess
+import multiprocessing
+from pathlib import Path
+from pdf_extractor import (PDFPropertyExtractor, JobQueue, PropertyRecord, run_queue_worker, JOB_MAX_ATTEMPTS,
+                           CHECKPOINT_DONE, CHECKPOINT_FAILED, CHECKPOINT_PENDING, CHECKPOINT_RUNNING)
+
+def make_rows(pdf_name, count):
+    return [PropertyRecord(department='89', commune='238', section='ZY', numero=str(i), id=f"89238000ZY{i:04d}",
+                           nom=f'MARTIN{i}', prenom='JEAN', fichier_source=pdf_name) for i in range(count)]
+
+def creer_pdfs(directory, count):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = [directory / f"doc{i:03d}.pdf" for i in range(count)]
+    for path in paths:
+        path.write_bytes(b"%PDF-1.4")
+    return paths
+
+def test_cycle_de_vie():
+    print("🧪 TEST CYCLE DE VIE D'UN TRAVAIL (BAIL, ÉCHEC, REPRISE)")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdfs = creer_pdfs(Path(tmp) / "input", 3)
+        with JobQueue(Path(tmp) / "queue.sqlite", lease_seconds=0.2, max_attempts=2) as queue:
+            ids = queue.enqueue(pdfs)
+            assert queue.enqueue(pdfs[:1]) == ids[:1] and queue.stats()['depth'] == 3
+            print(f"  📬 Travaux {ids}, doublon en attente non ajouté")
+
+            premier, second = queue.claim("w1"), queue.claim("w1")
+            assert (premier.id, second.id) == tuple(ids[:2]) and premier.pdf_path == pdfs[0].resolve()
+            assert queue.complete(premier, "w1", make_rows('doc000.pdf', 4))
+            assert queue.results(premier.id) == make_rows('doc000.pdf', 4)
+            assert queue.fail(second, "w1", "quota API dépassé") == CHECKPOINT_PENDING
+            print("  ✅ Terminé avec résultats stockés, échec remis en attente")
+
+            # Le 2e travail est à sa dernière tentative : échec définitif
+            retente = queue.claim("w1")
+            assert retente.id == second.id and retente.attempts == 2
+            assert queue.fail(retente, "w1", "quota API dépassé") == CHECKPOINT_FAILED
+            print("  ✅ Échec définitif après le nombre maximal de tentatives")
+
+            # Worker tué pendant le 3e travail : bail expiré, repris par un autre worker
+            troisieme = queue.claim("w1")
+            assert queue.claim("w2") is None
+            time.sleep(0.25)
+            repris = queue.claim("w2")
+            assert repris.id == troisieme.id and repris.attempts == 2
+            assert not queue.complete(troisieme, "w1", [])
+            assert queue.complete(repris, "w2", make_rows('doc002.pdf', 1))
+            print("  ✅ Bail expiré repris par un autre worker, résultat de l'ancien worker ignoré")
+
+            stats = queue.stats()
+            print(f"  📊 {stats['counts']}")
+            assert stats['counts'] == {CHECKPOINT_PENDING: 0, CHECKPOINT_RUNNING: 0, CHECKPOINT_DONE: 2, CHECKPOINT_FAILED: 1}
+            assert stats['failures'][0]['erreur'] == "quota API dépassé" and stats['rows_in_window'] == 5
+            # Un PDF terminé ou en échec peut être remis dans la file
+            assert queue.enqueue(pdfs[:1]) != ids[:1]
+    return True
+
+def test_bail_renouvele_et_resultat_perime():
+    print("\n🧪 TEST BAIL RENOUVELÉ PENDANT UN LONG PDF, RÉSULTAT D'UN BAIL PERDU")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdfs = creer_pdfs(Path(tmp) / "input", 2)
+        with JobQueue(Path(tmp) / "queue.sqlite", lease_seconds=0.3) as queue:
+            ids = queue.enqueue(pdfs)
+
+            # PDF plus long que le bail : le battement de cœur le garde au worker
+            long_pdf = queue.claim("w1")
+            with queue.keep_alive(long_pdf, "w1"):
+                time.sleep(1.0)
+                assert queue.claim("w2").id == ids[1]
+            assert queue.complete(long_pdf, "w1", make_rows('doc000.pdf', 2))
+            print("  ✅ Bail renouvelé au-delà de sa durée, travail non repris par un autre worker")
+
+            # Bail expiré puis repris : l'ancien worker ne peut ni renouveler ni écraser le résultat
+            perime = queue._db.execute('SELECT tentatives FROM travaux WHERE id = ?', (ids[1],)).fetchone()[0]
+            time.sleep(0.35)
+            repris = queue.claim("w2")
+            assert repris.id == ids[1] and repris.attempts == perime + 1
+            assert queue.complete(repris, "w2", make_rows('doc001.pdf', 3))
+            ancien = repris._replace(attempts=perime)
+            assert not queue.renew(ancien, "w2") and not queue.complete(ancien, "w2", make_rows('doc001.pdf', 9))
+            assert queue.results(ids[1]) == make_rows('doc001.pdf', 3)
+            fichiers = sorted(path.name for path in queue.results_dir.iterdir())
+            print(f"  🗂️ Résultats: {fichiers}")
+            assert fichiers == [f"job-{ids[0]}-1.json", f"job-{ids[1]}-{repris.attempts}.json"]
+            print("  ✅ Résultat publié conservé, fichier de la tentative périmée supprimé")
+    return True
+
+def test_worker_bail_court():
+    print("\n🧪 TEST WORKER: PDF PLUS LONG QUE LE BAIL")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        pdfs = creer_pdfs(Path(tmp) / "input", 1)
+        with JobQueue(extractor.job_queue_path()) as queue:
+            job_id, = queue.enqueue(pdfs)
+        concurrents = []
+
+        def fake_process(pdf_path):
+            extractor.last_pdf_error = None
+            time.sleep(1.0)
+            with JobQueue(extractor.job_queue_path(), lease_seconds=0.3) as queue:
+                concurrents.append(queue.claim("concurrent"))
+            return make_rows(pdf_path.name, 2)
+
+        extractor.process_like_make = fake_process
+        logging.disable(logging.WARNING)
+        try:
+            processed = run_queue_worker(extractor=extractor, worker_id="lent", idle_exit=True, lease_seconds=0.3)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        with JobQueue(extractor.job_queue_path()) as queue:
+            tentatives = queue._db.execute('SELECT tentatives FROM travaux WHERE id = ?', (job_id,)).fetchone()[0]
+            assert queue.job_status(job_id) == CHECKPOINT_DONE and queue.results(job_id) == make_rows("doc000.pdf", 2)
+        assert processed == 1 and concurrents == [None] and tentatives == 1
+        print("  ✅ Bail tenu par le worker pendant tout le PDF, une seule tentative")
+    return True
+
+def worker_simule(queue_path, worker_id):
+    """Worker minimal : réserve et termine des travaux jusqu'à ce que la file soit vide."""
+    with JobQueue(queue_path) as queue:
+        while True:
+            job = queue.claim(worker_id)
+            if job is None:
+                return
+            time.sleep(0.002)
+            queue.complete(job, worker_id, make_rows(job.pdf_path.name, 2))
+
+def test_workers_concurrents(count=200, workers=4):
+    print(f"\n🧪 TEST {workers} PROCESSUS WORKERS SUR {count} TRAVAUX")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue_path = Path(tmp) / "queue.sqlite"
+        with JobQueue(queue_path) as queue:
+            queue.enqueue(creer_pdfs(Path(tmp) / "input", count))
+
+        start = time.perf_counter()
+        processes = [multiprocessing.Process(target=worker_simule, args=(queue_path, f"w{index}"))
+                     for index in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        with JobQueue(queue_path) as queue:
+            rows = queue._db.execute('SELECT statut, tentatives, worker FROM travaux').fetchall()
+            stats = queue.stats()
+        par_worker = {worker: sum(1 for row in rows if row[2] == worker) for worker in sorted({row[2] for row in rows})}
+        print(f"  ⏱️ {elapsed:.2f}s, répartition {par_worker}")
+        assert all(statut == CHECKPOINT_DONE and tentatives == 1 for statut, tentatives, _ in rows)
+        assert stats['counts'][CHECKPOINT_DONE] == count and stats['rows_in_window'] == 2 * count
+        assert len(par_worker) > 1
+        print("  ✅ Chaque travail réservé une seule fois, aucun perdu")
+    return True
+
+def test_worker_extracteur():
+    print("\n🧪 TEST WORKER AVEC L'EXTRACTEUR (process_like_make)")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        pdfs = creer_pdfs(Path(tmp) / "input", 4)
+        appels = []
+
+        def fake_process(pdf_path):
+            appels.append(pdf_path.name)
+            extractor.last_pdf_error = "quota API dépassé" if pdf_path.name == "doc002.pdf" else None
+            return [] if extractor.last_pdf_error else make_rows(pdf_path.name, 3)
+
+        extractor.process_like_make = fake_process
+        with JobQueue(extractor.job_queue_path()) as queue:
+            ids = queue.enqueue(pdfs + [Path(tmp) / "absent.pdf"])
+
+        logging.disable(logging.WARNING)
+        try:
+            processed = run_queue_worker(extractor=extractor, worker_id="test", idle_exit=True)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        with JobQueue(extractor.job_queue_path()) as queue:
+            statuts = [queue.job_status(job_id) for job_id in ids]
+            stats = queue.stats()
+            assert queue.results(ids[0]) == make_rows("doc000.pdf", 3)
+        print(f"  📬 {processed} tentatives, statuts {statuts}")
+        assert statuts == [CHECKPOINT_DONE, CHECKPOINT_DONE, CHECKPOINT_FAILED, CHECKPOINT_DONE, CHECKPOINT_FAILED]
+        assert appels.count("doc002.pdf") == JOB_MAX_ATTEMPTS and processed == 3 + 2 * JOB_MAX_ATTEMPTS
+        assert {Path(failure['chemin']).name for failure in stats['failures']} == {"doc002.pdf", "absent.pdf"}
+        print("  ✅ Résultats par travail, échec retenté puis définitif, fichier introuvable signalé")
+    return True
+
+def test_commandes():
+    print("\n🧪 TEST COMMANDES enqueue / status")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        creer_pdfs(Path(tmp) / "lot", 5)
+        queue_path = str(Path(tmp) / "queue.sqlite")
+        env = dict(os.environ, OPENAI_API_KEY=os.getenv('OPENAI_API_KEY', 'sk-test'))
+        script = str(Path(__file__).resolve().parent / "pdf_extractor.py")
+
+        def commande(*args):
+            return subprocess.run([sys.executable, script, *args], capture_output=True, text=True, check=True,
+                                  env=env, cwd=tmp).stdout
+
+        print("  " + commande("enqueue", str(Path(tmp) / "lot"), "--queue", queue_path).strip())
+        with JobQueue(queue_path) as queue:
+            job = queue.claim("w1")
+            queue.fail(job, "w1", "quota API dépassé")
+        status = commande("status", "--queue", queue_path)
+        print("  " + status.strip().replace("\n", "\n  "))
+        assert "5 en attente" in status and "quota API dépassé" not in status
+        with JobQueue(queue_path, max_attempts=1) as queue:
+            queue.fail(queue.claim("w1"), "w1", "quota API dépassé")
+        status = commande("status", "--queue", queue_path)
+        assert "4 en attente" in status and "1 en échec" in status and "doc000.pdf" in status
+        print("  ✅ Ajout d'un dossier, profondeur, débit et échecs affichés")
+    return True
+
+if __name__ == "__main__":
+    test_cycle_de_vie()
+    test_bail_renouvele_et_resultat_perime()
+    test_worker_bail_court()
+    test_workers_concurrents()
+    test_worker_extracteur()
+    test_commandes()
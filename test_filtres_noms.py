@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test du filtrage propriétaires compilé : identique aux boucles sur mots-clés, mémoïsé
+"""
+
+import json
+import time
+import random
+import logging
+from pdf_extractor import PDFPropertyExtractor, NameFilters, compile_keyword_pattern, DEFAULT_NAME_FILTERS_FILE
+
+with open(DEFAULT_NAME_FILTERS_FILE, encoding='utf-8') as f:
+    FILTRES = json.load(f)
+
+def ressemble_adresse_reference(nom_upper):
+    """Ancienne implémentation : boucle sur chaque mot-clé d'adresse."""
+    return any(keyword in nom_upper for keyword in FILTRES['mots_adresse'] + FILTRES['motifs_adresse'])
+
+def vrai_proprietaire_reference(nom, prenom):
+    """Ancienne implémentation de is_likely_real_owner (boucles sur les listes)."""
+    if not nom.strip():
+        return False
+    nom_upper = nom.upper().strip()
+    prenom_clean = prenom.strip()
+    if nom_upper in FILTRES['mots_parasites']:
+        return False
+    if any(nom_upper.startswith(pattern) for pattern in FILTRES['prefixes_suspects']):
+        return False
+    for keyword in FILTRES['personnes_morales']:
+        if keyword in nom_upper and len(nom.strip()) >= 8:
+            return True
+    if ressemble_adresse_reference(nom_upper):
+        return False
+    if prenom_clean and len(prenom_clean) >= 2:
+        if len(nom.strip()) >= 3 and not ressemble_adresse_reference(nom_upper):
+            return True
+    if not prenom_clean:
+        if (len(nom.strip()) >= 5 and not ressemble_adresse_reference(nom_upper) and
+                not any(char.isdigit() for char in nom) and nom_upper not in FILTRES['noms_vides']):
+            return True
+    for pattern in FILTRES['motifs_noms_classiques']:
+        if pattern in nom_upper and len(nom.strip()) >= 5:
+            return True
+    return False
+
+NOMS_FAMILLE = ["MARTIN", "BERNARD", "DUBOIS", "THOMAS", "ROBERT", "RICHARD", "PETIT", "DURAND", "LEROY",
+                "MOREAU", "SIMON", "LAURENT", "LEFEBVRE", "MICHEL", "GARCIA", "DAVID", "BERTRAND", "ROUX",
+                "VINCENT", "FOURNIER", "MOREL", "GIRARD", "ANDRE", "MERCIER", "DUPONT", "LAMBERT", "BONNET",
+                "FRANCOIS", "MARTINEZ", "LEGRAND", "MACDONALD", "MCKAY", "DE GAULLE", "LA FONTAINE", "ÉTIENNE"]
+PRENOMS = ["JEAN", "MARIE", "PIERRE", "ANNE", "LOUIS", "PAUL", "JEANNE", "JACQUES", "J", "", "", "  "]
+FRAGMENTS = ["COMMUNE DE", "SCI", "SARL", "RUE", "CHEMIN DES", "LIEU-DIT", "AU VILLAGE", "LES", "12", "BIS",
+             "SUR", "MONT", "VAL", "N/A", "ECURIE", "PRES", "SA", "SOCIÉTÉ", "UNION", "ETANG", "X"]
+
+def generer_noms(count, seed=0, distincts=50_000):
+    """Noms synthétiques : personnes, sociétés, adresses, résidus ; répétés comme dans un relevé."""
+    rng = random.Random(seed)
+    vocabulaire = []
+    for _ in range(distincts):
+        kind = rng.random()
+        if kind < 0.5:
+            nom = rng.choice(NOMS_FAMILLE) + rng.choice(["", "", " " + rng.choice(NOMS_FAMILLE)])
+        elif kind < 0.8:
+            nom = " ".join(rng.choice(FRAGMENTS + NOMS_FAMILLE) for _ in range(rng.randint(1, 4)))
+        else:
+            nom = "".join(rng.choice("ABCDEFGHIJLMNOPRSTUV ÉÈ0123-'") for _ in range(rng.randint(0, 14)))
+        vocabulaire.append((rng.choice(["", " "]) + nom.lower() if rng.random() < 0.05 else nom, rng.choice(PRENOMS)))
+    vocabulaire += [(word, "") for word in FILTRES['mots_parasites']] + [("", "JEAN"), ("   ", "")]
+    return [rng.choice(vocabulaire) for _ in range(count)]
+
+def test_regex_arborescente():
+    print("🧪 TEST REGEX ARBORESCENTE = BOUCLE SUR MOTS-CLÉS")
+    print("=" * 50)
+
+    keywords = ["PRE", "PRES", "PRES DE", "A.B", "[X]", "É"]
+    pattern = compile_keyword_pattern(keywords)
+    print(f"  Regex: {pattern.pattern}")
+    for text in ["PRE", "PR", "XPRES DEY", "A.B", "AXB", "[X]", "X]", "ÉTAT", "", "E"]:
+        assert (pattern.search(text) is not None) == any(k in text for k in keywords), text
+    assert compile_keyword_pattern([]).search("PRE") is None
+    print("  ✅ Préfixes communs, caractères spéciaux et liste vide")
+    return True
+
+def test_identique_ancienne_implementation():
+    print("\n🧪 TEST FILTRAGE COMPILÉ = ANCIENNE IMPLÉMENTATION")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    noms = set(generer_noms(100_000, seed=1))
+    for nom, prenom in noms:
+        assert extractor.is_likely_real_owner(nom, prenom) == vrai_proprietaire_reference(nom, prenom), (nom, prenom)
+        assert extractor.looks_like_address(nom.upper()) == ressemble_adresse_reference(nom.upper()), nom
+    print(f"  ✅ {len(noms)} noms distincts classés à l'identique")
+
+    # Dictionnaires éditables : un mot ajouté au fichier est pris en compte
+    filtres = dict(FILTRES, mots_parasites=FILTRES['mots_parasites'] + ['DUPONTEL'])
+    assert PDFPropertyExtractor.is_likely_real_owner(extractor, "DUPONTEL", "")
+    assert not NameFilters(filtres).is_likely_real_owner("DUPONTEL", "")
+    print("  ✅ Mot parasite ajouté pris en compte")
+    return True
+
+def test_benchmark_million_noms(count=1_000_000):
+    print(f"\n🧪 BENCHMARK {count:,} NOMS SYNTHÉTIQUES".replace(",", " "))
+    print("=" * 50)
+
+    noms = generer_noms(count, seed=2)
+    logging.disable(logging.INFO)
+    try:
+        timings = {}
+        resultats = {}
+        for label, function in [
+            ("boucles", vrai_proprietaire_reference),
+            ("regex compilée", NameFilters(FILTRES)._is_likely_real_owner),
+            ("regex + mémo", NameFilters(FILTRES).is_likely_real_owner),
+        ]:
+            start = time.perf_counter()
+            resultats[label] = [function(nom, prenom) for nom, prenom in noms]
+            timings[label] = time.perf_counter() - start
+            print(f"  ⏱️ {label}: {timings[label]:.2f}s")
+    finally:
+        logging.disable(logging.NOTSET)
+
+    assert resultats["boucles"] == resultats["regex compilée"] == resultats["regex + mémo"]
+    print(f"  ✅ {sum(resultats['boucles'])} propriétaires retenus, gain x{timings['boucles'] / timings['regex + mémo']:.1f}")
+    return True
+
+if __name__ == "__main__":
+    test_regex_arborescente()
+    test_identique_ancienne_implementation()
+    test_benchmark_million_noms()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test de l'index persistant inter-exécutions (nouveau / modifié / inchangé, export delta)
+"""
+
+import time
+import logging
+import tempfile
+from pathlib import Path
+import pandas as pd
+from pdf_extractor import (PDFPropertyExtractor, ParcelIndex, PropertyRecord,
+                           STATUS_NEW, STATUS_CHANGED, STATUS_UNCHANGED)
+
+def make_rows(count, start=0, contenance='25', commune='238'):
+    return [
+        PropertyRecord(department='89', commune=commune, section='ZY', numero=str(i),
+                       id=f"89{commune}000ZY{i:04d}"[-14:], nom=f'MARTIN{i % 100}', prenom='JEAN',
+                       droit_reel='PP', contenance_a=contenance, fichier_source='a.pdf')
+        for i in range(start, start + count)
+    ]
+
+def test_statuts_entre_executions():
+    print("🧪 TEST STATUTS ENTRE DEUX EXÉCUTIONS")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = Path(tmp) / "index.sqlite"
+        premier = make_rows(1_200)
+        with ParcelIndex(index_path) as index:
+            statuts = [status for status, _ in index.tag(premier, run_id="T1")]
+            assert statuts == [STATUS_NEW] * 1_200 and len(index) == 1_200
+        print("  ✅ Première exécution: 1200 nouvelles")
+
+        # Trimestre suivant (index rouvert) : contenance modifiée, nouvelles lignes, doublon interne,
+        # même parcelle avec un autre propriétaire (= nouvelle ligne)
+        second = make_rows(1_000) + make_rows(200, start=1_000, contenance='30') + make_rows(50, start=5_000)
+        second += make_rows(1, start=5_000)
+        autre_proprietaire = make_rows(1)[0].copy()
+        autre_proprietaire['nom'] = 'DURAND'
+        second.append(autre_proprietaire)
+        with ParcelIndex(index_path) as index:
+            tagged = index.tag(second, run_id="T2")
+            statuts = [status for status, _ in tagged]
+            assert statuts[:1_000] == [STATUS_UNCHANGED] * 1_000
+            assert statuts[1_000:1_200] == [STATUS_CHANGED] * 200
+            assert statuts[1_200:1_250] == [STATUS_NEW] * 50
+            assert statuts[1_250:] == [STATUS_UNCHANGED, STATUS_NEW]
+            assert [prop for _, prop in tagged] == second
+            assert len(index) == 1_251
+            runs = index._db.execute('SELECT * FROM runs ORDER BY run_id').fetchall()
+        print(f"  📊 Exécutions enregistrées: {runs}")
+        assert runs == [("T1", 1_200, 0, 0, 0), ("T2", 51, 200, 1_001, 0)]
+        print("  ✅ Inchangées, modifiées, nouvelles, doublon interne et nouveau propriétaire")
+    return True
+
+def test_export_delta():
+    print("\n🧪 TEST EXPORT DELTA")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        index_path = Path(tmp) / "index.sqlite"
+        extractor.export_delta_with_index(make_rows(10), index_path=str(index_path))
+
+        path = extractor.export_delta_with_index(make_rows(8) + make_rows(2, start=8, contenance='99') + make_rows(1, start=10),
+                                                 index_path=str(index_path))
+        delta = pd.read_csv(path, sep=';', dtype=str, encoding='utf-8-sig')
+        print(delta[['Statut', 'Numéro', 'Contenance A']].to_string(index=False))
+        assert delta.columns[0] == 'Statut'
+        assert delta['Statut'].tolist() == [STATUS_CHANGED, STATUS_CHANGED, STATUS_NEW]
+        assert delta['Numéro'].tolist() == ['8', '9', '10']
+
+        # Aucun changement : fichier delta avec en-têtes seulement
+        path = extractor.export_delta_with_index(make_rows(8), index_path=str(index_path))
+        assert pd.read_csv(path, sep=';', encoding='utf-8-sig').empty
+    print("  ✅ Delta limité aux lignes nouvelles et modifiées")
+    return True
+
+def test_lignes_retirees_de_l_export():
+    print("\n🧪 TEST LIGNES RETIRÉES PAR LA DÉDUPLICATION FINALE PUIS RÉAPPARUES")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        index_path = Path(tmp) / "index.sqlite"
+        extractor.export_delta_with_index(make_rows(10), index_path=str(index_path))
+        # Lignes 8 et 9 absentes de l'export suivant : retirées de l'index
+        extractor.export_delta_with_index(make_rows(8), index_path=str(index_path))
+        with ParcelIndex(index_path) as index:
+            assert len(index) == 8
+            assert index._db.execute('SELECT supprimes FROM runs ORDER BY rowid DESC').fetchone()[0] == 2
+
+        # Réapparues à l'identique : nouvelles par rapport au dernier export, pas inchangées
+        path = extractor.export_delta_with_index(make_rows(10), index_path=str(index_path))
+        delta = pd.read_csv(path, sep=';', dtype=str, encoding='utf-8-sig')
+        print(delta[['Statut', 'Numéro']].to_string(index=False))
+        assert delta['Statut'].tolist() == [STATUS_NEW, STATUS_NEW] and delta['Numéro'].tolist() == ['8', '9']
+
+        # Classement partiel (full_run=False) : aucune suppression
+        with ParcelIndex(index_path) as index:
+            index.tag(make_rows(1), run_id="partiel")
+            assert len(index) == 10
+    print("  ✅ Index aligné sur le dernier export complet")
+    return True
+
+def test_executions_par_commune():
+    print("\n🧪 TEST EXÉCUTIONS SUCCESSIVES SUR DES COMMUNES DIFFÉRENTES")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        index_path = str(Path(tmp) / "index.sqlite")
+        extractor.export_delta_with_index(make_rows(10, commune='238'), index_path=index_path)
+        # Commune 239 seule : les lignes de la commune 238 restent indexées
+        extractor.export_delta_with_index(make_rows(5, commune='239'), index_path=index_path)
+        with ParcelIndex(index_path) as index:
+            assert len(index) == 15
+            assert index._db.execute('SELECT supprimes FROM runs ORDER BY rowid DESC').fetchone()[0] == 0
+
+        # Relance de la commune 238 sans changement : delta vide ; une parcelle disparue n'est retirée que dans sa commune
+        path = extractor.export_delta_with_index(make_rows(10, commune='238'), index_path=index_path)
+        assert pd.read_csv(path, sep=';', encoding='utf-8-sig').empty
+        path = extractor.export_delta_with_index(make_rows(4, commune='239'), index_path=index_path)
+        assert pd.read_csv(path, sep=';', encoding='utf-8-sig').empty
+        with ParcelIndex(index_path) as index:
+            assert len(index) == 14
+            perimetres = dict(index._db.execute('SELECT perimetre, COUNT(*) FROM parcelles GROUP BY perimetre'))
+        print(f"  🗂️ Lignes indexées par commune: {perimetres}")
+        assert perimetres == {'89|238': 10, '89|239': 4}
+    print("  ✅ Suppressions limitées aux communes de l'exécution, delta des autres communes intact")
+    return True
+
+def test_recherche_a_grande_echelle():
+    print("\n🧪 TEST TEMPS DE RECHERCHE SELON LA TAILLE DE L'INDEX")
+    print("=" * 50)
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as tmp, ParcelIndex(Path(tmp) / "index.sqlite") as index:
+            sonde = make_rows(20_000, start=10_000_000)
+            timings = []
+            loaded = 0
+            for target in (100_000, 400_000):
+                while loaded < target:
+                    index.tag(make_rows(50_000, start=loaded), run_id=f"charge{loaded}")
+                    loaded += 50_000
+                start = time.perf_counter()
+                index.tag(sonde, run_id=f"sonde{target}")
+                timings.append(time.perf_counter() - start)
+                print(f"  ⏱️ {len(index)} lignes indexées: 20 000 lignes classées en {timings[-1]:.2f}s")
+    finally:
+        logging.disable(logging.NOTSET)
+
+    # Index 4x plus grand : temps de classement quasi constant
+    assert timings[1] < timings[0] * 2
+    print("  ✅ Temps de recherche indépendant de la taille de l'index")
+    return True
+
+if __name__ == "__main__":
+    test_statuts_entre_executions()
+    test_export_delta()
+    test_lignes_retirees_de_l_export()
+    test_executions_par_commune()
+    test_recherche_a_grande_echelle()
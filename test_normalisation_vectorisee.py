@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test de la normalisation vectorisée : résultats identiques au traitement ligne par ligne
+"""
+
+import time
+import itertools
+import warnings
+from pdf_extractor import PDFPropertyExtractor, clean_commune_code
+
+DEPARTEMENTS = ["89", "5", "", "N/A", " 51 ", "2A", "123", "-5"]
+COMMUNES = ["238", "7", "51179", "", "N/A", "COM 42", "BAR-LE-DUC", " 12 ", "1²", "+7", "A-12"]
+SECTIONS = ["A", "ZY", "302A", "302 AB", "", "N/A", "b", "1 ZD", "ABCDEF", " 12 c", "É", "302\x1fA", "1  ZD", "-A", "302 -B"]
+NUMEROS = ["12", "0045", "", "N/A", "12345", "A12", "P", "7b", "²3"]
+PREFIXES = ["", "302", "N/A", "1", "12345", "123456", " 12 ", "1"]
+CONTENANCES = ["", "N/A", "null", "12", "1 234", "12,50", "3.7", "0,5", "abc", "12a3", " 45 ", "²", "-3", None]
+NOMS = [
+    ("MARTIN", "JEAN"), ("JEAN MARTIN", "JEAN"), ("JEAN PIERRE MARTIN", ""), ("PIERRE DUPONT", ""),
+    ("COMMUNE DE BAR", ""), ("SCI DU CENTRE", ""), ("DURAND", ""), ("", ""), ("  ", "PAUL"),
+    ("MARIE ANNE LEFEBVRE", "  "), ("SALOMON", ""), ("COMTE DE PARIS", ""), ("MARTIN", "MARTIN"),
+    ("JEAN\tLOUIS  MARTIN", ""), ("ÉLODIE MARTIN", ""), ("JEAN\x1fMARTIN", ""), ("ÉTAT FRANÇAIS", ""),
+]
+
+def normalisation_scalaire(extractor, properties):
+    """Référence : traitement ligne par ligne."""
+    rows = []
+    for prop in extractor.separate_stuck_prefixes([dict(prop) for prop in properties]):
+        prop['commune'] = clean_commune_code(prop['commune'])
+        for column in ['contenance_ha', 'contenance_a', 'contenance_ca']:
+            prop[column] = extractor.parse_contenance_value(prop[column])
+        prop['nom'], prop['prenom'] = extractor.split_name_intelligently(prop['nom'], prop['prenom'])
+        prop['id'] = extractor.generate_unique_id(prop['department'], prop['commune'], prop['section'],
+                                                  prop['numero'], prop['prefixe'])
+        rows.append(prop)
+    return rows
+
+def test_identite_avec_scalaire():
+    print("🧪 TEST NORMALISATION VECTORISÉE = LIGNE PAR LIGNE")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+
+    # Commune et contenance
+    assert list(extractor.vectorized_clean_commune_code(COMMUNES)) == [clean_commune_code(c) for c in COMMUNES]
+    assert list(extractor.vectorized_parse_contenance(CONTENANCES)) == [
+        extractor.parse_contenance_value(c if c is not None else "") for c in CONTENANCES
+    ]
+    print("  ✅ Commune et contenance identiques")
+
+    # Noms/prénoms
+    noms, prenoms = extractor.vectorized_split_names([n for n, _ in NOMS], [p for _, p in NOMS])
+    assert list(zip(noms, prenoms)) == [extractor.split_name_intelligently(n, p) for n, p in NOMS]
+    print("  ✅ Noms/prénoms identiques")
+
+    # Préfixes collés
+    pairs = list(itertools.product(PREFIXES, SECTIONS))
+    with warnings.catch_warnings():
+        # Aucun avertissement pandas (motif avec groupes de capture dans str.contains)
+        warnings.simplefilter("error", UserWarning)
+        prefixes, sections, _ = extractor.vectorized_separate_stuck_prefixes(*zip(*pairs))
+    expected = extractor.separate_stuck_prefixes([{'prefixe': p, 'section': s} for p, s in pairs])
+    assert list(zip(prefixes, sections)) == [(e['prefixe'], e['section']) for e in expected]
+    print("  ✅ Séparation des préfixes identique")
+
+    # ID unique : produit cartésien de tous les cas limites
+    combinations = list(itertools.product(DEPARTEMENTS, COMMUNES, SECTIONS, NUMEROS, PREFIXES))
+    ids = extractor.vectorized_generate_unique_id(*zip(*combinations))
+    expected_ids = [extractor.generate_unique_id(*values) for values in combinations]
+    mismatches = [(c, i, e) for c, i, e in zip(combinations, ids, expected_ids) if i != e]
+    assert not mismatches, mismatches[:5]
+    print(f"  ✅ {len(combinations)} IDs identiques")
+    return True
+
+def test_normalisation_lot():
+    print("\n🧪 TEST NORMALISATION D'UN LOT COMPLET")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    properties = [
+        {'department': '89', 'commune': '89238', 'prefixe': '', 'section': '302A', 'numero': '12',
+         'contenance_ha': '1 234', 'contenance_a': '05', 'contenance_ca': '12,5',
+         'nom': 'JEAN PIERRE MARTIN', 'prenom': ''},
+        {'department': '51', 'commune': '179', 'prefixe': '', 'section': 'ZY', 'numero': '4',
+         'contenance_ha': '', 'contenance_a': 'N/A', 'contenance_ca': '7',
+         'nom': 'COMMUNE DE DAMPIERRE', 'prenom': ''},
+    ] * 50_000
+
+    start = time.perf_counter()
+    df = extractor.normalize_properties_vectorized(properties)
+    elapsed = time.perf_counter() - start
+    print(f"  ⏱️ {len(df)} lignes normalisées en {elapsed:.2f}s")
+
+    # Référence : traitement ligne par ligne des deux lignes distinctes
+    for index, prop in enumerate(normalisation_scalaire(extractor, properties[:2])):
+        assert df.loc[index, list(prop)].tolist() == list(prop.values()), index
+    print("  ✅ Lot normalisé correctement")
+    return True
+
+def test_toutes_lignes_en_repli():
+    print("\n🧪 TEST LOT DONT TOUTES LES LIGNES PASSENT PAR LE REPLI SCALAIRE (ACCENTS)")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    accentuees = [
+        {'department': '89', 'commune': '238 É', 'prefixe': '', 'section': '302É', 'numero': '12',
+         'contenance_ha': '1²', 'contenance_a': '05', 'contenance_ca': '12,5', 'nom': 'LEFÈVRE', 'prenom': 'HÉLÈNE'},
+        {'department': '51', 'commune': '179', 'prefixe': 'É', 'section': 'ZY', 'numero': '4',
+         'contenance_ha': '', 'contenance_a': '²7', 'contenance_ca': '', 'nom': 'ÉMILE GÉRARD', 'prenom': ''},
+    ]
+    # Un lot entièrement accentué, puis une seule ligne accentuée
+    for properties in (accentuees, accentuees[:1], accentuees[1:]):
+        df = extractor.normalize_properties_vectorized(properties)
+        for index, prop in enumerate(normalisation_scalaire(extractor, properties)):
+            assert df.loc[index, list(prop)].tolist() == list(prop.values()), (len(properties), index)
+    noms, prenoms = extractor.vectorized_split_names(["LEFÈVRE", "GÉRARD"], ["HÉLÈNE", "ÉMILE"])
+    assert list(zip(noms, prenoms)) == [("LEFÈVRE", "HÉLÈNE"), ("GÉRARD", "ÉMILE")]
+    assert list(extractor.vectorized_clean_commune_code(["Ä12"])) == [clean_commune_code("Ä12")]
+    print("  ✅ Lots de 2 et de 1 ligne(s) accentuée(s) identiques au traitement ligne par ligne")
+    return True
+
+if __name__ == "__main__":
+    test_identite_avec_scalaire()
+    test_normalisation_lot()
+    test_toutes_lignes_en_repli()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test de l'ordonnancement des PDF (plus court d'abord, voies prioritaires, latences par voie)
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import logging
+import tempfile
+import subprocess
+from pathlib import Path
+import fitz
+from pdf_extractor import (PDFPropertyExtractor, JobQueue, estimate_pdf_cost, shortest_job_first, latency_percentiles,
+                           fingerprint_pdf, CHECKPOINT_PENDING)
+
+def creer_pdf(path, pages):
+    doc = fitz.open()
+    for number in range(pages):
+        doc.new_page().insert_text((50, 60), f"RELEVÉ DE PROPRIÉTÉ - page {number + 1}")
+    doc.save(path)
+    doc.close()
+    return path
+
+def temps_moyen_achevement(pdf_files, cost):
+    ecoule = total = 0.0
+    for pdf_path in pdf_files:
+        ecoule += cost(pdf_path)
+        total += ecoule
+    return total / len(pdf_files)
+
+def test_plus_court_d_abord():
+    print("🧪 TEST PLUS COURT D'ABORD (PAGES, TAILLE)")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gros = creer_pdf(Path(tmp) / "a_gros.pdf", 120)
+        # Petits PDF de même contenu : coût égal (la taille d'un PDF fitz varie d'un octet selon la date)
+        modele = creer_pdf(Path(tmp) / "modele.pdf", 2).read_bytes()
+        (Path(tmp) / "modele.pdf").unlink()
+        petits = [Path(tmp) / f"b_petit{i:02d}.pdf" for i in range(12)]
+        for petit in petits:
+            petit.write_bytes(modele)
+        moyen = creer_pdf(Path(tmp) / "c_moyen.pdf", 10)
+        glob_order = sorted(Path(tmp).glob("*.pdf"))
+
+        assert estimate_pdf_cost(petits[0]) < estimate_pdf_cost(moyen) < estimate_pdf_cost(gros)
+        assert estimate_pdf_cost(gros, fingerprint_pdf(gros)) == estimate_pdf_cost(gros)
+        assert estimate_pdf_cost(Path(tmp) / "absent.pdf") == 0
+        ordre = shortest_job_first(glob_order)
+        assert ordre == petits + [moyen, gros]
+
+        avant = temps_moyen_achevement(glob_order, estimate_pdf_cost)
+        apres = temps_moyen_achevement(ordre, estimate_pdf_cost)
+        print(f"  ⏱️ Temps moyen d'achèvement estimé: ordre du dossier {avant:.0f}s → plus court d'abord {apres:.0f}s")
+        assert apres < avant / 3
+        print("  ✅ Petits PDF avant le gros, ordre stable à coût égal")
+    return True
+
+def test_lot_ordonne():
+    print("\n🧪 TEST LOT: ORDRE DE TRAITEMENT")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        creer_pdf(extractor.input_dir / "a_gros.pdf", 60)
+        for index in range(3):
+            creer_pdf(extractor.input_dir / f"b_petit{index}.pdf", 1)
+        traites = []
+        extractor.list_pdf_files = lambda: sorted(extractor.input_dir.glob("*.pdf"))
+        extractor.process_like_make = lambda pdf_path: traites.append(pdf_path.name) or []
+        logging.disable(logging.WARNING)
+        try:
+            extractor.run()
+        finally:
+            logging.disable(logging.NOTSET)
+        print(f"  📄 Ordre: {traites}")
+        assert traites == ['b_petit0.pdf', 'b_petit1.pdf', 'b_petit2.pdf', 'a_gros.pdf']
+        print("  ✅ Empreintes de la pré-analyse réutilisées pour ordonner le lot")
+    return True
+
+def test_voies_prioritaires():
+    print("\n🧪 TEST VOIES PRIORITAIRES DE LA FILE")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gros = creer_pdf(Path(tmp) / "gros.pdf", 80)
+        petit = creer_pdf(Path(tmp) / "petit.pdf", 2)
+        urgent = creer_pdf(Path(tmp) / "urgent.pdf", 40)
+        autre = creer_pdf(Path(tmp) / "autre.pdf", 3)
+        with JobQueue(Path(tmp) / "queue.sqlite") as queue:
+            queue.enqueue([gros, petit])
+            queue.enqueue([urgent], lane='interactive')
+            jobs = [queue.claim("w") for _ in range(3)]
+            ordre = [job.pdf_path.name for job in jobs]
+            print(f"  📬 Réservations: {ordre}")
+            assert ordre == ['urgent.pdf', 'petit.pdf', 'gros.pdf']
+            for job in jobs:
+                queue.complete(job, "w", [])
+
+            # Vieillissement : un gros PDF en attente depuis longtemps passe devant un petit récent
+            queue.enqueue([gros])
+            queue._db.execute("UPDATE travaux SET ajout = ajout - 3600 WHERE statut = ?", (CHECKPOINT_PENDING,))
+            queue.enqueue([petit])
+            job = queue.claim("w")
+            assert job.pdf_path.name == 'gros.pdf'
+            queue.complete(job, "w", [])
+            queue.complete(queue.claim("w"), "w", [])
+
+            # Remise d'un PDF en attente dans la voie interactive : sa priorité est relevée
+            queue.enqueue([autre])
+            ids = queue.enqueue([autre], lane='interactive')
+            job = queue.claim("w")
+            assert (job.id, job.lane) == (ids[0], 'interactive')
+            try:
+                queue.enqueue([autre], lane='urgent')
+                raise AssertionError("voie inconnue acceptée")
+            except ValueError:
+                pass
+        print("  ✅ Voie interactive d'abord, plus court d'abord dans une voie, vieillissement, relèvement de voie")
+    return True
+
+def test_latences_par_voie():
+    print("\n🧪 TEST LATENCES PAR VOIE")
+    print("=" * 50)
+
+    assert latency_percentiles([]) == {}
+    assert latency_percentiles([float(v) for v in range(1, 101)]) == {'p50': 50.0, 'p90': 90.0, 'p99': 99.0}
+    assert latency_percentiles([3.0]) == {'p50': 3.0, 'p90': 3.0, 'p99': 3.0}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdfs = [creer_pdf(Path(tmp) / f"doc{i}.pdf", 1) for i in range(6)]
+        queue_path = Path(tmp) / "queue.sqlite"
+        with JobQueue(queue_path) as queue:
+            queue.enqueue(pdfs[:4])
+            queue.enqueue(pdfs[4:], lane='interactive')
+            while (job := queue.claim("w")) is not None:
+                queue.complete(job, "w", [])
+            # Latences connues : bulk 10/20/30/40 s, interactive 1/2 s
+            for job_id, latence in zip(range(1, 7), (10, 20, 30, 40, 1, 2)):
+                queue._db.execute('UPDATE travaux SET ajout = fin - ?, debut = fin - 0.5 WHERE id = ?', (latence, job_id))
+            stats = queue.stats()
+        lanes = stats['lanes']
+        print(f"  📊 {lanes}")
+        assert lanes['bulk']['latency'] == {'p50': 20, 'p90': 40, 'p99': 40} and lanes['bulk']['done'] == 4
+        assert lanes['interactive']['latency']['p50'] == 1 and lanes['interactive']['wait']['p50'] == 0.5
+        assert stats['depth_by_lane'] == {'interactive': 0, 'bulk': 0}
+
+        env = dict(os.environ, OPENAI_API_KEY=os.getenv('OPENAI_API_KEY', 'sk-test'))
+        sortie = subprocess.run([sys.executable, str(Path(__file__).resolve().parent / "pdf_extractor.py"), "status",
+                                 "--queue", str(queue_path)], capture_output=True, text=True, check=True, env=env).stdout
+        print("  " + sortie.strip().replace("\n", "\n  "))
+        assert "Voie interactive: 0 en attente, latence p50 1.0s" in sortie
+        print("  ✅ Percentiles d'attente et de latence par voie, affichés par `status`")
+    return True
+
+def test_migration_file_existante():
+    print("\n🧪 TEST FILE CRÉÉE AVANT L'ORDONNANCEMENT")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "queue.sqlite"
+        db = sqlite3.connect(str(path))
+        db.execute('CREATE TABLE travaux (id INTEGER PRIMARY KEY AUTOINCREMENT, chemin TEXT NOT NULL, statut TEXT NOT NULL, '
+                   'tentatives INTEGER NOT NULL DEFAULT 0, worker TEXT, bail REAL, ajout REAL, debut REAL, fin REAL, '
+                   'lignes INTEGER, resultat TEXT, erreur TEXT)')
+        db.execute("INSERT INTO travaux (chemin, statut, ajout) VALUES ('/ancien.pdf', ?, ?)", (CHECKPOINT_PENDING, time.time()))
+        db.commit()
+        db.close()
+        with JobQueue(path) as queue:
+            job = queue.claim("w")
+            assert job.pdf_path == Path('/ancien.pdf') and job.lane == 'bulk'
+        print("  ✅ Colonnes voie/coût ajoutées, travaux existants conservés")
+    return True
+
+if __name__ == "__main__":
+    test_plus_court_d_abord()
+    test_lot_ordonne()
+    test_voies_prioritaires()
+    test_latences_par_voie()
+    test_migration_file_existante()
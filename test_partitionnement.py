@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test du partitionnement statique d'un lot (run --shard i/N sur plusieurs processes, puis merge)
+"""
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+import subprocess
+import multiprocessing
+from pathlib import Path
+import pandas as pd
+from pdf_extractor import (PDFPropertyExtractor, PropertyRecord, parse_shard, shard_of, select_shard,
+                           shard_output_dir, find_shard_manifests, SHARD_RESULTS_FILENAME)
+
+def make_rows(pdf_name):
+    """Deux lignes propres au PDF et une parcelle commune à tous les PDF (doublon entre fichiers)."""
+    rows = [PropertyRecord(department='89', commune='238', section='ZY', numero=str(i), id=f"89238000ZY{i:04d}",
+                           nom=f'MARTIN{pdf_name[3:6]}', prenom='JEAN', droit_reel='PP', fichier_source=pdf_name)
+            for i in range(2)]
+    rows.append(PropertyRecord(department='89', commune='238', section='AB', numero='7', id="89238000AB0007",
+                               nom='DURAND', prenom='MARIE', droit_reel='PP', fichier_source=pdf_name))
+    return rows
+
+def creer_pdfs(directory, count):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = [directory / f"doc{i:03d}.pdf" for i in range(count)]
+    for path in paths:
+        path.write_bytes(b"%PDF-1.4 " + path.name.encode())
+    return paths
+
+def extracteur_simule(tmp, output="output"):
+    extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/{output}")
+    extractor.list_pdf_files = lambda: sorted(extractor.input_dir.glob("*.pdf"))
+    extractor.process_like_make = lambda pdf_path: make_rows(pdf_path.name)
+    return extractor
+
+def noeud(tmp, index, count):
+    """Une « machine » : traite son shard dans le dossier partagé."""
+    logging.disable(logging.WARNING)
+    extracteur_simule(tmp).run(shard=(index, count))
+
+def lignes_csv(path):
+    df = pd.read_csv(path, sep=';', dtype=str, encoding='utf-8-sig', keep_default_na=False)
+    return sorted(map(tuple, df.drop(columns=['Fichier source']).values.tolist()))
+
+def test_partition_deterministe():
+    print("🧪 TEST PARTITION DÉTERMINISTE PAR CONTENU")
+    print("=" * 50)
+
+    assert parse_shard("2/4") == (2, 4)
+    for invalide in ("0/4", "5/4", "2", "a/b"):
+        try:
+            parse_shard(invalide)
+            raise AssertionError(f"{invalide} accepté")
+        except ValueError:
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdfs = creer_pdfs(Path(tmp) / "a", 40)
+        shards = [select_shard(pdfs, index, 4) for index in range(1, 5)]
+        print(f"  🧩 Répartition: {[len(shard) for shard in shards]}")
+        assert sorted(sum(shards, [])) == pdfs and all(shards)
+
+        # Autre machine, autres noms : même contenu → même shard
+        copie = Path(tmp) / "b"
+        copie.mkdir()
+        for pdf in pdfs:
+            shutil.copy(pdf, copie / f"renomme_{pdf.name}")
+        assert [shard_of(copie / f"renomme_{pdf.name}", 4) for pdf in pdfs] == [shard_of(pdf, 4) for pdf in pdfs]
+        print("  ✅ Chaque PDF dans un seul shard, indépendamment du nom et de la machine")
+    return True
+
+def test_shards_paralleles_puis_fusion(count=3):
+    print(f"\n🧪 TEST {count} PROCESSUS SUR UN DOSSIER PARTAGÉ, PUIS FUSION")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        creer_pdfs(Path(tmp) / "input", 12)
+        processes = [multiprocessing.Process(target=noeud, args=(tmp, index, count)) for index in range(1, count + 1)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert all(process.exitcode == 0 for process in processes)
+
+        manifests = find_shard_manifests(Path(tmp) / "output")[count]
+        assert sorted(manifests) == list(range(1, count + 1))
+        assert sorted(name for manifest in manifests.values() for name in manifest['pdfs']) == \
+            [f"doc{i:03d}.pdf" for i in range(12)]
+        for index in range(1, count + 1):
+            shard_dir = shard_output_dir(Path(tmp) / "output", index, count)
+            assert (shard_dir / "output.csv").exists() and (shard_dir / "batch_journal.sqlite").exists()
+        assert not (Path(tmp) / "output" / "output.csv").exists()
+        print(f"  📁 Sorties par shard: {[len(manifests[i]['pdfs']) for i in sorted(manifests)]} PDF")
+
+        # Fusion par la commande merge
+        env = dict(os.environ, OPENAI_API_KEY=os.getenv('OPENAI_API_KEY', 'sk-test'))
+        subprocess.run([sys.executable, str(Path(__file__).resolve().parent / "pdf_extractor.py"), "merge"],
+                       capture_output=True, text=True, check=True, env=env, cwd=tmp)
+        output = Path(tmp) / "output"
+        assert (output / "output.xlsx").exists() and (output / "output_parquet").is_dir()
+        fusion = lignes_csv(output / "output.csv")
+
+        # Référence : le même lot traité sur une seule machine
+        logging.disable(logging.WARNING)
+        try:
+            extracteur_simule(tmp, output="reference").run()
+        finally:
+            logging.disable(logging.NOTSET)
+        reference = lignes_csv(Path(tmp) / "reference" / "output.csv")
+        print(f"  📊 Fusion: {len(fusion)} lignes, lot unique: {len(reference)} lignes")
+        assert fusion == reference and len(fusion) == 12 * 2 + 1
+        print("  ✅ Doublons entre shards supprimés, exports CSV/Excel/Parquet identiques au lot sur une machine")
+    return True
+
+def test_fusion_incomplete_et_reprise():
+    print("\n🧪 TEST FUSION INCOMPLÈTE ET REPRISE D'UN SHARD")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        creer_pdfs(Path(tmp) / "input", 6)
+        extractor = extracteur_simule(tmp)
+        appels = []
+        extractor.process_like_make = lambda pdf_path: appels.append(pdf_path.name) or make_rows(pdf_path.name)
+        logging.disable(logging.ERROR)
+        try:
+            extractor.run(shard=(1, 2))
+            assert extractor.merge_shards() == []
+            assert not (extractor.output_dir / "output.csv").exists()
+            print("  ✅ Shard 2/2 manquant: fusion refusée")
+
+            # Reprise du shard 1 : rien n'est retraité
+            traites = list(appels)
+            extractor.run(resume=True, shard=(1, 2))
+            assert appels == traites and len(traites) == len(select_shard(extractor.list_pdf_files(), 1, 2))
+
+            extractor.run(shard=(2, 2))
+            # Découpage obsolète en 3 shards présent : ambigu sans --shards
+            extractor.run(shard=(1, 3))
+            assert extractor.merge_shards() == []
+            merged = extractor.merge_shards(2)
+        finally:
+            logging.disable(logging.NOTSET)
+        assert len(merged) == 6 * 2 + 1 and (extractor.output_dir / "output.csv").exists()
+        resultats = shard_output_dir(extractor.output_dir, 1, 2) / SHARD_RESULTS_FILENAME
+        assert resultats.exists()
+        print("  ✅ Reprise par shard, découpage choisi explicitement quand plusieurs coexistent")
+    return True
+
+if __name__ == "__main__":
+    test_partition_deterministe()
+    test_shards_paralleles_puis_fusion()
+    test_fusion_incomplete_et_reprise()
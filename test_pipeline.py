@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test du pipeline par étapes (rendu → tableaux → vision → fusion → écriture, files bornées)
+"""
+
+import time
+import logging
+import tempfile
+import threading
+from pathlib import Path
+import fitz
+import pandas as pd
+from pdf_extractor import (PDFPropertyExtractor, PipelineSettings, BatchJournal, TimeoutLimits,
+                           CHECKPOINT_DONE, CHECKPOINT_FAILED, CHECKPOINT_TIMED_OUT)
+
+def creer_pdf(path, pages=2):
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page(width=100, height=140)
+        for line in range(8):
+            page.insert_text((5, 12 + 15 * line), f"RELEVÉ DE PROPRIÉTÉ {path.stem} {number + 1}", fontsize=5)
+    doc.save(path)
+    doc.close()
+    return path
+
+def make_props(count, start=0):
+    return [{'Sec': 'ZY', 'N° Plan': str(start + i + 1), 'Adresse': 'LES GRANDS CHAMPS', 'HA': '', 'A': '25', 'CA': '40'}
+            for i in range(count)]
+
+class Traces:
+    """Intervalles (début, fin) de chaque étape simulée, et concurrence maximale observée."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.intervals = {'tables': [], 'vision': []}
+        self.current = {'tables': 0, 'vision': 0}
+        self.peak = {'tables': 0, 'vision': 0}
+
+    def run(self, stage, duration):
+        with self.lock:
+            self.current[stage] += 1
+            self.peak[stage] = max(self.peak[stage], self.current[stage])
+        start = time.perf_counter()
+        time.sleep(duration)
+        with self.lock:
+            self.current[stage] -= 1
+            self.intervals[stage].append((start, time.perf_counter()))
+
+def extracteur_simule(tmp, output, pdfs, traces, tables=0.1, vision=0.3):
+    extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/{output}")
+    extractor.list_pdf_files = lambda: sorted(extractor.input_dir.glob("*.pdf"))
+
+    def tableaux(path):
+        traces.run('tables', tables)
+        if path.stem == "doc_casse":
+            raise ValueError("tableau illisible")
+        return {'non_batie': make_props(3, 10 * pdfs.index(path)), 'prop_batie': []}
+
+    def appel_api(base64_image, page_num):
+        if "doc_bloque" in extractor.deadline.label:
+            while True:  # API qui ne répond pas : seule l'échéance l'interrompt
+                extractor.check_deadline()
+                time.sleep(0.01)
+        traces.run('vision', vision)
+        return [{'nom': 'MARTIN', 'prenom': 'JEAN', 'department': '89', 'commune': '238', 'droit_reel': 'PP'},
+                {'nom': 'DURAND', 'prenom': 'MARIE', 'department': '89', 'commune': '238', 'droit_reel': 'PP'}]
+
+    extractor.extract_tables_with_pdfplumber = tableaux
+    extractor.extract_with_ultra_directive_prompt = appel_api
+    extractor.validate_complete_extraction = lambda owners, filename: owners
+    extractor.get_header_location = lambda path: {'department': '89', 'commune': '238'}
+    return extractor
+
+def executer(extractor, **kwargs):
+    logging.disable(logging.CRITICAL)
+    try:
+        start = time.perf_counter()
+        extractor.run(**kwargs)
+        return time.perf_counter() - start
+    finally:
+        logging.disable(logging.NOTSET)
+
+def lignes_csv(path):
+    df = pd.read_csv(path, sep=';', dtype=str, encoding='utf-8-sig', keep_default_na=False)
+    return sorted(map(tuple, df.values.tolist()))
+
+def test_recouvrement_des_etapes(count=8):
+    print(f"🧪 TEST {count} PDF: LOT SÉQUENTIEL PUIS PIPELINE")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "input").mkdir()
+        pdfs = [creer_pdf(Path(tmp) / "input" / f"doc{i}.pdf") for i in range(count)]
+
+        sequentiel = executer(extracteur_simule(tmp, "sequentiel", pdfs, Traces()))
+        traces = Traces()
+        extractor = extracteur_simule(tmp, "pipeline", pdfs, traces)
+        pipeline = executer(extractor, pipeline=True)
+        print(f"  ⏱️ Séquentiel {sequentiel:.2f}s, pipeline {pipeline:.2f}s (×{sequentiel / pipeline:.1f})")
+        assert sequentiel / pipeline > 1.8
+
+        # Tableaux d'un PDF pendant les appels vision d'un autre
+        recouvrements = sum(1 for debut, fin in traces.intervals['tables']
+                            for v_debut, v_fin in traces.intervals['vision'] if debut < v_fin and v_debut < fin)
+        assert recouvrements > 0 and traces.peak['tables'] <= PipelineSettings().tables
+        print(f"  🔀 {recouvrements} recouvrement(s) tableaux/vision, {traces.peak['vision']} appels vision simultanés")
+
+        assert lignes_csv(Path(tmp) / "pipeline" / "output.csv") == lignes_csv(Path(tmp) / "sequentiel" / "output.csv")
+        with BatchJournal(extractor.batch_journal_path()) as journal:
+            assert journal.counts() == {CHECKPOINT_DONE: count}
+        assert extractor.memory.used == 0
+        print("  ✅ Mêmes lignes exportées, journal complet, mémoire rendue")
+    return True
+
+def test_echecs_isoles_et_concurrence_bornee():
+    print("\n🧪 TEST ÉCHEC ET DÉLAI ISOLÉS, CONCURRENCE PAR ÉTAPE")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "input").mkdir()
+        noms = ["doc_a", "doc_bloque", "doc_casse", "doc_d", "doc_e", "doc_f"]
+        pdfs = [creer_pdf(Path(tmp) / "input" / f"{nom}.pdf") for nom in noms]
+        traces = Traces()
+        extractor = extracteur_simule(tmp, "output", pdfs, traces, tables=0.05, vision=0.1)
+        extractor.timeout_limits = TimeoutLimits(api_call=1, page=0.5, pdf=1)
+        settings = PipelineSettings(render=1, tables=1, vision=2, merge=1, queue_size=1)
+        logging.disable(logging.CRITICAL)
+        try:
+            extractor.journal = BatchJournal(extractor.batch_journal_path())
+            extractor.journal.start_batch(pdfs)
+            lignes = extractor.process_pdf_pipeline(pdfs, settings)
+            statuts = {pdf.name: extractor.journal.status(pdf) for pdf in pdfs}
+        finally:
+            extractor.journal.close()
+            extractor.journal = None
+            logging.disable(logging.NOTSET)
+
+        print(f"  📒 Journal: {statuts}")
+        assert statuts == {"doc_a.pdf": CHECKPOINT_DONE, "doc_bloque.pdf": CHECKPOINT_TIMED_OUT,
+                           "doc_casse.pdf": CHECKPOINT_FAILED, "doc_d.pdf": CHECKPOINT_DONE,
+                           "doc_e.pdf": CHECKPOINT_DONE, "doc_f.pdf": CHECKPOINT_DONE}
+        sources = [ligne['fichier_source'] for ligne in lignes]
+        assert sources == sorted(sources) and set(sources) == {"doc_a.pdf", "doc_d.pdf", "doc_e.pdf", "doc_f.pdf"}
+        # 2 PDF en vision au plus, 2 pages chacun
+        assert traces.peak['tables'] == 1 and traces.peak['vision'] <= 2 * 2
+        assert extractor.timeouts.snapshot()['counts']['pdf'] == 1 and extractor.memory.used == 0
+        print("  ✅ PDF en échec ou hors délai journalisés, les autres traités, lignes dans l'ordre du lot")
+    return True
+
+def test_admission_hors_boucle():
+    print("\n🧪 TEST ADMISSION (EMPREINTE, CACHE, CONTEXTE) HORS DE LA BOUCLE")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "input").mkdir()
+        pdfs = [creer_pdf(Path(tmp) / "input" / f"doc{i}.pdf") for i in range(3)]
+        extractor = extracteur_simule(tmp, "output", pdfs, Traces(), tables=0.01, vision=0.01)
+        threads = []
+        cached_results, open_document_context = extractor.cached_results, extractor.open_document_context
+
+        def cache(pdf_path, key):
+            threads.append(threading.current_thread().name)
+            return cached_results(pdf_path, key)
+
+        def contexte(pdf_path):
+            threads.append(threading.current_thread().name)
+            return open_document_context(pdf_path)
+
+        extractor.cached_results = cache
+        extractor.open_document_context = contexte
+        logging.disable(logging.CRITICAL)
+        try:
+            lignes = extractor.process_pdf_pipeline(pdfs, PipelineSettings(render=1, tables=1, vision=1, merge=1))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        print(f"  🧵 Threads: {sorted(set(threads))}")
+        assert len(threads) == 6 and all(name.startswith('pipeline-cpu') for name in threads)
+        assert {ligne['fichier_source'] for ligne in lignes} == {pdf.name for pdf in pdfs} and extractor.memory.used == 0
+        print("  ✅ Lecture du PDF et ouverture du contexte dans le pool CPU, boucle libre")
+    return True
+
+if __name__ == "__main__":
+    test_recouvrement_des_etapes()
+    test_echecs_isoles_et_concurrence_bornee()
+    test_admission_hors_boucle()
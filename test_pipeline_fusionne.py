@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test du post-traitement fusionné : résultat identique à la séquence d'étapes en liste
+"""
+
+import time
+import random
+import logging
+from pdf_extractor import PDFPropertyExtractor, PropertyRecord, properties_to_dataframe
+
+CHAMPS_PROPAGES = ['prefixe', 'contenance_ha', 'contenance_a', 'contenance_ca']
+
+def generer_lignes(count, seed=42, files=("a.pdf", "b.pdf", "c.pdf", "secours.pdf")):
+    """Lignes fusionnées variées : préfixes collés, numéros vides, géographies invalides ou étrangères."""
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        fichier = rng.choice(files)
+        if fichier == "secours.pdf":
+            # Aucune géographie ultra-valide dans ce fichier → mode de secours
+            dept, commune = rng.choice([("8A", "12B"), ("XX", "238"), ("2A", "004"), ("", "")])
+        else:
+            dept, commune = rng.choice([
+                ("89", "238"), ("89", "238"), ("89", "238"), ("51", "179"),
+                ("", ""), ("XX", "COMMUNE"), ("Unknown", "238"), ("89", "N/A"), ("8", "23"),
+            ])
+        rows.append(PropertyRecord(
+            department=dept, commune=commune,
+            prefixe=rng.choice(["", "", "302"]), section=rng.choice(["A", "ZY", "302A", "1 ZD", ""]),
+            numero=rng.choice([str(index), str(index), "", "0", "N/A"]),
+            contenance_ha=rng.choice(["", "1"]), contenance_a=rng.choice(["", "25"]), contenance_ca=rng.choice(["", "40"]),
+            nom=f"NOM{index % 50}", prenom="JEAN", fichier_source=fichier, type_propriete='non_batie',
+        ))
+    return rows
+
+def sequence_en_liste(extractor, rows, filename):
+    rows = extractor.separate_stuck_prefixes(rows)
+    rows = extractor.propagate_values_downward(rows, CHAMPS_PROPAGES)
+    rows = extractor.remove_empty_parcel_numbers(rows, filename)
+    rows = extractor.apply_forced_geography(rows, filename)
+    return extractor.filter_by_geographic_reference(rows, filename)
+
+def comparer(extractor, rows_factory, filename="test.pdf"):
+    attendu = sequence_en_liste(extractor, rows_factory(), filename)
+    obtenu = extractor.post_process_file_results(rows_factory(), filename)
+    assert [dict(row) for row in obtenu] == [dict(row) for row in attendu]
+    return len(obtenu)
+
+def test_identique_sequence():
+    print("🧪 TEST PIPELINE FUSIONNÉ = SÉQUENCE D'ÉTAPES")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    logging.disable(logging.INFO)
+    try:
+        # En-tête introuvable (fichier absent) : seule la géographie de la première ligne compte
+        for seed in range(5):
+            count = comparer(extractor, lambda: generer_lignes(2_000, seed))
+            print(f"  ✅ Graine {seed}: {count} lignes identiques")
+
+        # Fichier unique avec en-tête lu (département + commune)
+        extractor.get_header_location = lambda filename: {"department": "89", "commune": "238"}
+        count = comparer(extractor, lambda: generer_lignes(2_000, 7, files=("a.pdf",)))
+        print(f"  ✅ En-tête 89/238: {count} lignes identiques")
+
+        # En-tête partiel (commune non forçable), puis rows en dicts simples
+        extractor.get_header_location = lambda filename: {"department": "51", "commune": "51179"}
+        count = comparer(extractor, lambda: [row.to_dict() for row in generer_lignes(2_000, 8)])
+        print(f"  ✅ En-tête partiel, lignes dict: {count} lignes identiques")
+
+        # Cas limites : vide, une seule ligne sans numéro, fichier uniquement en mode de secours
+        assert extractor.post_process_file_results([], "test.pdf") == []
+        comparer(extractor, lambda: [PropertyRecord(numero="", fichier_source="a.pdf")])
+        del extractor.get_header_location
+        comparer(extractor, lambda: generer_lignes(300, 9, files=("secours.pdf",)))
+        print("  ✅ Cas limites identiques")
+    finally:
+        logging.disable(logging.NOTSET)
+    return True
+
+def test_benchmark_100k():
+    print("\n🧪 BENCHMARK 100 000 LIGNES")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    logging.disable(logging.INFO)
+    try:
+        timings = {}
+        for label, function in [("séquence", sequence_en_liste), ("fusionné", lambda e, rows, f: e.post_process_file_results(rows, f))]:
+            best = None
+            for _ in range(3):
+                rows = generer_lignes(100_000, 1)
+                start = time.perf_counter()
+                result = function(extractor, rows, "test.pdf")
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[label] = (best, properties_to_dataframe(result))
+            print(f"  ⏱️ {label}: {best:.3f}s ({len(result)} lignes)")
+    finally:
+        logging.disable(logging.NOTSET)
+
+    assert timings["séquence"][1].equals(timings["fusionné"][1])
+    print(f"  ✅ Sorties identiques, gain x{timings['séquence'][0] / timings['fusionné'][0]:.2f}")
+    return True
+
+if __name__ == "__main__":
+    test_identique_sequence()
+    test_benchmark_100k()
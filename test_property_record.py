@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test de l'enregistrement compact PropertyRecord (remplace les dicts de merge_like_make)
+"""
+
+import sys
+import time
+import pickle
+import tracemalloc
+from pdf_extractor import (PDFPropertyExtractor, PropertyRecord, PROPERTY_FIELDS, properties_to_dataframe,
+                           iter_export_rows)
+
+OWNER = {
+    'nom': 'MARTIN', 'prenom': 'JEAN', 'department': '89', 'commune': '238',
+    'numero_proprietaire': 'M12345', 'street_address': '12 RUE DE LA PAIX',
+    'post_code': '89000', 'city': 'AUXERRE', 'droit_reel': 'PP'
+}
+
+def make_props(count):
+    return [
+        {'Sec': '302A' if i % 3 == 0 else 'ZY', 'N° Plan': str(i), 'Adresse': 'LES GRANDS CHAMPS',
+         'HA': '' if i % 2 else '1', 'A': '25', 'CA': '40'}
+        for i in range(count)
+    ]
+
+def test_compatibilite_dict():
+    print("🧪 TEST COMPATIBILITÉ PropertyRecord / dict")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    record = extractor.merge_like_make(OWNER, make_props(1)[0], '892383020A0000', 'non_batie', 'test.pdf')
+
+    assert isinstance(record, PropertyRecord)
+    assert list(record.keys()) == list(PROPERTY_FIELDS)
+    assert record['prefixe'] == '302' and record['section'] == 'A'
+    assert record.get('nom') == 'MARTIN' and record.get('inconnu', 'defaut') == 'defaut'
+    assert 'fichier_source' in record and 'inconnu' not in record
+    assert record == record.to_dict()
+    assert PropertyRecord.from_dict(record.to_dict()) == record
+    assert pickle.loads(pickle.dumps(record)) == record
+    print("  ✅ Accès dict, to_dict/from_dict et pickle")
+
+    # Copie indépendante de l'original
+    copie = record.copy()
+    copie['commune'] = '999'
+    copie.update({'section': 'B', 'numero': '12'})
+    assert record['commune'] == '238' and record['section'] == 'A'
+    assert (copie['commune'], copie['section'], copie['numero']) == ('999', 'B', '12')
+    print("  ✅ Copie et modification sans effet sur l'original")
+
+    # Schéma fixe
+    for operation in (lambda: record.__setitem__('colonne_libre', 'x'), lambda: PropertyRecord(colonne_libre='x')):
+        try:
+            operation()
+            assert False, "Champ hors schéma accepté"
+        except KeyError:
+            pass
+    print("  ✅ Champs hors schéma refusés")
+    return True
+
+def test_chaine_identique_aux_dicts():
+    print("\n🧪 TEST CHAÎNE DE POST-TRAITEMENT (records vs dicts)")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    props = make_props(20_000)
+
+    def chain(rows):
+        rows = extractor.separate_stuck_prefixes(rows)
+        rows = extractor.propagate_values_downward(rows, ['prefixe', 'contenance_ha', 'contenance_a', 'contenance_ca'])
+        return extractor.remove_empty_parcel_numbers(rows, 'test.pdf')
+
+    records = [extractor.merge_like_make(OWNER, prop, 'ID', 'non_batie', 'test.pdf') for prop in props]
+
+    # Coût mémoire du conteneur seul (les chaînes de valeurs sont partagées)
+    tracemalloc.start()
+    dicts = [record.to_dict() for record in records]
+    dicts_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    copies = [PropertyRecord(*record.values()) for record in records]
+    records_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copies
+
+    print(f"  📦 Taille d'une ligne: dict={sys.getsizeof(dicts[0])} o, record={sys.getsizeof(records[0]) + sys.getsizeof(records[0].as_tuple())} o")
+    print(f"  📦 Mémoire {len(props)} lignes: dicts={dicts_memory / 1e6:.1f} Mo, records={records_memory / 1e6:.1f} Mo")
+    assert records_memory < dicts_memory / 2
+
+    # La chaîne ne modifie pas les lignes d'entrée
+    first_record = records[0].as_tuple()
+    result_records = chain(records)
+    result_dicts = chain(dicts)
+    assert records[0].as_tuple() == first_record
+
+    assert properties_to_dataframe(result_records).equals(properties_to_dataframe(result_dicts))
+    print(f"  ✅ {len(result_records)} lignes identiques après post-traitement")
+    return True
+
+def test_export_valeurs_vides():
+    print("\n🧪 TEST EXPORT DES VALEURS None / NaN (RECORD = DICT)")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    record = extractor.merge_like_make(OWNER, make_props(1)[0], 'ID', 'non_batie', 'test.pdf')
+    record.update({'prenom': None, 'contenance_ha': float('nan'), 'numero_majic': None})
+    ligne_record, ligne_dict = iter_export_rows([record, record.to_dict()])
+    print(f"  📋 {ligne_record}")
+    assert ligne_record == ligne_dict
+    assert None not in ligne_record and all(value == value for value in ligne_record)
+    print("  ✅ None et NaN exportés en '' pour les records comme pour les dicts")
+    return True
+
+def test_affectation_en_place(count=20_000):
+    print("\n🧪 TEST AFFECTATION D'UN CHAMP (EN PLACE, SANS RECONSTRUCTION)")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    records = [extractor.merge_like_make(OWNER, prop, 'ID', 'non_batie', 'test.pdf') for prop in make_props(count)]
+    dicts = [record.to_dict() for record in records]
+    valeurs = [str(i) for i in range(count)]
+
+    def affecter(rows):
+        start = time.perf_counter()
+        for row, valeur in zip(rows, valeurs):
+            for champ in ('prefixe', 'contenance_ha', 'contenance_a', 'contenance_ca', 'commune'):
+                row[champ] = valeur
+        return time.perf_counter() - start
+
+    # Aucune allocation : les valeurs affectées existent déjà
+    tracemalloc.start()
+    duree_records = affecter(records)
+    alloue = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    duree_dicts = affecter(dicts)
+    print(f"  ⏱️ {count * 5} affectations: records={duree_records * 1e3:.1f} ms, dicts={duree_dicts * 1e3:.1f} ms, "
+          f"pic alloué={alloue / 1e3:.1f} Ko")
+    assert alloue < 64_000, "conteneur reconstruit à chaque affectation"
+    assert all(record == d for record, d in zip(records, dicts))
+    print("  ✅ Affectations en place, résultat identique aux dicts")
+    return True
+
+if __name__ == "__main__":
+    test_compatibilite_dict()
+    test_chaine_identique_aux_dicts()
+    test_export_valeurs_vides()
+    test_affectation_en_place()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test du journal de lot et de la reprise après interruption (run(resume=True))
+"""
+
+import time
+import logging
+import tempfile
+from pathlib import Path
+import pandas as pd
+from pdf_extractor import (PDFPropertyExtractor, BatchJournal, PropertyRecord,
+                           CHECKPOINT_DONE, CHECKPOINT_FAILED, CHECKPOINT_PENDING, CHECKPOINT_RUNNING)
+
+def make_rows(pdf_name, count, start=0):
+    return [
+        PropertyRecord(department='89', commune='238', section='ZY', numero=str(i), id=f"89238000ZY{i:04d}",
+                       nom=f'MARTIN{i}', prenom='JEAN', droit_reel='PP', contenance_a='25', fichier_source=pdf_name)
+        for i in range(start, start + count)
+    ]
+
+class FauxLot:
+    """Extracteur dont l'extraction (GPT) est remplacée par des lignes déterministes."""
+
+    def __init__(self, tmp, count=5):
+        self.extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        self.extractor.result_cache = None  # Reprise assurée par le journal seul (cache : test_cache_resultats)
+        self.pdf_files = [Path(f"{tmp}/input/doc{i}.pdf") for i in range(1, count + 1)]
+        for pdf_file in self.pdf_files:
+            pdf_file.write_bytes(b"%PDF-1.4")
+        self.traites = []
+        self.analyses = []
+        self.interrompre = None
+        self.echecs = set()
+        self.extractor.list_pdf_files = lambda: self.pdf_files
+        self.extractor.analyze_pdf_batch = self.analyze
+        self.extractor.process_like_make = self.process
+
+    def analyze(self, files):
+        self.analyses.append([pdf.name for pdf in files])
+        return {'approach': 'mixed_adaptive'}
+
+    def process(self, pdf_path):
+        self.extractor.last_pdf_error = None
+        if pdf_path.name == self.interrompre:
+            raise KeyboardInterrupt("processus tué")
+        self.traites.append(pdf_path.name)
+        if pdf_path.name in self.echecs:
+            self.extractor.last_pdf_error = "quota API dépassé"
+            return []
+        number = int(pdf_path.stem[3:])
+        return make_rows(pdf_path.name, 3, start=number * 10)
+
+    def run(self, resume=False):
+        self.traites = []
+        logging.disable(logging.WARNING)
+        try:
+            self.extractor.run(resume=resume)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def journal(self):
+        return BatchJournal(self.extractor.output_dir / "batch_journal.sqlite")
+
+    def sortie(self):
+        return pd.read_csv(self.extractor.output_dir / "output.csv", sep=';', dtype=str, encoding='utf-8-sig')
+
+def test_reprise_apres_interruption():
+    print("🧪 TEST REPRISE APRÈS INTERRUPTION AU 3e PDF")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lot = FauxLot(tmp)
+        lot.interrompre = 'doc3.pdf'
+        try:
+            lot.run()
+            raise AssertionError("l'interruption aurait dû remonter")
+        except KeyboardInterrupt:
+            pass
+        with lot.journal() as journal:
+            statuts = [journal.status(pdf) for pdf in lot.pdf_files]
+        print(f"  📒 Après interruption: {statuts}")
+        assert statuts == [CHECKPOINT_DONE] * 2 + [CHECKPOINT_RUNNING] + [CHECKPOINT_PENDING] * 2
+
+        lot.interrompre = None
+        lot.analyses = []
+        lot.run(resume=True)
+        print(f"  ⏩ Reprise: PDF retraités {lot.traites}")
+        assert lot.traites == ['doc3.pdf', 'doc4.pdf', 'doc5.pdf']
+        assert lot.analyses == [['doc3.pdf', 'doc4.pdf', 'doc5.pdf']]
+        sortie = lot.sortie()
+        assert sorted(sortie['Fichier source'].unique()) == [f'doc{i}.pdf' for i in range(1, 6)] and len(sortie) == 15
+        assert (lot.extractor.output_dir / "output.xlsx").exists()
+        print("  ✅ PDF terminés relus depuis le journal, export complet")
+
+        # Tout est terminé : aucune pré-analyse ni extraction
+        lot.analyses = []
+        lot.run(resume=True)
+        assert lot.traites == [] and lot.analyses == [] and len(lot.sortie()) == 15
+        # Sans reprise : tout est retraité
+        lot.run()
+        assert lot.traites == [f'doc{i}.pdf' for i in range(1, 6)]
+        print("  ✅ Reprise sans travail restant, lot complet sans --resume")
+    return True
+
+def test_echecs_et_invalidation():
+    print("\n🧪 TEST ÉCHECS, FICHIER MODIFIÉ, VERSION DU PIPELINE")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lot = FauxLot(tmp, count=4)
+        lot.echecs = {'doc2.pdf'}
+        lot.run()
+        with lot.journal() as journal:
+            assert journal.status(lot.pdf_files[1]) == CHECKPOINT_FAILED
+            print(f"  📒 {journal.counts()}")
+
+        # Quota rétabli, doc4 remplacé entre-temps
+        lot.echecs = set()
+        lot.pdf_files[3].write_bytes(b"%PDF-1.4 nouvelle version")
+        lot.run(resume=True)
+        assert lot.traites == ['doc2.pdf', 'doc4.pdf']
+        print(f"  ✅ Retraités: {lot.traites} (échec, fichier modifié)")
+
+        # Nouvelle version du pipeline : résultats journalisés invalidés
+        with BatchJournal(lot.extractor.output_dir / "batch_journal.sqlite", version="autre") as journal:
+            assert journal.start_batch(lot.pdf_files, resume=True) == []
+        print("  ✅ Version différente: tout est à retraiter")
+    return True
+
+def test_cout_du_journal(count=500):
+    print(f"\n🧪 COÛT DU JOURNAL ({count} PDF)")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_files = [Path(tmp) / f"doc{i}.pdf" for i in range(count)]
+        for pdf_file in pdf_files:
+            pdf_file.write_bytes(b"%PDF-1.4")
+        rows = make_rows('doc.pdf', 40)
+        with BatchJournal(Path(tmp) / "journal.sqlite") as journal:
+            journal.start_batch(pdf_files)
+            start = time.perf_counter()
+            for pdf_file in pdf_files:
+                journal.mark_running(pdf_file)
+                journal.mark_done(pdf_file, rows)
+            per_pdf = (time.perf_counter() - start) / count
+            assert journal.load_results(pdf_files[0]) == rows
+    print(f"  ⏱️ {per_pdf * 1000:.2f} ms par PDF (40 lignes journalisées)")
+    assert per_pdf < 0.05
+    print("  ✅ Négligeable devant l'extraction d'un PDF (plusieurs secondes)")
+    return True
+
+if __name__ == "__main__":
+    test_reprise_apres_interruption()
+    test_echecs_et_invalidation()
+    test_cout_du_journal()
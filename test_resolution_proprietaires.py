@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test de la résolution d'entités propriétaires (variantes OCR/LLM, blocage phonétique / MAJIC)
+"""
+
+import time
+import random
+import logging
+import sqlite3
+import tempfile
+import pandas as pd
+from pdf_extractor import (PDFPropertyExtractor, OwnerEntityResolver, french_phonetic_key, normalize_owner_name,
+                           read_parquet_export)
+
+def test_cles_et_variantes():
+    print("🧪 TEST CLÉS PHONÉTIQUES ET NOMS NORMALISÉS")
+    print("=" * 50)
+
+    assert french_phonetic_key("DUPONT") == french_phonetic_key("DUPOND") == french_phonetic_key("Duppont")
+    assert french_phonetic_key("GAUTHIER") == french_phonetic_key("GAUTIER")
+    assert french_phonetic_key("PHILIPPE") == french_phonetic_key("FILIPE")
+    assert french_phonetic_key("MARTIN") != french_phonetic_key("BERNARD")
+    assert normalize_owner_name("DUPONT JEAN-PIERRE") == normalize_owner_name("DUPONT", "JEAN PIERRE") \
+        == normalize_owner_name("JEAN PIERRE", "DUPONT") == "DUPONT JEAN PIERRE"
+    assert normalize_owner_name("  ", "") == ""
+    print("  ✅ DUPONT/DUPOND, GAUTHIER/GAUTIER, ordre et ponctuation neutralisés")
+    return True
+
+def test_regroupement():
+    print("\n🧪 TEST REGROUPEMENT DES VARIANTES")
+    print("=" * 50)
+
+    rows = [
+        {'nom': 'DUPONT', 'prenom': 'JEAN-PIERRE', 'post_code': '89000'},          # 0
+        {'nom': 'DUPONT JEAN PIERRE', 'prenom': '', 'post_code': '89000'},         # 1 nom/prénom fusionnés
+        {'nom': 'DUPOND', 'prenom': 'JEAN PIERRE', 'post_code': '89000'},          # 2 faute OCR
+        {'nom': 'DUPONT', 'prenom': 'JEANPIERRE', 'post_code': '89000'},           # 3 mots collés
+        {'nom': 'DUPONT', 'prenom': 'JEAN-PIERRE', 'post_code': '89000'},          # 4 doublon exact
+        {'nom': 'DUPONT', 'prenom': 'JEAN PAUL', 'post_code': '89000'},            # 5 autre personne
+        {'nom': 'DUPONT', 'prenom': 'JEAN-PIERRE', 'post_code': '51100'},          # 6 homonyme ailleurs
+        {'nom': 'DUPONT', 'prenom': 'JEAN PIERE', 'post_code': '75001', 'numero_majic': 'M8BNF6'},  # 7
+        {'nom': 'DUPONT', 'prenom': 'JEAN PIERRE', 'post_code': '', 'numero_majic': 'm8bnf6'},   # 8 même MAJIC
+        {'nom': 'DUPONT', 'prenom': 'JEAN PIERRE', 'post_code': '51100'},          # 9 relié à 6
+        {'nom': '', 'prenom': '', 'post_code': '89000'},                           # 10 sans nom
+    ]
+    resolver = OwnerEntityResolver()
+    ids = resolver.resolve(rows)
+    for row, owner_id in zip(rows, ids):
+        print(f"  {owner_id or '-':16} {row['nom']} / {row['prenom']} ({row['post_code']}, {row.get('numero_majic', '')})")
+
+    assert len({ids[i] for i in (0, 1, 2, 3, 4)}) == 1
+    assert ids[5] != ids[0] and ids[6] != ids[0]
+    assert ids[7] == ids[8] != ids[0]
+    assert ids[9] == ids[6]
+    assert ids[10] == ''
+    assert all(owner_id.startswith('PR') and len(owner_id) == 14 for owner_id in ids[:10])
+    print(f"  📊 {resolver.stats}")
+
+    # Identifiant stable d'une exécution à l'autre (variante canonique la plus fréquente)
+    assert OwnerEntityResolver().resolve(list(reversed(rows)))[::-1] == ids
+    print("  ✅ Variantes regroupées, homonymes distincts, MAJIC commun, identifiants stables")
+    return True
+
+def test_deduplication_avec_resolution():
+    print("\n🧪 TEST DÉDUPLICATION: NOMS EXACTS DANS LA CLÉ, IDENTIFIANT CANONIQUE EN ANNOTATION")
+    print("=" * 50)
+
+    extractor = PDFPropertyExtractor()
+    parcelle = {'section': 'ZY', 'numero': '12', 'department': '89', 'commune': '238', 'post_code': '89000', 'droit_reel': 'PP'}
+    rows = [
+        dict(parcelle, nom='DUPONT', prenom='JEAN-PIERRE'),
+        dict(parcelle, nom='DUPOND JEAN PIERRE', prenom=''),     # variante du même propriétaire
+        dict(parcelle, nom='DUPONT', prenom='JEAN PAUL'),        # autre propriétaire
+        dict(parcelle, nom='DUPONT', prenom='JEAN-PIERRE', numero='13'),
+        dict(parcelle, nom='DUPONT', prenom='JEAN-PIERRE'),      # doublon exact
+    ]
+    originaux = [dict(row) for row in rows]
+    result = extractor.deduplicate_batch_results(rows)
+    assert [(row['nom'], row['prenom'], row['numero']) for row in result] == [
+        ('DUPONT', 'JEAN-PIERRE', '12'), ('DUPOND JEAN PIERRE', '', '12'), ('DUPONT', 'JEAN PAUL', '12'),
+        ('DUPONT', 'JEAN-PIERRE', '13')]
+    assert result[0]['proprietaire_id'] == result[1]['proprietaire_id'] == result[3]['proprietaire_id']
+    assert result[2]['proprietaire_id'] != result[0]['proprietaire_id']
+    assert rows == originaux, "lignes de l'appelant modifiées"
+    print(f"  ✅ {len(rows)} → {len(result)} lignes (seul le doublon exact retiré), variantes annotées")
+
+    # Indivisaires aux prénoms proches sur les mêmes parcelles : aucune ligne perdue
+    indivision = [dict(parcelle, nom='MARTIN', prenom=prenom, numero=numero)
+                  for prenom in ('JEAN', 'JEANNE', 'JEANNE MARIE') for numero in ('12', '13')]
+    result = extractor.deduplicate_batch_results(indivision)
+    print(f"  👥 Identifiants: {sorted({row['proprietaire_id'] for row in result})}")
+    assert len(result) == 6 and all('proprietaire_id' not in row for row in indivision)
+    print("  ✅ JEAN / JEANNE / JEANNE MARIE MARTIN conservés sur chaque parcelle")
+    return True
+
+def test_identifiant_exporte():
+    print("\n🧪 TEST IDENTIFIANT PROPRIÉTAIRE EXPORTÉ (CSV, EXCEL, SQLITE, PARQUET)")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        parcelle = {'department': '89', 'commune': '238', 'section': 'ZY', 'post_code': '89000', 'droit_reel': 'PP'}
+        rows = [dict(parcelle, numero='12', id='89238000ZY0012', nom='DUPONT', prenom='JEAN-PIERRE', fichier_source='a.pdf'),
+                dict(parcelle, numero='13', id='89238000ZY0013', nom='DUPOND', prenom='JEAN PIERRE', fichier_source='b.pdf'),
+                dict(parcelle, numero='14', id='89238000ZY0014', nom='BERNARD', prenom='MARIE', fichier_source='b.pdf')]
+        logging.disable(logging.CRITICAL)
+        try:
+            extractor.export_to_csv_with_stats(extractor.deduplicate_batch_results(rows))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        csv = pd.read_csv(extractor.output_dir / "output.csv", sep=';', dtype=str, encoding='utf-8-sig')
+        excel = pd.read_excel(extractor.output_dir / "output.xlsx", dtype=str)
+        with sqlite3.connect(extractor.sqlite_output_path()) as db:
+            sqlite_ids = [row[0] for row in db.execute('SELECT proprietaire_id FROM proprietes ORDER BY numero')]
+        parquet = read_parquet_export(extractor.output_dir / "output_parquet").to_pandas().sort_values('numero')
+        for exported in (csv['ID Propriétaire'].tolist(), excel['ID Propriétaire'].tolist(), sqlite_ids,
+                         parquet['proprietaire_id'].tolist()):
+            print(f"  🆔 {exported}")
+            assert exported[0] == exported[1] != exported[2] and all(exported)
+    print("  ✅ DUPONT JEAN-PIERRE / DUPOND JEAN PIERRE: même identifiant dans chaque export")
+    return True
+
+NOMS = ["MARTIN", "BERNARD", "DUBOIS", "THOMAS", "ROBERT", "RICHARD", "PETIT", "DURAND", "LEROY", "MOREAU",
+        "SIMON", "LAURENT", "LEFEBVRE", "MICHEL", "GARCIA", "DAVID", "BERTRAND", "ROUX", "VINCENT", "FOURNIER",
+        "MOREL", "GIRARD", "ANDRE", "MERCIER", "DUPONT", "LAMBERT", "BONNET", "FRANCOIS", "MARTINEZ", "LEGRAND"]
+PRENOMS = ["JEAN", "MARIE", "PIERRE", "ANNE", "LOUIS", "PAUL", "JEANNE", "JACQUES", "JEAN-PIERRE",
+           "MARIE-ANNE", "CLAUDE", "MICHEL", "ANDRE", "SYLVIE", "NATHALIE"]
+
+def generer_lignes(count, owners=60_000, seed=0):
+    """Propriétaires répétés sur plusieurs parcelles, ~10 % de variantes OCR/LLM."""
+    rng = random.Random(seed)
+    base = [(rng.choice(NOMS) + rng.choice(["", "", "S", "EAU", "IN", "ET"]), rng.choice(PRENOMS),
+             f"{rng.randint(1, 95):02d}{rng.randint(0, 99):02d}0", f"M{i:05d}" if rng.random() < 0.5 else "")
+            for i in range(owners)]
+    rows = []
+    for _ in range(count):
+        nom, prenom, post_code, majic = rng.choice(base)
+        variant = rng.random()
+        if variant < 0.05:
+            nom, prenom = f"{nom} {prenom}", ""
+        elif variant < 0.08:
+            prenom = prenom.replace("-", " ")
+        elif variant < 0.10 and nom.endswith("T"):
+            nom = nom[:-1] + "D"
+        rows.append({'nom': nom, 'prenom': prenom, 'post_code': post_code, 'numero_majic': majic})
+    return rows
+
+def test_debit_million_lignes(count=1_000_000):
+    print(f"\n🧪 DÉBIT SUR {count:,} LIGNES".replace(",", " "))
+    print("=" * 50)
+
+    rows = generer_lignes(count)
+    logging.disable(logging.INFO)
+    try:
+        resolver = OwnerEntityResolver()
+        start = time.perf_counter()
+        ids = resolver.resolve(rows)
+        elapsed = time.perf_counter() - start
+    finally:
+        logging.disable(logging.NOTSET)
+
+    print(f"  ⏱️ {elapsed:.2f}s ({count / elapsed:,.0f} lignes/s)".replace(",", " ") + f" - {resolver.stats}")
+    assert len(ids) == count and all(ids)
+    # Les variantes sont regroupées : moins d'entités que de signatures distinctes
+    assert resolver.stats['entites'] < resolver.stats['signatures']
+    assert elapsed < 120
+    print("  ✅ Un million de lignes résolues en bien moins d'une minute")
+    return True
+
+if __name__ == "__main__":
+    test_cles_et_variantes()
+    test_regroupement()
+    test_deduplication_avec_resolution()
+    test_identifiant_exporte()
+    test_debit_million_lignes()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test du mode surveillance du dossier d'entrée (anti-rebond, arriéré, ajout aux sorties)
+"""
+
+import os
+import time
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+import pandas as pd
+from pdf_extractor import PDFPropertyExtractor, InputFolderWatcher, BatchJournal, PropertyRecord, CHECKPOINT_DONE
+
+def make_rows(pdf_name, count, start=0):
+    return [PropertyRecord(department='89', commune='238', section='ZY', numero=str(i), id=f"89238000ZY{i:04d}",
+                           nom=f'MARTIN{i}', prenom='JEAN', droit_reel='PP', fichier_source=pdf_name)
+            for i in range(start, start + count)]
+
+def deposer(path, age=None):
+    path.write_bytes(b"%PDF-1.4 " + path.name.encode())
+    if age is not None:
+        old = time.time() - age
+        os.utime(path, (old, old))
+    return path
+
+def attendre(watcher, timeout=3.0):
+    """poll() jusqu'à obtenir des fichiers (notifications asynchrones)."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        ready = watcher.poll()
+        if ready:
+            return ready
+        time.sleep(0.05)
+    return []
+
+def test_anti_rebond():
+    print("🧪 TEST ANTI-REBOND (COPIE EN COURS)")
+    print("=" * 50)
+
+    for use_events in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            ancien = deposer(directory / "ancien.pdf", age=3600)
+            (directory / "notes.txt").write_text("ignoré")
+            watcher = InputFolderWatcher(directory, settle_seconds=0.3, use_events=use_events)
+            watcher.start()
+            try:
+                assert watcher.poll() == [ancien]
+
+                # Copie lente : la taille change toutes les 0,1 s pendant 0,6 s
+                copie = directory / "copie.pdf"
+                with open(copie, 'wb') as handle:
+                    for _ in range(6):
+                        handle.write(b"x" * 1000)
+                        handle.flush()
+                        time.sleep(0.1)
+                        assert watcher.poll() == []
+                assert watcher.pending() == 1
+                assert attendre(watcher) == [copie] and watcher.poll() == []
+
+                # Fichier remplacé : remis une nouvelle fois une fois stable
+                time.sleep(0.05)
+                copie.write_bytes(b"y" * 5000)
+                assert attendre(watcher) == [copie]
+            finally:
+                watcher.stop()
+        print(f"  ✅ {'inotify' if use_events else 'parcours'}: arriéré immédiat, copie remise une fois stable, "
+              f"remplacement détecté")
+    return True
+
+def test_arriere_sans_reparcours(count=3000):
+    print(f"\n🧪 TEST ARRIÉRÉ DE {count} FICHIERS SANS REPARCOURS DU DOSSIER")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        for index in range(count):
+            deposer(directory / f"doc{index:05d}.pdf", age=600)
+        watcher = InputFolderWatcher(directory, settle_seconds=0.2)
+        watcher.start()
+        try:
+            start = time.perf_counter()
+            arriere = watcher.poll()
+            premier = time.perf_counter() - start
+            assert len(arriere) == count
+
+            # Ensuite : seuls les fichiers signalés sont examinés
+            with mock.patch('pdf_extractor.os.scandir', side_effect=AssertionError("dossier reparcouru")):
+                start = time.perf_counter()
+                for _ in range(50):
+                    assert watcher.poll() == []
+                vide = (time.perf_counter() - start) / 50
+                nouveau = deposer(directory / "nouveau.pdf")
+                assert attendre(watcher) == [nouveau]
+        finally:
+            watcher.stop()
+    print(f"  ⏱️ Premier parcours {premier * 1000:.0f} ms, examen sans événement {vide * 1e6:.0f} µs")
+    assert vide < 0.001
+    print("  ✅ Un seul parcours au démarrage, nouveaux fichiers via notifications")
+    return True
+
+def test_demon_ajoute_aux_sorties():
+    print("\n🧪 TEST MODE DÉMON: TRAITEMENT DES NOUVEAUX PDF ET AJOUT AUX SORTIES")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        traites = []
+
+        def fake_process(pdf_path):
+            traites.append(pdf_path.name)
+            return make_rows(pdf_path.name, 2, start=len(traites) * 10)
+
+        extractor.process_like_make = fake_process
+        # Sortie d'un lot précédent : conservée, les nouvelles lignes s'y ajoutent
+        extractor.export_to_csv(make_rows('lot.pdf', 3, start=100))
+        deposer(extractor.input_dir / "a.pdf", age=60)
+
+        def lancer():
+            stop = threading.Event()
+            thread = threading.Thread(target=extractor.watch,
+                                      kwargs={'poll_interval': 0.05, 'settle_seconds': 0.3, 'stop_event': stop})
+            thread.start()
+            return stop, thread
+
+        logging.disable(logging.WARNING)
+        try:
+            stop, thread = lancer()
+            time.sleep(0.2)
+            deposer(extractor.input_dir / "b.pdf")
+            deadline = time.time() + 5
+            while len(traites) < 2 and time.time() < deadline:
+                time.sleep(0.05)
+            stop.set()
+            thread.join()
+            assert traites == ['a.pdf', 'b.pdf']
+
+            # Redémarrage : les PDF terminés ne sont pas retraités, seul le nouveau l'est
+            deposer(extractor.input_dir / "c.pdf", age=60)
+            stop, thread = lancer()
+            deadline = time.time() + 5
+            while len(traites) < 3 and time.time() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.2)
+            stop.set()
+            thread.join()
+        finally:
+            logging.disable(logging.NOTSET)
+
+        print(f"  📥 PDF traités: {traites}")
+        assert traites == ['a.pdf', 'b.pdf', 'c.pdf']
+        sortie = pd.read_csv(extractor.output_dir / "output.csv", sep=';', dtype=str, encoding='utf-8-sig')
+        assert list(sortie['Fichier source']) == ['lot.pdf'] * 3 + ['a.pdf', 'a.pdf', 'b.pdf', 'b.pdf', 'c.pdf', 'c.pdf']
+        with BatchJournal(extractor.batch_journal_path()) as journal:
+            assert journal.counts() == {CHECKPOINT_DONE: 3}
+        print("  ✅ Lignes ajoutées à output.csv existant, journal à jour, aucun retraitement au redémarrage")
+    return True
+
+if __name__ == "__main__":
+    test_anti_rebond()
+    test_arriere_sans_reparcours()
+    test_demon_ajoute_aux_sorties()
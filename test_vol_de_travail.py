@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test du vol de travail entre machines (baux fichiers sur un dossier partagé, reprise, débit)
+"""
+
+import os
+import time
+import uuid
+import logging
+import tempfile
+import multiprocessing
+from pathlib import Path
+import pandas as pd
+from pdf_extractor import (PDFPropertyExtractor, SharedWorkDir, PropertyRecord, run_shared_worker,
+                           CHECKPOINT_DONE, CHECKPOINT_FAILED, CHECKPOINT_PENDING, CHECKPOINT_RUNNING)
+
+def make_rows(pdf_name, count=2):
+    return [PropertyRecord(department='89', commune='238', section='ZY', numero=str(i), id=f"89238000ZY{i:04d}",
+                           nom=f'MARTIN{pdf_name[3:6]}', prenom='JEAN', droit_reel='PP', fichier_source=pdf_name)
+            for i in range(count)]
+
+def creer_pdfs(directory, count):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = [directory / f"doc{i:03d}.pdf" for i in range(count)]
+    for path in paths:
+        path.write_bytes(b"%PDF-1.4 " + path.name.encode())
+    return paths
+
+def machine(tmp, shared, worker_id, duree=0.05, lease_seconds=5.0):
+    """Un worker d'une « machine » : chaque traitement laisse une trace (PDF traité une seule fois ?)."""
+    logging.disable(logging.WARNING)
+    extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+    extractor.list_pdf_files = lambda: sorted(extractor.input_dir.glob("*.pdf"))
+
+    def fake_process(pdf_path):
+        # Quelques relevés très longs, comme un shard qui les concentrerait tous
+        debut = time.time()
+        time.sleep(duree * (8 if pdf_path.name.endswith("0.pdf") else 1))
+        (Path(tmp) / "traces" / f"{pdf_path.name}.{uuid.uuid4().hex}").write_text(f"{debut} {time.time()}")
+        return make_rows(pdf_path.name)
+
+    extractor.process_like_make = fake_process
+    run_shared_worker(shared, worker_id=worker_id, idle_exit=True, idle_sleep=0.05, lease_seconds=lease_seconds,
+                      extractor=extractor)
+
+def worker_tue(tmp, shared):
+    """Réserve un PDF puis meurt sans le terminer ni libérer son bail."""
+    SharedWorkDir(shared, lease_seconds=0.5).claim(Path(tmp) / "input" / "doc000.pdf", "tue")
+    os._exit(1)
+
+def lancer(tmp, shared, count):
+    """Durée du premier début au dernier fin de traitement (hors démarrage des processus)."""
+    (Path(tmp) / "traces").mkdir(exist_ok=True)
+    processes = [multiprocessing.Process(target=machine, args=(tmp, shared, f"hote{index}")) for index in range(count)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    bornes = [tuple(map(float, path.read_text().split())) for path in (Path(tmp) / "traces").iterdir()]
+    return max(fin for _, fin in bornes) - min(debut for debut, _ in bornes)
+
+def test_resultat_publie_jamais_ecrase():
+    print("\n🧪 TEST BAIL PERDU PENDANT LA PUBLICATION: RÉSULTAT PUBLIÉ CONSERVÉ")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf, = creer_pdfs(Path(tmp) / "input", 1)
+        shared = SharedWorkDir(Path(tmp) / "partage", lease_seconds=0.3)
+        ancien = shared.claim(pdf, "w1")
+        time.sleep(0.35)
+        repris = shared.claim(pdf, "w2")
+        assert shared.complete(repris, make_rows(pdf.name, count=3))
+
+        # w1 a vérifié son bail juste avant qu'il expire, puis publie une extraction différente
+        holds = shared.holds
+        shared.holds = lambda lease: True
+        try:
+            assert not shared.complete(ancien, make_rows(pdf.name, count=7))
+        finally:
+            shared.holds = holds
+        fichiers = sorted(path.name for path in shared.results_dir.iterdir())
+        print(f"  📁 {fichiers}")
+        assert shared.results() == make_rows(pdf.name, count=3) and len(fichiers) == 1
+    print("  ✅ Publication exclusive : le premier résultat reste, aucun fichier du worker en retard")
+    return True
+
+def test_protocole_bail():
+    print("🧪 TEST PROTOCOLE DE BAIL (RÉSERVATION, EXPIRATION, BATTEMENT, ÉCHEC)")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        a, b, c = creer_pdfs(Path(tmp) / "input", 3)
+        shared = SharedWorkDir(Path(tmp) / "partage", lease_seconds=0.3, max_attempts=2)
+
+        bail = shared.claim(a, "w1")
+        assert bail.attempts == 1 and shared.claim(a, "w2") is None and shared.state(a) == CHECKPOINT_RUNNING
+        assert shared.complete(bail, make_rows(a.name)) and shared.state(a) == CHECKPOINT_DONE
+        assert shared.claim(a, "w2") is None
+        print("  ✅ Réservation exclusive, publication, PDF terminé non repris")
+
+        # Worker disparu : bail expiré repris avec une tentative de plus, l'ancien ne publie pas
+        ancien = shared.claim(b, "w1")
+        time.sleep(0.35)
+        repris = shared.claim(b, "w2")
+        assert repris.attempts == 2 and repris.worker == "w2"
+        assert not shared.complete(ancien, make_rows(b.name)) and shared.state(b) == CHECKPOINT_RUNNING
+        assert shared.complete(repris, make_rows(b.name))
+        print("  ✅ Bail expiré repris, résultat du worker disparu ignoré")
+
+        # Battement de cœur : un long traitement garde son bail
+        bail = shared.claim(c, "w1")
+        with shared.keep_alive(bail):
+            time.sleep(1.0)
+            assert shared.claim(c, "w2") is None
+        # Échec : repris immédiatement, puis échec définitif à la 2e tentative
+        assert shared.fail(bail, "quota API dépassé") == CHECKPOINT_PENDING
+        retente = shared.claim(c, "w2")
+        assert retente.attempts == 2
+        assert shared.fail(retente, "quota API dépassé") == CHECKPOINT_FAILED
+        assert shared.claim(c, "w3") is None and shared.state(c) == CHECKPOINT_FAILED
+        assert shared.failures() == [{'pdf': 'doc002.pdf', 'erreur': 'quota API dépassé', 'tentatives': 2}]
+        assert shared.counts([a, b, c]) == {CHECKPOINT_PENDING: 0, CHECKPOINT_RUNNING: 0, CHECKPOINT_DONE: 2,
+                                            CHECKPOINT_FAILED: 1}
+        assert not list(shared.leases_dir.iterdir())
+        print("  ✅ Bail renouvelé pendant le traitement, échec retenté puis définitif")
+    return True
+
+def test_debit_et_unicite(count=40):
+    print(f"\n🧪 TEST DÉBIT: 1 PUIS 4 « MACHINES » SUR {count} PDF")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        creer_pdfs(Path(tmp) / "input", count)
+        durees = {}
+        for hotes in (1, 4):
+            shared = Path(tmp) / f"partage{hotes}"
+            durees[hotes] = lancer(tmp, str(shared), hotes)
+            traces = [path.name.split('.pdf')[0] for path in (Path(tmp) / "traces").iterdir()]
+            assert sorted(traces) == [f"doc{i:03d}" for i in range(count)], "PDF traité deux fois ou oublié"
+            for path in (Path(tmp) / "traces").iterdir():
+                path.unlink()
+            assert len(list((shared / "results").glob("*.json"))) == count
+        print(f"  ⏱️ 1 machine {durees[1]:.2f}s, 4 machines {durees[4]:.2f}s (×{durees[1] / durees[4]:.1f})")
+        assert durees[1] / durees[4] > 2.4
+        print("  ✅ Chaque PDF traité une seule fois, débit proche de linéaire")
+
+        extractor = PDFPropertyExtractor(input_dir=f"{tmp}/input", output_dir=f"{tmp}/output")
+        logging.disable(logging.WARNING)
+        try:
+            merged = extractor.merge_shared_results(Path(tmp) / "partage4")
+        finally:
+            logging.disable(logging.NOTSET)
+        sortie = pd.read_csv(extractor.output_dir / "output.csv", sep=';', dtype=str, encoding='utf-8-sig')
+        assert len(merged) == len(sortie) == count * 2
+        print("  ✅ Résultats publiés fusionnés dans output.csv")
+    return True
+
+def test_worker_tue():
+    print("\n🧪 TEST WORKER TUÉ EN COURS DE TRAITEMENT")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        creer_pdfs(Path(tmp) / "input", 3)
+        shared = str(Path(tmp) / "partage")
+        process = multiprocessing.Process(target=worker_tue, args=(tmp, shared))
+        process.start()
+        process.join()
+        assert SharedWorkDir(shared).state(Path(tmp) / "input" / "doc000.pdf") == CHECKPOINT_RUNNING
+
+        (Path(tmp) / "traces").mkdir()
+        start = time.perf_counter()
+        machine(tmp, shared, "survivant", duree=0.01, lease_seconds=0.5)
+        logging.disable(logging.NOTSET)
+        elapsed = time.perf_counter() - start
+        assert SharedWorkDir(shared).counts(sorted((Path(tmp) / "input").glob("*.pdf")))[CHECKPOINT_DONE] == 3
+        print(f"  ✅ PDF abandonné repris après expiration du bail ({elapsed:.2f}s)")
+    return True
+
+if __name__ == "__main__":
+    test_protocole_bail()
+    test_resultat_publie_jamais_ecrase()
+    test_debit_et_unicite()
+    test_worker_tue()